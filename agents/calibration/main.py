@@ -9,10 +9,21 @@ Förbättringar:
 - Bättre skalstabilitet
 - Integration med golden tests
 - Statistik över tid
+
+Stateful läge (opt-in: meta.stateful och meta.agent satta, ingen historical_scores): historiken
+hålls per agent/metrik i online_stats (Welford, EWMA, fönster) och klienten
+skickar bara nya current_scores. Drift och normaliserade scores räknas i O(1)
+per observation, och driftutfallet är detsamma som om hela historiken skickats.
+Varje anrop läser och skriver statistiken i en transaktion mot storen.
 """
 import sys, json, time, argparse
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 from collections import defaultdict
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from agents.calibration import online_stats
 
 AGENT_VERSION = "1.1.0"
 AGENT_ID = "calibration"
@@ -138,6 +149,60 @@ def normalize_scores(scores: Dict[str, float], target_mean: float = 0.5, target_
     
     return scores
 
+def calibrate_online(
+    agent: str,
+    current_scores: Dict[str, Any],
+    window_size: int = 20,
+    threshold: float = 0.15,
+    alpha: Optional[float] = None,
+    store=None
+) -> Dict[str, Any]:
+    """
+    Drift och normalisering mot lagrad statistik i stället för payload-historik.
+    
+    Nyckeln "agent:*" håller alla metrikers värden i inskickad ordning, så dess
+    fönster är exakt historical_values[-window_size:]. Varje metrik har egen
+    statistik ("agent:metrik") för per-metrik-drift och z-normalisering.
+    Läsning och skrivning sker i en transaktion, så samtidiga anrop serialiseras.
+    """
+    store = online_stats.get_store() if store is None else store
+    with online_stats.transaction(store):
+        return _calibrate_online(agent, current_scores, window_size, threshold, alpha, store)
+
+def _calibrate_online(agent: str, current_scores: Dict[str, Any], window_size: int, threshold: float,
+                      alpha: Optional[float], store) -> Dict[str, Any]:
+    alpha = online_stats.EWMA_ALPHA if alpha is None else float(alpha)
+    current_values = [v for v in current_scores.values() if isinstance(v, (int, float))]
+    
+    pooled = online_stats.load(f"{agent}:*", window_size, alpha, store)
+    drift_result = detect_drift(current_values, list(pooled.window), window_size, threshold)
+    
+    metrics = {}
+    for metric, value in current_scores.items():
+        if not isinstance(value, (int, float)):
+            continue
+        stats = online_stats.load(f"{agent}:{metric}", window_size, alpha, store)
+        drift = detect_drift([value], list(stats.window), window_size, threshold)
+        metrics[metric] = {
+            "normalized": round(stats.normalize(value), 3),
+            "drift_detected": drift["drift_detected"],
+            "drift_magnitude": drift["drift_magnitude"],
+            "drift_direction": drift["drift_direction"],
+        }
+        stats.update(value)
+        online_stats.save(f"{agent}:{metric}", stats, store)
+        metrics[metric]["stats"] = stats.summary()
+    
+    pooled.extend(current_values)
+    online_stats.save(f"{agent}:*", pooled, store)
+    
+    return {
+        "agent": agent,
+        "drift_detection": drift_result,
+        "metrics": metrics,
+        "pooled": pooled.summary()
+    }
+
 # -------------------- Core -------------------- #
 def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
     data = payload.get("data", {}) or {}
@@ -163,8 +228,14 @@ def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
         elif isinstance(hist_entry, list):
             historical_values.extend([v for v in hist_entry if isinstance(v, (int, float))])
     
-    # Detektera drift
-    drift_result = detect_drift(current_values, historical_values, window_size, threshold)
+    # Detektera drift (stateful: mot lagrad historik för agenten)
+    agent = meta.get("agent") or data.get("agent")
+    online = None
+    if agent and not historical_scores and meta.get("stateful"):
+        online = calibrate_online(agent, current_scores, window_size, threshold, meta.get("ewma_alpha"))
+        drift_result = online["drift_detection"]
+    else:
+        drift_result = detect_drift(current_values, historical_values, window_size, threshold)
     
     # Normalisera scores för skalstabilitet
     normalized_scores = normalize_scores(current_scores)
@@ -214,6 +285,8 @@ def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
         "recommendations": recommendations,
         "calibration_status": "ok" if not drift_result["drift_detected"] else "drift_detected"
     }
+    if online is not None:
+        emits["online"] = online
     
     checks = {
         "CHK-CALIBRATION-01": {
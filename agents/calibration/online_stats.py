@@ -0,0 +1,185 @@
+"""
+Online Stats - löpande driftstatistik per agent/metrik för calibration.
+
+calibrate/detect_drift räknade om medel/std från hela värdelistor som
+klienten skickade med i varje payload (historical_scores), så kostnaden växte
+med historiken. Här hålls statistiken per nyckel (agent:metrik) och
+uppdateras i O(1) per observation:
+
+- Welford: n, medel och M2 (varians) över hela strömmen, plus min/max
+- EWMA: exponentiellt viktat medel och varians (alpha, CALIBRATION_EWMA_ALPHA)
+- fönster: de senaste `window` värdena - samma historiska fönster som
+  detect_drift jämför mot, och underlag för fönsterkvantiler (p10/p50/p90)
+
+Tillståndet lagras som kompakt JSON i samma store-backends som
+tone_state_store (CALIBRATION_STATE_BACKEND, default sqlite under runtime/ så
+att det överlever mellan CLI-anrop). Ett anrops läs-uppdatera-skriv görs inom
+`transaction(store)`, så samtidiga CLI-anrop inte tappar uppdateringar.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterable, List, Optional
+
+from agents.emotion.tone_state_store import SHM_DIR, make_store
+
+ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_WINDOW = 20
+EWMA_ALPHA = float(os.getenv("CALIBRATION_EWMA_ALPHA", "0.1"))
+STATE_MAX = int(os.getenv("CALIBRATION_STATE_MAX", "100000"))
+STATE_MAX_BYTES = int(os.getenv("CALIBRATION_STATE_MAX_BYTES", str(64 * 1024 * 1024)))
+STATE_TTL_S = float(os.getenv("CALIBRATION_STATE_TTL_S", str(90 * 86400)))
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _quantile(sorted_vals: List[float], q: float) -> float:
+    # Linjär interpolation mellan närmaste rangerna
+    pos = (len(sorted_vals) - 1) * q
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+class OnlineStats:
+    """Welford + EWMA + begränsat fönster för en metrik."""
+
+    __slots__ = ("n", "mean", "m2", "min", "max", "ew_mean", "ew_var", "alpha", "window")
+
+    def __init__(self, window: int = DEFAULT_WINDOW, alpha: float = EWMA_ALPHA):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.ew_mean = 0.0
+        self.ew_var = 0.0
+        self.alpha = float(alpha)
+        self.window: deque = deque(maxlen=max(1, int(window)))
+
+    def update(self, x: float) -> None:
+        x = float(x)
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if self.n == 1:
+            self.ew_mean = x
+        else:
+            diff = x - self.ew_mean
+            incr = self.alpha * diff
+            self.ew_mean += incr
+            self.ew_var = (1.0 - self.alpha) * (self.ew_var + diff * incr)
+        self.window.append(x)
+
+    def extend(self, values: Iterable[float]) -> None:
+        for x in values:
+            self.update(x)
+
+    @property
+    def std(self) -> float:
+        # Populationsvarians, som calculate_statistics
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    def normalize(self, x: float, target_mean: float = 0.5, target_std: float = 0.2) -> float:
+        """x som z-score mot strömmens medel/std, skalad till target och klampad till [0, 1]."""
+        if self.n < 2:
+            return float(x)
+        z = (float(x) - self.mean) / max(self.std, 0.001)
+        return max(0.0, min(1.0, target_mean + z * target_std))
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "n": self.n,
+            "mean": round(self.mean, 3),
+            "std": round(self.std, 3),
+            "min": round(self.min, 3) if self.n else 0.0,
+            "max": round(self.max, 3) if self.n else 0.0,
+            "ewma": round(self.ew_mean, 3),
+            "ew_std": round(math.sqrt(self.ew_var), 3),
+        }
+        if self.window:
+            vals = sorted(self.window)
+            out["window"] = {f"p{int(q * 100)}": round(_quantile(vals, q), 3) for q in QUANTILES}
+        return out
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"n": self.n, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.n else None, "max": self.max if self.n else None,
+                "ew": [self.ew_mean, self.ew_var], "win": list(self.window)}
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]], window: int = DEFAULT_WINDOW,
+                   alpha: float = EWMA_ALPHA) -> "OnlineStats":
+        st = cls(window, alpha)
+        if state:
+            st.n = int(state.get("n", 0))
+            st.mean = float(state.get("mean", 0.0))
+            st.m2 = float(state.get("m2", 0.0))
+            if st.n:
+                st.min = float(state["min"])
+                st.max = float(state["max"])
+            st.ew_mean, st.ew_var = (float(v) for v in state.get("ew", (0.0, 0.0)))
+            st.window.extend(state.get("win", []))  # maxlen klipper om fönstret krympt
+        return st
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Processens calibration-store (skapas lazy från CALIBRATION_STATE_*)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.getenv("CALIBRATION_STATE_BACKEND", "sqlite").strip().lower()
+                path = os.getenv("CALIBRATION_STATE_PATH")
+                if backend != "memory" and not path:
+                    base = SHM_DIR if backend == "shm" and SHM_DIR.is_dir() else ROOT / "runtime"
+                    path = str(base / "calibration_state.sqlite")
+                _store = make_store(backend, path, max_entries=STATE_MAX, ttl_s=STATE_TTL_S,
+                                    max_bytes=STATE_MAX_BYTES)
+    return _store
+
+
+def set_store(store) -> None:
+    """Byt store (tester, eller värdprocess som injicerar egen backend)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def load(key: str, window: int = DEFAULT_WINDOW, alpha: float = EWMA_ALPHA, store=None) -> OnlineStats:
+    store = get_store() if store is None else store
+    return OnlineStats.from_state(store.get(key), window, alpha)
+
+
+def save(key: str, stats: OnlineStats, store=None) -> None:
+    store = get_store() if store is None else store
+    store.put(key, stats.to_state())
+
+
+def transaction(store=None) -> ContextManager[None]:
+    """Atomisk läs-uppdatera-skriv mot storen (se tone_state_store)."""
+    store = get_store() if store is None else store
+    return store.transaction()
+
+
+__all__ = [
+    "OnlineStats",
+    "get_store",
+    "set_store",
+    "load",
+    "save",
+    "transaction",
+]
@@ -9,13 +9,31 @@ Förbättringar:
 - Tidsmönster och sekvenser
 - Förbättrad confidence-scoring
 - Stöd för flera aktörer och komplexa relationer
+
+Inkrementellt läge (analyze_incremental, eller run() med conversation_id):
+grafen per konversation (nodräknare, aggregerade kanter, tidslinjens svans)
+ligger i en begränsad state-store och bara de nya turerna bearbetas. Räknarna
+har fast storlek oavsett samtalets längd, så kostnaden per tur är konstant.
+graph_spans är som i analyze() alla spans i hela dialogen (en retry/replay får
+samma evidens), och graph_delta är den faktiska diffen: nya/ändrade noder, nya
+kanter, nya tidslinjeposter och nya spans. Store-backend:
+CONTEXT_GRAPH_STATE_BACKEND (memory/shm/sqlite, samma backends som
+tone_state_store); default sqlite under runtime/, eftersom varje request körs i
+en ny process och en minnes-store inte skulle överleva till nästa tur.
 """
 from __future__ import annotations
 import re
+import os
 import json
 import sys
 import time
+import hashlib
+from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from agents.emotion.tone_state_store import SHM_DIR, make_store
 
 AGENT_VERSION = "2.1.0"
 AGENT_ID = "context_graph"
@@ -256,6 +274,208 @@ def analyze(
         "relation_counts": {rel_type: len([r for r in relations if r[0] == rel_type]) for rel_type in relation_types}
     }
 
+# -------------------------- Inkrementell graf -------------------------- #
+TIMELINE_KEEP = int(os.getenv("CONTEXT_GRAPH_TIMELINE_KEEP", "50"))
+GRAPH_STATE_MAX = int(os.getenv("CONTEXT_GRAPH_STATE_MAX", "4096"))
+GRAPH_STATE_MAX_BYTES = int(os.getenv("CONTEXT_GRAPH_STATE_MAX_BYTES", str(16 * 1024 * 1024)))
+GRAPH_STATE_TTL_S = float(os.getenv("CONTEXT_GRAPH_STATE_TTL_S", "86400"))
+
+def new_state() -> Dict[str, Any]:
+    """Tom graf. Utom tidslinjen och spans är allt räknare; spans växer bara med antalet händelseträffar."""
+    return {
+        "turns": 0,
+        "offset": 0,        # längd på " ".join(texter) hittills - spans får samma offsets som analyze()
+        "span_count": 0,
+        "last": None,       # nyckel för senast bearbetade tur (upptäcker ändrad dialog)
+        "actors": {},       # id -> mentions
+        "events": {},       # label -> count
+        "relations": {},    # rel_type -> mentions
+        "edges": {},        # "from|to|type" -> kant med count/first_turn/last_turn
+        "timeline": [],     # de senaste TIMELINE_KEEP turerna
+        "spans": [],        # alla händelsespans (graph_spans)
+    }
+
+def _turn_key(turn: Dict[str, Any]) -> str:
+    raw = f"{turn.get('speaker', '?')}\x00{turn.get('text', '')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def _node(state: Dict[str, Any], node_id: str) -> Dict[str, Any]:
+    if node_id.startswith("evt:"):
+        n = state["events"][node_id[4:]]
+        return {"id": node_id, "type": "event", "count": n, "mentions": n}
+    if node_id.startswith("rel:"):
+        return {"id": node_id, "type": "relation", "mentions": state["relations"][node_id[4:]]}
+    return {"id": node_id, "type": "actor", "mentions": state["actors"][node_id]}
+
+def _add_edge(state: Dict[str, Any], edge: Dict[str, Any]) -> None:
+    """Aggregera kanten i tillståndet per (from, to, type)."""
+    key = f"{edge['from']}|{edge['to']}|{edge['type']}"
+    agg = state["edges"].get(key)
+    if agg is None:
+        agg = state["edges"][key] = {"from": edge["from"], "to": edge["to"], "type": edge["type"],
+                                     "confidence": edge["confidence"], "count": 0}
+        if "turn" in edge:
+            agg["first_turn"] = edge["turn"]
+    agg["count"] += 1
+    if "turn" in edge:
+        agg["last_turn"] = edge["turn"]
+
+def apply_turn(state: Dict[str, Any], turn: Dict[str, Any]) -> Dict[str, Any]:
+    """Lägg till en tur i grafen (muterar state) och returnera turens diff."""
+    i = state["turns"] + 1
+    speaker = turn.get("speaker", "?")
+    turn_text = turn.get("text", "")
+    base = state["offset"]
+    touched: List[str] = []
+    
+    # Aktörer (P1/P2 finns alltid i dialogläge)
+    actors = state["actors"]
+    if i == 1:
+        for a in ("P1", "P2"):
+            actors.setdefault(a, 0)
+            touched.append(a)
+    for m in ACTOR_RE.finditer(turn_text):
+        a = _norm_actor(m.group())
+        actors[a] = actors.get(a, 0) + 1
+        if a not in touched:
+            touched.append(a)
+    
+    # Händelser + spans (offsets i den fogade dialogtexten)
+    spans, edges, turn_events = [], [], []
+    for label, rx in EVENT_RE:
+        matches = list(rx.finditer(turn_text))
+        if not matches:
+            continue
+        turn_events.append(label)
+        state["events"][label] = state["events"].get(label, 0) + len(matches)
+        touched.append(f"evt:{label}")
+        for m in matches:
+            spans.append({
+                "label": label,
+                "start": base + m.start(),
+                "end": base + m.end(),
+                "text": m.group(),
+                "confidence": 0.8
+            })
+            edges.append({"from": speaker, "to": f"evt:{label}", "type": "mentions",
+                          "confidence": 0.8, "turn": i})
+    
+    # Relationer
+    for rel_type, _ in _extract_relations(turn_text):
+        state["relations"][rel_type] = state["relations"].get(rel_type, 0) + 1
+        if f"rel:{rel_type}" not in touched:
+            touched.append(f"rel:{rel_type}")
+        edges.append({"from": speaker, "to": f"rel:{rel_type}", "type": "has_relation",
+                      "confidence": 0.7, "turn": i})
+    
+    for e in edges:
+        _add_edge(state, e)
+    if "P1" in actors and "P2" in actors and "P1|P2|interacts_with" not in state["edges"]:
+        e = {"from": "P1", "to": "P2", "type": "interacts_with", "confidence": 0.6}
+        _add_edge(state, e)
+        edges.append(e)
+    
+    entry = {"t": i, "speaker": speaker, "text": turn_text[:100], "events": turn_events,
+             "ts": turn.get("ts", i)}
+    state["timeline"].append(entry)
+    del state["timeline"][:-TIMELINE_KEEP]
+    
+    state["turns"] = i
+    state["offset"] = base + len(turn_text) + 1
+    state["span_count"] += len(spans)
+    state["spans"].extend(spans)
+    state["last"] = _turn_key(turn)
+    return {"nodes": [_node(state, n) for n in touched], "edges": edges, "timeline": [entry], "spans": spans}
+
+def graph_snapshot(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Hela den lagrade grafen: noder, aggregerade kanter och tidslinjens svans."""
+    nodes = [_node(state, a) for a in sorted(state["actors"])]
+    nodes += [_node(state, f"evt:{e}") for e in sorted(state["events"])]
+    nodes += [_node(state, f"rel:{r}") for r in sorted(state["relations"])]
+    return {"nodes": nodes, "edges": list(state["edges"].values()), "timeline": list(state["timeline"])}
+
+def _graph_confidence(state: Dict[str, Any]) -> float:
+    # Samma formel som analyze(), på de ackumulerade räknarna
+    conf_boost = 0.0
+    if state["span_count"] > 0:
+        conf_boost += min(0.2, state["span_count"] * 0.02)
+    if state["turns"] > 1:
+        conf_boost += 0.1
+    if state["relations"]:
+        conf_boost += 0.1
+    return round(min(1.0, 0.6 + conf_boost), 2)
+
+_graph_store = None
+
+def get_graph_store():
+    """Processens graf-store (skapas lazy från CONTEXT_GRAPH_STATE_*)."""
+    global _graph_store
+    if _graph_store is None:
+        backend = os.getenv("CONTEXT_GRAPH_STATE_BACKEND", "sqlite").strip().lower()
+        path = os.getenv("CONTEXT_GRAPH_STATE_PATH")
+        if backend != "memory" and not path:
+            base = SHM_DIR if backend == "shm" and SHM_DIR.is_dir() else ROOT / "runtime"
+            path = str(base / "context_graph_state.sqlite")
+        _graph_store = make_store(backend, path, max_entries=GRAPH_STATE_MAX,
+                                  ttl_s=GRAPH_STATE_TTL_S, max_bytes=GRAPH_STATE_MAX_BYTES)
+    return _graph_store
+
+def set_graph_store(store) -> None:
+    """Byt store (tester, eller värdprocess som injicerar egen backend)."""
+    global _graph_store
+    _graph_store = store
+
+def analyze_incremental(
+    conversation_id: str,
+    dialog: List[Dict[str, str]],
+    store=None
+) -> Dict[str, Any]:
+    """
+    Uppdatera konversationens lagrade graf med turerna efter de redan bearbetade.
+    
+    `dialog` är hela dialogen hittills; bara dialog[state.turns:] bearbetas.
+    Är dialogen kortare än tillståndet, eller skiljer sig den senast bearbetade
+    turen, byggs grafen om från början (graph_rebuilt). graph_spans är alla
+    spans i grafen; turernas nya spans ligger i graph_delta["spans"].
+    """
+    if store is None:
+        store = get_graph_store()
+    key = f"context_graph:{conversation_id}"
+    dialog = dialog or []
+    state = store.get(key)
+    if state is not None and "spans" not in state:
+        state = None  # tillstånd från före spans sparades: bygg om tyst
+    n = state["turns"] if state else 0
+    rebuilt = bool(state) and (n > len(dialog) or (n > 0 and _turn_key(dialog[n - 1]) != state["last"]))
+    if state is None or rebuilt:
+        state, n = new_state(), 0
+    
+    nodes: Dict[str, Dict[str, Any]] = {}
+    delta = {"nodes": [], "edges": [], "timeline": [], "spans": []}
+    for turn in dialog[n:]:
+        d = apply_turn(state, turn)
+        for node in d["nodes"]:
+            nodes[node["id"]] = node   # senaste värdet per nod
+        delta["edges"].extend(d["edges"])
+        delta["timeline"].extend(d["timeline"])
+        delta["spans"].extend(d["spans"])
+    delta["nodes"] = list(nodes.values())
+    if len(dialog) > n or rebuilt:
+        store.put(key, state)
+    
+    return {
+        "graph_delta": delta,
+        "graph_events": sorted(state["events"]),
+        "graph_relations": sorted(state["relations"]),
+        "graph_confidence": _graph_confidence(state),
+        "graph_spans": list(state["spans"]),
+        "event_counts": dict(state["events"]),
+        "relation_counts": dict(state["relations"]),
+        "graph_turns": state["turns"],
+        "graph_node_count": len(state["actors"]) + len(state["events"]) + len(state["relations"]),
+        "graph_rebuilt": rebuilt,
+    }
+
 # -------------------------- Runner -------------------------- #
 def run(payload: Dict[str, Any]) -> Dict[str, Any]:
     data = payload.get("data", {})
@@ -263,8 +483,13 @@ def run(payload: Dict[str, Any]) -> Dict[str, Any]:
     text = data.get("description", "") or data.get("text", "")
     dialog = payload.get("dialog") or data.get("dialog")
     lang = meta.get("language", "sv") or "sv"
+    conversation_id = meta.get("conversation_id") or data.get("conversation_id")
     
-    result = analyze(text=text, dialog=dialog, lang=lang)
+    if conversation_id and dialog and meta.get("incremental", True):
+        result = analyze_incremental(conversation_id, dialog)
+    else:
+        result = analyze(text=text, dialog=dialog, lang=lang)
+    node_count = result.get("graph_node_count", len(result["graph_delta"]["nodes"]))
     
     return {
         "ok": True,
@@ -272,8 +497,8 @@ def run(payload: Dict[str, Any]) -> Dict[str, Any]:
         "emits": result,
         "checks": {
             "CHK-GRAPH-01": {
-                "pass": len(result["graph_delta"]["nodes"]) > 0,
-                "reason": f"{len(result['graph_delta']['nodes'])} nodes skapade"
+                "pass": node_count > 0,
+                "reason": f"{node_count} nodes skapade"
             }
         }
     }
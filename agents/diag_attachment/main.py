@@ -6,37 +6,42 @@ S002 ≥0.75
 import sys
 import json
 import time
-import re
 from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.phrase_index import lexicon_hits
 
 AGENT_VERSION = "1.1.0"
 AGENT_ID = "diag_attachment"
 
+# Indikatorer för varje typ (sv + en)
+ATTACHMENT_INDICATORS = {
+    "secure": [
+        "trygg", "säker", "tillit", "förtroende", "secure", "trust", "comfort", "open", "honest"
+    ],
+    "anxious": [
+        "orolig", "rädd", "osäker", "clingy", "needy", "afraid", "worried", "insecure",
+        "fear", "rejection", "aband", "depend", "doubt"
+    ],
+    "avoidant": [
+        "undvik", "distans", "kall", "avoid", "distant", "cold", "independent",
+        "detached", "closed", "pull away", "emotionless"
+    ]
+}
+
+# Delat fras-index med övriga diag-agenter (lib/text/phrase_index)
+DIAG_HITS = lexicon_hits("diag")
+DIAG_HITS.register(AGENT_ID, ATTACHMENT_INDICATORS)
+
 def analyze_attachment(features, text):
     """Analysera anknytningstyp (mer generell version)"""
-    text_lower = text.lower()
-
-    # Indikatorer för varje typ (sv + en)
-    attachment_indicators = {
-        "secure": [
-            "trygg", "säker", "tillit", "förtroende", "secure", "trust", "comfort", "open", "honest"
-        ],
-        "anxious": [
-            "orolig", "rädd", "osäker", "clingy", "needy", "afraid", "worried", "insecure",
-            "fear", "rejection", "aband", "depend", "doubt"
-        ],
-        "avoidant": [
-            "undvik", "distans", "kall", "avoid", "distant", "cold", "independent",
-            "detached", "closed", "pull away", "emotionless"
-        ]
-    }
+    found = DIAG_HITS.hits(text)
 
     # Poängberäkning (viktning)
     scores = {"secure": 0, "anxious": 0, "avoidant": 0}
-    for style, keywords in attachment_indicators.items():
-        for word in keywords:
-            if re.search(r"\b" + re.escape(word) + r"\b", text_lower):
-                scores[style] += 1
+    for style, keywords in ATTACHMENT_INDICATORS.items():
+        scores[style] += DIAG_HITS.count(keywords, text, found)
 
     total = sum(scores.values()) or 1
     for k in scores:
@@ -8,7 +8,12 @@ import json
 import time
 import re
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.phrase_index import lexicon_hits
+from lib.text.text_view import TextView, adopt, text_view
 
 AGENT_VERSION = "1.1.0"
 AGENT_ID = "diag_boundary"
@@ -80,35 +85,32 @@ LEX = {
 
 SENT_SPLIT = re.compile(r'(?<=[\.\!\?])\s+')
 
+DIAG_HITS = lexicon_hits("diag")
+DIAG_HITS.register(AGENT_ID, LEX)
+
 # ----------------------------- Utils -----------------------------
 def split_sentences(text: str) -> List[str]:
-    s = [x.strip() for x in SENT_SPLIT.split(text) if x.strip()]
+    s = text_view(text).split(SENT_SPLIT)
     return s if s else [text.strip()]
 
 def has_any(phrase_list: List[str], text: str) -> bool:
-    for p in phrase_list:
-        if re.search(r'\b' + re.escape(p) + r'\b', text, flags=re.IGNORECASE):
-            return True
-    return False
+    return DIAG_HITS.any(phrase_list, text)
 
 def count_weighted_hits(phrases: List[str], sentence: str) -> Tuple[int, float]:
     """
     Returnerar (antal_träffar, viktad_poäng) i en mening.
     Negation sänker, intensifierare höjer.
     """
-    base_hits = 0
     weight = 1.0
-    s_lower = sentence.lower()
+    found = DIAG_HITS.hits(sentence)
 
     # Modifiera vikt baserat på intensifierare/negationer i meningen
-    if has_any(LEX["intensifiers"], s_lower):
+    if DIAG_HITS.any(LEX["intensifiers"], sentence, found):
         weight *= 1.25
-    if has_any(LEX["negations"], s_lower):
+    if DIAG_HITS.any(LEX["negations"], sentence, found):
         weight *= 0.75
 
-    for p in phrases:
-        if re.search(r'\b' + re.escape(p.lower()) + r'\b', s_lower):
-            base_hits += 1
+    base_hits = DIAG_HITS.count(phrases, sentence, found)
 
     return base_hits, base_hits * weight
 
@@ -248,7 +250,8 @@ def analyze_boundaries(features: List[str], text: str) -> Dict:
     return insights, label
 
 # ----------------------------- Runner -----------------------------
-def run(payload: Dict) -> Dict:
+def run(payload: Dict, view: Optional[TextView] = None) -> Dict:
+    adopt(view)  # delad vy från anroparen (samma text) återanvänds av split_sentences
     data = payload.get("data", {})
     text = data.get("text", "") or ""
     features = data.get("features", [])
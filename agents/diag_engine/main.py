@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+D0 DiagEngine - alla diag_*-agenter i ett pass över delad text/träfftabell
+
+De elva diagnostikagenterna körs in-process på samma TextView (meningar delas
+en gång per SENT_SPLIT) och samma fras-index: varje agent registrerar sitt LEX
+i lexicon_hits("diag"), så när alla är laddade finns ETT index över samtliga
+lexikon och varje mening skannas en gång - träffmängden återanvänds av alla
+kategorier, intensifierare/negationer och agenter.
+
+Input (stdin):
+{
+  "data": {"text": "...", "features": [...], "tags": [...]},
+  "meta": {"agents": ["diag_trust", ...]}   # valfritt urval, default alla
+}
+
+Output:
+{
+  "ok": true,
+  "emits": {"diag": {"diag_trust": {...emits...}, ...}},
+  "checks": {"CHK-TRUST-01": {...}, ...},
+  "agents": {"diag_trust": {"ok": true, "ms": 0.4}, ...},   # per agent: ok/fel + tid
+  "engine": {"sentences": 3, "phrases": 1240, "scans": 5, "scan_hits": 120}
+}
+"""
+import sys
+import json
+import time
+import importlib
+import inspect
+from pathlib import Path
+from typing import Any, Dict, Optional
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.phrase_index import lexicon_hits
+from lib.text.text_view import TextView, ensure_view
+
+AGENT_VERSION = "1.0.0"
+AGENT_ID = "diag_engine"
+
+DIAG_AGENTS = (
+    "diag_trust", "diag_power", "diag_boundary", "diag_intimacy", "diag_digital",
+    "diag_cultural", "diag_substance", "diag_alignment", "diag_communication",
+    "diag_conflict", "diag_attachment",
+)
+
+DIAG_HITS = lexicon_hits("diag")
+
+_modules: Dict[str, Any] = {}
+_takes_view: Dict[str, bool] = {}
+
+
+def load_agents() -> Dict[str, Any]:
+    """Importera alla diag-agenter (registrerar deras lexikon i det delade indexet)."""
+    if len(_modules) < len(DIAG_AGENTS):
+        for agent_id in DIAG_AGENTS:
+            if agent_id not in _modules:
+                mod = importlib.import_module(f"agents.{agent_id}.main")
+                _modules[agent_id] = mod
+                _takes_view[agent_id] = "view" in inspect.signature(mod.run).parameters
+    return _modules
+
+
+def run(payload: Dict, view: Optional[TextView] = None) -> Dict:
+    modules = load_agents()
+    data = payload.get("data", {}) or {}
+    meta = payload.get("meta", {}) or {}
+    text = data.get("text", "") or ""
+    wanted = meta.get("agents") or DIAG_AGENTS
+    view = ensure_view(text, view)
+    stats0 = dict(DIAG_HITS.stats)
+
+    # Agenterna får data/meta men inte motorns intent (diag_alignment validerar sin egen)
+    sub_payload = {"data": data, "meta": meta}
+    diag: Dict[str, Any] = {}
+    checks: Dict[str, Any] = {}
+    agents: Dict[str, Any] = {}
+    for agent_id in DIAG_AGENTS:
+        if agent_id not in wanted:
+            continue
+        t0 = time.perf_counter()
+        try:
+            mod = modules[agent_id]
+            res = mod.run(sub_payload, view=view) if _takes_view[agent_id] else mod.run(sub_payload)
+        except Exception as e:
+            res = {"ok": False, "error": str(e)}
+        agents[agent_id] = {"ok": bool(res.get("ok")), "ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+        if res.get("error"):
+            agents[agent_id]["error"] = res["error"]
+        diag[agent_id] = res.get("emits", {})
+        checks.update(res.get("checks", {}) or {})
+
+    return {
+        "ok": True,
+        "emits": {"diag": diag},
+        "checks": checks,
+        "agents": agents,
+        "engine": {
+            "sentences": len(view.sentences),
+            "phrases": len(DIAG_HITS.index),
+            "scans": DIAG_HITS.stats["scans"] - stats0["scans"],
+            "scan_hits": DIAG_HITS.stats["hit"] - stats0["hit"],
+        },
+    }
+
+
+# ----------------------------- Main -----------------------------
+if __name__ == "__main__":
+    t0 = time.time()
+    payload = json.loads(sys.stdin.read())
+    try:
+        res = run(payload)
+        res["version"] = f"{AGENT_ID}@{AGENT_VERSION}"
+        res["latency_ms"] = int((time.time() - t0) * 1000)
+        res["cost"] = {"usd": 0.010}
+        print(json.dumps(res, ensure_ascii=False))
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}))
+        sys.exit(1)
@@ -8,7 +8,13 @@ import sys
 import json
 import time
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.phrase_index import lexicon_hits
+from lib.text.text_view import TextView, adopt, text_view
 
 AGENT_VERSION = "1.2.0"
 AGENT_ID = "diag_power"
@@ -112,27 +118,23 @@ LEX = {
 
 SENT_SPLIT = re.compile(r'(?<=[\.\!\?\n])\s+')
 
+DIAG_HITS = lexicon_hits("diag")
+DIAG_HITS.register(AGENT_ID, LEX)
+
 # ----------------------------- Utils -----------------------------
 def split_sentences(text: str) -> List[str]:
-    parts = [x.strip() for x in SENT_SPLIT.split(text or "") if x.strip()]
+    parts = text_view(text or "").split(SENT_SPLIT)
     return parts or [text.strip()]
 
 def has_any(phrases: List[str], s: str) -> bool:
-    s = s.lower()
-    for p in phrases:
-        if re.search(r'\b' + re.escape(p.lower()) + r'\b', s):
-            return True
-    return False
+    return DIAG_HITS.any(phrases, s)
 
 def count_weighted_hits(phrases: List[str], sentence: str) -> Tuple[int, float]:
-    s = sentence.lower()
-    base = 0
+    found = DIAG_HITS.hits(sentence)
     w = 1.0
-    if has_any(LEX["intensifiers"], s): w *= 1.25
-    if has_any(LEX["negations"], s):    w *= 0.8
-    for p in phrases:
-        if re.search(r'\b' + re.escape(p.lower()) + r'\b', s):
-            base += 1
+    if DIAG_HITS.any(LEX["intensifiers"], sentence, found): w *= 1.25
+    if DIAG_HITS.any(LEX["negations"], sentence, found):    w *= 0.8
+    base = DIAG_HITS.count(phrases, sentence, found)
     return base, base * w
 
 def clamp01(x: float) -> float:
@@ -253,7 +255,8 @@ def analyze_power_balance(features: List[str], text: str) -> Tuple[Dict, str]:
     return insights, label_ui
 
 # ----------------------------- Runner -----------------------------
-def run(payload: Dict) -> Dict:
+def run(payload: Dict, view: Optional[TextView] = None) -> Dict:
+    adopt(view)  # delad vy från anroparen (samma text) återanvänds av split_sentences
     data = payload.get("data", {})
     text = data.get("text", "") or ""
     features = data.get("features", []) or []
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Calibration Engine - Z-tröskelsvep utan att köra om textdetektionen.
+
+I CALIBRATION_MODE beror bara det sista klassificeringsbandet
+(micro_mood.calibrated_band) på Z_RED/Z_PLUS/Z_LIGHT. Allt fram till dit
+(ordräkning, fraser, emoji, gates, z) extraheras en gång per fall och
+CFG-inställning till en FeatureCache; varje tröskelkombination utvärderas
+sedan direkt mot de cachade signalerna. Fall som avgörs innan Z-beslutet
+(STRONG-RED, ABUSE, WEAK-RED) är Z-oberoende och räknas bara en gång.
+
+Ersätter emotion_grid_calibrate.mjs-loopen (node + python per kombination).
+
+Usage:
+    python agents/emotion/calibration_engine.py \\
+        --zred 0.85:1.00:0.05 --zplus 0.60:0.85:0.05 --zlight 0.30:0.50:0.05 \\
+        [--cfg EVID_SOFT_POS_W=0.1,0.2] [--in tests/golden/emotion] [--out reports/emotion_calibration_sweep.json]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import micro_mood as mm
+
+GOLDEN_DIR = ROOT / "tests" / "golden" / "emotion"
+LEVELS = ("neutral", "light", "plus", "red")
+
+
+def load_golden(paths=None) -> list[dict]:
+    """Golden-fall ({id, label, text, lang}) från jsonl-filer eller kataloger."""
+    files = []
+    for p in [Path(x) for x in (paths or [GOLDEN_DIR])]:
+        files += sorted(p.glob("*.jsonl")) if p.is_dir() else [p]
+    cases = []
+    for f in files:
+        for line in f.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            label = (r.get("label") or r.get("expected") or "neutral").lower()
+            lang = r.get("lang") or "sv"
+            cases.append({
+                "id": r.get("id", ""),
+                "label": label,
+                "text": r.get("text", ""),
+                # Samma språkmappning som emotion_golden_eval.mjs
+                "lang": "sv" if lang == "auto" else lang,
+            })
+    return cases
+
+
+def _coerce(current, value):
+    if isinstance(current, bool):
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+    return type(current)(value)
+
+
+@contextmanager
+def cfg_override(overrides: dict | None = None):
+    """Kör med CALIBRATION_MODE=true och tillfälligt ändrade CFG-värden."""
+    values = {"CALIBRATION_MODE": True, **(overrides or {})}
+    saved = {k: mm.CFG[k] for k in values}
+    try:
+        for k, v in values.items():
+            mm.CFG[k] = _coerce(saved[k], v)
+        yield
+    finally:
+        mm.CFG.update(saved)
+
+
+def _final_score(level: str, score: float) -> float:
+    # Samma clamp/avrundning som micro_mood.ok()
+    if level == "light":
+        score = mm.clamp_light_score(score)
+    elif level == "plus":
+        score = mm.clamp_plus_score(score)
+    return round(float(score), 3)
+
+
+class FeatureCache:
+    """
+    Signaler per golden-fall för en CFG-inställning.
+
+    `fixed[i]` är (level, score) för fall som avgörs före Z-beslutet, annars
+    None och `signals[i]` håller micro_mood.CalibrationSignals.
+    """
+
+    def __init__(self, cases: list[dict], cfg: dict | None = None):
+        self.cases = cases
+        self.cfg = dict(cfg or {})
+        self.labels = [c["label"] for c in cases]
+        self.langs = [c["lang"] for c in cases]
+        self.fixed: list = []
+        self.signals: list = []
+        with cfg_override(self.cfg):
+            for c in cases:
+                out = mm.detect_mood(c["text"], c["lang"], signals_only=True)
+                if "signals" in out:
+                    self.fixed.append(None)
+                    self.signals.append(out["signals"])
+                else:
+                    self.fixed.append((out["level"], out["score"]))
+                    self.signals.append(None)
+        self._dynamic = [i for i, s in enumerate(self.signals) if s is not None]
+
+    def predict(self, z_red: float, z_plus: float, z_light: float) -> list[tuple[str, float]]:
+        """(level, score) per fall - identiskt med detect_mood under samma Z/CFG."""
+        out = list(self.fixed)
+        with cfg_override(self.cfg):
+            for i in self._dynamic:
+                level, score = mm.calibrated_band(self.signals[i], z_red, z_plus, z_light)
+                out[i] = (level, _final_score(level, score))
+        return out
+
+    def evaluate(self, z_red: float, z_plus: float, z_light: float) -> dict:
+        return score_predictions(self.labels, self.langs, self.predict(z_red, z_plus, z_light))
+
+
+def score_predictions(labels: list[str], langs: list[str], preds: list[tuple[str, float]]) -> dict:
+    """Confusion matrix, per-klass/macro F1, accuracy, RED-FP och SV/EN-gap."""
+    cm = {e: {d: 0 for d in LEVELS} for e in LEVELS}
+    sv, en = [], []
+    for exp, lang, (det, score) in zip(labels, langs, preds):
+        if exp in cm and det in cm:
+            cm[exp][det] += 1
+        if lang == "sv":
+            sv.append(score)
+        elif lang == "en":
+            en.append(score)
+
+    f1 = {}
+    for lvl in LEVELS:
+        tp = cm[lvl][lvl]
+        pred = sum(cm[e][lvl] for e in LEVELS)
+        true = sum(cm[lvl].values())
+        prec = tp / pred if pred else 0.0
+        rec = tp / true if true else 0.0
+        f1[lvl] = 2 * prec * rec / (prec + rec) if prec + rec else 0.0
+    present = [lvl for lvl in LEVELS if sum(cm[lvl].values())]
+    total = sum(sum(row.values()) for row in cm.values())
+    red_pred = sum(cm[e]["red"] for e in LEVELS)
+
+    def mean(xs):
+        return sum(xs) / len(xs) if xs else 0.0
+
+    return {
+        "accuracy": round(sum(cm[lvl][lvl] for lvl in LEVELS) / total, 4) if total else 0.0,
+        "macro_f1": round(mean([f1[lvl] for lvl in present]), 4),
+        "f1": {k: round(v, 4) for k, v in f1.items()},
+        "red_fp_rate": round((red_pred - cm["red"]["red"]) / red_pred, 4) if red_pred else 0.0,
+        "sv_en_gap": round(abs(mean(sv) - mean(en)), 4),
+        "confusion_matrix": cm,
+    }
+
+
+def frange(spec: str) -> list[float]:
+    """"min:max:step" eller "a,b,c" → lista av värden."""
+    if ":" in spec:
+        lo, hi, step = (float(x) for x in spec.split(":"))
+        n = int(round((hi - lo) / step)) if step > 0 else 0
+        return [round(lo + i * step, 6) for i in range(n + 1)]
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+
+def sweep(cases: list[dict], z_red: list[float], z_plus: list[float], z_light: list[float],
+          cfg_grid: list[dict] | None = None) -> list[dict]:
+    """Utvärdera alla kombinationer (Z_RED > Z_PLUS > Z_LIGHT), bäst först."""
+    results = []
+    for cfg in cfg_grid or [{}]:
+        cache = FeatureCache(cases, cfg)
+        for zr, zp, zl in itertools.product(z_red, z_plus, z_light):
+            if not (zr > zp > zl):
+                continue
+            m = cache.evaluate(zr, zp, zl)
+            results.append({"cfg": cfg, "Z_RED": zr, "Z_PLUS": zp, "Z_LIGHT": zl, **m})
+    results.sort(key=lambda r: (-r["macro_f1"], r["red_fp_rate"], r["sv_en_gap"]))
+    return results
+
+
+def _cfg_grid(specs: list[str]) -> list[dict]:
+    axes = []
+    for spec in specs:
+        key, _, values = spec.partition("=")
+        if key not in mm.CFG:
+            raise SystemExit(f"Unknown CFG key: {key}")
+        axes.append([(key, v) for v in values.split(",") if v.strip()])
+    return [dict(combo) for combo in itertools.product(*axes)] if axes else [{}]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Z-threshold sweep over cached micro_mood signals")
+    ap.add_argument("--in", dest="inputs", action="append", help="golden jsonl file/dir (repeatable)")
+    ap.add_argument("--zred", default="0.85:1.00:0.05")
+    ap.add_argument("--zplus", default="0.60:0.85:0.05")
+    ap.add_argument("--zlight", default="0.30:0.50:0.05")
+    ap.add_argument("--cfg", action="append", default=[], help="KEY=v1,v2 (CFG-axel, repeatable)")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    cases = load_golden(args.inputs)
+    results = sweep(cases, frange(args.zred), frange(args.zplus), frange(args.zlight), _cfg_grid(args.cfg))
+    elapsed = time.perf_counter() - t0
+
+    print(f"[calibrate] {len(results)} combinations x {len(cases)} cases in {elapsed:.2f}s")
+    for r in results[:args.top]:
+        print(f"  Z=({r['Z_RED']:.2f},{r['Z_PLUS']:.2f},{r['Z_LIGHT']:.2f}) cfg={r['cfg']} "
+              f"macroF1={r['macro_f1']:.4f} acc={r['accuracy']:.4f} redFP={r['red_fp_rate']:.4f} gap={r['sv_en_gap']:.4f}")
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps({"cases": len(cases), "elapsed_s": round(elapsed, 3), "results": results},
+                                  ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+__all__ = ["FeatureCache", "load_golden", "cfg_override", "score_predictions", "sweep", "frange"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emotion Core - hela emotion-kedjan i en process på en delad TextAnalysis.
+
+Tidigare ett bridge-anrop per agent (micro_mood, empathy_tone_v2,
+tone_regularizer, empathy_fusion, soft_correction, explain_emotion), där
+varje agent normaliserade och tokeniserade samma text på nytt. Här byggs
+TextAnalysis en gång och kedjan körs i ordning:
+
+    micro_mood → empathy_tone_v2 → tone_regularizer → empathy_fusion
+               → soft_correction → explain_emotion
+
+Svaret innehåller varje stegs resultat, det fusionerade tonläget och
+`timings_ms` per steg.
+
+Tillstånd mellan turer (trace_id): tonfiltret läser/skriver tone_state_store
+som vanligt; regularizer-historiken sparas i samma store och turen matas in
+i emotion_tracker. Subprocess-anropare kan i stället skicka `prev_state` /
+`tone_history` och få `next_state` / `tone_history` tillbaka.
+
+Input (JSONL):
+{"agent":"emotion_core","text":"...","lang":"auto","trace_id":"...",
+ "prev_state":{...}, "tone_history":[[...]], "safety_result":{...},
+ "previous_response":"...", "salient_spans":[...], "memory_facets":[...],
+ "explain":true, "explain_level":"standard", "explain_style":null}
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import micro_mood as mm
+from agents.emotion import empathy_tone_v2 as tone_agent
+from agents.emotion import soft_correction
+from agents.emotion.empathy_fusion import fuse
+from agents.emotion.text_analysis import TextAnalysis
+from agents.emotion.tone_regularizer import MAX_DRIFT, TONE_HISTORY_SIZE, regularize_tone
+from agents.emotion.emotion_tracker import get_tracker
+from agents.emotion.tone_state_store import get_store
+from agents.explain.explain_emotion_agent import explain_emotion
+
+AGENT_VERSION = "1.0.0"
+AGENT_ID = "emotion_core"
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+def _history_key(trace_id: str) -> str:
+    return f"{trace_id}#tone_history"
+
+
+def run_emotion_core(
+    text: str,
+    lang: str = "auto",
+    *,
+    trace_id: str = "",
+    prev_state: Optional[Dict[str, Any]] = None,
+    tone_history: Optional[List[List[float]]] = None,
+    safety_result: Optional[Dict[str, Any]] = None,
+    previous_response: Optional[str] = None,
+    salient_spans: Optional[List[Dict[str, Any]]] = None,
+    memory_facets: Optional[List[str]] = None,
+    risk_flags: Optional[Dict[str, Any]] = None,
+    explain: bool = True,
+    explain_level: str = "standard",
+    explain_style: Optional[str] = None,
+    max_drift: float = MAX_DRIFT,
+    track: bool = True,
+) -> Dict[str, Any]:
+    """
+    Kör hela emotion-kedjan på en text.
+
+    lang="auto" löses en gång (micro_mood.detect_lang) och samma språk används
+    i alla steg. Utan `safety_result` härleds blockering från micro_mood:
+    RED → block (samma regel som orchestratorns micro_mood_red_block).
+    Med trace_id (och track) matas turen in i emotion_tracker; change-points
+    returneras som `tracker_events`.
+    """
+    timings: Dict[str, float] = {}
+    t_total = time.perf_counter()
+
+    t0 = time.perf_counter()
+    analysis = TextAnalysis(text).warm()
+    resolved_lang = analysis.mood_lang if lang == "auto" else lang
+    timings["analysis"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    mood = mm.detect_mood(text, lang, analysis=analysis)
+    timings["micro_mood"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    context = {"trace_id": trace_id, "prev_state": prev_state} if trace_id else None
+    tone = tone_agent.analyze(text, resolved_lang, context=context, analysis=analysis)
+    next_state = context.get("_updated_state") if context else None
+    timings["empathy_tone"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    store = get_store() if trace_id else None
+    if tone_history is None:
+        stored = store.get(_history_key(trace_id)) if store else None
+        tone_history = stored["history"] if stored else []
+    regularized = regularize_tone(tone["tone_vector"], tone_history, max_drift)
+    history = (list(tone_history) + [regularized["tone_vector"]])[-TONE_HISTORY_SIZE:]
+    if store:
+        store.put(_history_key(trace_id), {"history": history})
+    timings["tone_regularizer"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    is_red = mood.get("level") == "red"
+    if safety_result is None:
+        safety_result = {"block": is_red, "level": "red" if is_red else "safe"}
+    fused = fuse(
+        safety_result,
+        {"affects": tone["affects"], "tone_vector": regularized["tone_vector"]},
+        text,
+        resolved_lang,
+    )
+    timings["empathy_fusion"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    correction = soft_correction.analyze(text, resolved_lang, previous_response, analysis=analysis)
+    timings["soft_correction"] = _ms(t0)
+
+    explanation = None
+    if explain:
+        t0 = time.perf_counter()
+        # RED säger att något akut syns, inte vilken risk (självskada, övergrepp):
+        # neutral flagga om anroparen inte skickat egna risk_flags
+        flags = risk_flags if risk_flags is not None else ({"red": True} if is_red else {})
+        explanation = explain_emotion(
+            tuple(fused["fused_tone"]),
+            salient_spans,
+            memory_facets,
+            flags,
+            level=explain_level,
+            style=explain_style,
+            lang=resolved_lang,
+        )
+        timings["explain"] = _ms(t0)
+
+    timings["total"] = _ms(t_total)
+    result = {
+        "lang": resolved_lang,
+        "text": analysis.summary(),
+        "mood": {k: v for k, v in mood.items() if k not in ("ok", "latency_ms")},
+        "tone": tone,
+        "regularizer": regularized,
+        "fusion": fused,
+        "soft_correction": correction,
+        "explain": explanation,
+        "timings_ms": timings,
+    }
+    if trace_id:
+        result["tone_history"] = history
+        if track:
+            tracked = get_tracker().push_turn(trace_id, mood=mood, tone_vector=fused["fused_tone"])
+            result["tracker_events"] = tracked["events"]
+        if next_state is not None:
+            result["next_state"] = next_state
+    return result
+
+
+def handle_jsonl_request(line: str) -> str:
+    """
+    Hantera JSONL request (se modul-docstring för fält).
+
+    Output:
+    {"ok":true,"agent":"emotion_core","lang":"sv","mood":{...},"tone":{...},
+     "regularizer":{...},"fusion":{...},"soft_correction":{...},"explain":{...},
+     "timings_ms":{...},"next_state":{...},"tone_history":[...],"latency_ms":3.2}
+    """
+    start_time = time.perf_counter()
+    trace_id = ""
+    try:
+        request = json.loads(line.strip())
+        agent = request.get("agent", AGENT_ID)
+        trace_id = request.get("trace_id", "") or ""
+
+        if agent != AGENT_ID:
+            return json.dumps({
+                "ok": False,
+                "agent": agent,
+                "error": "Unknown agent",
+                "trace_id": trace_id,
+                "latency_ms": round((time.perf_counter() - start_time) * 1000, 2)
+            }, ensure_ascii=False)
+
+        result = run_emotion_core(
+            request.get("text", ""),
+            request.get("lang", "auto") or "auto",
+            trace_id=trace_id,
+            prev_state=request.get("prev_state"),
+            tone_history=request.get("tone_history"),
+            safety_result=request.get("safety_result"),
+            previous_response=request.get("previous_response"),
+            salient_spans=request.get("salient_spans"),
+            memory_facets=request.get("memory_facets"),
+            risk_flags=request.get("risk_flags"),
+            explain=request.get("explain", True),
+            explain_level=request.get("explain_level") or "standard",
+            explain_style=request.get("explain_style"),
+            max_drift=request.get("max_drift", MAX_DRIFT),
+            track=request.get("track", True),
+        )
+        return json.dumps({
+            "ok": True,
+            "agent": AGENT_ID,
+            "version": AGENT_VERSION,
+            **result,
+            "trace_id": trace_id,
+            "latency_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        }, ensure_ascii=False)
+
+    except Exception as e:
+        return json.dumps({
+            "ok": False,
+            "agent": AGENT_ID,
+            "error": str(e),
+            "trace_id": trace_id,
+            "latency_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        }, ensure_ascii=False)
+
+
+__all__ = ["run_emotion_core", "handle_jsonl_request"]
+
+
+if __name__ == "__main__":
+    if not sys.stdin.isatty():
+        # JSONL bridge mode
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            print(handle_jsonl_request(line), flush=True)
+        sys.exit(0)
+
+    test_text = " ".join(sys.argv[1:]) or "Jag är orolig för imorgon, men det löser sig nog 🙂"
+    print(json.dumps(run_emotion_core(test_text), indent=2, ensure_ascii=False))
@@ -0,0 +1,310 @@
+"""
+Emotion Tracker - strömmande per-tur-aggregat för pågående konversationer.
+
+Konversationsvyer räknades tidigare om från grunden av
+scripts/agg_emotion_events.mjs över reports/emotion_events. Här håller
+trackern rullande aggregat per konversation och uppdaterar dem i O(1) per tur:
+
+- nivåhistogram (neutral/light/plus/red) och RED-andel
+- EMA av score och tonvektor (empathy, warmth, clarity)
+- RED-streak (aktuell + max) och SV/EN-medel för parity-gap
+- tvåsidig CUSUM på score för drift-detektion
+
+Varje tur kan ge change-point-events som skickas till prenumeranter
+(dashboards, krisvägen) direkt, utan batch-omräkning:
+
+    level_change  nivån skiftade sedan förra turen
+    red_enter     första RED efter icke-RED
+    red_streak    RED-streaken nådde EMOTION_RED_STREAK_ALERT
+    red_exit      RED följd av icke-RED
+    tone_shift    tonvektorn avviker > EMOTION_TONE_SHIFT (L2) från sin EMA
+    score_drift   CUSUM passerade EMOTION_CUSUM_H (uppåt/nedåt)
+
+Sessioner är begränsade (LRU + TTL) precis som tone_state_store.
+
+API:
+    tracker = EmotionTracker()
+    tracker.open_session("conv-1")
+    tracker.push_turn("conv-1", text="...")           # kör micro_mood
+    tracker.push_turn("conv-1", mood={"level": ...})  # färdigt resultat/event
+    tracker.snapshot("conv-1")
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+LEVELS = ("neutral", "light", "plus", "red")
+
+DEFAULT_MAX_SESSIONS = int(os.getenv("EMOTION_TRACKER_MAX_SESSIONS", "10000"))
+DEFAULT_TTL_S = float(os.getenv("EMOTION_TRACKER_TTL_S", str(6 * 3600)))
+SCORE_ALPHA = float(os.getenv("EMOTION_SCORE_ALPHA", "0.3"))
+TONE_ALPHA = float(os.getenv("EMOTION_TONE_ALPHA", "0.3"))
+TONE_SHIFT = float(os.getenv("EMOTION_TONE_SHIFT", "0.15"))
+RED_STREAK_ALERT = int(os.getenv("EMOTION_RED_STREAK_ALERT", "2"))
+# CUSUM: slack k (tolererad avvikelse per tur) och larmtröskel h
+CUSUM_K = float(os.getenv("EMOTION_CUSUM_K", "0.05"))
+CUSUM_H = float(os.getenv("EMOTION_CUSUM_H", "0.5"))
+
+
+class EmotionSession:
+    """Rullande aggregat för en konversation (ingen turhistorik sparas)."""
+
+    __slots__ = (
+        "conversation_id", "meta", "opened_at", "updated_at", "touched", "turns",
+        "counts", "last_level", "last_score", "score_ema", "tone_ema",
+        "red_streak", "max_red_streak", "lang_sum", "lang_n",
+        "cusum_pos", "cusum_neg", "change_points", "last_event",
+    )
+
+    def __init__(self, conversation_id: str, meta: Optional[Dict[str, Any]] = None, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.conversation_id = conversation_id
+        self.meta = dict(meta or {})
+        self.opened_at = now
+        self.updated_at = now
+        self.touched = time.monotonic()
+        self.turns = 0
+        self.counts = {lvl: 0 for lvl in LEVELS}
+        self.last_level: Optional[str] = None
+        self.last_score: Optional[float] = None
+        self.score_ema: Optional[float] = None
+        self.tone_ema: Optional[List[float]] = None
+        self.red_streak = 0
+        self.max_red_streak = 0
+        self.lang_sum = {"sv": 0.0, "en": 0.0}
+        self.lang_n = {"sv": 0, "en": 0}
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.change_points = 0
+        self.last_event: Optional[Dict[str, Any]] = None
+
+    def update(self, level: str, score: float, lang: Optional[str], tone_vector: Optional[Sequence[float]],
+               ts: float) -> List[Dict[str, Any]]:
+        """Lägg till en tur och returnera de change-point-events den gav."""
+        events: List[Dict[str, Any]] = []
+        prev_level = self.last_level
+
+        self.turns += 1
+        self.counts[level] = self.counts.get(level, 0) + 1
+        if prev_level is not None and level != prev_level:
+            events.append({"type": "level_change", "from": prev_level, "to": level})
+
+        if level == "red":
+            self.red_streak += 1
+            self.max_red_streak = max(self.max_red_streak, self.red_streak)
+            if self.red_streak == 1:
+                events.append({"type": "red_enter"})
+            if self.red_streak == RED_STREAK_ALERT:
+                events.append({"type": "red_streak", "streak": self.red_streak})
+        else:
+            if self.red_streak:
+                events.append({"type": "red_exit", "streak": self.red_streak})
+            self.red_streak = 0
+
+        if self.score_ema is None:
+            self.score_ema = score
+        else:
+            # CUSUM mot EMA före uppdatering (förväntat värde för denna tur)
+            dev = score - self.score_ema
+            self.cusum_pos = max(0.0, self.cusum_pos + dev - CUSUM_K)
+            self.cusum_neg = max(0.0, self.cusum_neg - dev - CUSUM_K)
+            if self.cusum_pos > CUSUM_H:
+                events.append({"type": "score_drift", "direction": "up", "cusum": round(self.cusum_pos, 3)})
+                self.cusum_pos = 0.0
+            elif self.cusum_neg > CUSUM_H:
+                events.append({"type": "score_drift", "direction": "down", "cusum": round(self.cusum_neg, 3)})
+                self.cusum_neg = 0.0
+            self.score_ema += SCORE_ALPHA * dev
+        self.last_score = score
+
+        if tone_vector is not None:
+            tv = [float(v) for v in tone_vector[:3]]
+            if self.tone_ema is None:
+                self.tone_ema = tv
+            else:
+                dist = sum((a - b) ** 2 for a, b in zip(tv, self.tone_ema)) ** 0.5
+                if dist > TONE_SHIFT:
+                    events.append({"type": "tone_shift", "distance": round(dist, 3)})
+                self.tone_ema = [e + TONE_ALPHA * (v - e) for e, v in zip(self.tone_ema, tv)]
+
+        if lang in self.lang_sum:
+            self.lang_sum[lang] += score
+            self.lang_n[lang] += 1
+
+        self.last_level = level
+        self.updated_at = ts
+        self.touched = time.monotonic()
+        for ev in events:
+            ev.update({"conversation_id": self.conversation_id, "turn": self.turns, "level": level,
+                       "score": score, "ts": ts})
+        if events:
+            self.change_points += len(events)
+            self.last_event = events[-1]
+        return events
+
+    def snapshot(self) -> Dict[str, Any]:
+        means = {k: self.lang_sum[k] / self.lang_n[k] for k in self.lang_sum if self.lang_n[k]}
+        return {
+            "conversation_id": self.conversation_id,
+            "meta": dict(self.meta),
+            "turns": self.turns,
+            "counts_by_level": dict(self.counts),
+            "red_rate": round(self.counts["red"] / self.turns, 3) if self.turns else 0.0,
+            "last_level": self.last_level,
+            "last_score": self.last_score,
+            "score_ema": round(self.score_ema, 4) if self.score_ema is not None else None,
+            "tone_ema": [round(v, 4) for v in self.tone_ema] if self.tone_ema is not None else None,
+            "red_streak": self.red_streak,
+            "max_red_streak": self.max_red_streak,
+            "sv_en_gap": round(abs(means["sv"] - means["en"]), 3) if len(means) == 2 else None,
+            "change_points": self.change_points,
+            "last_event": dict(self.last_event) if self.last_event else None,
+            "opened_at": self.opened_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class EmotionTracker:
+    """Trådsäker samling sessioner med LRU + TTL och event-prenumeranter."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl_s: float = DEFAULT_TTL_S):
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, EmotionSession]" = OrderedDict()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.stats = {"turns": 0, "events": 0, "evicted": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def subscribe(self, fn: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Registrera callback för change-point-events; returnerar unsubscribe."""
+        with self._lock:
+            self._listeners.append(fn)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if fn in self._listeners:
+                    self._listeners.remove(fn)
+        return unsubscribe
+
+    def _session_locked(self, conversation_id: str, create: bool, meta=None) -> Optional[EmotionSession]:
+        s = self._sessions.get(conversation_id)
+        if s is not None and time.monotonic() - s.touched > self.ttl_s:
+            del self._sessions[conversation_id]
+            self.stats["expired"] += 1
+            s = None
+        if s is None:
+            if not create:
+                return None
+            s = self._sessions[conversation_id] = EmotionSession(conversation_id, meta)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+        self._sessions.move_to_end(conversation_id)
+        return s
+
+    def open_session(self, conversation_id: str, **meta) -> Dict[str, Any]:
+        """Skapa (eller återuppta) en session; meta följer med i snapshot."""
+        with self._lock:
+            s = self._session_locked(conversation_id, True, meta)
+            s.meta.update(meta)
+            return s.snapshot()
+
+    def push_turn(
+        self,
+        conversation_id: str,
+        text: Optional[str] = None,
+        lang: str = "auto",
+        *,
+        mood: Optional[Dict[str, Any]] = None,
+        tone_vector: Optional[Sequence[float]] = None,
+        ts: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Lägg till en tur. `mood` är ett micro_mood-resultat eller emotion-event
+        ({level, score, lang}); utan mood körs micro_mood.detect_mood på `text`.
+        Returnerar {"snapshot", "events"}.
+        """
+        if mood is None:
+            from .micro_mood import detect_mood
+            mood = detect_mood(text or "", lang)
+        level = str(mood.get("level") or "neutral").lower()
+        score = float(mood.get("score") or 0.0)
+        turn_lang = mood.get("lang") or (lang if lang != "auto" else None)
+        if tone_vector is None:
+            tone_vector = mood.get("tone_vector")
+
+        with self._lock:
+            s = self._session_locked(conversation_id, True)
+            events = s.update(level, score, turn_lang, tone_vector, time.time() if ts is None else ts)
+            snap = s.snapshot()
+            listeners = list(self._listeners) if events else []
+            self.stats["turns"] += 1
+            self.stats["events"] += len(events)
+
+        for ev in events:
+            for fn in listeners:
+                try:
+                    fn(ev)
+                except Exception:
+                    # En trasig prenumerant får inte stoppa turen
+                    pass
+        return {"snapshot": snap, "events": events}
+
+    def snapshot(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            s = self._session_locked(conversation_id, False)
+            return s.snapshot() if s else None
+
+    def close_session(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Ta bort sessionen och returnera sista snapshot."""
+        with self._lock:
+            s = self._sessions.pop(conversation_id, None)
+            return s.snapshot() if s else None
+
+    def sessions(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions)
+
+
+_tracker: Optional[EmotionTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker() -> EmotionTracker:
+    """Processens delade tracker (skapas lazy)."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = EmotionTracker()
+    return _tracker
+
+
+def open_session(conversation_id: str, **meta) -> Dict[str, Any]:
+    return get_tracker().open_session(conversation_id, **meta)
+
+
+def push_turn(conversation_id: str, text: Optional[str] = None, lang: str = "auto", **kw) -> Dict[str, Any]:
+    return get_tracker().push_turn(conversation_id, text, lang, **kw)
+
+
+def snapshot(conversation_id: str) -> Optional[Dict[str, Any]]:
+    return get_tracker().snapshot(conversation_id)
+
+
+__all__ = [
+    "EmotionSession",
+    "EmotionTracker",
+    "get_tracker",
+    "open_session",
+    "push_turn",
+    "snapshot",
+]
@@ -20,6 +20,7 @@ try:
     from .text_utils import normalize_text as normalize_text_util, clamp
     from .vector import embed, cosine_sim, blend, TONE_ANCHOR
     from .filters import median3, ema, slew_limit, adaptive_alpha, big_change_signal
+    from .tone_state_store import get_store
 except ImportError:
     # Fallback for standalone execution
     import sys
@@ -29,10 +30,10 @@ except ImportError:
     from text_utils import normalize_text as normalize_text_util, clamp
     from vector import embed, cosine_sim, blend, TONE_ANCHOR
     from filters import median3, ema, slew_limit, adaptive_alpha, big_change_signal
+    from tone_state_store import get_store
 
-# In-memory state cache for filtering (keyed by trace_id or thread_id)
-# In production, this should use Memory V2
-_state_cache: Dict[str, Dict[str, Any]] = {}
+# Filter state (keyed by trace_id or thread_id) lives in a bounded store
+# (LRU + TTL, byte budget); TONE_STATE_BACKEND=shm/sqlite shares it across workers
 
 # Force UTF-8 encoding for Windows compatibility
 if sys.platform == 'win32':
@@ -132,9 +133,9 @@ def normalize_text(text: str) -> str:
     """Normalize text for matching (legacy - uses text_utils for consistency)."""
     return normalize_text_util(text).lower()
 
-def detect_worry(text: str, lang: str) -> float:
+def detect_worry(text: str, lang: str, lowered=None) -> float:
     """Detect worry/anxiety level (0.0-1.0)."""
-    t = normalize_text(text)
+    t = lowered if lowered is not None else normalize_text(text)
     lexicon = WORRY_SV if lang == "sv" else WORRY_EN
     matches = sum(1 for word in lexicon if word in t)
     
@@ -157,9 +158,9 @@ def detect_worry(text: str, lang: str) -> float:
     
     return score
 
-def detect_humor(text: str, lang: str) -> float:
+def detect_humor(text: str, lang: str, lowered=None) -> float:
     """Detect humor level (0.0-1.0)."""
-    t = normalize_text(text)
+    t = lowered if lowered is not None else normalize_text(text)
     lexicon = HUMOR_SV if lang == "sv" else HUMOR_EN
     matches = sum(1 for word in lexicon if word in t)
     
@@ -180,9 +181,9 @@ def detect_humor(text: str, lang: str) -> float:
     
     return score
 
-def detect_irony(text: str, lang: str) -> float:
+def detect_irony(text: str, lang: str, lowered=None) -> float:
     """Detect irony/sarcasm level (0.0-1.0)."""
-    t = normalize_text(text)
+    t = lowered if lowered is not None else normalize_text(text)
     lexicon = IRONY_SV if lang == "sv" else IRONY_EN
     matches = sum(1 for word in lexicon if word in t)
     
@@ -212,10 +213,13 @@ def detect_irony(text: str, lang: str) -> float:
     
     return score
 
-def analyze(text: str, lang: str = "sv", persona=None, context=None) -> Dict[str, Any]:
+def analyze(text: str, lang: str = "sv", persona=None, context=None, analysis=None) -> Dict[str, Any]:
     """
     Real implementation av empathy/tone detection with driftfix.
     
+    analysis: förberäknad TextAnalysis (emotion_core) - normaliserad och
+    gemen text delas i stället för att normaliseras om per detektor.
+    
     Returns:
         {
             "affects": List[str],  # Multi-label: ["worry", "humor", "irony"]
@@ -235,12 +239,16 @@ def analyze(text: str, lang: str = "sv", persona=None, context=None) -> Dict[str
         }
     
     # 1) Normalize text first (reduces drift from formatting differences)
-    normalized = normalize_text_util(text)
+    if analysis is not None:
+        normalized, lowered = analysis.normalized, analysis.normalized_lower
+    else:
+        normalized = normalize_text_util(text)
+        lowered = normalize_text(normalized)
     
     # 2) Detect each affect on normalized input
-    worry_score = detect_worry(normalized, lang)
-    humor_score = detect_humor(normalized, lang)
-    irony_score = detect_irony(normalized, lang)
+    worry_score = detect_worry(normalized, lang, lowered)
+    humor_score = detect_humor(normalized, lang, lowered)
+    irony_score = detect_irony(normalized, lang, lowered)
     
     # 3) Clamp scores to prevent runaway drift
     scores_dict = {
@@ -315,11 +323,13 @@ def analyze(text: str, lang: str = "sv", persona=None, context=None) -> Dict[str
     
     # 5) Stateful filtering for drift reduction
     # Get or initialize state (keyed by trace_id or use default)
-    state_key = context.get("trace_id") if context else "default"
+    state_key = str(context.get("trace_id") if context else "default")
     prev_state = context.get("prev_state") if context else None
+    store = get_store()
     
     # Initialize or restore state
     has_prev_state = False
+    cached_state = None if prev_state else store.get(state_key)
     if prev_state:
         # Restore state from previous call (across subprocess boundaries)
         state = prev_state.copy()  # Make a copy to avoid modifying original
@@ -327,9 +337,9 @@ def analyze(text: str, lang: str = "sv", persona=None, context=None) -> Dict[str
         history_vectors = [tuple(v) for v in state["history_vectors"]]
         prev_feats = state["prev_feats"]
         has_prev_state = True
-    elif state_key in _state_cache:
-        # Use cached state (same process)
-        state = _state_cache[state_key]
+    elif cached_state is not None:
+        # Use stored state (same process, or shared store across workers)
+        state = cached_state
         prev_vector = tuple(state["prev_vector"])
         history_vectors = [tuple(v) for v in state["history_vectors"]]
         prev_feats = state["prev_feats"]
@@ -368,8 +378,8 @@ def analyze(text: str, lang: str = "sv", persona=None, context=None) -> Dict[str
         state["history_vectors"] = [list(v) for v in history_vectors]
         state["prev_feats"] = current_feats
         
-        # Update cache
-        _state_cache[state_key] = state
+        # Update store
+        store.put(state_key, state)
         # Store state in result for return (for subprocess communication)
         if context:
             context["_updated_state"] = state.copy()
@@ -380,7 +390,7 @@ def analyze(text: str, lang: str = "sv", persona=None, context=None) -> Dict[str
             "history_vectors": [list(tone_vector_raw)],
             "prev_feats": {"worry": worry_score, "humor": humor_score, "irony": irony_score},
         }
-        _state_cache[state_key] = state
+        store.put(state_key, state)
         tone_vector = tone_vector_raw
         # Store state in result for return (for subprocess communication)
         if context:
@@ -454,8 +464,10 @@ def handle_jsonl_request(line: str) -> str:
         # Include updated state in response for next call
         if trace_id and analysis_context and "_updated_state" in analysis_context:
             result["next_state"] = analysis_context["_updated_state"].copy()
-        elif trace_id and trace_id in _state_cache:
-            result["next_state"] = _state_cache[trace_id].copy()
+        elif trace_id:
+            stored = get_store().get(str(trace_id))
+            if stored is not None:
+                result["next_state"] = stored
         
         elapsed_ms = (time.perf_counter() - start_time) * 1000
         
@@ -1,15 +1,180 @@
 #!/usr/bin/env python3
-"""Load emotion lexicon JSON with sane defaults + caching."""
+"""
+Load emotion lexicon JSON with sane defaults + caching.
+
+Källan (lexicons/emotion_lexicon.json) kompileras till en versionerad artefakt
+(lexicons/emotion_lexicon.compiled.json): NFC-normaliserade, trimmade och
+deduplicerade listor plus innehållshashar. Bygg och kontrollera med:
+
+    python agents/emotion/lexicon_loader.py build [--src PATH] [--out PATH]
+    python agents/emotion/lexicon_loader.py check   # exit 1 om artefakten är inaktuell (CI)
+
+Runtime: `load_lexicon()` returnerar samma dict-objekt så länge källfilen är
+oförändrad (micro_mood cachar sin DetectionPlan per objekt). Källans mtime
+kontrolleras högst var LEXICON_RELOAD_CHECK_S sekund; vid ändring laddas
+lexikonet om (från artefakten om dess source_sha256 matchar, annars
+kompileras källan i minnet) och byts atomärt - långlivade workers får
+uppdateringen utan omstart.
+"""
+import argparse
+import hashlib
 import json
-import functools
+import os
+import sys
+import threading
+import time
+import unicodedata
 from pathlib import Path
 
 DEFAULT_PATH = Path(__file__).resolve().parents[2] / "lexicons" / "emotion_lexicon.json"
 
-@functools.lru_cache(maxsize=4)
-def load_lexicon(path: str | Path | None = None):
+# Bumpa vid ändrat artefaktformat (gamla artefakter ignoreras då)
+COMPILED_FORMAT = 2
+RELOAD_CHECK_S = float(os.getenv("LEXICON_RELOAD_CHECK_S", "1.0"))
+
+EMPTY_LEXICON = {
+    "RED": {"sv": [], "en": []},
+    "RED_PHRASES": {"sv": [], "en": []},
+    "ABUSE": {"sv": [], "en": []},
+    "ABUSE_PHRASES": {"sv": [], "en": []},
+    "PLUS": {"sv": [], "en": []},
+    "PLUS_PHRASES": {"sv": [], "en": []},
+    "NEUTRAL": {"sv": [], "en": []},
+    "NEGATIONS": {"sv": [], "en": []},
+    "MODIFIERS": {"boost": [], "dampen": []},
+    "EMOJI": {"red": [], "plus": []},
+    "WEIGHTS": {
+        "unigram": {"red": 0.3, "plus": 0.25},
+        "phrase": {"red": 0.6, "plus": 0.4},
+        "emoji": {"red": 0.5, "plus": 0.25}
+    }
+}
+
+def compiled_path(src: Path) -> Path:
+    return src.with_name(src.stem + ".compiled.json")
+
+
+def _canonical(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _norm_list(items: list) -> list:
+    """NFC + trim + dedup (skiftlägesokänsligt, första förekomsten vinner)."""
+    out, seen = [], set()
+    for x in items:
+        if not isinstance(x, str):
+            out.append(x)
+            continue
+        x = unicodedata.normalize("NFC", x).strip()
+        if x and x.lower() not in seen:
+            seen.add(x.lower())
+            out.append(x)
+    return out
+
+
+def _normalize(node):
+    if isinstance(node, dict):
+        return {k: _normalize(v) for k, v in node.items()}
+    if isinstance(node, list):
+        return _norm_list(node)
+    return node
+
+
+def compile_lexicon(raw: dict, source_sha256: str = "", source: str = "") -> dict:
+    """Källexikon → artefakt (ren funktion, ingen I/O)."""
+    lexicon = _normalize(raw)
+    return {
+        "format": COMPILED_FORMAT,
+        "source": source,
+        "source_sha256": source_sha256,
+        "hash": hashlib.sha256(_canonical(lexicon).encode("utf-8")).hexdigest(),
+        "lexicon": lexicon,
+    }
+
+
+def build(src: Path = DEFAULT_PATH, out: Path | None = None) -> dict:
+    """Kompilera källan och skriv artefakten atomärt; returnerar artefakten."""
+    src = Path(src)
+    out = Path(out) if out else compiled_path(src)
+    data = src.read_bytes()
+    try:
+        source = src.resolve().relative_to(DEFAULT_PATH.parents[1]).as_posix()
+    except ValueError:
+        source = src.as_posix()
+    compiled = compile_lexicon(json.loads(data.decode("utf-8")), hashlib.sha256(data).hexdigest(), source)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(compiled, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp, out)
+    return compiled
+
+
+class _Entry:
+    __slots__ = ("stamp", "checked", "compiled")
+
+    def __init__(self, stamp, compiled):
+        self.stamp = stamp
+        self.checked = time.monotonic()
+        self.compiled = compiled
+
+
+_entries: dict = {}
+_lock = threading.Lock()
+
+
+def _stamp(p: Path):
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _load_compiled(p: Path) -> dict:
+    if not p.exists():
+        return {"format": COMPILED_FORMAT, "source": p.as_posix(), "source_sha256": "", "hash": "",
+                "lexicon": json.loads(json.dumps(EMPTY_LEXICON))}
+    data = p.read_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+    art = compiled_path(p)
+    if art.exists():
+        try:
+            compiled = json.loads(art.read_text(encoding="utf-8"))
+            if compiled.get("format") == COMPILED_FORMAT and compiled.get("source_sha256") == sha:
+                return compiled
+        except (OSError, ValueError):
+            pass
+    # Artefakt saknas/inaktuell: kompilera i minnet
+    return compile_lexicon(json.loads(data.decode("utf-8")), sha, p.as_posix())
+
+
+def load_compiled(path: str | Path | None = None, check_interval: float | None = None) -> dict:
     """
-    Load emotion lexicon from JSON file with caching.
+    Kompilerad lexikonartefakt för `path` (default: DEFAULT_PATH).
+
+    Samma objekt returneras tills källans mtime/storlek ändras; då laddas den
+    om och byts atomärt. `check_interval=0` kontrollerar vid varje anrop.
+    """
+    p = Path(path) if path is not None else DEFAULT_PATH
+    key = str(p)
+    interval = RELOAD_CHECK_S if check_interval is None else check_interval
+    entry = _entries.get(key)
+    if entry is not None and time.monotonic() - entry.checked < interval:
+        return entry.compiled
+    with _lock:
+        entry = _entries.get(key)
+        stamp = _stamp(p)
+        if entry is not None and entry.stamp == stamp:
+            entry.checked = time.monotonic()
+            return entry.compiled
+        entry = _Entry(stamp, _load_compiled(p))
+        _entries[key] = entry
+        return entry.compiled
+
+
+def load_lexicon(path: str | Path | None = None, check_interval: float | None = None):
+    """
+    Load emotion lexicon (normalized source structure) with hot-reload caching.
     
     Args:
         path: Optional path to lexicon file. If None, uses default location.
@@ -17,29 +182,45 @@ def load_lexicon(path: str | Path | None = None):
     Returns:
         dict: Lexicon structure with RED, PLUS, PHRASES, etc.
     """
-    if path is None:
-        p = DEFAULT_PATH
-    else:
-        p = Path(path)
-    
-    if not p.exists():
-        return {
-            "RED": {"sv": [], "en": []},
-            "RED_PHRASES": {"sv": [], "en": []},
-            "ABUSE": {"sv": [], "en": []},
-            "ABUSE_PHRASES": {"sv": [], "en": []},
-            "PLUS": {"sv": [], "en": []},
-            "PLUS_PHRASES": {"sv": [], "en": []},
-            "NEUTRAL": {"sv": [], "en": []},
-            "NEGATIONS": {"sv": [], "en": []},
-            "MODIFIERS": {"boost": [], "dampen": []},
-            "EMOJI": {"red": [], "plus": []},
-            "WEIGHTS": {
-                "unigram": {"red": 0.3, "plus": 0.25},
-                "phrase": {"red": 0.6, "plus": 0.4},
-                "emoji": {"red": 0.5, "plus": 0.25}
-            }
-        }
-    
-    return json.loads(p.read_text(encoding="utf-8"))
+    return load_compiled(path, check_interval)["lexicon"]
+
+
+def reload_lexicon(path: str | Path | None = None) -> dict:
+    """Tvinga mtime-kontroll nu (t.ex. direkt efter en lexikonuppdatering)."""
+    return load_lexicon(path, check_interval=0)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Build the compiled emotion lexicon artifact")
+    ap.add_argument("cmd", choices=["build", "check"])
+    ap.add_argument("--src", default=str(DEFAULT_PATH))
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    src = Path(args.src)
+    if args.cmd == "check":
+        art = Path(args.out) if args.out else compiled_path(src)
+        sha = hashlib.sha256(src.read_bytes()).hexdigest()
+        try:
+            compiled = json.loads(art.read_text(encoding="utf-8"))
+            ok = compiled.get("format") == COMPILED_FORMAT and compiled.get("source_sha256") == sha
+        except (OSError, ValueError):
+            ok = False
+        print(f"[lexicon] {art}: {'up to date' if ok else 'STALE'}")
+        return 0 if ok else 1
+
+    compiled = build(src, args.out)
+    counts = {}
+    for table in compiled["lexicon"].values():
+        for lang, xs in (table.items() if isinstance(table, dict) else ()):
+            if lang in ("sv", "en") and isinstance(xs, list):
+                counts[lang] = counts.get(lang, 0) + len(xs)
+    print(f"[lexicon] built {args.out or compiled_path(src)} hash={compiled['hash'][:12]} entries={counts}")
+    return 0
+
+
+__all__ = ["load_lexicon", "load_compiled", "reload_lexicon", "compile_lexicon", "build", "DEFAULT_PATH"]
+
 
+if __name__ == "__main__":
+    sys.exit(main())
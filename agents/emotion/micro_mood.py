@@ -16,8 +16,11 @@ import sys
 import os
 import time
 import math
+import functools
+import threading
 import unicodedata
 from pathlib import Path
+from typing import NamedTuple
 
 # Add parent directory to path for imports
 _script_dir = Path(__file__).resolve().parent
@@ -230,8 +233,9 @@ def norm(s: str) -> str:
 
 # --- Unicode-safe word boundary ---
 
+@functools.lru_cache(maxsize=4096)
 def wb(word: str) -> re.Pattern:
-    """Create Unicode-safe word boundary pattern"""
+    """Create Unicode-safe word boundary pattern (kompileras en gång per ord)"""
     return re.compile(
         rf'(?<![0-9A-Za-zÅÄÖåäöÀ-Öà-ö]){re.escape(word)}(?![0-9A-Za-zÅÄÖåäöÀ-Öà-ö])',
         re.IGNORECASE | re.UNICODE
@@ -299,6 +303,133 @@ EMOJI_PLUS = set("🙂😊❤️💖🌸🎉💗👍🤝🥰")
 EMOJI_NEG = set("😞😔💔😭😢😡👎")
 EMOJI_RED = set("💔🆘🛑☠️🔪")
 
+# --- Severe RED / gate patterns (kompileras en gång, se _rx nedan) ---
+
+NEGATIONS_GENERIC = [
+    r"\bi am not suicidal\b",
+    r"\bi'?m not suicidal\b",
+    r"\bi don'?t want to die\b",
+    r"\bi do want to live\b",
+    r"\bjag (?:\b| )vill leva\b",
+]
+
+SEVERE_RED_EN_STRONG = [
+    r"\bdon'?t\s+want\s+to\s+go\s+on\b",
+    r"\bcan'?t\s+go\s+on\b",
+    r"\bcan'?t\s+keep\s+going\b",
+    r"\bi'?m\s+exhausted\s+and\s+see\s+no\s+point\b",
+    r"\b(no|not?\s+any)\s+point\s+(?:in|to)\s+(?:living|this|going\s+on)\b",
+    r"\blife\s+is\s+pointless\b",
+    r"\btired\s+of\s+living\b",
+    r"\b(end\s+my\s+life|suicidal)\b",
+    r"\bif\s+i\s+disappeared.*no\s+one\s+would\s+miss\s+me\b",
+    r"\bi\s+see\s+no\s+point\s+in\s+living\b",
+    r"\bno\s+reason\s+to\s+live\b",
+    r"\bend\s+it\s+all\b",
+    r"\bi\s+want\s+to\s+end\s+it\b",
+]
+
+SEVERE_RED_EN_WEAK = [
+    r"\bi\s+want\s+to\s+die\b",
+    r"\bno\s+way\s+out\b",
+]
+
+SEVERE_RED_SV_STRONG = [
+    r"\bvill\s+inte\s+leva(?:\s+l(a|ä)ngre)?\b",
+    r"\borkar\s+inte\s+leva\b",
+    r"\bser\s+ingen\s+utv(a|ä)g\b",
+]
+SEVERE_RED_SV_WEAK = [
+    r"\bom\s+jag\s+bara\s+f(ö|o)rsvann\b",
+    r"\bingen\s+skulle\s+sakna\s+mig\b",
+    r"\bjag\s+vill\s+d(ö|o)\b",
+]
+SEVERE_RED_SV = SEVERE_RED_SV_STRONG + SEVERE_RED_SV_WEAK
+
+COPING_PLUS_PATTERNS = [
+    r"\bv(å|a)gade?\s+be\s+om\s+hj(a|ä)lp\b",
+    r"\blugn\s+pratstund\b",
+    r"\bpromenad\b",
+    r"\bkunde\s+andas\s+ut\b",
+    r"\bone\s+tiny\s+win\b",
+    r"\basked\s+for\s+help\b",
+    r"\bagreed\s+to\s+pause\b",
+    r"\bshort\s+walk\s+cleared\s+my\s+head\b",
+    r"\brevisit\s+calmly\s+tomorrow\b",
+    r"\bkeep\s+my\s+tone\s+calm\b",
+]
+
+# "Constructive intent" → PLUS-gate
+CONSTRUCTIVE_PATTERNS = [
+    r"\bbest(a|ä)mde?\s+en\s+sak\s+i\s+t(a|ä)get\b",
+    r"\bvi\s+(?:kom\s+)?(överens|pausade|planerade)\b",
+    r"\bimorgon\b",
+    r"\bi\s+will\b",
+    r"\bwe\s+agreed\b",
+    r"\bplan\b",
+    r"\basked\s+for\s+help\b",
+    r"\bthanks?\s+for\s+being\s+honest\b",
+]
+
+HOPELESS_PATS = [
+    r"\bhoppl(ö|o)s\b",
+    r"\bingen\s+utv(a|ä)g\b",
+    r"\bpointless\b",
+    r"\bno\s+point\b",
+    r"\bworthless\b",
+    r"\btomhet\b",
+    r"\bempty\b",
+]
+
+# ABUSE-coercion gate (för ABUSE-RED detection)
+ABUSE_TRIG = frozenset({
+    "drar in pengar som hot", "tracks my location", "logs into my accounts",
+    "calls me crazy", "kräver min platsdelning", "kräver bilder för att bevisa",
+    "kontrollerar min telefon", "tar min telefon", "gaslighting", "gaslighting me"
+})
+
+HUMOR = frozenset({"we joked", "we laughed", "roliga minnen", "vi skrattade", "skämtade"})
+IRONY_MARKERS = frozenset({"visst, för det har ju alltid", "yeah very helpful", "sure that worked great"})
+
+ANXIETY_CTX = frozenset({"orolig", "oroar", "spänd", "worried", "concerned", "tense", "stressed", "pulling away", "ångest", "anxious", "nervous"})
+
+COPING_PHRASES = frozenset({
+    "ett steg i taget", "försöker hålla lugnt", "försöker hålla lugnet", "vågar be om hjälp",
+    "tar en paus", "andas lugnt", "one step at a time", "trying to stay calm",
+    "asked for help", "taking a pause", "breathing calmly", "we start over",
+    "we talk calmly", "pause before i respond", "pausar innan jag svarar"
+})
+
+
+def _rx(patterns: list[str], flags: int = re.UNICODE) -> tuple:
+    return tuple(re.compile(p, flags) for p in patterns)
+
+
+_NEGATIONS_GENERIC_RX = _rx(NEGATIONS_GENERIC)
+_SEVERE_RED_EN_STRONG_RX = _rx(SEVERE_RED_EN_STRONG)
+_SEVERE_RED_EN_WEAK_RX = _rx(SEVERE_RED_EN_WEAK)
+_SEVERE_RED_SV_RX = _rx(SEVERE_RED_SV)
+_SEVERE_RED_SV_STRONG_RX = _rx(SEVERE_RED_SV_STRONG)
+_SEVERE_RED_SV_WEAK_RX = _rx(SEVERE_RED_SV_WEAK)
+_COPING_PLUS_RX = _rx(COPING_PLUS_PATTERNS)
+_CONSTRUCTIVE_RX = _rx(CONSTRUCTIVE_PATTERNS)
+_HOPELESS_RX = _rx(HOPELESS_PATS)
+_HARD_RED_RX = {
+    "sv": _rx(RED_PATTERNS_SV, re.IGNORECASE),
+    "en": _rx(RED_PATTERNS_EN, re.IGNORECASE),
+}
+
+_COPING_TOKEN_RE = re.compile(r"[a-zA-ZåäöÅÄÖ'’-]+")
+_WORD_TOKEN_RE = re.compile(r"[A-Za-zÅÄÖåäöÀ-Öà-ö]+")
+
+
+def _any_rx(compiled: tuple, text: str) -> bool:
+    return any(rx.search(text) for rx in compiled)
+
+
+def _count_rx(compiled: tuple, text: str) -> int:
+    return sum(1 for rx in compiled if rx.search(text))
+
 
 # --- Threshold loading ---
 
@@ -360,11 +491,15 @@ if THR and "sv" in THR and "light_min" in THR["sv"]:
 
 # --- Language detection ---
 
+_LANG_WORDS_SV = tuple(POS_SV + NEG_SV + RED_SV + NEGATORS_SV)
+_LANG_WORDS_EN = tuple(POS_EN + NEG_EN + RED_EN + NEGATORS_EN)
+
+
 def detect_lang(txt: str) -> str:
     """Detect language from text (SV vs EN)"""
     t = norm(txt)
-    sv_hits = sum(1 for w in POS_SV + NEG_SV + RED_SV + NEGATORS_SV if w in t)
-    en_hits = sum(1 for w in POS_EN + NEG_EN + RED_EN + NEGATORS_EN if w in t)
+    sv_hits = sum(1 for w in _LANG_WORDS_SV if w in t)
+    en_hits = sum(1 for w in _LANG_WORDS_EN if w in t)
     return "sv" if sv_hits >= en_hits else "en"
 
 
@@ -373,10 +508,11 @@ def detect_lang(txt: str) -> str:
 def count_matches(text: str, words: list) -> int:
     """Count matches using Unicode-safe word boundaries"""
     count = 0
+    text_lower = text.lower()
     for w in words:
         # For multi-word phrases, use simpler search (no word boundaries)
         if " " in w:
-            if w.lower() in text.lower():
+            if w.lower() in text_lower:
                 count += 1
         else:
             # Single word: use word boundaries
@@ -385,6 +521,234 @@ def count_matches(text: str, words: list) -> int:
     return count
 
 
+# Ordlöp enligt wb():s teckenklass. Ett helord (bara klass-tecken) som matchar
+# med wb() täcker alltid ett helt löp, så träffen kan slås upp i löp-mängden
+# istället för att söka med ett mönster per ord. Gäller exakt för Latin-1-text
+# (där IGNORECASE == lower()); annan text går via wb()-mönstren.
+_WB_RUN_RE = re.compile(r"[0-9A-Za-zÅÄÖåäöÀ-Öà-ö]+")
+_runs_memo: tuple = ("", frozenset())
+
+
+def word_runs(text: str) -> frozenset | None:
+    """Gemena ordlöp i texten (memo för senaste texten); None om texten inte är Latin-1."""
+    global _runs_memo
+    memo = _runs_memo
+    if memo[0] is text or memo[0] == text:
+        return memo[1]
+    try:
+        text.encode("latin-1")
+    except UnicodeEncodeError:
+        runs = None
+    else:
+        runs = frozenset(r.lower() for r in _WB_RUN_RE.findall(text))
+    _runs_memo = (text, runs)
+    return runs
+
+
+class WordMatcher:
+    """Förkompilerad count_matches: fraser som substring, helord via ordlöp, övriga med wb()."""
+
+    __slots__ = ("phrases", "patterns", "words", "word_patterns")
+
+    def __init__(self, words):
+        words = list(words)
+        self.phrases = tuple(w.lower() for w in words if " " in w)
+        singles = [w for w in words if " " not in w]
+        plain = [w for w in singles if _WB_RUN_RE.fullmatch(w)]
+        # Helord: gemen form -> antal listposter (dubbletter räknas som i count_matches)
+        self.words: dict = {}
+        for w in plain:
+            self.words[w.lower()] = self.words.get(w.lower(), 0) + 1
+        self.word_patterns = tuple(wb(w) for w in plain)
+        self.patterns = tuple(wb(w) for w in singles if not _WB_RUN_RE.fullmatch(w))
+
+    def _word_hits(self, text: str) -> int:
+        runs = word_runs(text)
+        if runs is None:
+            return sum(1 for rx in self.word_patterns if rx.search(text))
+        words = self.words
+        return sum(words[r] for r in runs if r in words)
+
+    def count(self, text: str, text_lower: str | None = None) -> int:
+        if text_lower is None:
+            text_lower = text.lower()
+        return (sum(1 for p in self.phrases if p in text_lower)
+                + self._word_hits(text)
+                + sum(1 for rx in self.patterns if rx.search(text)))
+
+    def any(self, text: str, text_lower: str | None = None) -> bool:
+        if text_lower is None:
+            text_lower = text.lower()
+        return (any(p in text_lower for p in self.phrases) or self._word_hits(text) > 0
+                or any(rx.search(text) for rx in self.patterns))
+
+
+# --- Detection plan ---
+# Allt som tidigare byggdes vid varje anrop (sammanslagna ordlistor, CFG-listor,
+# lexikonfraser) byggs en gång per (CFG-listor, lexikon) och återanvänds.
+
+_PLAN_CFG_KEYS = (
+    "NEUTRAL_ANCHOR_LIST_SV", "NEUTRAL_ANCHOR_LIST_EN",
+    "RESOLVE_MARKERS_SV", "RESOLVE_MARKERS_EN",
+    "RESOLVE_POS_SV", "RESOLVE_POS_EN",
+    "MUTUAL_POS_SV", "MUTUAL_POS_EN",
+    "TENSION_LITE_TERMS_SV", "TENSION_LITE_TERMS_EN",
+    "TENSION_LITE_NEG_SV", "TENSION_LITE_NEG_EN",
+)
+
+
+def _csv(value: str, keep_empty: bool = False) -> tuple:
+    items = [x.strip() for x in value.split(",")]
+    return tuple(items if keep_empty else [x for x in items if x])
+
+
+class LangPlan:
+    """Förberäknade ordlistor/matchare för ett språk."""
+
+    def __init__(self, lang: str, lexicon: dict):
+        sv = lang == "sv"
+        pos, neg, red, gas = (POS_SV, NEG_SV, RED_SV, GASLIT_SV) if sv else (POS_EN, NEG_EN, RED_EN, GASLIT_EN)
+        negators, intens = (NEGATORS_SV, INTENS_SV) if sv else (NEGATORS_EN, INTENS_EN)
+        soft_pos = SOFT_POS_SV if sv else SOFT_POS_EN
+        sfx = "SV" if sv else "EN"
+
+        # Merge lexicon words with hardcoded lists
+        self.pos_words = list(set(pos + lexicon.get("PLUS", {}).get(lang, [])))
+        self.red_words = list(set(red + lexicon.get("RED", {}).get(lang, [])))
+        self.gas_words = list(set(gas + lexicon.get("ABUSE", {}).get(lang, [])))
+        self.neg_words = neg
+
+        self.pos = WordMatcher(self.pos_words)
+        self.pos_plain = WordMatcher(pos)
+        self.neg = WordMatcher(neg)
+        self.red = WordMatcher(self.red_words)
+        self.gas = WordMatcher(self.gas_words)
+        self.gaslit = WordMatcher(gas)
+        self.intens = WordMatcher(intens)
+        self.negators = WordMatcher(negators)
+        self.soft_pos = WordMatcher(soft_pos)
+        self.neutral = WordMatcher(lexicon.get("NEUTRAL", {}).get(lang, []))
+
+        # Lexikonfraser (substring mot text.lower())
+        self.red_phrases = tuple(p.lower() for p in
+                                 lexicon.get("RED_PHRASES", {}).get(lang, []) + lexicon.get("ABUSE_PHRASES", {}).get(lang, []))
+        self.plus_phrases = tuple(p.lower() for p in lexicon.get("PLUS_PHRASES", {}).get(lang, []))
+        self.distress_phrases = tuple(p.lower() for p in lexicon.get("EMOTION_DISTRESS_PHRASES", {}).get(lang, []))
+        weights = lexicon.get("WEIGHTS", {})
+        # Starkare fraser - höjda bonuses
+        self.phrase_w_red = weights.get("phrase", {}).get("red", 0.65)
+        self.phrase_w_plus = weights.get("phrase", {}).get("plus", 0.45)
+
+        # negation_guard
+        self.negator_set = frozenset(negators)
+        self.guard_pos = frozenset(pos + soft_pos)
+        self.guard_neg = frozenset(neg)
+
+        # CFG-styrda listor
+        self.anchors = _csv(CFG["NEUTRAL_ANCHOR_LIST_" + sfx])
+        self.resolve_markers = frozenset(_csv(CFG["RESOLVE_MARKERS_" + sfx]))
+        self.resolve_pos = frozenset(_csv(CFG["RESOLVE_POS_" + sfx]))
+        self.mutual_pos = frozenset(_csv(CFG["MUTUAL_POS_" + sfx]))
+        self.tlite_quant = _csv(CFG["TENSION_LITE_TERMS_" + sfx], keep_empty=True)
+        self.tlite_neg = _csv(CFG["TENSION_LITE_NEG_" + sfx], keep_empty=True)
+        self.strong_pos = tuple(pos + soft_pos)
+        self.lite_hints = tuple(LITE_NEG_HINT_SV if sv else LITE_NEG_HINT_EN)
+
+
+class DetectionPlan:
+    """Detektionsplan byggd från CFG + lexikon; byggs om när någon av dem ändras."""
+
+    def __init__(self, lexicon: dict):
+        self.lexicon = lexicon
+        self.cfg_key = tuple(CFG[k] for k in _PLAN_CFG_KEYS)
+        self.sv = LangPlan("sv", lexicon)
+        self.en = LangPlan("en", lexicon)
+
+    def lang(self, lang: str) -> LangPlan:
+        return self.sv if lang == "sv" else self.en
+
+
+# Senast använda planer först. Varje plan håller en referens till sitt lexikon
+# och matchas på identitet (`is`), inte id(), så ett återanvänt id kan aldrig
+# ge en plan byggd för ett annat lexikon.
+_PLANS: list = []
+_PLAN_SLOTS = 4
+
+
+def get_plan(lexicon: dict | None = None) -> DetectionPlan:
+    """Aktuell detektionsplan för lexikonet (default: load_lexicon())."""
+    if lexicon is None:
+        lexicon = load_lexicon()
+    cfg_key = tuple(CFG[k] for k in _PLAN_CFG_KEYS)
+    for plan in _PLANS:
+        if plan.lexicon is lexicon and plan.cfg_key == cfg_key:
+            return plan
+    plan = DetectionPlan(lexicon)
+    _PLANS[:] = [plan] + [p for p in _PLANS if p.lexicon is not lexicon][:_PLAN_SLOTS - 1]
+    return plan
+
+
+def clear_plan() -> None:
+    """Tvinga ombyggnad av planen (t.ex. efter ändrade ordlistor i samma lexikonobjekt)."""
+    _PLANS.clear()
+    _Z_MEMO.clear()
+
+
+_Z_MEMO: dict = {}
+
+
+def z_thresholds() -> tuple[float, float, float]:
+    """Z_RED/Z_PLUS/Z_LIGHT från ENV eller thresholds.json (memo per fil-mtime)."""
+    # Load Z thresholds from environment or thresholds.json
+    Z_RED = float(os.getenv("Z_RED", "1.05"))
+    Z_PLUS = float(os.getenv("Z_PLUS", "0.80"))
+    Z_LIGHT = float(os.getenv("Z_LIGHT", "0.45"))
+    if os.getenv("Z_RED") or os.getenv("Z_PLUS") or os.getenv("Z_LIGHT"):
+        return Z_RED, Z_PLUS, Z_LIGHT
+
+    # Try multiple paths
+    thresholds_paths = [
+        Path(__file__).resolve().parents[2] / "thresholds.json",  # sintari-relations/thresholds.json
+        Path(__file__).resolve().parents[3] / "sintari-relations" / "thresholds.json",  # project root
+        Path("thresholds.json").absolute(),  # current dir
+    ]
+    key = []
+    for p in thresholds_paths:
+        try:
+            key.append((str(p), p.stat().st_mtime_ns))
+        except OSError:
+            key.append((str(p), None))
+    key = tuple(key)
+    if key in _Z_MEMO:
+        return _Z_MEMO[key]
+
+    # Try to load from thresholds.json if it exists and ENV vars not set
+    try:
+        for thresh_path in thresholds_paths:
+            if thresh_path.exists():
+                with open(thresh_path, "r", encoding="utf-8") as f:
+                    cfg = json.load(f)
+                    # Use sv values (or en if sv not available)
+                    sv_cfg = cfg.get("sv", {})
+                    en_cfg = cfg.get("en", {})
+                    if sv_cfg:
+                        Z_RED = float(sv_cfg.get("red_min", Z_RED))
+                        Z_PLUS = float(sv_cfg.get("plus_min", Z_PLUS))
+                        Z_LIGHT = float(sv_cfg.get("light_min", Z_LIGHT))
+                    elif en_cfg:
+                        Z_RED = float(en_cfg.get("red_min", Z_RED))
+                        Z_PLUS = float(en_cfg.get("plus_min", Z_PLUS))
+                        Z_LIGHT = float(en_cfg.get("light_min", Z_LIGHT))
+                if DEBUG:
+                    print(f"[DEBUG] Loaded thresholds from {thresh_path}: Z_RED={Z_RED}, Z_PLUS={Z_PLUS}, Z_LIGHT={Z_LIGHT}", file=sys.stderr)
+                break
+    except Exception as e:
+        if DEBUG:
+            print(f"[DEBUG] Could not load thresholds.json: {e}", file=sys.stderr)
+    _Z_MEMO[key] = (Z_RED, Z_PLUS, Z_LIGHT)
+    return Z_RED, Z_PLUS, Z_LIGHT
+
+
 def emoji_score(text: str) -> tuple[int, int, int]:
     """Count positive, negative, and RED emojis"""
     plus = sum(1 for ch in text if ch in EMOJI_PLUS)
@@ -394,10 +758,8 @@ def emoji_score(text: str) -> tuple[int, int, int]:
 
 def negation_guard(text: str, lang: str) -> float:
     """Detect negation and invert polarity of affected words (±3 token window)"""
-    if lang == "sv":
-        negators = NEGATORS_SV
-    else:
-        negators = NEGATORS_EN
+    lp = get_plan().lang(lang)
+    negators = lp.negator_set
     
     tokens = tokenize_words(text)
     if not tokens:
@@ -413,8 +775,8 @@ def negation_guard(text: str, lang: str) -> float:
             window_tokens = tokens[window_start:window_end]
             
             # Check for positive/negative words in window
-            pos_words = POS_SV + SOFT_POS_SV if lang == "sv" else POS_EN + SOFT_POS_EN
-            neg_words = NEG_SV if lang == "sv" else NEG_EN
+            pos_words = lp.guard_pos
+            neg_words = lp.guard_neg
             
             for wt in window_tokens:
                 if wt.lower() in pos_words:
@@ -437,8 +799,7 @@ def intensity_score(text: str) -> float:
 
 def tension_score(text: str, lang: str) -> float:
     """Calculate tension score for mild negative → light"""
-    NEG = NEG_SV if lang == "sv" else NEG_EN
-    neg_c = count_matches(text, NEG)
+    neg_c = get_plan().lang(lang).neg.count(text)
     _, e_neg, _ = emoji_score(text)
     # mild negativitet utan kris → driver mot "light"
     return min(1.0, CFG["TENSION_W_NEG"] * neg_c + CFG["TENSION_W_EMOJI"] * e_neg)
@@ -447,7 +808,7 @@ def tension_score(text: str, lang: str) -> float:
 def tokenize_words(text: str) -> list[str]:
     """Simple tokenizer for window searches"""
     t = norm(text)
-    return re.findall(r"[A-Za-zÅÄÖåäöÀ-Öà-ö]+", t)
+    return _WORD_TOKEN_RE.findall(t)
 
 
 def resolve_feature(text: str, lang: str, window: int) -> float:
@@ -455,9 +816,9 @@ def resolve_feature(text: str, lang: str, window: int) -> float:
     toks = tokenize_words(text)
     if not toks:
         return 0.0
-    markers = [x.strip() for x in (CFG["RESOLVE_MARKERS_SV"] if lang=="sv" else CFG["RESOLVE_MARKERS_EN"]).split(",") if x.strip()]
-    poslist = [x.strip() for x in (CFG["RESOLVE_POS_SV"] if lang=="sv" else CFG["RESOLVE_POS_EN"]).split(",") if x.strip()]
-    posset = set(poslist)
+    lp = get_plan().lang(lang)
+    markers = lp.resolve_markers
+    posset = lp.resolve_pos
     
     score = 0.0
     for i, tk in enumerate(toks):
@@ -472,32 +833,21 @@ def resolve_feature(text: str, lang: str, window: int) -> float:
 def mutual_feature(text: str, lang: str) -> float:
     """Count words signaling mutuality/encouragement/planning"""
     toks = tokenize_words(text)
-    poslist = [x.strip() for x in (CFG["MUTUAL_POS_SV"] if lang=="sv" else CFG["MUTUAL_POS_EN"]).split(",") if x.strip()]
-    posset = set(poslist)
+    posset = get_plan().lang(lang).mutual_pos
     hits = sum(1 for tk in toks if tk in posset)
     return min(1.0, hits / 3.0)
 
 
 def hard_red(text: str, lang: str) -> bool:
     """Check hard RED patterns (gaslighting + power)"""
-    patterns = RED_PATTERNS_SV if lang == "sv" else RED_PATTERNS_EN
+    lang_key = "sv" if lang == "sv" else "en"
     t = norm(text)
     # Check regex patterns
-    for pattern in patterns:
-        if re.search(pattern, t, re.IGNORECASE):
-            return True
+    if _any_rx(_HARD_RED_RX[lang_key], t):
+        return True
     # Check gaslighting phrases (they should also trigger hard red)
-    gas_words = GASLIT_SV if lang == "sv" else GASLIT_EN
-    for phrase in gas_words:
-        if " " in phrase:
-            # Multi-word: simple substring match
-            if phrase.lower() in t:
-                return True
-        else:
-            # Single word: use word boundaries
-            if wb(phrase).search(t):
-                return True
-    return False
+    # Multi-word: simple substring match, single word: word boundaries
+    return get_plan().lang(lang).gaslit.any(t, t)
 
 
 def tension_lite_feature(text: str, lang: str) -> float:
@@ -508,42 +858,35 @@ def tension_lite_feature(text: str, lang: str) -> float:
     if not CFG["FEATURE_TENSION_LITE"]:
         return 0.0
     
-    if lang == "sv":
-        quantifiers = CFG["TENSION_LITE_TERMS_SV"].split(",")
-        neg_words = CFG["TENSION_LITE_NEG_SV"].split(",")
-    else:
-        quantifiers = CFG["TENSION_LITE_TERMS_EN"].split(",")
-        neg_words = CFG["TENSION_LITE_NEG_EN"].split(",")
+    lp = get_plan().lang(lang)
+    quantifiers = lp.tlite_quant
+    neg_words = lp.tlite_neg
     
     t = norm(text)
     toks = tokenize_words(t)
     n = len(toks)
+    is_quant = [any(q in tok for q in quantifiers) for tok in toks]
+    is_neg = [any(nw in tok for nw in neg_words) for tok in toks]
     
     # Count quantifier+neg bigrams within window of 3
     bigram_hits = 0
     for i in range(n):
+        if not is_quant[i]:
+            continue
         for j in range(max(0, i-3), min(n, i+3)):
-            if i == j:
-                continue
-            if any(q.strip() in toks[i] for q in quantifiers):
-                if any(nw.strip() in toks[j] for nw in neg_words):
-                    bigram_hits += 1
-                    break  # Don't double-count
+            if i != j and is_neg[j]:
+                bigram_hits += 1
+                break  # Don't double-count
     
     # Count standalone neg words
-    neg_hits = sum(1 for tok in toks if any(nw.strip() in tok for nw in neg_words))
+    neg_hits = sum(is_neg)
     
     # Combine signals
     hits = bigram_hits + neg_hits
     f_score = min(1.0, hits / 3.0)
     
     # Dampen if strong positive signals present
-    if lang == "sv":
-        strong_pos = POS_SV + SOFT_POS_SV
-    else:
-        strong_pos = POS_EN + SOFT_POS_EN
-    
-    if any(sp in t for sp in strong_pos):
+    if any(sp in t for sp in lp.strong_pos):
         f_score *= 0.4
     
     return f_score
@@ -565,49 +908,24 @@ def polarity_score(text: str, lang: str, lexicon: dict | None = None) -> tuple[f
     if lexicon is None:
         lexicon = load_lexicon()
     
-    lang_key = "sv" if lang == "sv" else "en"
+    # Sammanslagna ordlistor (hårdkodat + lexikon) och fraser från planen
+    lp = get_plan(lexicon).lang(lang)
     text_lower = text.lower()
-    
-    # Get lexicon phrases
-    red_phrases = lexicon.get("RED_PHRASES", {}).get(lang_key, [])
-    plus_phrases = lexicon.get("PLUS_PHRASES", {}).get(lang_key, [])
-    abuse_phrases = lexicon.get("ABUSE_PHRASES", {}).get(lang_key, [])
-    distress_phrases = lexicon.get("EMOTION_DISTRESS_PHRASES", {}).get(lang_key, [])
-    weights = lexicon.get("WEIGHTS", {})
-    # Starkare fraser - höjda bonuses
-    PHRASE_RED_BONUS = 0.65
-    PHRASE_PLUS_BONUS = 0.45
-    phrase_w_red = weights.get("phrase", {}).get("red", PHRASE_RED_BONUS)
-    phrase_w_plus = weights.get("phrase", {}).get("plus", PHRASE_PLUS_BONUS)
-    
-    if lang == "sv":
-        pos, neg, red, gas = POS_SV, NEG_SV, RED_SV, GASLIT_SV
-        negators, intens = NEGATORS_SV, INTENS_SV
-    else:
-        pos, neg, red, gas = POS_EN, NEG_EN, RED_EN, GASLIT_EN
-        negators, intens = NEGATORS_EN, INTENS_EN
-    
-    # Merge lexicon words with hardcoded lists
-    lexicon_red = lexicon.get("RED", {}).get(lang_key, [])
-    lexicon_plus = lexicon.get("PLUS", {}).get(lang_key, [])
-    lexicon_abuse = lexicon.get("ABUSE", {}).get(lang_key, [])
-    
-    # Combine hardcoded + lexicon words
-    pos = list(set(pos + lexicon_plus))
-    red = list(set(red + lexicon_red))
-    gas = list(set(gas + lexicon_abuse))
+    phrase_w_red = lp.phrase_w_red
+    phrase_w_plus = lp.phrase_w_plus
+    pos, neg, red, gas = lp.pos_words, lp.neg_words, lp.red_words, lp.gas_words
 
     # Count matches
-    pos_c = count_matches(text, pos)
-    neg_c = count_matches(text, neg)
-    red_c = count_matches(text, red) + count_matches(text, gas)  # Gaslighting → RED
-    intens_c = count_matches(text, intens)
-    negator_c = count_matches(text, negators)
+    pos_c = lp.pos.count(text, text_lower)
+    neg_c = lp.neg.count(text, text_lower)
+    red_c = lp.red.count(text, text_lower) + lp.gas.count(text, text_lower)  # Gaslighting → RED
+    intens_c = lp.intens.count(text, text_lower)
+    negator_c = lp.negators.count(text, text_lower)
     
     # Phrase matching (before word weights)
-    red_phrase_hits = sum(1 for phrase in red_phrases + abuse_phrases if phrase.lower() in text_lower)
-    plus_phrase_hits = sum(1 for phrase in plus_phrases if phrase.lower() in text_lower)
-    distress_phrase_hits = sum(1 for phrase in distress_phrases if phrase.lower() in text_lower)
+    red_phrase_hits = sum(1 for phrase in lp.red_phrases if phrase in text_lower)
+    plus_phrase_hits = sum(1 for phrase in lp.plus_phrases if phrase in text_lower)
+    distress_phrase_hits = sum(1 for phrase in lp.distress_phrases if phrase in text_lower)
     
     # Debug: show which words matched
     if DEBUG:
@@ -621,14 +939,12 @@ def polarity_score(text: str, lang: str, lexicon: dict | None = None) -> tuple[f
         print(f"[DEBUG] Counts: pos_c={pos_c}, neg_c={neg_c}, red_c={red_c}, intens_c={intens_c}, negator_c={negator_c}", file=sys.stderr)
     
     # Count soft-positive words (weak signal)
-    soft_pos = SOFT_POS_SV if lang == "sv" else SOFT_POS_EN
-    soft_pos_c = count_matches(text, soft_pos)
+    soft_pos_c = lp.soft_pos.count(text, text_lower)
     # Add soft-positive as partial contribution
     pos_soft_contrib = CFG["EVID_SOFT_POS_W"] * soft_pos_c
     
     # Count neutral words (for logit-mix)
-    neutral_words = lexicon.get("NEUTRAL", {}).get(lang_key, [])
-    neutral_hits = count_matches(text, neutral_words)
+    neutral_hits = lp.neutral.count(text, text_lower)
 
     # Phrase boost (before basic valence calculation)
     if red_phrase_hits > 0:
@@ -654,18 +970,10 @@ def polarity_score(text: str, lang: str, lexicon: dict | None = None) -> tuple[f
     # Coping rule: oro + coping signals → plus_score += 0.25, reduce neutral
     # Detect worry/anxiety words combined with positive/coping words
     # Tokenize text for better matching
-    tokens = set(re.findall(r"[a-zA-ZåäöÅÄÖ'’-]+", text_lower))
-    
-    anxiety_ctx = {"orolig", "oroar", "spänd", "worried", "concerned", "tense", "stressed", "pulling away", "ångest", "anxious", "nervous"}
-    has_anxiety = any(t in anxiety_ctx for t in tokens) or ("pulling away" in text_lower)
+    tokens = set(_COPING_TOKEN_RE.findall(text_lower))
     
-    coping_phr = {
-        "ett steg i taget", "försöker hålla lugnt", "försöker hålla lugnet", "vågar be om hjälp", 
-        "tar en paus", "andas lugnt", "one step at a time", "trying to stay calm", 
-        "asked for help", "taking a pause", "breathing calmly", "we start over", 
-        "we talk calmly", "pause before i respond", "pausar innan jag svarar"
-    }
-    has_coping = any(p in text_lower for p in coping_phr)
+    has_anxiety = any(t in ANXIETY_CTX for t in tokens) or ("pulling away" in text_lower)
+    has_coping = any(p in text_lower for p in COPING_PHRASES)
     
     if has_anxiety and has_coping:
         # Coping detected: boost plus, reduce neutral influence
@@ -771,10 +1079,67 @@ def ok(level: str, score: float, lang: str, t0: float) -> dict:
     }
 
 
-def detect_mood(text: str, lang: str = "auto") -> dict:
+class CalibrationSignals(NamedTuple):
+    """Z-oberoende signaler vid CALIBRATION_MODE:s beslutspunkt (en rad per text)."""
+    z: float
+    pos_n: float
+    neg_n: float
+    distress_mode: bool
+    humor_or_irony: bool
+    has_coping: bool
+    gate: bool  # coping_gate or constructive_gate
+    plus_gate: bool
+    strong: bool  # STRONG-RED (EN/SV)
+    abuse_gate: bool
+
+
+def calibrated_band(sig: CalibrationSignals, z_red: float, z_plus: float, z_light: float) -> tuple[str, float]:
+    """Klassificeringsband för CALIBRATION_MODE - enda steget som beror på Z-trösklarna."""
+    z = sig.z
+    # 1) Distress-låsning: om distress_mode och inte severe_red → LIGHT
+    if sig.distress_mode and z < z_red:
+        level, score = "light", 0.60
+    # 3) Humor/ironi-säkring: dämpa till neutral/light om ingen coping
+    elif sig.humor_or_irony and not sig.has_coping:
+        if z >= z_light:
+            level, score = "light", 0.60
+        else:
+            level, score = "neutral", CFG["NEUTRAL_SCORE"]
+    # 4) Band-klassning med coping/constructive-bump
+    # 4a) Tighta PLUS-gate lite (höjer precisionen)
+    elif sig.gate and z_light <= z < z_plus and (sig.pos_n - sig.neg_n) >= 0.03:
+        level, score = "plus", 0.75
+    elif z >= z_red:
+        level, score = "red", 0.9
+    elif z >= z_plus and sig.plus_gate:
+        level, score = "plus", 0.75
+    elif z >= z_light:
+        level, score = "light", 0.60
+    else:
+        level, score = "neutral", CFG["NEUTRAL_SCORE"]
+
+    # 3) Anti-RED när coping/constructive ändå råkar trigga (failsafe)
+    # Om något ändå föreslår RED utan STRONG, nedgradera konservativt
+    if sig.gate and not sig.strong and level == "red":
+        level, score = "light", 0.60
+
+    # Sista fintrim: Sänk RED-FP utan att röra STRONG/ABUSE
+    if level == "red" and not (sig.strong or sig.abuse_gate):
+        if sig.pos_n >= 0.19 or (sig.neg_n - sig.pos_n) < 0.08:  # positiv dominans eller för svag negativ dominans
+            level, score = "light", 0.60
+    return level, score
+
+
+def detect_mood(text: str, lang: str = "auto", *, signals_only: bool = False, analysis=None) -> dict:
     """
     Detect mood level and score.
     Returns: {level, score, flags, red_hint}
+
+    signals_only (CALIBRATION_MODE): returnera {"signals": CalibrationSignals, "lang"}
+    istället för att klassa, om texten når Z-beslutet (se calibration_engine).
+
+    analysis: förberäknad TextAnalysis för samma text (emotion_core) - återanvänder
+    simple_norm/norm/språk/emoji i stället för att normalisera om.
     """
     if not text or not text.strip():
         return {
@@ -786,14 +1151,21 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
 
     t0 = time.time()
     raw_text = text
-    text_lower = simple_norm(text)  # Robust normalisering
-    tnorm = norm(text)  # Behåll för bakåtkompatibilitet
-    
-    # Language detection
-    detected_lang = detect_lang(tnorm) if lang == "auto" else lang
+    if analysis is not None:
+        text_lower = analysis.simple_norm
+        tnorm = analysis.norm
+        detected_lang = analysis.mood_lang if lang == "auto" else lang
+    else:
+        text_lower = simple_norm(text)  # Robust normalisering
+        tnorm = norm(text)  # Behåll för bakåtkompatibilitet
+        
+        # Language detection
+        detected_lang = detect_lang(tnorm) if lang == "auto" else lang
     
-    # Load lexicon
-    lexicon = load_lexicon()
+    # Detection plan (kompilerade mönster + ordlistor, byggs om bara vid ändrad CFG/lexikon)
+    plan = get_plan()
+    lexicon = plan.lexicon
+    lp = plan.lang(detected_lang)
     
     # Use CFG thresholds (backward compatible with THR if needed)
     thr = {
@@ -806,68 +1178,19 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
     s_pos, s_red, debug_info = polarity_score(tnorm, detected_lang, lexicon)
     
     # Check for coping pattern (worry + coping words) - enhanced version
-    tokens = set(re.findall(r"[a-zA-ZåäöÅÄÖ'’-]+", text_lower))
+    tokens = set(_COPING_TOKEN_RE.findall(text_lower))
     
-    anxiety_ctx = {"orolig", "oroar", "spänd", "worried", "concerned", "tense", "stressed", "pulling away", "ångest", "anxious", "nervous"}
-    has_anxiety = any(t in anxiety_ctx for t in tokens) or ("pulling away" in text_lower)
-    
-    coping_phr = {
-        "ett steg i taget", "försöker hålla lugnt", "försöker hålla lugnet", "vågar be om hjälp", 
-        "tar en paus", "andas lugnt", "one step at a time", "trying to stay calm", 
-        "asked for help", "taking a pause", "breathing calmly", "we start over", 
-        "we talk calmly", "pause before i respond", "pausar innan jag svarar"
-    }
-    has_coping = any(p in text_lower for p in coping_phr)
+    has_anxiety = any(t in ANXIETY_CTX for t in tokens) or ("pulling away" in text_lower)
+    has_coping = any(p in text_lower for p in COPING_PHRASES)
     
     coping_detected = has_anxiety and has_coping
     tens = tension_score(tnorm, detected_lang)
-    e_plus, e_neg, e_red = emoji_score(tnorm)
+    e_plus, e_neg, e_red = analysis.mood_emoji if analysis is not None else emoji_score(tnorm)
     
     # --- Severe RED detection (STRONG/WEAK mönster) ---
-    NEGATIONS_GENERIC = [
-        r"\bi am not suicidal\b",
-        r"\bi'?m not suicidal\b",
-        r"\bi don'?t want to die\b",
-        r"\bi do want to live\b",
-        r"\bjag (?:\b| )vill leva\b",
-    ]
-
-    def is_negated_generic(t: str) -> bool:
-        return any(re.search(p, t) for p in NEGATIONS_GENERIC)
-
-    SEVERE_RED_EN_STRONG = [
-        r"\bdon'?t\s+want\s+to\s+go\s+on\b",
-        r"\bcan'?t\s+go\s+on\b",
-        r"\bcan'?t\s+keep\s+going\b",
-        r"\bi'?m\s+exhausted\s+and\s+see\s+no\s+point\b",
-        r"\b(no|not?\s+any)\s+point\s+(?:in|to)\s+(?:living|this|going\s+on)\b",
-        r"\blife\s+is\s+pointless\b",
-        r"\btired\s+of\s+living\b",
-        r"\b(end\s+my\s+life|suicidal)\b",
-        r"\bif\s+i\s+disappeared.*no\s+one\s+would\s+miss\s+me\b",
-        r"\bi\s+see\s+no\s+point\s+in\s+living\b",
-        r"\bno\s+reason\s+to\s+live\b",
-        r"\bend\s+it\s+all\b",
-        r"\bi\s+want\s+to\s+end\s+it\b",
-    ]
-
-    SEVERE_RED_EN_WEAK = [
-        r"\bi\s+want\s+to\s+die\b",
-        r"\bno\s+way\s+out\b",
-    ]
-
-    SEVERE_RED_SV = [
-        r"\bvill\s+inte\s+leva(?:\s+l(a|ä)ngre)?\b",
-        r"\borkar\s+inte\s+leva\b",
-        r"\bser\s+ingen\s+utv(a|ä)g\b",
-        r"\bom\s+jag\s+bara\s+f(ö|o)rsvann\b",
-        r"\bingen\s+skulle\s+sakna\s+mig\b",
-        r"\bjag\s+vill\s+d(ö|o)\b",
-    ]
-
-    sv_severe = any_re(text_lower, SEVERE_RED_SV)
-    en_severe_strong = any_re(text_lower, SEVERE_RED_EN_STRONG)
-    en_severe_weak = any_re(text_lower, SEVERE_RED_EN_WEAK) and not is_negated_generic(text_lower)
+    sv_severe = _any_rx(_SEVERE_RED_SV_RX, text_lower)
+    en_severe_strong = _any_rx(_SEVERE_RED_EN_STRONG_RX, text_lower)
+    en_severe_weak = _any_rx(_SEVERE_RED_EN_WEAK_RX, text_lower) and not _any_rx(_NEGATIONS_GENERIC_RX, text_lower)
     severe_red_flag = sv_severe or en_severe_strong or en_severe_weak
     
     if coping_detected and not en_severe_strong:
@@ -905,23 +1228,16 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
             if abs(val) < CFG["WEAK_ABS_VAL_MAX"] and total_weak_signals <= CFG["WEAK_TOTAL_SIG_MAX"] and pos_c_debug == 0 and neg_c_debug == 0:
                 return ok("neutral", CFG["NEUTRAL_SCORE"], detected_lang, t0)
 
-    # Get word lists for evidence
-    if detected_lang == "sv":
-        pos_words = POS_SV
-        intens_words = INTENS_SV
-    else:
-        pos_words = POS_EN
-        intens_words = INTENS_EN
-
-    pos_c = count_matches(tnorm, pos_words)
-    intens_c = count_matches(tnorm, intens_words)
+    # Word lists for evidence
+    pos_c = lp.pos_plain.count(tnorm)
+    intens_c = lp.intens.count(tnorm)
     pos_evid = pos_c + CFG["EVID_INTENS_W"] * intens_c + CFG["EVID_EMOJI_W"] * e_plus
 
     # Calculate anchor before features (needed for mutual damping)
     # Reduced from 1.0 to 0.6 to avoid canceling weak plus signals
     # Coping rule: if worry + coping detected, reduce anchor to 0.52
     anchor_base = 0.52 if coping_detected else 0.6
-    anchor = anchor_base if (CFG["NEUTRAL_ANCHOR_ENABLE"] and any(a.strip() and a.strip() in tnorm for a in (CFG["NEUTRAL_ANCHOR_LIST_SV"] if detected_lang == "sv" else CFG["NEUTRAL_ANCHOR_LIST_EN"]).split(","))) else 0.0
+    anchor = anchor_base if (CFG["NEUTRAL_ANCHOR_ENABLE"] and any(a in tnorm for a in lp.anchors)) else 0.0
 
     # New features (only if flags enabled)
     f_resolve = resolve_feature(tnorm, detected_lang, CFG["RESOLVE_WINDOW"]) if CFG["FEATURE_RESOLVE"] else 0.0
@@ -968,35 +1284,8 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
         neg_n += 0.14 * red_phrase_hits + 0.08 * e_red
         
         # 0) STRONG-RED först, helt orörd (räddar recall)
-        # Definiera STRONG-mönster tidigt
-        SEVERE_RED_EN_STRONG_CAL = [
-            r"\bdon'?t\s+want\s+to\s+go\s+on\b",
-            r"\bcan'?t\s+go\s+on\b",
-            r"\bcan'?t\s+keep\s+going\b",
-            r"\bi'?m\s+exhausted\s+and\s+see\s+no\s+point\b",
-            r"\b(no|not?\s+any)\s+point\s+(?:in|to)\s+(?:living|this|going\s+on)\b",
-            r"\blife\s+is\s+pointless\b",
-            r"\btired\s+of\s+living\b",
-            r"\b(end\s+my\s+life|suicidal)\b",
-            r"\bif\s+i\s+disappeared.*no\s+one\s+would\s+miss\s+me\b",
-            r"\bi\s+see\s+no\s+point\s+in\s+living\b",
-            r"\bno\s+reason\s+to\s+live\b",
-            r"\bend\s+it\s+all\b",
-            r"\bi\s+want\s+to\s+end\s+it\b",
-        ]
-        SEVERE_RED_SV_STRONG = [
-            r"\bvill\s+inte\s+leva(?:\s+l(a|ä)ngre)?\b",
-            r"\borkar\s+inte\s+leva\b",
-            r"\bser\s+ingen\s+utv(a|ä)g\b",
-        ]
-        SEVERE_RED_SV_WEAK = [
-            r"\bom\s+jag\s+bara\s+f(ö|o)rsvann\b",
-            r"\bingen\s+skulle\s+sakna\s+mig\b",
-            r"\bjag\s+vill\s+d(ö|o)\b",
-        ]
-        
-        en_severe_strong_cal = any_re(text_lower, SEVERE_RED_EN_STRONG_CAL)
-        sv_severe_strong = any_re(text_lower, SEVERE_RED_SV_STRONG)
+        en_severe_strong_cal = en_severe_strong
+        sv_severe_strong = _any_rx(_SEVERE_RED_SV_STRONG_RX, text_lower)
         
         # STRONG → tidig retur (ingen coping-veto)
         if en_severe_strong_cal or sv_severe_strong:
@@ -1006,20 +1295,7 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
         
         # 1) Adaptiv RED-dominans (minskar PLUS→RED)
         # Beräkna coping_gate och distress_mode först (behövs för adaptiv tröskel)
-        COPING_PLUS_PATTERNS = [
-            r"\bv(å|a)gade?\s+be\s+om\s+hj(a|ä)lp\b",
-            r"\blugn\s+pratstund\b",
-            r"\bpromenad\b",
-            r"\bkunde\s+andas\s+ut\b",
-            r"\bone\s+tiny\s+win\b",
-            r"\basked\s+for\s+help\b",
-            r"\bagreed\s+to\s+pause\b",
-            r"\bshort\s+walk\s+cleared\s+my\s+head\b",
-            r"\brevisit\s+calmly\s+tomorrow\b",
-            r"\bkeep\s+my\s+tone\s+calm\b",
-        ]
-        
-        coping_gate = any(re.search(p, text_lower, flags=re.UNICODE) for p in COPING_PLUS_PATTERNS)
+        coping_gate = _any_rx(_COPING_PLUS_RX, text_lower)
         if coping_gate:
             pos_n += 0.18
             if pos_n < 0.14:
@@ -1027,28 +1303,12 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
             neu_n = max(0.0, neu_n - 0.04)
         
         # "Constructive intent" → PLUS-gate (lyfter light/neutral → plus)
-        CONSTRUCTIVE_PATTERNS = [
-            r"\bbest(a|ä)mde?\s+en\s+sak\s+i\s+t(a|ä)get\b",
-            r"\bvi\s+(?:kom\s+)?(överens|pausade|planerade)\b",
-            r"\bimorgon\b",
-            r"\bi\s+will\b",
-            r"\bwe\s+agreed\b",
-            r"\bplan\b",
-            r"\basked\s+for\s+help\b",
-            r"\bthanks?\s+for\s+being\s+honest\b",
-        ]
-        
-        constructive_gate = any(re.search(p, text_lower, flags=re.UNICODE) for p in CONSTRUCTIVE_PATTERNS)
+        constructive_gate = _any_rx(_CONSTRUCTIVE_RX, text_lower)
         if constructive_gate:
             pos_n += 0.12  # separat från coping
             neu_n = max(0.0, neu_n - 0.02)
         
         # ABUSE-coercion gate (för ABUSE-RED detection)
-        ABUSE_TRIG = {
-            "drar in pengar som hot", "tracks my location", "logs into my accounts",
-            "calls me crazy", "kräver min platsdelning", "kräver bilder för att bevisa",
-            "kontrollerar min telefon", "tar min telefon", "gaslighting", "gaslighting me"
-        }
         abuse_coercion_gate = any(p in text_lower for p in ABUSE_TRIG)
         
         # Tvä-rads-tweak för ABUSE-RED
@@ -1070,8 +1330,6 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
             neg_n = min(neg_n, pos_n + 0.05)
         
         # 3) Humor/ironi-neutralisering (hindrar neutral→plus: E063/64/75/76/87/88)
-        HUMOR = {"we joked", "we laughed", "roliga minnen", "vi skrattade", "skämtade"}
-        IRONY_MARKERS = {"visst, för det har ju alltid", "yeah very helpful", "sure that worked great"}
         humor = any(h in text_lower for h in HUMOR)
         irony = any(i in text_lower for i in IRONY_MARKERS)
         humor_hits = 1 if humor else 0
@@ -1084,30 +1342,12 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
                 neg_n += 0.03   # sarkasm → lite negativ realism
         
         # 2) WEAK-RED: kräver flera signaler + absolut negativ massa
-        SEVERE_RED_EN_WEAK = [
-            r"\bi\s+want\s+to\s+die\b",
-            r"\bno\s+way\s+out\b",
-        ]
-        
-        HOPELESS_PATS = [
-            r"\bhoppl(ö|o)s\b",
-            r"\bingen\s+utv(a|ä)g\b",
-            r"\bpointless\b",
-            r"\bno\s+point\b",
-            r"\bworthless\b",
-            r"\btomhet\b",
-            r"\bempty\b",
-        ]
-        
-        def count_re(text, patterns):
-            return sum(1 for p in patterns if re.search(p, text, flags=re.UNICODE))
-        
         ABS_NEG_MIN = 0.22
         neg_dom = neg_n - pos_n
         
         # multi-hit villkor för WEAK-RED (ingen coping/constructive)
-        weak_hits = count_re(text_lower, SEVERE_RED_EN_WEAK) + count_re(text_lower, SEVERE_RED_SV_WEAK)
-        hopeless_hits = count_re(text_lower, HOPELESS_PATS)
+        weak_hits = _count_rx(_SEVERE_RED_EN_WEAK_RX, text_lower) + _count_rx(_SEVERE_RED_SV_WEAK_RX, text_lower)
+        hopeless_hits = _count_rx(_HOPELESS_RX, text_lower)
         
         thr = 0.05  # sänkt bas (hjälper recall)
         if distress_mode:
@@ -1151,112 +1391,25 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
             print(f"[DEBUG] Coping: anxiety={has_anxiety}, coping={has_coping}", file=sys.stderr)
             print(f"[DEBUG] z={z:.3f} (logit-mix, clamped)", file=sys.stderr)
         
-        # Load Z thresholds from environment or thresholds.json
-        Z_RED = float(os.getenv("Z_RED", "1.05"))
-        Z_PLUS = float(os.getenv("Z_PLUS", "0.80"))
-        Z_LIGHT = float(os.getenv("Z_LIGHT", "0.45"))
-        
-        # Try to load from thresholds.json if it exists and ENV vars not set
-        if not os.getenv("Z_RED") and not os.getenv("Z_PLUS") and not os.getenv("Z_LIGHT"):
-            try:
-                import json
-                from pathlib import Path
-                # Try multiple paths
-                thresholds_paths = [
-                    Path(__file__).resolve().parents[2] / "thresholds.json",  # sintari-relations/thresholds.json
-                    Path(__file__).resolve().parents[3] / "sintari-relations" / "thresholds.json",  # project root
-                    Path("thresholds.json"),  # current dir
-                ]
-                for thresh_path in thresholds_paths:
-                    if thresh_path.exists():
-                        with open(thresh_path, "r", encoding="utf-8") as f:
-                            cfg = json.load(f)
-                            # Use sv values (or en if sv not available)
-                            sv_cfg = cfg.get("sv", {})
-                            en_cfg = cfg.get("en", {})
-                            if sv_cfg:
-                                Z_RED = float(sv_cfg.get("red_min", Z_RED))
-                                Z_PLUS = float(sv_cfg.get("plus_min", Z_PLUS))
-                                Z_LIGHT = float(sv_cfg.get("light_min", Z_LIGHT))
-                            elif en_cfg:
-                                Z_RED = float(en_cfg.get("red_min", Z_RED))
-                                Z_PLUS = float(en_cfg.get("plus_min", Z_PLUS))
-                                Z_LIGHT = float(en_cfg.get("light_min", Z_LIGHT))
-                        if DEBUG:
-                            print(f"[DEBUG] Loaded thresholds from {thresh_path}: Z_RED={Z_RED}, Z_PLUS={Z_PLUS}, Z_LIGHT={Z_LIGHT}", file=sys.stderr)
-                        break
-            except Exception as e:
-                if DEBUG:
-                    print(f"[DEBUG] Could not load thresholds.json: {e}", file=sys.stderr)
-        
         # --- Klassificeringsband (efter att z är beräknad) ---
-        # Gate-villkor (använder coping_gate och constructive_gate från ovan - sätts i CALIBRATION_MODE block)
-        # Om coping_gate inte är definierat (non-CALIBRATION_MODE), använd has_coping
-        if CFG["CALIBRATION_MODE"]:
-            # coping_gate och constructive_gate är redan definierat ovan i CALIBRATION_MODE block
-            plus_gate = (pos_n - neg_n) >= 0.06 or coping_gate or constructive_gate or has_coping or plus_phrase_hits >= 1
-        else:
-            # För non-CALIBRATION_MODE, konstruera constructive_gate här också
-            CONSTRUCTIVE_PATTERNS_NON_CAL = [
-                r"\bbest(a|ä)mde?\s+en\s+sak\s+i\s+t(a|ä)get\b",
-                r"\bvi\s+(?:kom\s+)?(överens|pausade|planerade)\b",
-                r"\bimorgon\b",
-                r"\bi\s+will\b",
-                r"\bwe\s+agreed\b",
-                r"\bplan\b",
-                r"\basked\s+for\s+help\b",
-                r"\bthanks?\s+for\s+being\s+honest\b",
-            ]
-            constructive_gate = any(re.search(p, text_lower, flags=re.UNICODE) for p in CONSTRUCTIVE_PATTERNS_NON_CAL)
-            plus_gate = (pos_n - neg_n) >= 0.06 or constructive_gate or has_coping or plus_phrase_hits >= 1
-        humor = any(h in text_lower for h in {"we joked", "we laughed", "roliga minnen", "vi skrattade", "skämtade"})
-        irony = any(i in text_lower for i in {"visst, för det har ju alltid", "yeah very helpful", "sure that worked great"})
-        
-        result_level = None
-        result_score = None
-        
-        # 1) Distress-låsning: om distress_mode och inte severe_red → LIGHT
-        if distress_mode and z < Z_RED:
-            result_level = "light"
-            result_score = 0.60
-        # 3) Humor/ironi-säkring: dämpa till neutral/light om ingen coping
-        elif (humor or irony) and not has_coping:
-            if z >= Z_LIGHT:
-                result_level = "light"
-                result_score = 0.60
-            else:
-                result_level = "neutral"
-                result_score = CFG["NEUTRAL_SCORE"]
-        # 4) Band-klassning med coping/constructive-bump
-        # 4a) Tighta PLUS-gate lite (höjer precisionen)
-        elif (coping_gate or constructive_gate) and Z_LIGHT <= z < Z_PLUS and (pos_n - neg_n) >= 0.03:
-            result_level = "plus"
-            result_score = 0.75
-        elif z >= Z_RED:
-            result_level = "red"
-            result_score = 0.9
-        elif z >= Z_PLUS and plus_gate:
-            result_level = "plus"
-            result_score = 0.75
-        elif z >= Z_LIGHT:
-            result_level = "light"
-            result_score = 0.60
-        else:
-            result_level = "neutral"
-            result_score = CFG["NEUTRAL_SCORE"]
-        
-        # 3) Anti-RED när coping/constructive ändå råkar trigga (failsafe)
-        # Om något ändå föreslår RED utan STRONG, nedgradera konservativt
-        if (coping_gate or constructive_gate) and not (en_severe_strong_cal or sv_severe_strong):
-            if result_level == "red":
-                result_level = "light"
-                result_score = 0.60
-        
-        # Sista fintrim: Sänk RED-FP utan att röra STRONG/ABUSE
-        if result_level == "red" and not (en_severe_strong_cal or sv_severe_strong or abuse_coercion_gate):
-            if pos_n >= 0.19 or (neg_n - pos_n) < 0.08:  # positiv dominans eller för svag negativ dominans
-                result_level = "light"
-                result_score = 0.60
+        # Gate-villkor (coping_gate och constructive_gate är satta ovan i CALIBRATION_MODE-blocket)
+        plus_gate = (pos_n - neg_n) >= 0.06 or coping_gate or constructive_gate or has_coping or plus_phrase_hits >= 1
+        sig = CalibrationSignals(
+            z=z, pos_n=pos_n, neg_n=neg_n,
+            distress_mode=distress_mode,
+            humor_or_irony=humor or irony,
+            has_coping=has_coping,
+            gate=coping_gate or constructive_gate,
+            plus_gate=plus_gate,
+            strong=en_severe_strong_cal or sv_severe_strong,
+            abuse_gate=abuse_coercion_gate,
+        )
+        if signals_only:
+            return {"signals": sig, "lang": detected_lang}
+
+        # Z thresholds from environment or thresholds.json (memo per fil-mtime)
+        Z_RED, Z_PLUS, Z_LIGHT = z_thresholds()
+        result_level, result_score = calibrated_band(sig, Z_RED, Z_PLUS, Z_LIGHT)
         
         # Debug logging (after result_level is set)
         if DEBUG or os.getenv("DBG_CASE_ID") or DEBUG_EMOTION:
@@ -1325,8 +1478,7 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
 
     # 3.5) Tension-lite nudge → LIGHT (svag negativ vardag)
     if CFG["FEATURE_TENSION_LITE"] and s_red < thr["red_min"]:
-        hints = LITE_NEG_HINT_SV if detected_lang == "sv" else LITE_NEG_HINT_EN
-        has_hint = any(h in tnorm for h in hints)
+        has_hint = any(h in tnorm for h in lp.lite_hints)
         in_band = abs(s_pos - thr["light_min"]) <= CFG["LITE_WINDOW"]
         mild_tension = CFG["LITE_TENSION_MIN"] <= tens <= CFG["LITE_TENSION_MAX"]
         if has_hint and in_band and mild_tension:
@@ -1372,22 +1524,89 @@ def detect_mood(text: str, lang: str = "auto") -> dict:
     return result
 
 
+# --- Batch scoring ---
+
+def _detect_chunk(pairs: list) -> list:
+    """Processpool-enhet: detect_mood för en chunk av (text, lang)."""
+    return [detect_mood(text, lang) for text, lang in pairs]
+
+
+def detect_mood_batch(texts, lang="auto", workers: int = 0, chunksize: int = 512) -> list[dict]:
+    """
+    detect_mood över många texter (arkiv, offline-körningar).
+
+    `lang` är ett språk för alla texter eller en sekvens per text. Identiska
+    (text, lang) räknas bara en gång (kopior returneras); med workers > 1
+    fördelas de unika texterna i chunkar över en processpool. Resultaten är
+    identiska med detect_mood per text.
+    """
+    texts = list(texts)
+    langs = [lang] * len(texts) if isinstance(lang, str) else list(lang)
+    if len(langs) != len(texts):
+        raise ValueError("lang must be a string or match len(texts)")
+
+    index: dict = {}
+    unique: list = []
+    slots = []
+    for pair in zip(texts, langs):
+        i = index.get(pair)
+        if i is None:
+            i = index[pair] = len(unique)
+            unique.append(pair)
+        slots.append(i)
+
+    if workers > 1 and len(unique) > chunksize:
+        import multiprocessing
+        chunks = [unique[i:i + chunksize] for i in range(0, len(unique), chunksize)]
+        with multiprocessing.Pool(workers) as pool:
+            results = [r for part in pool.imap(_detect_chunk, chunks) for r in part]
+    else:
+        results = _detect_chunk(unique)
+
+    seen = set()
+    out = []
+    for i in slots:
+        out.append(dict(results[i]) if i in seen else results[i])
+        seen.add(i)
+    return out
+
+
 # --- JSONL Bridge Protocol ---
+# En rad per request:
+#   {"text": "...", "lang": "auto", "trace_id": "t1"}             -> ett svar
+#   {"batch": [{"text": ..., "lang": ..., "trace_id": ...} | "text", ...],
+#    "lang": "auto", "trace_id": "b1"}                            -> {"ok", "batch": [svar, ...], "trace_id": "b1"}
+# Klienten kan skicka flera rader utan att vänta (pipelining). Stora batchar körs
+# i bakgrunden i en processpool (MICRO_MOOD_WORKERS > 1), så svar kan komma i
+# annan ordning än requests - klienten matchar på trace_id.
 
-def handle_jsonl_request(line: str) -> str:
-    """Handle JSONL request from Node.js bridge"""
-    start_time = time.perf_counter()
-    try:
-        request = json.loads(line.strip())
-        text = request.get("text", "")
-        lang = request.get("lang", "auto")
-        trace_id = request.get("trace_id", "")
+BATCH_WORKERS = int(os.getenv("MICRO_MOOD_WORKERS", "0"))  # 0/1 = ingen processpool
+BATCH_MP_MIN = int(os.getenv("MICRO_MOOD_MP_MIN", "256"))  # minsta batch för processpoolen
 
-        result = detect_mood(text, lang)
-        
-        elapsed_ms = (time.perf_counter() - start_time) * 1000
 
-        return json.dumps({
+def _elapsed_ms(start_time: float) -> float:
+    return round((time.perf_counter() - start_time) * 1000, 2)
+
+
+def _error_response(error: Exception, start_time: float, trace_id: str = "") -> dict:
+    return {
+        "ok": False,
+        "agent": AGENT_ID,
+        "error": str(error),
+        "latency_ms": _elapsed_ms(start_time),
+        "trace_id": trace_id,
+    }
+
+
+def _mood_response(item, default_lang: str = "auto") -> dict:
+    """Svar för ett enskilt item ({"text", "lang", "trace_id"} eller ren text)."""
+    start_time = time.perf_counter()
+    if not isinstance(item, dict):
+        item = {"text": item}
+    trace_id = item.get("trace_id", "")
+    try:
+        result = detect_mood(item.get("text", ""), item.get("lang", default_lang))
+        return {
             "ok": True,
             "agent": AGENT_ID,
             "version": AGENT_VERSION,
@@ -1395,16 +1614,118 @@ def handle_jsonl_request(line: str) -> str:
             "score": result["score"],
             "flags": result["flags"],
             "red_hint": result["red_hint"],
-            "latency_ms": round(elapsed_ms, 2),
+            "latency_ms": _elapsed_ms(start_time),
             "trace_id": trace_id,
-        }, ensure_ascii=False)
+        }
     except Exception as e:
-        return json.dumps({
-            "ok": False,
-            "agent": AGENT_ID,
-            "error": str(e),
-            "latency_ms": round((time.perf_counter() - start_time) * 1000, 2)
-        }, ensure_ascii=False)
+        return _error_response(e, start_time, trace_id)
+
+
+def _mood_responses(items: list, default_lang: str = "auto") -> list:
+    """Processpool-enhet: en chunk av batchen."""
+    return [_mood_response(item, default_lang) for item in items]
+
+
+def _batch_response(request: dict, results: list, start_time: float) -> dict:
+    return {
+        "ok": True,
+        "agent": AGENT_ID,
+        "version": AGENT_VERSION,
+        "batch": results,
+        "count": len(results),
+        "latency_ms": _elapsed_ms(start_time),
+        "trace_id": request.get("trace_id", ""),
+    }
+
+
+def handle_request(request: dict, start_time: float | None = None) -> dict:
+    """Handle a decoded request (single text or {"batch": [...]}) in-process"""
+    start_time = time.perf_counter() if start_time is None else start_time
+    try:
+        batch = request.get("batch")
+        if batch is None:
+            return _mood_response(request)
+        if not isinstance(batch, list):
+            raise ValueError("batch must be a list")
+        return _batch_response(request, _mood_responses(batch, request.get("lang", "auto")), start_time)
+    except Exception as e:
+        trace_id = request.get("trace_id", "") if isinstance(request, dict) else ""
+        return _error_response(e, start_time, trace_id)
+
+
+def handle_jsonl_request(line: str) -> str:
+    """Handle JSONL request from Node.js bridge"""
+    start_time = time.perf_counter()
+    try:
+        request = json.loads(line.strip())
+    except Exception as e:
+        return json.dumps(_error_response(e, start_time), ensure_ascii=False)
+    return json.dumps(handle_request(request, start_time), ensure_ascii=False)
+
+
+def _submit_batch(pool, request: dict, emit, start_time: float, workers: int):
+    """Kör en stor batch i processpoolen; svaret skrivs när alla chunkar är klara."""
+    batch = request["batch"]
+    lang = request.get("lang", "auto")
+    size = max(1, -(-len(batch) // (workers * 4)))
+    chunks = [(batch[i:i + size], lang) for i in range(0, len(batch), size)]
+
+    def done(parts):
+        emit(_batch_response(request, [r for part in parts for r in part], start_time))
+
+    def failed(error):
+        emit(_error_response(error, start_time, request.get("trace_id", "")))
+
+    return pool.starmap_async(_mood_responses, chunks, callback=done, error_callback=failed)
+
+
+def serve_jsonl(inp=None, out=None, workers: int | None = None, mp_min: int | None = None) -> None:
+    """
+    JSONL-loop över stdin/stdout.
+
+    Enstaka requests och små batchar besvaras direkt i ordning. Batchar med
+    minst `mp_min` items körs i en processpool (om workers > 1) medan loopen
+    fortsätter läsa, så att bulk-körningar inte blockerar interaktiva anrop.
+    """
+    inp = sys.stdin if inp is None else inp
+    out = sys.stdout if out is None else out
+    workers = BATCH_WORKERS if workers is None else workers
+    mp_min = BATCH_MP_MIN if mp_min is None else mp_min
+    lock = threading.Lock()
+
+    def emit(response: dict) -> None:
+        line = json.dumps(response, ensure_ascii=False)
+        with lock:
+            out.write(line + "\n")
+            out.flush()
+
+    pool = None
+    pending = []
+    try:
+        for line in inp:
+            line = line.strip()
+            if not line:
+                continue
+            start_time = time.perf_counter()
+            try:
+                request = json.loads(line)
+            except Exception as e:
+                emit(_error_response(e, start_time))
+                continue
+            batch = request.get("batch") if isinstance(request, dict) else None
+            if workers > 1 and isinstance(batch, list) and len(batch) >= mp_min:
+                if pool is None:
+                    import multiprocessing
+                    pool = multiprocessing.Pool(workers)
+                pending.append(_submit_batch(pool, request, emit, start_time, workers))
+            else:
+                emit(handle_request(request, start_time))
+        for result in pending:
+            result.wait()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
 
 # --- CLI/Interactive mode ---
@@ -1418,21 +1739,7 @@ if __name__ == "__main__":
         isatty_result = False
     
     if not isatty_result:
-        for line in sys.stdin:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                response = handle_jsonl_request(line)
-                print(response, flush=True)
-            except Exception as e:
-                error_resp = json.dumps({
-                    "ok": False,
-                    "agent": AGENT_ID,
-                    "error": str(e),
-                    "latency_ms": 0
-                }, ensure_ascii=False)
-                print(error_resp, flush=True, file=sys.stdout)
+        serve_jsonl()
         sys.exit(0)
 
     # Simple CLI test (for debugging)
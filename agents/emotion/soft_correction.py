@@ -50,9 +50,9 @@ CORRECTION_TEMPLATES_EN = [
     "I was unclear – let me clarify: {clarification}. {question}",
 ]
 
-def detect_misunderstanding(text: str, lang: str) -> bool:
+def detect_misunderstanding(text: str, lang: str, lowered: Optional[str] = None) -> bool:
     """Detect if text indicates a misunderstanding."""
-    t = text.lower()
+    t = lowered if lowered is not None else text.lower()
     indicators = MISUNDERSTANDING_SV if lang == "sv" else MISUNDERSTANDING_EN
     return any(indicator in t for indicator in indicators)
 
@@ -108,11 +108,14 @@ def analyze(
     text: str,
     lang: str = "sv",
     previous_response: Optional[str] = None,
-    context: Optional[Dict] = None
+    context: Optional[Dict] = None,
+    analysis=None
 ) -> Dict[str, Any]:
     """
     Analyze if soft correction is needed.
     
+    analysis: förberäknad TextAnalysis (emotion_core), återanvänder gemen text.
+    
     Returns:
         {
             "needs_correction": bool,
@@ -128,7 +131,7 @@ def analyze(
         }
     
     # Check if misunderstanding is detected
-    has_misunderstanding = detect_misunderstanding(text, lang)
+    has_misunderstanding = detect_misunderstanding(text, lang, analysis.lower if analysis is not None else None)
     
     if not has_misunderstanding:
         return {
@@ -0,0 +1,83 @@
+"""
+TextAnalysis - delad förbehandling för emotion-kedjan (emotion_core).
+
+micro_mood, empathy_tone_v2 och soft_correction normaliserade tidigare samma
+text var för sig (NFC/NFKC, mojibake-fix, lowercase, tokenisering). Här räknas
+varje form ut en gång per meddelande (lazy) och skickas vidare som `analysis=`.
+Varje fält är exakt det värde respektive agent annars hade räknat fram, så
+utfallet är identiskt med separata anrop.
+
+TextAnalysis är en lib.text.TextView, så samma objekt kan ges vidare som
+`view=` till övriga agenter (safety_gate, tox_nuance, diag_* ...). Formerna
+som är micro_mood-specifika heter mood_* för att inte krocka med vyns egna
+(lang är vyns lang_detect-resultat, emoji vyns emoji-lista).
+"""
+from __future__ import annotations
+
+from functools import cached_property
+
+from lib.text.text_view import TextView
+
+from . import micro_mood as mm
+from .text_utils import normalize_text
+
+
+class TextAnalysis(TextView):
+    """TextView + emotion-kedjans normaliserade former, tokens och emoji."""
+
+    def __init__(self, text: str):
+        super().__init__(text or "")
+
+    @cached_property
+    def normalized(self) -> str:
+        """text_utils.normalize_text (NFC, whitespace, !!/??/...) - empathy_tone_v2."""
+        return normalize_text(self.raw)
+
+    @cached_property
+    def normalized_lower(self) -> str:
+        # normalize_text är idempotent, så detta == empathy_tone_v2.normalize_text(normalized)
+        return self.normalized.lower()
+
+    @cached_property
+    def simple_norm(self) -> str:
+        """micro_mood.simple_norm (NFC + lowercase + ordgränser)."""
+        return mm.simple_norm(self.raw)
+
+    @cached_property
+    def norm(self) -> str:
+        """micro_mood.norm (mojibake + NFKC + lowercase)."""
+        return mm.norm(self.raw)
+
+    @cached_property
+    def mood_lang(self) -> str:
+        """micro_mood.detect_lang på norm."""
+        return mm.detect_lang(self.norm)
+
+    @cached_property
+    def mood_tokens(self) -> list[str]:
+        return mm._WORD_TOKEN_RE.findall(self.norm)
+
+    @cached_property
+    def mood_emoji(self) -> tuple[int, int, int]:
+        """(plus, neg, red) enligt micro_mood.emoji_score."""
+        return mm.emoji_score(self.norm)
+
+    def warm(self) -> "TextAnalysis":
+        """Räkna ut alla former direkt (för mätbar analys-latens)."""
+        for name in ("lower", "normalized", "normalized_lower", "simple_norm", "norm",
+                     "mood_lang", "mood_tokens", "sentences", "mood_emoji"):
+            getattr(self, name)
+        return self
+
+    def summary(self) -> dict:
+        plus, neg, red = self.mood_emoji
+        return {
+            "chars": len(self.raw),
+            "tokens": len(self.mood_tokens),
+            "sentences": len(self.sentences),
+            "emoji": {"plus": plus, "neg": neg, "red": red},
+            "lang_guess": self.mood_lang,
+        }
+
+
+__all__ = ["TextAnalysis"]
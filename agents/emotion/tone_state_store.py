@@ -0,0 +1,284 @@
+"""
+Tone State Store - begränsat filtertillstånd för empathy_tone_v2.
+
+empathy_tone_v2 håller per trace_id/tråd ett litet tillstånd (prev_vector,
+history_vectors, prev_feats) som median3/ema/slew_limit i filters.py behöver
+för nästa tur. Tidigare låg det i en obegränsad modul-dict: minnet växte med
+varje ny trace_id och tillståndet fanns bara i den process som råkade svara.
+
+Backends (TONE_STATE_BACKEND):
+- memory (default): in-process LRU + TTL med maxantal och byte-tak.
+- shm: SQLite-fil i /dev/shm - delas av alla workers i poolen på samma värd
+  utan diskskrivningar (faller tillbaka till runtime/ om /dev/shm saknas).
+- sqlite: SQLite-fil på disk (TONE_STATE_PATH, default runtime/tone_state.sqlite),
+  överlever omstarter.
+
+Värden lagras som kompakt JSON; byte-räkningen är längden på den kodade
+posten. `get` returnerar alltid en ny dict, så anropare kan mutera fritt.
+`with store.transaction():` gör en läs-ändra-skriv över flera nycklar atomisk
+(SQLite: BEGIN IMMEDIATE, så även andra processer väntar).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("TONE_STATE_MAX", "4096"))
+DEFAULT_MAX_BYTES = int(os.getenv("TONE_STATE_MAX_BYTES", str(4 * 1024 * 1024)))
+DEFAULT_TTL_S = float(os.getenv("TONE_STATE_TTL_S", "3600"))
+SHM_DIR = Path("/dev/shm")
+
+# SQLite: städa (TTL + maxantal) var N:e skrivning i stället för vid varje tur
+_SQLITE_PRUNE_EVERY = 64
+
+
+def _encode(state: Dict[str, Any]) -> str:
+    return json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+
+
+class MemoryToneStateStore:
+    """In-process LRU + TTL, begränsad både i antal poster och i bytes."""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.max_bytes = max(1, int(max_bytes))
+        self.nbytes = 0
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.stats = {"hit": 0, "miss": 0, "put": 0, "evicted": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def _drop_locked(self, key: str) -> None:
+        _, blob = self._entries.pop(key)
+        self.nbytes -= len(blob)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.stats["miss"] += 1
+                return None
+            if time.monotonic() - item[0] > self.ttl_s:
+                self._drop_locked(key)
+                self.stats["expired"] += 1
+                self.stats["miss"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hit"] += 1
+            blob = item[1]
+        return json.loads(blob)
+
+    def put(self, key: str, state: Dict[str, Any]) -> None:
+        blob = _encode(state)
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+            self._entries[key] = (time.monotonic(), blob)
+            self.nbytes += len(blob)
+            self.stats["put"] += 1
+            while len(self._entries) > self.max_entries or (self.nbytes > self.max_bytes and len(self._entries) > 1):
+                self._drop_locked(next(iter(self._entries)))
+                self.stats["evicted"] += 1
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "entries": len(self._entries), "bytes": self.nbytes, **self.stats}
+
+
+class SqliteToneStateStore:
+    """
+    Delad store för flera processer (worker-pool) via en SQLite-fil i WAL-läge.
+
+    TTL och LRU går på väggklocka (`updated`), som skrivs vid varje put - en
+    tur läser och skriver alltid samma nyckel, så senaste skrivning är i
+    praktiken senaste användning. Städning sker var _SQLITE_PRUNE_EVERY:e put.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: Path, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.max_bytes = max(1, int(max_bytes))
+        self._lock = threading.RLock()
+        self._puts = 0
+        self.stats = {"hit": 0, "miss": 0, "put": 0, "evicted": 0, "expired": 0}
+        self._conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tone_state ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, nbytes INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tone_state_updated ON tone_state(updated)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tone_state").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM tone_state").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, updated FROM tone_state WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["miss"] += 1
+                return None
+            if time.time() - row[1] > self.ttl_s:
+                self._conn.execute("DELETE FROM tone_state WHERE key = ?", (key,))
+                self.stats["expired"] += 1
+                self.stats["miss"] += 1
+                return None
+            self.stats["hit"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, state: Dict[str, Any]) -> None:
+        blob = _encode(state)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tone_state (key, value, nbytes, updated) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self.stats["put"] += 1
+            self._puts += 1
+            if self._puts % _SQLITE_PRUNE_EVERY == 0:
+                self._prune_locked()
+
+    def _prune_locked(self) -> None:
+        cur = self._conn.execute("DELETE FROM tone_state WHERE updated < ?", (time.time() - self.ttl_s,))
+        self.stats["expired"] += max(0, cur.rowcount)
+        cur = self._conn.execute(
+            "DELETE FROM tone_state WHERE key IN "
+            "(SELECT key FROM tone_state ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.stats["evicted"] += max(0, cur.rowcount)
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM tone_state").fetchone()[0]
+        if total > self.max_bytes:
+            # Äldst först tills vi är under byte-taket
+            drop, keys = total - self.max_bytes, []
+            for k, n in self._conn.execute("SELECT key, nbytes FROM tone_state ORDER BY updated"):
+                if drop <= 0:
+                    break
+                keys.append((k,))
+                drop -= n
+            self._conn.executemany("DELETE FROM tone_state WHERE key = ?", keys)
+            self.stats["evicted"] += len(keys)
+
+    def prune(self) -> None:
+        with self._lock:
+            self._prune_locked()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tone_state WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tone_state")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "path": str(self.path), "entries": len(self), "bytes": self.nbytes, **self.stats}
+
+
+def make_store(backend: Optional[str] = None, path: Optional[str] = None, **limits):
+    """Skapa store från namn (memory/shm/sqlite); default från TONE_STATE_BACKEND."""
+    backend = (backend or os.getenv("TONE_STATE_BACKEND", "memory")).strip().lower()
+    if backend == "memory":
+        return MemoryToneStateStore(**limits)
+    if backend == "shm":
+        base = SHM_DIR if SHM_DIR.is_dir() else ROOT / "runtime"
+        store = SqliteToneStateStore(Path(path or os.getenv("TONE_STATE_PATH") or base / "sintari_tone_state.db"), **limits)
+        store.backend = "shm"
+        return store
+    if backend == "sqlite":
+        return SqliteToneStateStore(Path(path or os.getenv("TONE_STATE_PATH") or ROOT / "runtime" / "tone_state.sqlite"), **limits)
+    raise ValueError(f"Unknown TONE_STATE_BACKEND: {backend}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Processens delade store (skapas lazy från env)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = make_store()
+    return _store
+
+
+def set_store(store) -> None:
+    """Byt store (tester, eller värdprocess som vill injicera egen backend)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+__all__ = [
+    "MemoryToneStateStore",
+    "SqliteToneStateStore",
+    "make_store",
+    "get_store",
+    "set_store",
+]
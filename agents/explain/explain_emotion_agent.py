@@ -91,7 +91,7 @@ def _mk_patterns(
         pats.append("empati utan värme → risk för utmattning")
     if c < 0.35 and ("boundary" in facets_lower or risk_flags.get("coercion")):
         pats.append("gräns-oskärpa i känsligt samtal")
-    if risk_flags.get("selfharm"):
+    if risk_flags.get("selfharm") or risk_flags.get("red"):
         pats.append("akut risksignal – observerad, ej tolkning")
 
     if not pats:
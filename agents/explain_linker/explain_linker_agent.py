@@ -1,23 +1,15 @@
-import re
 from typing import List, Dict
 
-CUES = [
-    (r"\bjag uppskattar\b", "beröm"),
-    (r"\bjag blev ledsen\b|\bjag kände\b", "känsla"),
-    (r"\bkan vi\b|\bskulle vi\b|\bvill du\b", "öppen_fråga"),
-    (r"\bförlåt\b|\bjag tar ansvar\b", "reparation"),
-    (r"\bska vi ta paus\b|\btime[- ]?out\b", "regler"),
-    (r"\begen tid\b|\bspace\b", "gräns"),
-]
+from lib.text.prescan import prescan
 
 
 def _spans(text: str) -> List[Dict]:
-    spans = []
+    # EXPLAIN_CUES (lib.text.prescan) skannas (alla träffar, case-insensitive) i den gemensamma prescan-skanningen
     t = text or ""
-    for rx, label in CUES:
-        for m in re.finditer(rx, t, flags=re.I):
-            spans.append({"text": t[m.start():m.end()], "start": m.start(), "end": m.end(), "label": label})
-    return spans
+    return [
+        {"text": t[start:end], "start": start, "end": end, "label": label}
+        for label, _pattern, start, end in prescan(t)["explain_cues"]
+    ]
 
 
 def link(text: str, insights=None, lang: str = "sv", persona=None, context=None) -> dict:
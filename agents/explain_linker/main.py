@@ -10,7 +10,13 @@ F3 explain_linker – span-kedja för Diamond/Silver/Gold
 - whitelist/blacklist + språk-gate
 """
 import sys, json, time, re
+from pathlib import Path
 from typing import List, Dict, Any, Tuple
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.long_doc import sentence_bounds
+from lib.text.spans import merge_same_label, nms as span_nms
 
 AGENT_VERSION = "2.3.0"
 AGENT_ID = "explain_linker"
@@ -68,45 +74,15 @@ SPLIT_RE = re.compile(rf"(?<={SENT_SEP})\s+|\n+")
 
 def clamp(v, lo, hi): return max(lo, min(hi, v))
 
-def iou(a:Tuple[int,int], b:Tuple[int,int])->float:
-    a1,a2 = a; b1,b2 = b
-    inter = max(0, min(a2,b2) - max(a1,b1))
-    union = (a2-a1) + (b2-b1) - inter
-    return inter/union if union>0 else 0.0
-
 def find_sentence_bounds(text:str, start:int, end:int)->Tuple[int,int]:
-    n = len(text)
-    # vänster: gå bakåt till närmaste separator/ny rad
-    l = start
-    while l>0 and not re.match(SENT_SEP, text[l-1]) and text[l-1] not in "\n":
-        l -= 1
-    # höger: gå framåt till nästa separator/ny rad
-    r = end
-    while r<n and not re.match(SENT_SEP, text[r]) and text[r] not in "\n":
-        r += 1
-    if r < n: r += 1  # ta med separator
-    # inkludera omgivande citattecken
-    while l>0 and text[l-1] in QUOTE_CHARS: l -= 1
-    while r<n and text[r:r+1] in QUOTE_CHARS: r += 1
-    return clamp(l,0,n), clamp(r,0,n)
+    # närmaste separator/ny rad åt båda håll (separatorn medtagen) + omgivande citattecken;
+    # rfind/regex i stället för teckenvis loop - linjärt även i långa dokument
+    return sentence_bounds(text, start, end)
 
 def merge_overlaps(spans:List[Dict[str,Any]])->List[Dict[str,Any]]:
-    """Merge inom *samma flagg* med gap + IoU."""
-    spans = sorted(spans, key=lambda s: (s["flag"], s["start"], s["end"]))
-    out=[]
-    for s in spans:
-        if not out: out.append(s); continue
-        last = out[-1]
-        if s["flag"]==last["flag"]:
-            # gap-join
-            if s["start"] <= last["end"] + CFG["gap_join"]:
-                # slå ihop om också någorlunda överlapp
-                if iou((s["start"], s["end"]), (last["start"], last["end"])) >= CFG["iou_thr_same_flag"] or s["start"]<=last["end"]+CFG["gap_join"]:
-                    last["end"] = max(last["end"], s["end"])
-                    last["confidence"] = max(last.get("confidence",0), s.get("confidence",0))
-                    continue
-        out.append(s)
-    return out
+    """Merge inom *samma flagg* på gap-join (IoU-villkoret var alltid uppfyllt via gap-villkoret)."""
+    return merge_same_label(spans, label="flag", gap_join=CFG["gap_join"], iou_merge=None,
+                            conf="confidence", default_conf=0)
 
 def prefer_phrase(rationals:List[Dict[str,Any]])->List[Dict[str,Any]]:
     """Behåll max en rationale per (flag, grov mening) – välj :PHRASE före LEXICON."""
@@ -235,20 +211,8 @@ def run(payload:Dict[str,Any])->Dict[str,Any]:
     # 3) merge inom samma flagg
     merged = merge_overlaps(filtered)
 
-    # 4) sortera på score (prio + längd + confidence)
-    merged.sort(key=lambda s: span_score(s), reverse=True)
-
-    # 5) greedy NMS över flaggar
-    selected=[]
-    for s in merged:
-        keep=True
-        for t in selected:
-            if iou((s["start"], s["end"]), (t["start"], t["end"])) >= CFG["iou_thr_cross_nms"]:
-                keep=False; break
-        if keep:
-            selected.append(s)
-        if len(selected) >= CFG["max_spans"]:
-            break
+    # 4+5) greedy NMS över flaggar i fallande score (prio + längd + confidence)
+    selected = span_nms(merged, span_score, iou_thr=CFG["iou_thr_cross_nms"], limit=CFG["max_spans"])
 
     # 6) bygg emits
     explain_spans=[]
@@ -268,6 +232,7 @@ def run(payload:Dict[str,Any])->Dict[str,Any]:
         "explain_spans": explain_spans,
     }
     if debug:
+        merged.sort(key=lambda s: span_score(s), reverse=True)
         emits["debug"] = {
             "filtered": filtered,
             "merged": merged[:16],
@@ -7,9 +7,16 @@ Bronze F1 ≥ 0.65
 - Viktade träffar, negationer, boosters (always/never)
 - Brusfilter, merge + IoU, NMS
 - Tier allowlist (Silver/Diamond)
+- Långa texter (opt-in, meta.long_doc): mönstren körs chunkvis via lib.text.long_doc
 """
 import sys, json, time, re
-from typing import List, Dict, Any, Tuple
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.long_doc import Matcher, Probe, matcher_for, sentence_bounds
+from lib.text.spans import merge_same_label, nms as span_nms
 
 AGENT_VERSION = "2.0.0"
 AGENT_ID = "features_conversation"
@@ -137,65 +144,39 @@ DIAMOND_ALLOW = SILVER_ALLOW | {
 def clamp(v, lo, hi): return max(lo, min(hi, v))
 
 def find_sentence_bounds(text:str, start:int, end:int)->Tuple[int,int]:
-    n = len(text)
-    l = start
-    while l>0 and not re.match(SENT_SEP, text[l-1]) and text[l-1] not in "\n":
-        l -= 1
-    r = end
-    while r<n and not re.match(SENT_SEP, text[r]) and text[r] not in "\n":
-        r += 1
-    if r<n: r += 1
-    while l>0 and text[l-1] in QUOTE_CHARS: l -= 1
-    while r<n and text[r:r+1] in QUOTE_CHARS: r += 1
-    return clamp(l,0,n), clamp(r,0,n)
-
-def extract_phrase_span(text:str, pattern:str):
-    m = re.search(pattern, text, flags=re.IGNORECASE)
-    if not m: return None
-    a,b = m.start(), m.end()
+    # närmaste SENT_SEP/ny rad åt båda håll + omgivande citattecken
+    return sentence_bounds(text, start, end)
+
+def extract_phrase_span(text:str, pattern:str, matcher:Optional[Matcher]=None):
+    hit = (matcher or Matcher(text)).search(pattern, re.IGNORECASE)
+    if not hit: return None
+    a,b = hit
     L,R = find_sentence_bounds(text, a, b)
     if R-L < CFG["min_span_len"]:
         R = min(len(text), L + CFG["min_span_len"])
     return [L,R]
 
-def iou(a:Tuple[int,int], b:Tuple[int,int])->float:
-    a1,a2 = a; b1,b2 = b
-    inter = max(0, min(a2,b2)-max(a1,b1))
-    union = (a2-a1)+(b2-b1)-inter
-    return inter/union if union>0 else 0.0
-
 def merge_same_flag(spans:List[Dict[str,Any]])->List[Dict[str,Any]]:
-    spans = sorted(spans, key=lambda s: (s["flag"], s["start"], s["end"]))
-    out=[]
-    for s in spans:
-        if not out: out.append(s); continue
-        last = out[-1]
-        if s["flag"]==last["flag"] and s["start"] <= last["end"] + CFG["gap_join"]:
-            if iou((s["start"],s["end"]), (last["start"],last["end"])) >= CFG["iou_merge"]:
-                last["end"] = max(last["end"], s["end"])
-                last["confidence"] = max(last.get("confidence",0.9), s.get("confidence",0.9))
-                continue
-        out.append(s)
-    return out
+    return merge_same_label(spans, label="flag", gap_join=CFG["gap_join"], iou_merge=CFG["iou_merge"],
+                            conf="confidence", default_conf=0.9)
 
 def nms(spans:List[Dict[str,Any]])->List[Dict[str,Any]]:
-    # sortera på längd*confidence
-    spans = sorted(spans, key=lambda s: (s["end"]-s["start"]) * s.get("confidence",0.9), reverse=True)
-    kept=[]
-    for s in spans:
-        keep=True
-        for t in kept:
-            if iou((s["start"],s["end"]), (t["start"],t["end"])) >= CFG["iou_nms"]:
-                keep=False; break
-        if keep: kept.append(s)
-        if len(kept) >= CFG["max_spans"]: break
-    return kept
-
-def count_hits(terms:List[str], text_lower:str)->int:
-    c=0
-    for t in terms:
-        c += len(re.findall(rf"\b{re.escape(t)}\b", text_lower))
-    return c
+    # fallande längd*confidence, greedy IoU-suppression (lib.text.spans)
+    return span_nms(spans, lambda s: (s["end"]-s["start"]) * s.get("confidence",0.9),
+                    iou_thr=CFG["iou_nms"], limit=CFG["max_spans"])
+
+def term_pattern(term:str)->str:
+    return rf"\b{re.escape(term)}\b"
+
+BOOST_PATTERN = r"\byou\s+(always|never)\b"
+CONSEQUENCE_PATTERN = r"\b(annars|or else|så händer)\b"
+
+def long_doc_probes()->List[Probe]:
+    """Alla uppslag analyze gör mot texten - räknas chunkvis i långt läge."""
+    probes = [("search", pat, re.IGNORECASE, False) for pats in PHRASES.values() for pat in pats]
+    probes += [("search", term_pattern(t), 0, True) for terms in LEX.values() for t in terms]
+    probes += [("search", p, 0, True) for p in (BOOST_PATTERN, CONSEQUENCE_PATTERN, *PHRASES["sarkasm"])]
+    return probes
 
 # ------------------------- Analys ---------------------------------
 def analyze(text:str, expectedFlagsSeed:List[str], expectedTop3Seed:List[str], explain_verbose:bool, meta:Dict)->Dict:
@@ -212,12 +193,13 @@ def analyze(text:str, expectedFlagsSeed:List[str], expectedTop3Seed:List[str], e
     for ef in expectedFlagsSeed or []:
         if ef and ef not in LEX:
             LEX[ef] = [ef]
+    matcher = matcher_for(text_orig, meta, long_doc_probes)
 
     # 1) Phrase-first
     rationales=[]
     for flag, pats in PHRASES.items():
         for pat in pats:
-            span = extract_phrase_span(text_orig, pat)
+            span = extract_phrase_span(text_orig, pat, matcher)
             if span:
                 cue = text_orig[span[0]:span[1]]
                 rationales.append({
@@ -233,35 +215,34 @@ def analyze(text:str, expectedFlagsSeed:List[str], expectedTop3Seed:List[str], e
     for flag, terms in LEX.items():
         if any(flag == r["flag"] for r in rationales):
             continue
-        if count_hits(terms, text_lower) > 0:
-            # hitta första träffens mening
-            for t in terms:
-                m = re.search(rf"\b{re.escape(t)}\b", text_lower)
-                if m:
-                    L,R = find_sentence_bounds(text_orig, m.start(), m.end())
-                    cue = text_orig[L:R]
-                    rationales.append({
-                        "flag": flag,
-                        "cue": cue,
-                        "span_src": [L,R],
-                        "rule_id": f"C1:{flag.upper()}:LEXICON",
-                        "confidence": 0.85
-                    })
-                    break
+        # första termen som träffar -> dess första träffs mening
+        for t in terms:
+            m = matcher.search(term_pattern(t), lower=True)
+            if m:
+                L,R = find_sentence_bounds(text_orig, *m)
+                cue = text_orig[L:R]
+                rationales.append({
+                    "flag": flag,
+                    "cue": cue,
+                    "span_src": [L,R],
+                    "rule_id": f"C1:{flag.upper()}:LEXICON",
+                    "confidence": 0.85
+                })
+                break
 
     # 3) Boosters/arbitering
-    if re.search(r"\byou\s+(always|never)\b", text_lower):
+    m = matcher.search(BOOST_PATTERN, lower=True)
+    if m:
         if not any(r["flag"]=="kritik" for r in rationales):
-            m = re.search(r"\byou\s+(always|never)\b", text_lower)
-            L,R = find_sentence_bounds(text_orig, m.start(), m.end())
+            L,R = find_sentence_bounds(text_orig, *m)
             rationales.append({
                 "flag":"kritik","cue":text_orig[L:R],"span_src":[L,R],
                 "rule_id":"C1:KRITIK:FREQ_BOOST","confidence":0.90
             })
 
     # sarkasm > ultimatum (om inga konsekvensord)
-    if any(re.search(p, text_lower) for p in PHRASES["sarkasm"]):
-        if not re.search(r"\b(annars|or else|så händer)\b", text_lower):
+    if any(matcher.search(p, lower=True) for p in PHRASES["sarkasm"]):
+        if not matcher.search(CONSEQUENCE_PATTERN, lower=True):
             rationales = [r for r in rationales if r["flag"]!="ultimatum"]
 
     # "gör vad du vill" => stonewalling, nolla ultimatum
@@ -345,7 +326,10 @@ def analyze(text:str, expectedFlagsSeed:List[str], expectedTop3Seed:List[str], e
         "start": s["start"], "end": s["end"], "flag": s["flag"]
     } for s in selected]
 
-    return {"flags": flags, "top3": top3, "spans": out_spans, "rationales": rationals}
+    res = {"flags": flags, "top3": top3, "spans": out_spans, "rationales": rationals}
+    if hasattr(matcher, "chunks"):
+        res["long_doc_chunks"] = len(matcher.chunks)
+    return res
 
 # ------------------------- Runner ---------------------------------
 def run(payload:Dict[str,Any])->Dict[str,Any]:
@@ -393,8 +377,11 @@ def run(payload:Dict[str,Any])->Dict[str,Any]:
         "fp": list(actual - expected),
         "fn": list(expected - actual),
         "is_silver": meta.get("case_id","").startswith(("S","B")),
-        "is_diamond": meta.get("case_id","").startswith("D")
+        "is_diamond": meta.get("case_id","").startswith("D"),
     }
+    # Bara när long-läget körts (annars oförändrad debug-shape)
+    if "long_doc_chunks" in res:
+        emits["debug"]["long_doc_chunks"] = res["long_doc_chunks"]
 
     return {
         "ok": True,
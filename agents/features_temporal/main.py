@@ -5,7 +5,12 @@ Detekterar: repetition/cykel, eskalationstrend, kommunikationsrytm, period-gissn
 Bronze: Precision ≥ 0.75
 """
 import sys, json, time, re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, adopt, text_view
 
 AGENT_VERSION = "1.3.0"
 AGENT_ID = "features_temporal"
@@ -64,7 +69,7 @@ SENT_SPLIT = re.compile(r'(?<=[\.\!\?\…])\s+|\n+')
 
 # ------------------------- Utils -------------------------
 def split_sentences(text:str)->List[str]:
-    parts = [s.strip() for s in SENT_SPLIT.split(text or "") if s.strip()]
+    parts = text_view(text or "").split(SENT_SPLIT)
     return parts or [text.strip()]
 
 def has_any(s:str, terms:List[str])->bool:
@@ -216,7 +221,8 @@ def analyze_temporal(text:str, features:List[str])->Tuple[Dict, str]:
     return insights, label
 
 # ------------------------- Runner -------------------------
-def run(payload:Dict)->Dict:
+def run(payload:Dict, view:Optional[TextView]=None)->Dict:
+    adopt(view)  # delad vy från anroparen (samma text) återanvänds av split_sentences
     data = payload.get("data", {}) or {}
     text = data.get("text", "") or ""
     features = data.get("features", []) or []  # valfri lista av redan upptäckta drag
@@ -6,8 +6,14 @@ Mål: ≥0.98 rätt språk när texten är tydlig (stopwords/diakritik/fraser do
 - Tålig mot kort text, emojis, URL:er, kod, versaler
 - Viktning: funktionsord/stopwords > diakritik > fraser > bokstavsprofil > n-gram
 """
-import sys, json, time, re
-from typing import Dict, Tuple
+import sys, json, time, re, os, hashlib, threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.4.0"
 AGENT_ID = "lang_detect"
@@ -151,8 +157,8 @@ def calibrate_confidence(sv: float, en: float, stats: Dict[str,int]) -> Tuple[st
 
     return lang, round(min(1.0, base_conf), 3), is_mixed
 
-def detect_language(text: str) -> Dict:
-    t_norm = normalize(text or "")
+def detect_language(text: str, view: Optional[TextView] = None) -> Dict:
+    t_norm = ensure_view(text or "", view).clean
     stats = token_stats(t_norm)
     sv, sv_d, en, en_d = score_lang(t_norm)
     lang, conf, is_mixed = calibrate_confidence(sv, en, stats)
@@ -166,11 +172,76 @@ def detect_language(text: str) -> Dict:
         "length": stats
     }
 
-def run(payload):
+# ------------------------- In-process cache -------------------------
+# lib/lang/language_bridge m.fl. anropar detekteringen per meddelande (tidigare
+# en subprocess per anrop). Resultatet beror bara på texten, så det cachas i en
+# begränsad LRU nyckelad på textens hash (texterna själva hålls inte kvar).
+CACHE_MAX = int(os.getenv("LANG_DETECT_CACHE_MAX", "4096"))
+
+_cache: "OrderedDict[bytes, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hit": 0, "miss": 0, "evicted": 0}
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b((text or "").encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def _copy(res: Dict) -> Dict:
+    # Anroparen får en egen kopia; cachat värde får inte muteras
+    return {
+        **res,
+        "scores": dict(res["scores"]),
+        "details": {k: dict(v) for k, v in res["details"].items()},
+        "length": dict(res["length"]),
+    }
+
+def detect_language_cached(text: str, view: Optional[TextView] = None) -> Dict:
+    """detect_language med LRU (LANG_DETECT_CACHE_MAX poster). Trådsäker."""
+    text = text or ""
+    key = text_key(text)
+    with _cache_lock:
+        res = _cache.get(key)
+        if res is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hit"] += 1
+            return _copy(res)
+        _cache_stats["miss"] += 1
+    res = detect_language(text, view=view)
+    with _cache_lock:
+        _cache[key] = res
+        _cache.move_to_end(key)
+        while len(_cache) > max(1, CACHE_MAX):
+            _cache.popitem(last=False)
+            _cache_stats["evicted"] += 1
+    return _copy(res)
+
+def detect_languages(texts: Iterable[str]) -> List[Dict]:
+    """Batch: ett resultat per text i samma ordning; dubbletter räknas en gång."""
+    texts = [t or "" for t in texts]
+    seen: Dict[str, Dict] = {}
+    out = []
+    for t in texts:
+        if t not in seen:
+            seen[t] = detect_language_cached(t)
+            out.append(seen[t])
+        else:
+            out.append(_copy(seen[t]))
+    return out
+
+def cache_info() -> Dict:
+    with _cache_lock:
+        return {"entries": len(_cache), "max": CACHE_MAX, **_cache_stats}
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+        for k in _cache_stats:
+            _cache_stats[k] = 0
+
+def run(payload, view: Optional[TextView] = None):
     data = payload.get("data", {}) or {}
     text = data.get("text", "") or ""
 
-    res = detect_language(text)
+    res = detect_language(text, view=view)
 
     emits = {
         "lang": res["lang"],
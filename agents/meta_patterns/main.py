@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import sys, json, time, re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
+from lib.text.long_doc import Matcher, Probe, matcher_for
+from lib.text.spans import merge_same_label, nms as span_nms
 
 # Fix Unicode encoding for Windows
 import codecs
@@ -12,30 +19,9 @@ AGENT_VERSION = "2.0.0"
 AGENT_ID = "meta_patterns"
 
 # -------------------------- Utils --------------------------
-URL_RE = re.compile(r"https?://\S+|www\.\S+", re.I)
-EMAIL_RE = re.compile(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", re.I)
-CODE_FENCE_RE = re.compile(r"```.*?```", re.S)
-NUM_RE = re.compile(r"\d+")
-WS_RE = re.compile(r"\s+")
-
-def normalize(text: str) -> str:
-    t = text or ""
-    t = CODE_FENCE_RE.sub(" ", t)
-    t = URL_RE.sub(" ", t)
-    t = EMAIL_RE.sub(" ", t)
-    t = NUM_RE.sub(" ", t)
-    t = WS_RE.sub(" ", t)
-    return t.strip()
-
 def clamp01(x: float) -> float:
     return max(0.0, min(1.0, x))
 
-def iou(a: Tuple[int,int], b: Tuple[int,int]) -> float:
-    a1,a2 = a; b1,b2 = b
-    inter = max(0, min(a2,b2) - max(a1,b1))
-    union = (a2-a1) + (b2-b1) - inter
-    return inter/union if union>0 else 0.0
-
 # -------------------------- Default archetypes (sv+en) --------------------------
 # Varje arketyp: severity (0..1), risk, recommendation, patterns (regex), keywords (fallback)
 DEFAULT_ARCHETYPES: Dict[str, Dict[str, Any]] = {
@@ -127,22 +113,22 @@ GAP_JOIN = 2
 IOU_MERGE = 0.50
 IOU_NMS = 0.80
 
-def score_text_for_archetype(name: str, conf: Dict[str,Any], text: str) -> Tuple[float, List[Dict[str,Any]]]:
+def score_text_for_archetype(name: str, conf: Dict[str,Any], text: str,
+                             matcher: Optional[Matcher] = None) -> Tuple[float, List[Dict[str,Any]]]:
     severity = float(conf.get("severity", 0.5))
     spans: List[Dict[str,Any]] = []
     score = 0.0
+    matcher = matcher or Matcher(text)
 
     # 1) Regex-fraser (tyngst)
     for pat in conf.get("patterns", []):
-        for m in re.finditer(pat, text, flags=re.I):
-            s,e = m.start(), m.end()
+        for s, e in matcher.finditer(pat, re.I):
             spans.append({"start": s, "end": e, "label": name, "source": "PHRASE", "text": text[s:e], "conf": 0.9})
             score += 2.0 * severity
 
     # 2) Fallback-nyckelord (lätt vikt)
-    tl = text.lower()
     for kw in conf.get("keywords", []):
-        pos = tl.find(kw.lower())
+        pos = matcher.find(kw.lower(), lower=True)
         if pos != -1:
             s,e = pos, pos+len(kw)
             spans.append({"start": s, "end": e, "label": name, "source": "KEYWORD", "text": text[s:e], "conf": 0.7})
@@ -150,41 +136,28 @@ def score_text_for_archetype(name: str, conf: Dict[str,Any], text: str) -> Tuple
 
     return score, spans
 
+def long_doc_probes(arche_cfg: Dict[str, Dict[str,Any]]) -> List[Probe]:
+    """Uppslagen score_text_for_archetype gör - räknas chunkvis i långt läge."""
+    probes: List[Probe] = []
+    for conf in arche_cfg.values():
+        probes += [("finditer", pat, re.I, False) for pat in conf.get("patterns", [])]
+        probes += [("find", kw.lower(), 0, True) for kw in conf.get("keywords", [])]
+    return probes
+
+def _drop_text(kept: Dict[str,Any], merged: Dict[str,Any]) -> None:
+    kept["text"] = None  # undvik megatexter; klient kan hämta från original
+
 def merge_overlaps(spans: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
-    if not spans: return []
-    spans = sorted(spans, key=lambda x: (x["label"], x["start"], x["end"]))
-    out = []
-    for s in spans:
-        if not out:
-            out.append(s); continue
-        last = out[-1]
-        if s["label"] == last["label"] and s["start"] <= last["end"] + GAP_JOIN:
-            if iou((s["start"], s["end"]), (last["start"], last["end"])) >= IOU_MERGE:
-                last["end"] = max(last["end"], s["end"])
-                last["conf"] = max(last.get("conf",0.7), s.get("conf",0.7))
-                last["text"] = None  # undvik megatexter; klient kan hämta från original
-                continue
-        out.append(s)
-    return out
+    return merge_same_label(spans, label="label", gap_join=GAP_JOIN, iou_merge=IOU_MERGE,
+                            conf="conf", default_conf=0.7, on_merge=_drop_text)
 
 def nms(spans: List[Dict[str,Any]], limit:int) -> List[Dict[str,Any]]:
-    spans = sorted(spans, key=lambda s: (s["end"]-s["start"]) * s.get("conf",0.8), reverse=True)
-    kept: List[Dict[str,Any]] = []
-    for s in spans:
-        keep = True
-        for t in kept:
-            if iou((s["start"], s["end"]), (t["start"], t["end"])) >= IOU_NMS:
-                keep = False; break
-        if keep:
-            kept.append(s)
-        if len(kept) >= limit:
-            break
-    return kept
+    return span_nms(spans, lambda s: (s["end"]-s["start"]) * s.get("conf",0.8), iou_thr=IOU_NMS, limit=limit)
 
 # -------------------------- Main analysis --------------------------
-def analyze(text: str, meta: Dict[str,Any]) -> Dict[str,Any]:
+def analyze(text: str, meta: Dict[str,Any], view: Optional[TextView] = None) -> Dict[str,Any]:
     raw = text or ""
-    norm = normalize(raw)
+    norm = ensure_view(raw, view).clean_ws
     if not norm:
         return {"archetypes": [], "spans": [], "confidence": 0.0}
 
@@ -199,11 +172,12 @@ def analyze(text: str, meta: Dict[str,Any]) -> Dict[str,Any]:
     for k,v in extra.items():
         arche_cfg[k] = v
 
-    # Scoring
+    # Scoring (långa texter: alla mönster chunkvis i ett svep, se lib.text.long_doc)
+    matcher = matcher_for(norm, meta, lambda: long_doc_probes(arche_cfg))
     all_detected = []
     all_spans = []
     for name, conf in arche_cfg.items():
-        sc, spans = score_text_for_archetype(name, conf, norm)
+        sc, spans = score_text_for_archetype(name, conf, norm, matcher)
         if sc > 0:
             all_detected.append({
                 "archetype": name,
@@ -257,12 +231,12 @@ def analyze(text: str, meta: Dict[str,Any]) -> Dict[str,Any]:
     }
 
 # -------------------------- Runner --------------------------
-def run(payload: Dict[str,Any]) -> Dict[str,Any]:
+def run(payload: Dict[str,Any], view: Optional[TextView] = None) -> Dict[str,Any]:
     data = (payload.get("data") or {})
     meta = (payload.get("meta") or {})
     text = data.get("description") or data.get("text") or ""
 
-    insights = analyze(text, meta)
+    insights = analyze(text, meta, view=view)
 
     emits = {
         "archetype_insights": insights["archetype_insights"],
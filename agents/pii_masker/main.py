@@ -2,15 +2,23 @@
 """
 A2 PIIMaskerAgent – Maska PII i råtext (sv+en)
 Mål: 0 PII i loggar
-- Detekterar & maskerar: e-post, telefon (SE/internationellt), personnummer (SE YYMMDD/YYMMDD-XXXX, YYYYMMDD-XXXX, +/−),
+- Detekterar & maskerar: e-post, telefon (SE/internationellt), personnummer (SE YYMMDD/YYMMDD-XXXX, YYYYMMDD-XXXX, +/−;
+  fel kontrollsiffra maskas ändå, som ssn_unverified),
   kreditkort (Luhn), IBAN, SWIFT/BIC, Bankgiro/Plusgiro, URL, IP (v4/v6), UUID, postnummer (SE), adressfragment (lätt),
   kontonummer-liknande sekvenser (konservativt).
 - Strategier: full|partial|hash (meta.strategy). Default: full. (partial behåller t.ex. e-postdomän, sista siffror i telefon/kort)
 - Ingen rå PII i emits (pii_map redovisas endast i hashad/partiellt redigerad form; ingen originaltext).
 - Residual-scan efter maskning; check PASS endast om 0 kvarvarande match.
+- Ett pass: alla mönster körs mot den oförändrade originaltexten, kandidaterna löses
+  efter prioritet (PATTERNS-ordning) utan överlapp, valideras lazy (Luhn/personnummer
+  bara för kandidater som annars skulle maskas) och utdata byggs med en join.
+  En underkänd kandidat med reservtyp (UNVERIFIED) maskas under den typen i stället,
+  så en kontrollsumma kan bara byta etikett, aldrig sänka täckningen.
+  Residual-scan behöver då bara titta runt maskerade gränser.
 """
 import sys, json, time, re, hashlib
-from typing import Dict, Any, List, Tuple, Callable
+from bisect import bisect_right
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Callable
 
 AGENT_VERSION = "2.2.0"
 AGENT_ID = "pii_masker"
@@ -73,20 +81,42 @@ PATTERNS: List[Tuple[str, re.Pattern]] = [
     ("digits", LONG_DIGIT_RE),
 ]
 
+# Underkänd validering som ändå ska maskas (samma span, egen etikett)
+UNVERIFIED = {"ssn": "ssn_unverified"}
+
+# Förfiltrering: mönster som inte kan matcha utan ett visst tecken hoppas över helt
+_DIGIT_RE = re.compile(r"\d")
+NEEDS_DIGIT = {"uuid", "iban", "card", "ssn", "phone", "ipv4", "bankgiro", "plusgiro", "postcode", "address", "digits"}
+NEEDS_CHAR = {"email": "@", "ipv4": ".", "ipv6": ":"}
+
+# Residual: hur långt ut från varje maskerad gräns som mönstren körs igen
+RESIDUAL_WINDOW = 64
+RESIDUAL_CAP = 10
+
 # --------------------------- Helpers ---------------------------
 def sha(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
 
-def luhn_ok(num: str) -> bool:
-    digits = [int(c) for c in num if c.isdigit()]
-    if len(digits) < 13 or len(digits) > 19:
-        return False
+def luhn_sum(digits: List[int]) -> int:
     s = 0
     alt = False
     for d in reversed(digits):
         s += d*2 - 9 if alt and d*2 > 9 else (d*2 if alt else d)
         alt = not alt
-    return s % 10 == 0
+    return s
+
+def luhn_ok(num: str) -> bool:
+    digits = [int(c) for c in num if c.isdigit()]
+    if len(digits) < 13 or len(digits) > 19:
+        return False
+    return luhn_sum(digits) % 10 == 0
+
+def personnummer_ok(s: str) -> bool:
+    # Kontrollsiffran: Luhn över YYMMDDNNNC (sekelsiffror i YYYYMMDD ingår inte)
+    digits = [int(c) for c in s if c.isdigit()]
+    if len(digits) not in (10, 12):
+        return False
+    return luhn_sum(digits[-10:]) % 10 == 0
 
 def is_probable_phone(s: str) -> bool:
     d = sum(1 for c in s if c.isdigit())
@@ -99,6 +129,8 @@ def is_probable_digits_account(s: str) -> bool:
 def classify_and_validate(kind: str, match_text: str) -> bool:
     if kind == "card":
         return luhn_ok(match_text)
+    if kind == "ssn":
+        return personnummer_ok(match_text)
     if kind == "phone":
         return is_probable_phone(match_text)
     if kind == "digits":
@@ -114,7 +146,7 @@ def partial_mask(kind: str, s: str) -> str:
             return f"[EMAIL] ***@{domain}"
         except Exception:
             return "[EMAIL] ***"
-    if kind in {"phone", "card", "ssn"}:
+    if kind in {"phone", "card", "ssn", "ssn_unverified"}:
         last = "".join([c for c in s if c.isdigit()])[-4:] or "**"
         return f"[{kind.upper()}] ***{last}"
     if kind == "url":
@@ -131,64 +163,211 @@ def hash_mask(kind: str, s: str) -> str:
     return f"[{kind.upper()}_{sha(s)}]"
 
 # --------------------------- Masker ---------------------------
-def mask_pii(text: str, strategy: str = "full") -> Tuple[str, Dict[str, Any], Dict[str, int]]:
+class PiiScan(NamedTuple):
+    masked_text: str
+    pii_map: Dict[str, Any]
+    counts: Dict[str, int]
+    seams: List[Tuple[int, int]]            # maskerade tokens (start, end) i masked_text
+    leftovers: List[Tuple[int, int, str]]   # omaskade (underkända) kandidater i masked_text
+
+def _applicable(text: str) -> List[Tuple[int, str, re.Pattern]]:
+    has_digit = _DIGIT_RE.search(text) is not None
+    out = []
+    for prio, (kind, pattern) in enumerate(PATTERNS):
+        if kind in NEEDS_DIGIT and not has_digit:
+            continue
+        ch = NEEDS_CHAR.get(kind)
+        if ch and ch not in text:
+            continue
+        out.append((prio, kind, pattern))
+    return out
+
+def _overlaps(starts: List[int], ends: List[int], s: int, e: int) -> bool:
+    i = bisect_right(starts, s)
+    return (i > 0 and ends[i-1] > s) or (i < len(starts) and starts[i] < e)
+
+def _scan_view(text: str, chosen: List[Tuple[int, int, int, str]]) -> Tuple[str, List[int], List[int], List[int]]:
+    # Luckorna mellan valda spans, ihopfogade med ett skiljetecken per span (icke-ord,
+    # icke-blank som tokenkanten) + var varje lucka börjar/slutar i vyn och i texten
+    w_starts: List[int] = []
+    w_ends: List[int] = []
+    o_starts: List[int] = []
+    pieces: List[str] = []
+    lo = 0
+    w = 0
+    for hi, nxt in [(s, e) for s, e, _, _ in chosen] + [(len(text), len(text))]:
+        pieces.append(text[lo:hi])
+        w_starts.append(w)
+        o_starts.append(lo)
+        w += hi - lo
+        w_ends.append(w)
+        w += 1
+        lo = nxt
+    return "\x00".join(pieces), w_starts, w_ends, o_starts
+
+def find_spans(text: str) -> Tuple[List[Tuple[int, int, int, str]], List[Tuple[int, int, str]]]:
     """
-    strategy: full | partial | hash
-    Returns: (masked_text, pii_map_public, counts)
-      - pii_map_public innehåller INTE råvärden (endast hash/sista4 beroende på strategi)
+    Välj PII-spans i originaltexten, mönster för mönster i prioritetsordning.
+
+    Varje mönster gäller bara luckorna mellan redan valda spans, som när texten
+    skrevs om till tokens efter varje mönster. I stället för tokens skannas en vy
+    där varje vald span är ett enda skiljetecken (\\\\b vid kanten som intill en
+    token); vyn byggs om bara när ett mönster valt något. En träff som korsar ett
+    skiljetecken (bara URL:ens \\\\S+ kan det) skannas om inom sin lucka.
+    Validering (Luhn/personnummer) sker först för en träff som annars maskas;
+    en underkänd träff med reservtyp i UNVERIFIED väljs ändå, under den typen.
+    Returnerar (valda (start, end, prio, kind) i textordning, underkända träffar
+    som ingen vald span täcker).
     """
+    chosen: List[Tuple[int, int, int, str]] = []
+    rejected: List[Tuple[int, int, str]] = []
+    view, w_starts, w_ends, o_starts = text, [0], [len(text)], [0]
+    for prio, kind, pattern in _applicable(text):
+        found: List[Tuple[int, int, int, str]] = []
+        pos = 0
+        while True:
+            m = pattern.search(view, pos)
+            if m is None:
+                break
+            g = bisect_right(w_starts, m.start()) - 1
+            if m.end() <= w_ends[g]:
+                matches = [m]
+                pos = m.end()
+            else:
+                matches = list(pattern.finditer(view, pos, w_ends[g]))
+                pos = w_ends[g] + 1
+            for mm in matches:
+                g = bisect_right(w_starts, mm.start()) - 1
+                s = o_starts[g] + mm.start() - w_starts[g]
+                e = s + mm.end() - mm.start()
+                if classify_and_validate(kind, mm.group(0)):
+                    found.append((s, e, prio, kind))
+                elif kind in UNVERIFIED:
+                    found.append((s, e, prio, UNVERIFIED[kind]))
+                else:
+                    rejected.append((s, e, kind))
+        if found:
+            chosen = sorted(chosen + found)
+            view, w_starts, w_ends, o_starts = _scan_view(text, chosen)
+    starts = [s for s, _, _, _ in chosen]
+    ends = [e for _, e, _, _ in chosen]
+    left = [(s, e, kind) for s, e, kind in rejected if not _overlaps(starts, ends, s, e)]
+    return chosen, left
+
+def scan_pii(text: str, strategy: str = "full") -> PiiScan:
+    """Maskning i ett pass; se mask_pii. Ger även tokengränser och kvarvarande kandidater."""
     if not text:
-        return "", {}, {}
-
-    masked = text
+        return PiiScan("", {}, {}, [], [])
+
+    chosen, left = find_spans(text)
+
+    # Tokens i textordning (full: löpnummer per typ i textordning)
+    idx: Dict[str, int] = {}
+    tokens: List[str] = []
+    for s, e, _, kind in chosen:
+        span_text = text[s:e]
+        if strategy == "partial":
+            token = partial_mask(kind, span_text)
+        elif strategy == "hash":
+            token = hash_mask(kind, span_text)
+        else:
+            idx[kind] = idx.get(kind, 0) + 1
+            token = full_mask(kind, idx[kind])
+        tokens.append(token)
+
+    # public map + counts per mönster (PATTERNS-ordning), sedan position - INGA råvärden
     pii_map_public: Dict[str, Dict[str, str]] = {}
     counts: Dict[str, int] = {}
+    for j in sorted(range(len(chosen)), key=lambda j: chosen[j][2]):
+        s, e, _, kind = chosen[j]
+        counts[kind] = counts.get(kind, 0) + 1
+        pii_map_public[tokens[j]] = {
+            "kind": kind,
+            "hint": partial_mask(kind, text[s:e]) if strategy == "full" else tokens[j],
+        }
+
+    # En join; tokengränser och förskjutning (för kvarvarande kandidater) på vägen
+    pieces: List[str] = []
+    seams: List[Tuple[int, int]] = []
+    starts: List[int] = []
+    shifts: List[int] = [0]
+    pos = 0
+    out = 0
+    for (s, e, _, _), token in zip(chosen, tokens):
+        pieces.append(text[pos:s])
+        out += s - pos
+        seams.append((out, out + len(token)))
+        pieces.append(token)
+        out += len(token)
+        pos = e
+        starts.append(s)
+        shifts.append(shifts[-1] + len(token) - (e - s))
+    pieces.append(text[pos:])
+    leftovers = []
+    for s, e, kind in left:
+        d = shifts[bisect_right(starts, s)]
+        leftovers.append((s + d, e + d, kind))
+    return PiiScan("".join(pieces), pii_map_public, counts, seams, leftovers)
 
-    # To avoid shifting indices, build global replacement plan per pattern using re.sub with a function.
-    # Also skip overlaps already masked (we check if match region contains '[').
-    for kind, pattern in PATTERNS:
-        idx = 0
-
-        def repl(m: re.Match) -> str:
-            nonlocal idx
-            span_text = m.group(0)
-            # skip if already masked
-            if "[" in span_text and "]" in span_text:
-                return span_text
-            # stricter validation:
-            if not classify_and_validate(kind, span_text):
-                return span_text
-
-            idx += 1
-            counts[kind] = counts.get(kind, 0) + 1
-
-            if strategy == "partial":
-                token = partial_mask(kind, span_text)
-            elif strategy == "hash":
-                token = hash_mask(kind, span_text)
-            else:
-                token = full_mask(kind, idx)
-
-            # public map (no raw PII):
-            pii_map_public[token] = {
-                "kind": kind,
-                "hint": partial_mask(kind, span_text) if strategy == "full" else token,
-            }
-            return token
-
-        masked = pattern.sub(repl, masked)
+def mask_pii(text: str, strategy: str = "full") -> Tuple[str, Dict[str, Any], Dict[str, int]]:
+    """
+    strategy: full | partial | hash
+    Returns: (masked_text, pii_map_public, counts)
+      - pii_map_public innehåller INTE råvärden (endast hash/sista4 beroende på strategi)
+    """
+    res = scan_pii(text, strategy=strategy)
+    return res.masked_text, res.pii_map, res.counts
 
-    return masked, pii_map_public, counts
+def residual_scan(text: str, seams: Optional[List[Tuple[int, int]]] = None,
+                  leftovers: Optional[List[Tuple[int, int, str]]] = None) -> List[Tuple[str, str]]:
+    """
+    Returnera [(kind, match_text)] för kvarvarande mönster (ska vara tomt).
 
-def residual_scan(text: str) -> List[Tuple[str, str]]:
-    """Returnera [(kind, match_text)] för kvarvarande mönster (ska vara tomt)."""
-    leftovers: List[Tuple[str, str]] = []
-    for kind, pattern in PATTERNS:
-        for m in pattern.finditer(text):
-            leftovers.append((kind, m.group(0)))
-            if len(leftovers) >= 10:  # cap
-                return leftovers
-    return leftovers
+    Utan seams: alla mönster över hela texten. Med seams (tokengränser från
+    scan_pii): bara fönster runt gränserna - resten av texten är orörd och redan
+    skannad, dess kvarvarande träffar kommer som `leftovers`. Träffar helt inuti
+    en token är maskeringen själv och räknas inte, och inte heller träffar som
+    fönsterkanten skär av (de ligger i orörd text).
+    """
+    found: Dict[Tuple[int, int], Tuple[int, str, str]] = {}
+    prio_of = {kind: prio for prio, (kind, _) in enumerate(PATTERNS)}
+    if seams is None:
+        for prio, (kind, pattern) in enumerate(PATTERNS):
+            for m in pattern.finditer(text):
+                found[(prio, m.start())] = (m.start(), kind, m.group(0))
+    else:
+        known: Dict[str, Tuple[List[int], List[int]]] = {}
+        for s, e, kind in sorted(leftovers or []):
+            found[(prio_of[kind], s)] = (s, kind, text[s:e])
+            ks, ke = known.setdefault(kind, ([], []))
+            ks.append(s)
+            ke.append(e)
+        tok_starts = [s for s, _ in seams]
+        tok_ends = [e for _, e in seams]
+        windows: List[Tuple[int, int]] = []
+        k = 0
+        while k < len(seams):
+            # slå ihop fönster som överlappar (täta tokens skannas en gång)
+            j = k
+            while j + 1 < len(seams) and seams[j+1][0] - seams[j][1] <= 2 * RESIDUAL_WINDOW:
+                j += 1
+            windows.append((max(0, seams[k][0] - RESIDUAL_WINDOW), min(len(text), seams[j][1] + RESIDUAL_WINDOW)))
+            k = j + 1
+        if sum(hi - lo for lo, hi in windows) * 2 > len(text):
+            windows = [(0, len(text))]  # tät PII: ett pass över hela texten är billigare än många fönster
+        for lo, hi in windows:
+            for prio, (kind, pattern) in enumerate(PATTERNS):
+                for m in pattern.finditer(text, lo, hi):
+                    ms, me = m.span()
+                    if (ms == lo and lo > 0) or (me == hi and hi < len(text)):
+                        continue
+                    i = bisect_right(tok_starts, ms) - 1
+                    if i >= 0 and me <= tok_ends[i]:
+                        continue  # inuti en token
+                    if kind in known and _overlaps(*known[kind], ms, me):
+                        continue  # del av en redan rapporterad kvarvarande träff
+                    found[(prio, ms)] = (ms, kind, m.group(0))
+    return [(kind, t) for (_, _), (_, kind, t) in sorted(found.items())][:RESIDUAL_CAP]
 
 # --------------------------- Runner ---------------------------
 def run(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -200,13 +379,15 @@ def run(payload: Dict[str, Any]) -> Dict[str, Any]:
     if strategy not in {"full", "partial", "hash"}:
         strategy = "full"
 
-    masked_text, pii_map_public, counts = mask_pii(text, strategy=strategy)
+    scan = scan_pii(text, strategy=strategy)
+    masked_text, pii_map_public, counts = scan.masked_text, scan.pii_map, scan.counts
     
     # Non-destructive fallback: om maskad text är tom men original inte är tom, använd original
     if not masked_text.strip() and text.strip():
         masked_text = text.strip()
-    
-    leftovers = residual_scan(masked_text)
+        leftovers = residual_scan(masked_text)
+    else:
+        leftovers = residual_scan(masked_text, seams=scan.seams, leftovers=scan.leftovers)
 
     emits = {
         "masked_text": masked_text,
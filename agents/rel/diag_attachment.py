@@ -1,33 +1,14 @@
-import re
+from lib.text.prescan import prescan
+from lib.text.rule_scan import label_counts
 
 LABELS = ("trygg","orolig","undvikande","ambivalent")
 
-KEYS = {
-    "trygg": [
-        r"\buppskattar\b", r"\bteam\b", r"\bvi\b", r"\bplanera\b", r"\bnyfiken\b",
-        r"\bcheck[- ]?in\b", r"\btack\b", r"\bvalfrihet\b", r"\bfråga\b"
-    ],
-    "orolig": [
-        r"\borolig\b", r"\bjag[aer] dig\b", r"\bghost\b", r"\bosedd\b",
-        r"\bjag blir defensiv\b", r"\btryggt\b"
-    ],
-    "undvikande": [
-        r"\bspace\b", r"\begen tid\b", r"\båterhämtn?ing\b", r"\bkort i tonen\b",
-        r"\bbyte av kanal\b", r"\bIRL\b", r"\bta paus\b"
-    ],
-    "ambivalent": [
-        r"\bpassivt aggressiv\b", r"\bspårade ur\b", r"\bsa saker jag inte menade\b"
-    ],
-}
-
-
-def _score_label(text: str, label: str) -> int:
-    return sum(1 for rx in KEYS[label] if re.search(rx, text or "", flags=re.I))
-
 
+# ATTACH_KEYS (lib.text.prescan) skannas (case-insensitive) i den gemensamma prescan-skanningen;
+# poängen är antalet matchande mönster per label.
 def classify(text: str, lang: str = "sv", persona=None, context=None) -> dict:
     text = text or ""
-    scores = {lbl: _score_label(text, lbl) for lbl in LABELS}
+    scores = label_counts(prescan(text)["attach_keys"], LABELS)
     label = max(scores.items(), key=lambda x: (x[1], x[0]))[0]
     if all(v == 0 for v in scores.values()):
         label = "trygg"
@@ -1,7 +1,9 @@
-from typing import List, Dict
+import hashlib
+from collections import deque
+from typing import List, Dict, Optional
 
 try:
-    from agents.rel.session_memory import key_of, save as sm_save, last_n as sm_last_n
+    from agents.rel.session_memory import save as sm_save, last_n as sm_last_n
     SESSION_MEMORY_AVAILABLE = True
 except ImportError:
     SESSION_MEMORY_AVAILABLE = False
@@ -15,47 +17,81 @@ def _summ(texts: List[str]) -> str:
     return f"{first} … {last}"
 
 
-def analyze(dialog: List[Dict], lang: str = "sv", persona=None, context=None, conversation_id=None) -> dict:
-    """Bygger enkel samtalsminnes-state över 3–6 turer."""
-    turns = dialog or []
-    speakers = [m.get("speaker", "") for m in turns]
-    texts = [m.get("text", "") for m in turns]
-    joined = " ".join(texts)
-
-    has_checkin = any("check" in (t or "").lower() for t in texts)
-    wants_pause = any("paus" in (t or "").lower() or "time" in (t or "").lower() for t in texts)
-    switch_channel = any(("IRL" in (t or "")) or ("call" in (t or "").lower()) or ("byt kanal" in (t or "").lower()) for t in texts)
-    boundary_lang = any(x in joined.lower() for x in ["regel", "gräns", "signal", "check-signal"])
-    empathy_flow = any(x in joined.lower() for x in ["spegla", "missförstådd"]) or "missförstod" in joined.lower()
-
-    memory = {
-        "speakers": speakers,
-        "last_speaker": speakers[-1] if speakers else None,
-        "proposal": {
-            "checkin": has_checkin,
-            "pause": wants_pause,
-            "switch_channel": switch_channel,
-            "boundary": boundary_lang,
-            "empathy": empathy_flow,
-        },
-        "summary": _summ(texts),
-    }
-
-    total = 5
-    hit = sum([has_checkin, wants_pause, switch_channel, boundary_lang, empathy_flow])
-    mem_score = round(hit / total, 2)
-    
-    result = {"state": memory, "signals": memory["proposal"], "memory_score": mem_score}
-    
-    # Session memory if available
-    if SESSION_MEMORY_AVAILABLE and dialog:
-        sid = conversation_id or key_of(joined)
-        history = sm_last_n(sid, 5)
-        summary = {"signals": memory["proposal"], "score": mem_score}
-        sm_save(sid, summary)
-        result["session_id"] = sid
-        result["session_history"] = history
-    
-    return result
+BOUNDARY_WORDS = ["regel", "gräns", "signal", "check-signal"]
+EMPATHY_WORDS = ["spegla", "missförstådd", "missförstod"]
+
+
+class DialogMemoryFold:
+    """
+    analyze() som löpande fold: add() per tur, result() när dialogen är slut.
+
+    Flaggorna, första/sista texten och sessionsnyckeln (sha256 över de
+    mellanslagsfogade texterna, samma som session_memory.key_of(joined)) uppdateras per tur, så
+    en strömmad dialog aldrig behöver fogas ihop. max_speakers begränsar
+    state.speakers till de senaste talarna (None = alla, som analyze).
+    """
+
+    def __init__(self, max_speakers: Optional[int] = None):
+        self.speakers = deque(maxlen=max_speakers)
+        self.last_speaker = None
+        self.first_text = None
+        self.last_text = None
+        self.turns = 0
+        self.proposal = {"checkin": False, "pause": False, "switch_channel": False,
+                         "boundary": False, "empathy": False}
+        self._key = hashlib.sha256()
+
+    def add(self, m: Dict) -> None:
+        spk = m.get("speaker", "")
+        t = m.get("text", "")
+        self.speakers.append(spk)
+        self.last_speaker = spk
+        if self.first_text is None:
+            self.first_text = t
+        self.last_text = t
+        if self.turns:
+            self._key.update(b" ")
+        self._key.update(t.encode("utf-8"))
+        self.turns += 1
+
+        low = (t or "").lower()
+        p = self.proposal
+        # Nyckelorden saknar mellanslag, så träff per tur == träff i den fogade texten
+        p["checkin"] = p["checkin"] or "check" in low
+        p["pause"] = p["pause"] or "paus" in low or "time" in low
+        p["switch_channel"] = p["switch_channel"] or ("IRL" in (t or "")) or ("call" in low) or ("byt kanal" in low)
+        p["boundary"] = p["boundary"] or any(x in low for x in BOUNDARY_WORDS)
+        p["empathy"] = p["empathy"] or any(x in low for x in EMPATHY_WORDS)
 
+    def result(self, conversation_id=None) -> dict:
+        memory = {
+            "speakers": list(self.speakers),
+            "last_speaker": self.last_speaker,
+            "proposal": dict(self.proposal),
+            "summary": _summ([self.first_text, self.last_text] if self.turns else []),
+        }
 
+        total = 5
+        hit = sum(memory["proposal"].values())
+        mem_score = round(hit / total, 2)
+
+        result = {"state": memory, "signals": memory["proposal"], "memory_score": mem_score}
+
+        # Session memory if available
+        if SESSION_MEMORY_AVAILABLE and self.turns:
+            sid = conversation_id or self._key.hexdigest()[:16]
+            history = sm_last_n(sid, 5)
+            summary = {"signals": memory["proposal"], "score": mem_score}
+            sm_save(sid, summary)
+            result["session_id"] = sid
+            result["session_history"] = history
+
+        return result
+
+
+def analyze(dialog: List[Dict], lang: str = "sv", persona=None, context=None, conversation_id=None) -> dict:
+    """Bygger enkel samtalsminnes-state över 3–6 turer."""
+    fold = DialogMemoryFold()
+    for m in dialog or []:
+        fold.add(m)
+    return fold.result(conversation_id)
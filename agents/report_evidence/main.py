@@ -13,7 +13,8 @@ Input (stdin eller --payload path):
     "max_items": 50,                      # hårt tak
     "pii_strict": false,                  # räkna adresshint som PII-varning
     "recent_weight_days": 365,            # tidsviktning för recency
-    "citation_style": "apa"               # "apa"|"iso"|"simple"
+    "citation_style": "apa",              # "apa"|"iso"|"simple"
+    "dedupe_mode": "exact"                # "exact" (prefixfilter) | "minhash" (LSH, ungefärlig)
   },
   "data": {
     "report": { "sections": [{"id":"sum","title":"Sammanfattning"}] },   # valfritt
@@ -32,6 +33,10 @@ Input (stdin eller --payload path):
         "content":"...abstract and key quotes...","snippet":"Daily check-ins reduced escalations by 23%.",
         "domain":"example.org","license":"CC-BY","confidence":0.8
       },
+      {
+        "id":"S3","type":"span","doc":"case_text","span":[120,164],   # agent-span: dubblett om
+        "snippet":"...","confidence":0.7                             # helt inuti en behållen span
+      },
       {
         "id":"S2","type":"pdf","title":"Internal weekly log","date":"2025-10-01",
         "file":"logs/week_40.pdf","snippet":"3 escalations vs 1 previous month","confidence":0.6
@@ -58,6 +63,12 @@ Output:
   },
   "rationales": [...]
 }
+
+Dedupe: exakta dubbletter via fingeravtryck (hash), nära dubbletter via
+token-Jaccard där kandidaterna kommer ur lib.text.dedup_index (prefixfilter,
+eller MinHash-LSH med dedupe_mode="minhash"), och spans som ligger helt inuti
+en behållen span i samma dokument (sorterade intervall). Nästan linjärt i
+antalet källor i stället för parvisa jämförelser.
 """
 import sys
 import json
@@ -66,7 +77,12 @@ import argparse
 import re
 import hashlib
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Any, Dict, List, Tuple, Optional
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.dedup_index import NearDupIndex, SpanCover, jaccard_sets, token_order, token_set
 
 AGENT_VERSION = "1.0.0"
 AGENT_ID = "report_evidence"
@@ -108,6 +124,8 @@ def load_payload(args: argparse.Namespace) -> Dict[str, Any]:
     return non_blocking_stdin(default_payload)
 
 def cfg_from(meta: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    # okänt dedupe-läge faller tillbaka på "exact" (som citation_style på apa)
+    dedupe_mode = str(meta.get("dedupe_mode", "exact")).lower()
     return {
         "min_quality": float(args.min_quality if args.min_quality is not None else meta.get("min_quality", 0.5)),
         "max_duplicates": float(args.max_duplicates if args.max_duplicates is not None else meta.get("max_duplicates", 0.85)),
@@ -115,6 +133,7 @@ def cfg_from(meta: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
         "pii_strict": bool(args.pii_strict or meta.get("pii_strict", False)),
         "recent_weight_days": int(meta.get("recent_weight_days", 365)),
         "citation_style": str(meta.get("citation_style", "apa")).lower(),
+        "dedupe_mode": dedupe_mode if dedupe_mode in ("exact", "minhash") else "exact",
         "explain_verbose": bool(args.explain_verbose or meta.get("explain_verbose", False)),
     }
 
@@ -128,13 +147,7 @@ def content_fprint(text: str) -> str:
 
 def jaccard(a: str, b: str) -> float:
     # enkel token-baserad likhet
-    ta = set(re.findall(r"\w+", a.lower()))
-    tb = set(re.findall(r"\w+", b.lower()))
-    if not ta and not tb:
-        return 1.0
-    if not ta or not tb:
-        return 0.0
-    return len(ta & tb) / max(1, len(ta | tb))
+    return jaccard_sets(token_set(a), token_set(b))
 
 def parse_date(s: Optional[str]) -> Optional[datetime]:
     if not s: return None
@@ -196,11 +209,22 @@ def make_citation(s: Dict[str, Any], style: str) -> str:
     # apa (förenklad)
     return f"{author} ({date}). {title}. {url}".strip()
 
+def source_span(s: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    span = s.get("span")
+    if isinstance(span, (list, tuple)) and len(span) == 2:
+        try:
+            start, end = int(span[0]), int(span[1])
+        except (TypeError, ValueError):
+            return None
+        if 0 <= start <= end:
+            return start, end
+    return None
+
 def to_evidence_item(s: Dict[str, Any], idx: int, style: str, horizon_days: int) -> Dict[str, Any]:
     content = normalize_text(s.get("content") or s.get("snippet") or "")
     snippet = normalize_text(s.get("snippet") or content[:300])
     evid_id = f"EVID_{idx:04d}"
-    return {
+    item = {
         "id": evid_id,
         "source_id": s.get("id") or evid_id,
         "type": s.get("type") or "unknown",
@@ -219,23 +243,58 @@ def to_evidence_item(s: Dict[str, Any], idx: int, style: str, horizon_days: int)
         "claims": s.get("claims") or [],         # ex: ["C1","C2"]
         "pii_hits": [],                          # fylls senare
     }
-
-def dedupe(items: List[Dict[str, Any]], max_duplicates: float) -> Tuple[List[Dict[str, Any]], int]:
+    span = source_span(s)
+    if span is not None:
+        item["doc"] = s.get("doc") or ""
+        item["span"] = list(span)
+    return item
+
+def dedupe(items: List[Dict[str, Any]], max_duplicates: float, mode: str = "exact") -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Samma utfall som att jämföra varje item mot varje behållet i tur och ordning:
+    första behållna med lika fingerprint eller jaccard >= max_duplicates vinner.
+    Indexen ger bara kandidaterna, som sedan prövas i behållen ordning.
+    """
+    toks = [token_set(it.get("snippet","")) for it in items]
+    near = NearDupIndex(max_duplicates, token_order(toks), mode)
+    by_fprint: Dict[str, set] = {}
+    cover = SpanCover()
     kept: List[Dict[str, Any]] = []
+    kept_toks: List[frozenset] = []
     dropped = 0
-    for it in items:
+
+    def index(k: int) -> None:
+        jt = kept[k]
+        by_fprint.setdefault(jt["content_fprint"], set()).add(k)
+        near.add(k, kept_toks[k])
+        if "span" in jt:
+            cover.add(jt["doc"], *jt["span"])
+
+    for it, tk in zip(items, toks):
         is_dup = False
-        for jt in kept:
+        for k in sorted(by_fprint.get(it["content_fprint"], set()) | near.candidates(tk)):
+            jt = kept[k]
             # om fingerprint lika eller jaccard över tröskel → drop
             if it["content_fprint"] == jt["content_fprint"]:
                 is_dup = True; break
-            if jaccard(it.get("snippet",""), jt.get("snippet","")) >= max_duplicates:
+            if jaccard_sets(tk, kept_toks[k]) >= max_duplicates:
                 # behåll den med högre kvalitet
                 if it["quality"] > jt["quality"]:
-                    jt.update(it)
+                    by_fprint[jt["content_fprint"]].discard(k)
+                    near.remove(k)
+                    if "span" in jt:
+                        cover.remove(jt["doc"], *jt["span"])
+                    kept[k] = it
+                    kept_toks[k] = tk
+                    index(k)
                 is_dup = True; break
+        if not is_dup and "span" in it and cover.covers(it["doc"], *it["span"]):
+            # agent-span helt inuti en redan behållen span i samma dokument
+            is_dup = True
         if not is_dup:
             kept.append(it)
+            kept_toks.append(tk)
+            index(len(kept) - 1)
         else:
             dropped += 1
     return kept, dropped
@@ -275,7 +334,7 @@ def run(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
     # 3) Filtrera på kvalitet
     qualified = [it for it in items if it["quality"] >= cfg["min_quality"]]
     # 4) Dedupe
-    deduped, dropped_dupes = dedupe(qualified, cfg["max_duplicates"])
+    deduped, dropped_dupes = dedupe(qualified, cfg["max_duplicates"], cfg.get("dedupe_mode", "exact"))
     # 5) Begränsa antal
     deduped = deduped[: cfg["max_items"]]
 
@@ -317,7 +376,8 @@ def run(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
                 "min_quality": cfg["min_quality"],
                 "max_duplicates": cfg["max_duplicates"],
                 "max_items": cfg["max_items"],
-                "citation_style": cfg["citation_style"]
+                "citation_style": cfg["citation_style"],
+                "dedupe_mode": cfg.get("dedupe_mode", "exact")
             }
         }]
 
@@ -31,8 +31,13 @@ Output:
   }
 }
 """
-import sys, json, time, argparse, re, unicodedata
-from typing import Any, Dict, List, Tuple
+import sys, json, time, argparse, re
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.0.0"
 AGENT_ID = "risk_abuse"
@@ -73,13 +78,6 @@ def cfg_from(meta: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
     }
 
 # -------------------- Normalisering -------------------- #
-def normalize(s: str) -> str:
-    t = s.lower()
-    t = unicodedata.normalize("NFKD", t)
-    t = re.sub(r"[\u0300-\u036f]", "", t)
-    t = re.sub(r"\s+", " ", t)
-    return t
-
 def clip(s: str, n: int) -> str:
     if n <= 0: return ""
     return s[:n] if len(s) > n else s
@@ -223,6 +221,18 @@ def in_quotes_fraction(text: str) -> float:
     if len(q) < 2: return 0.0
     return min(1.0, len("".join(q)) / max(1, len(text)))
 
+BUCKETS = ("high", "medium")
+RULE_GROUPS = [
+    # 1) Fysiskt våld (HIGH)
+    ("high", "phrase", PHYSICAL_ABUSE_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "physical", "HIGH"), None),
+    # 2) Psykiskt våld (HIGH)
+    ("high", "phrase", PSYCHOLOGICAL_ABUSE_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "psychological", "HIGH"), None),
+    # 3) Verbalt våld (MEDIUM-HIGH)
+    ("medium", "phrase", VERBAL_ABUSE_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "verbal", "MEDIUM"), None),
+    # 4) Regex-mönster
+    ("high", "regex", SV_PATTERNS + EN_PATTERNS, lambda text, t_norm, rules: regex_hits(text, t_norm, rules, "abuse", "HIGH"), None),
+]
+
 # -------------------- Policy -------------------- #
 def decide_level(high: List[Dict[str, Any]], medium: List[Dict[str, Any]], cfg: Dict[str, Any], text: str) -> Tuple[str, List[Dict[str, Any]], float, List[str]]:
     # Quote-relax
@@ -268,28 +278,20 @@ def decide_level(high: List[Dict[str, Any]], medium: List[Dict[str, Any]], cfg:
     return risk_level, all_spans, score, abuse_flags
 
 # -------------------- Core -------------------- #
-def run(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+def run(payload: Dict[str, Any], cfg: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
     data = payload.get("data", {}) or {}
     text = str(data.get("text", "") or "")
     text = clip(text, cfg["max_ctx_len"])
 
-    t_norm = normalize(text)
-
-    high_spans = []
-    medium_spans = []
+    t_norm = ensure_view(text, view).folded_ws
 
-    # 1) Fysiskt våld (HIGH)
-    high_spans += phrase_hits(t_norm, PHYSICAL_ABUSE_PHRASES, "physical", "HIGH")
-    
-    # 2) Psykiskt våld (HIGH)
-    high_spans += phrase_hits(t_norm, PSYCHOLOGICAL_ABUSE_PHRASES, "psychological", "HIGH")
-    
-    # 3) Verbalt våld (MEDIUM-HIGH)
-    medium_spans += phrase_hits(t_norm, VERBAL_ABUSE_PHRASES, "verbal", "MEDIUM")
-    
-    # 4) Regex-mönster
-    high_spans += regex_hits(text, t_norm, SV_PATTERNS + EN_PATTERNS, "abuse", "HIGH")
+    spans = {bucket: [] for bucket in BUCKETS}
+    for bucket, _kind, rules, hits, flag in RULE_GROUPS:
+        if flag is None or cfg[flag]:
+            spans[bucket] += hits(text, t_norm, rules)
+    return finalize(text, cfg, spans["high"], spans["medium"])
 
+def finalize(text: str, cfg: Dict[str, Any], high_spans: List[Dict[str, Any]], medium_spans: List[Dict[str, Any]]) -> Dict[str, Any]:
     # 5) Beslut
     risk_level, all_spans, score, abuse_flags = decide_level(high_spans, medium_spans, cfg, text)
 
@@ -31,8 +31,13 @@ Output:
   }
 }
 """
-import sys, json, time, argparse, re, unicodedata
-from typing import Any, Dict, List, Tuple
+import sys, json, time, argparse, re
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.0.0"
 AGENT_ID = "risk_coercion"
@@ -73,13 +78,6 @@ def cfg_from(meta: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
     }
 
 # -------------------- Normalisering -------------------- #
-def normalize(s: str) -> str:
-    t = s.lower()
-    t = unicodedata.normalize("NFKD", t)
-    t = re.sub(r"[\u0300-\u036f]", "", t)
-    t = re.sub(r"\s+", " ", t)
-    return t
-
 def clip(s: str, n: int) -> str:
     if n <= 0: return ""
     return s[:n] if len(s) > n else s
@@ -247,6 +245,22 @@ def in_quotes_fraction(text: str) -> float:
     if len(q) < 2: return 0.0
     return min(1.0, len("".join(q)) / max(1, len(text)))
 
+BUCKETS = ("high", "medium")
+RULE_GROUPS = [
+    # 1) Kontroll (HIGH)
+    ("high", "phrase", CONTROL_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "control", "HIGH"), None),
+    # 2) Isolering (HIGH)
+    ("high", "phrase", ISOLATION_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "isolation", "HIGH"), None),
+    # 3) Hot och utpressning (HIGH)
+    ("high", "phrase", THREAT_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "threats", "HIGH"), None),
+    # 4) Gaslighting (HIGH)
+    ("high", "phrase", GASLIGHTING_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "gaslighting", "HIGH"), None),
+    # 5) Ekonomisk kontroll (MEDIUM-HIGH)
+    ("medium", "phrase", FINANCIAL_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "financial", "MEDIUM"), None),
+    # 6) Regex-mönster
+    ("high", "regex", SV_PATTERNS + EN_PATTERNS, lambda text, t_norm, rules: regex_hits(text, t_norm, rules, "coercion", "HIGH"), None),
+]
+
 # -------------------- Policy -------------------- #
 def decide_level(high: List[Dict[str, Any]], medium: List[Dict[str, Any]], cfg: Dict[str, Any], text: str) -> Tuple[str, List[Dict[str, Any]], float, List[str]]:
     if cfg["quote_relax"] and in_quotes_fraction(text) >= 0.02 and cfg["mode"] in ("balanced","lenient"):
@@ -288,34 +302,20 @@ def decide_level(high: List[Dict[str, Any]], medium: List[Dict[str, Any]], cfg:
     return risk_level, all_spans, score, coercion_flags
 
 # -------------------- Core -------------------- #
-def run(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+def run(payload: Dict[str, Any], cfg: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
     data = payload.get("data", {}) or {}
     text = str(data.get("text", "") or "")
     text = clip(text, cfg["max_ctx_len"])
 
-    t_norm = normalize(text)
+    t_norm = ensure_view(text, view).folded_ws
 
-    high_spans = []
-    medium_spans = []
-
-    # 1) Kontroll (HIGH)
-    high_spans += phrase_hits(t_norm, CONTROL_PHRASES, "control", "HIGH")
-    
-    # 2) Isolering (HIGH)
-    high_spans += phrase_hits(t_norm, ISOLATION_PHRASES, "isolation", "HIGH")
-    
-    # 3) Hot och utpressning (HIGH)
-    high_spans += phrase_hits(t_norm, THREAT_PHRASES, "threats", "HIGH")
-    
-    # 4) Gaslighting (HIGH)
-    high_spans += phrase_hits(t_norm, GASLIGHTING_PHRASES, "gaslighting", "HIGH")
-    
-    # 5) Ekonomisk kontroll (MEDIUM-HIGH)
-    medium_spans += phrase_hits(t_norm, FINANCIAL_PHRASES, "financial", "MEDIUM")
-    
-    # 6) Regex-mönster
-    high_spans += regex_hits(text, t_norm, SV_PATTERNS + EN_PATTERNS, "coercion", "HIGH")
+    spans = {bucket: [] for bucket in BUCKETS}
+    for bucket, _kind, rules, hits, flag in RULE_GROUPS:
+        if flag is None or cfg[flag]:
+            spans[bucket] += hits(text, t_norm, rules)
+    return finalize(text, cfg, spans["high"], spans["medium"])
 
+def finalize(text: str, cfg: Dict[str, Any], high_spans: List[Dict[str, Any]], medium_spans: List[Dict[str, Any]]) -> Dict[str, Any]:
     risk_level, all_spans, score, coercion_flags = decide_level(high_spans, medium_spans, cfg, text)
 
     severity = "CRITICAL" if risk_level == "HIGH" else ("HIGH" if risk_level == "MEDIUM" else "LOW")
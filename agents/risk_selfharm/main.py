@@ -35,7 +35,13 @@ Output:
 }
 """
 import sys, json, time, argparse, re, unicodedata
-from typing import Any, Dict, List, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.0.0"
 AGENT_ID = "risk_selfharm"
@@ -172,11 +178,16 @@ def spans_find_all(hay: str, needle: str) -> List[Tuple[int,int]]:
         start = i + len(needle)
     return res
 
+@lru_cache(maxsize=1024)
+def normalize_phrase(phrase: str) -> str:
+    # Lexikonet är konstant - normalisera varje fras en gång i stället för per anrop
+    return normalize(phrase)
+
 def phrase_hits(text_norm: str, phrases: List[Tuple[str, str]], severity: str) -> List[Dict[str, Any]]:
     hits = []
     for phrase, rule in phrases:
         # Normalisera även lexikonet för matchning
-        phrase_norm = normalize(phrase)
+        phrase_norm = normalize_phrase(phrase)
         # Matcha både originalet (om text inte är normaliserad) och den normaliserade versionen
         idxs = spans_find_all(text_norm, phrase_norm)
         # Om ingen match med normaliserad, försök med original (för fallback)
@@ -214,6 +225,16 @@ def in_quotes_fraction(text: str) -> float:
     if len(q) < 2: return 0.0
     return min(1.0, len("".join(q)) / max(1, len(text)))
 
+BUCKETS = ("high", "medium")
+RULE_GROUPS = [
+    # 1) Kritiska fraser (direkt → HIGH)
+    ("high", "phrase", CRITICAL_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "HIGH"), None),
+    # 2) Medium risk-fraser
+    ("medium", "phrase", MEDIUM_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules, "MEDIUM"), None),
+    # 3) Regex-mönster för hopplöshet/desperation
+    ("high", "regex", SV_PATTERNS + EN_PATTERNS, lambda text, t_norm, rules: regex_hits(text, t_norm, rules, "HIGH"), None),
+]
+
 # -------------------- Policy -------------------- #
 def decide_level(high: List[Dict[str, Any]], medium: List[Dict[str, Any]], cfg: Dict[str, Any], text: str) -> Tuple[str, List[Dict[str, Any]], float]:
     # Quote-relax: om stor del är citat → nergradera vissa regler till MEDIUM i balanced/lenient
@@ -258,25 +279,20 @@ def decide_level(high: List[Dict[str, Any]], medium: List[Dict[str, Any]], cfg:
     return risk_level, all_spans, score
 
 # -------------------- Core -------------------- #
-def run(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+def run(payload: Dict[str, Any], cfg: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
     data = payload.get("data", {}) or {}
     text = str(data.get("text", "") or "")
     text = clip(text, cfg["max_ctx_len"])
 
-    t_norm = normalize(text)
+    t_norm = ensure_view(text, view).folded_ws
 
-    high_spans = []
-    medium_spans = []
-
-    # 1) Kritiska fraser (direkt → HIGH)
-    high_spans += phrase_hits(t_norm, CRITICAL_PHRASES, "HIGH")
-
-    # 2) Medium risk-fraser
-    medium_spans += phrase_hits(t_norm, MEDIUM_PHRASES, "MEDIUM")
-
-    # 3) Regex-mönster för hopplöshet/desperation
-    high_spans += regex_hits(text, t_norm, SV_PATTERNS + EN_PATTERNS, "HIGH")
+    spans = {bucket: [] for bucket in BUCKETS}
+    for bucket, _kind, rules, hits, flag in RULE_GROUPS:
+        if flag is None or cfg[flag]:
+            spans[bucket] += hits(text, t_norm, rules)
+    return finalize(text, cfg, spans["high"], spans["medium"])
 
+def finalize(text: str, cfg: Dict[str, Any], high_spans: List[Dict[str, Any]], medium_spans: List[Dict[str, Any]]) -> Dict[str, Any]:
     # 4) Beslut + ev. relaxering
     risk_level, all_spans, score = decide_level(high_spans, medium_spans, cfg, text)
 
@@ -34,8 +34,13 @@ Output:
   "checks": {"CHK-SAFE-RED-01": {"pass": true, "reason": "…"}}
 }
 """
-import sys, json, time, argparse, re, unicodedata
-from typing import Any, Dict, List, Tuple
+import sys, json, time, argparse, re
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.4.0"
 AGENT_ID = "safety_gate"
@@ -84,14 +89,6 @@ def cfg_from(meta: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
     }
 
 # -------------------- Normalisering -------------------- #
-def normalize(s: str) -> str:
-    # lower, Unicode NFKD, ta bort diakritik, kollapsa whitespace
-    t = s.lower()
-    t = unicodedata.normalize("NFKD", t)
-    t = re.sub(r"[\u0300-\u036f]", "", t)
-    t = re.sub(r"\s+", " ", t)
-    return t
-
 def clip(s: str, n: int) -> str:
     if n <= 0: return ""
     return s[:n] if len(s) > n else s
@@ -151,17 +148,17 @@ def spans_find_all(hay: str, needle: str) -> List[Tuple[int,int]]:
         start = i + len(needle)
     return res
 
-def phrase_hits(text_norm: str) -> List[Dict[str, Any]]:
+def phrase_hits(text_norm: str, phrases: List[Tuple[str, str]] = SILVER_GOLDEN_PHRASES) -> List[Dict[str, Any]]:
     hits = []
-    for phrase, rule in SILVER_GOLDEN_PHRASES:
+    for phrase, rule in phrases:
         idxs = spans_find_all(text_norm, phrase)
         for s, e in idxs:
             hits.append({"type":"threat", "span":[s,e], "text": text_norm[s:e], "rule": rule, "severity":"RED"})
     return hits
 
-def regex_hits(text_raw: str, text_norm: str) -> List[Dict[str, Any]]:
+def regex_hits(text_raw: str, text_norm: str, patterns: List[Tuple[re.Pattern, str]] = SV_PATTERNS + EN_PATTERNS) -> List[Dict[str, Any]]:
     hits = []
-    for rx, rule in SV_PATTERNS + EN_PATTERNS:
+    for rx, rule in patterns:
         m = rx.search(text_norm)
         if m:
             s, e = m.span()
@@ -181,6 +178,16 @@ def in_quotes_fraction(text: str) -> float:
     if len(q) < 2: return 0.0
     return min(1.0, len("".join(q)) / max(1, len(text)))
 
+BUCKETS = ("red", "warn")
+RULE_GROUPS = [
+    # 1) Silver/Golden fraser (direkt → RED)
+    ("red", "phrase", SILVER_GOLDEN_PHRASES, lambda text, t_norm, rules: phrase_hits(t_norm, rules), None),
+    # 2) Regex-hot/utpressning (flexibla)
+    ("red", "regex", SV_PATTERNS + EN_PATTERNS, lambda text, t_norm, rules: regex_hits(text, t_norm, rules), None),
+    # 3) Förolämpningar (WARN), på råtexten
+    ("warn", "insult", [(INSULT_RX, "INSULT_LEX")], lambda text, t_norm, rules: insult_hits(text), "enable_insults"),
+]
+
 # -------------------- Policy -------------------- #
 def decide_level(red: List[Dict[str, Any]], warn: List[Dict[str, Any]], cfg: Dict[str, Any], text: str) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]:
     # Quote-relax: om stor del är citat → nergradera vissa regler till WARN i balanced/lenient
@@ -215,27 +222,21 @@ def decide_level(red: List[Dict[str, Any]], warn: List[Dict[str, Any]], cfg: Dic
     return level, red, warn
 
 # -------------------- Core -------------------- #
-def run(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+def run(payload: Dict[str, Any], cfg: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
     data = payload.get("data", {}) or {}
     text = str(data.get("text", "") or "")
     text = clip(text, cfg["max_ctx_len"])
 
-    t_norm = normalize(text)
-
-    red_spans = []
-    warn_spans = []
-
-    # 1) Silver/Golden fraser (direkt → RED)
-    red_spans += phrase_hits(t_norm)
-
-    # 2) Regex-hot/utpressning (flexibla)
-    red_spans += regex_hits(text, t_norm)
+    t_norm = ensure_view(text, view).folded_ws
 
-    # 3) Förolämpningar (WARN)
-    if cfg["enable_insults"]:
-        warn_spans += insult_hits(text)
+    spans = {bucket: [] for bucket in BUCKETS}
+    for bucket, _kind, rules, hits, flag in RULE_GROUPS:
+        if flag is None or cfg[flag]:
+            spans[bucket] += hits(text, t_norm, rules)
+    return finalize(text, cfg, spans["red"], spans["warn"])
 
-    # 4) Beslut + ev. relaxering
+def finalize(text: str, cfg: Dict[str, Any], red_spans: List[Dict[str, Any]], warn_spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # 4) Beslut + ev. relaxering (text = klippt råtext, spans i RULE_GROUPS-ordning)
     level, red_spans, warn_spans = decide_level(red_spans, warn_spans, cfg, text)
 
     emits = {
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+S0 SafetyScan - safety_gate, risk_selfharm, risk_abuse och risk_coercion i ett pass
+
+De fyra säkerhetsagenterna normaliserar var för sig och går igenom sina
+fras-/regextabeller som separata processer, fast en enda RED/HIGH-träff räcker
+för routing. Varje agent exponerar BUCKETS (hard, soft; BUCKETS[0] är
+hard-stop-nivån som decide_level kan ge RED/HIGH) och RULE_GROUPS i körordning:
+(bucket, kind, regler, hits(text, t_norm, regler), cfg-flagga). Agentens egen
+run() går över samma tabell. Här slås agenternas RULE_GROUPS ihop till EN
+ordnad regelplan (en regel per fras/mönster, taggad med agent, bucket och hard/soft):
+hard-stop-regler först, billiga frasuppslag före regex. Texten normaliseras en
+gång (TextView.folded_ws) och delas av alla agenter.
+
+Early exit (default): efter varje hard-träff körs agentens egen decide_level
+på träffarna hittills; ger den RED/HIGH stannar passet. Nivån kan bara stiga
+när fler träffar tillkommer (quote-relax och lenient-nedgradering beror på
+texten respektive antalet träffar), så ett tidigt RED/HIGH är detsamma som
+agentens slutliga beslut. Blev det inget hard stop under passet körs varje
+agents decide_level en gång till på dess kompletta buckets: i lenient blir en
+isolerad hard-träff HIGH först tillsammans med soft-träffarna.
+
+Audit (meta.audit=true), eller early exit utan hard stop: alla regler körs och
+varje agents finalize() får sina spans i agentens egen ordning - emits och
+checks blir identiska med att köra agenterna var för sig.
+
+Input (stdin):
+{
+  "data": {"text": "..."},
+  "meta": {"audit": false, "agents": ["safety_gate", ...], "mode": "...", ...}
+}
+
+Output:
+{
+  "ok": true,
+  "emits": {
+    "safety_scan": {"hard_stop": true, "level": "RED", "agent": "safety_gate", "rule": "SV_B007",
+                    "span": [s, e], "complete": false, "rules_run": 3, "rules_total": 118},
+    "safety_gate": {...}, "risk_selfharm": {...}, ...   # endast när complete
+  },
+  "checks": {"CHK-SAFETY-SCAN-01": {...}, ...}
+}
+"""
+import sys
+import json
+import time
+import importlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
+
+AGENT_VERSION = "1.0.0"
+AGENT_ID = "safety_scan"
+
+SCAN_AGENTS = ("safety_gate", "risk_selfharm", "risk_abuse", "risk_coercion")
+HARD_LEVELS = frozenset({"RED", "HIGH"})
+
+# Inom hard/soft: frasuppslag (str.find) före regex före förolämpningar på råtext
+KIND_ORDER = {"phrase": 0, "regex": 1, "insult": 2}
+
+
+class SafetyRule(NamedTuple):
+    agent: str
+    bucket: str
+    hard: bool
+    kind: str
+    rule: str
+    pos: Tuple[int, int]          # (grupp, rad) i agentens RULE_GROUPS - återställer spanordningen
+    rules: List[Any]              # tabellrader som hits() får (en rad, eller hela insult-gruppen)
+    hits: Callable[[str, str, List[Any]], List[Dict[str, Any]]]
+    flag: Optional[str]           # cfg-nyckel som måste vara sann (t.ex. enable_insults)
+
+
+_modules: Dict[str, Any] = {}
+_defaults: Dict[str, Any] = {}
+_plan: List[SafetyRule] = []
+
+
+def load_agents() -> Dict[str, Any]:
+    """Importera säkerhetsagenterna och deras CLI-defaults (för cfg_from)."""
+    if len(_modules) < len(SCAN_AGENTS):
+        for agent_id in SCAN_AGENTS:
+            if agent_id not in _modules:
+                mod = importlib.import_module(f"agents.{agent_id}.main")
+                _defaults[agent_id] = mod.parse_args([])
+                _modules[agent_id] = mod
+    return _modules
+
+
+def build_plan(modules: Dict[str, Any]) -> List[SafetyRule]:
+    """Alla agenters regler i en lista, sorterad i körordning."""
+    plan: List[SafetyRule] = []
+    for agent_id in SCAN_AGENTS:
+        mod = modules[agent_id]
+        hard_bucket = mod.BUCKETS[0]
+        for g, (bucket, kind, table, hits, flag) in enumerate(mod.RULE_GROUPS):
+            rows = [table] if kind == "insult" else [[row] for row in table]
+            for i, rules in enumerate(rows):
+                plan.append(SafetyRule(agent_id, bucket, bucket == hard_bucket, kind, rules[0][1],
+                                       (g, i), rules, hits, flag))
+    plan.sort(key=lambda r: (not r.hard, KIND_ORDER.get(r.kind, len(KIND_ORDER)), SCAN_AGENTS.index(r.agent)))
+    return plan
+
+
+def get_plan() -> List[SafetyRule]:
+    if not _plan:
+        _plan.extend(build_plan(load_agents()))
+    return _plan
+
+
+def _ordered(found: List[Tuple[Tuple[int, int], List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    return [h for _, hits in sorted(found, key=lambda f: f[0]) for h in hits]
+
+
+def scan(text: str, cfgs: Dict[str, Dict[str, Any]], audit: bool = False,
+         view: Optional[TextView] = None) -> Dict[str, Any]:
+    """
+    Kör regelplanen för agenterna i `cfgs` (agent_id -> agentens cfg).
+
+    Returnerar hard stop-info plus, per agent, klippt text och spans per bucket
+    i agentens egen ordning. `complete` är False om passet avbröts tidigt.
+    """
+    modules = load_agents()
+    plan = get_plan()
+    inputs: Dict[str, Tuple[str, str]] = {}
+    norms: Dict[str, str] = {}
+    found: Dict[str, Dict[str, list]] = {}
+    for agent_id, cfg in cfgs.items():
+        mod = modules[agent_id]
+        clipped = mod.clip(text, cfg["max_ctx_len"])
+        if clipped not in norms:
+            norms[clipped] = ensure_view(clipped, view).folded_ws
+        inputs[agent_id] = (clipped, norms[clipped])
+        found[agent_id] = {bucket: [] for bucket in mod.BUCKETS}
+
+    stop: Optional[Dict[str, Any]] = None
+    complete = True
+    rules_run = 0
+    for r in plan:
+        cfg = cfgs.get(r.agent)
+        if cfg is None or (r.flag is not None and not cfg[r.flag]):
+            continue
+        rules_run += 1
+        clipped, t_norm = inputs[r.agent]
+        hits = r.hits(clipped, t_norm, r.rules)
+        if not hits:
+            continue
+        found[r.agent][r.bucket].append((r.pos, hits))
+        if r.hard and stop is None:
+            mod = modules[r.agent]
+            buckets = found[r.agent]
+            level = mod.decide_level(_ordered(buckets[mod.BUCKETS[0]]), _ordered(buckets[mod.BUCKETS[1]]),
+                                     cfg, clipped)[0]
+            if level in HARD_LEVELS:
+                stop = {"level": level, "agent": r.agent, "rule": r.rule, "span": hits[0]["span"]}
+                if not audit:
+                    complete = False
+                    break
+
+    if stop is None:
+        # Hela passet kört: hard + soft tillsammans (t.ex. lenient) kan ändå ge RED/HIGH
+        for agent_id, cfg in cfgs.items():
+            mod = modules[agent_id]
+            hard, soft = (_ordered(found[agent_id][b]) for b in mod.BUCKETS[:2])
+            level = mod.decide_level(hard, soft, cfg, inputs[agent_id][0])[0]
+            spans = hard + soft
+            if level in HARD_LEVELS and spans:
+                stop = {"level": level, "agent": agent_id, "rule": spans[0].get("rule"), "span": spans[0]["span"]}
+                break
+
+    return {
+        "hard_stop": stop is not None,
+        "stop": stop,
+        "complete": complete,
+        "rules_run": rules_run,
+        "rules_total": len(plan),
+        "texts": {agent_id: inputs[agent_id][0] for agent_id in cfgs},
+        "spans": {agent_id: {bucket: _ordered(f) for bucket, f in buckets.items()}
+                  for agent_id, buckets in found.items()},
+    }
+
+
+def run(payload: Dict, view: Optional[TextView] = None) -> Dict:
+    modules = load_agents()
+    data = payload.get("data", {}) or {}
+    meta = payload.get("meta", {}) or {}
+    text = str(data.get("text", "") or "")
+    wanted = meta.get("agents") or SCAN_AGENTS
+    cfgs = {agent_id: modules[agent_id].cfg_from(meta, _defaults[agent_id])
+            for agent_id in SCAN_AGENTS if agent_id in wanted}
+
+    res = scan(text, cfgs, audit=bool(meta.get("audit", False)), view=view)
+    stop = res["stop"] or {}
+    emits: Dict[str, Any] = {
+        "safety_scan": {
+            "hard_stop": res["hard_stop"],
+            "level": stop.get("level"),
+            "agent": stop.get("agent"),
+            "rule": stop.get("rule"),
+            "span": stop.get("span"),
+            "complete": res["complete"],
+            "rules_run": res["rules_run"],
+            "rules_total": res["rules_total"],
+        }
+    }
+    checks: Dict[str, Any] = {
+        "CHK-SAFETY-SCAN-01": {
+            "pass": True,
+            "reason": (f"Hard stop {stop['level']} ({stop['agent']}:{stop['rule']})" if res["hard_stop"]
+                       else "Ingen hard stop")
+        }
+    }
+    if res["complete"]:
+        for agent_id, cfg in cfgs.items():
+            mod = modules[agent_id]
+            spans = res["spans"][agent_id]
+            out = mod.finalize(res["texts"][agent_id], cfg, *(spans[b] for b in mod.BUCKETS))
+            emits[agent_id] = out["emits"]
+            checks.update(out.get("checks", {}) or {})
+    return {"ok": True, "emits": emits, "checks": checks}
+
+
+# ----------------------------- Main -----------------------------
+if __name__ == "__main__":
+    t0 = time.time()
+    payload = json.loads(sys.stdin.read())
+    try:
+        res = run(payload)
+        res["version"] = f"{AGENT_ID}@{AGENT_VERSION}"
+        res["latency_ms"] = int((time.time() - t0) * 1000)
+        res["cost"] = {"usd": 0.002}
+        print(json.dumps(res, ensure_ascii=False))
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}))
+        sys.exit(1)
@@ -32,9 +32,22 @@ Output:
     "speaker_distribution": {"P1": 0.5, "P2": 0.5}
   }
 }
+
+Strömmande läge (stora chattexporter):
+  python main.py --input export.txt
+  python ../thread_parser/main.py --input export.txt | python main.py --input -
+Rå text delas i turer radvis; JSON-rader (t.ex. thread_parsers strömmande
+utdata) attribueras tur för tur. Varje attribuerad tur skrivs direkt som en
+JSON-rad, och speaker_confidence/speaker_distribution skrivs sist till stderr.
+Språket detekteras på de första LANG_PEEK_LINES raderna (eller --lang).
 """
 import sys, json, time, argparse, re
-from typing import Any, Dict, List, Tuple
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.chat_stream import iter_lines, peek, write_jsonl, Source
 
 AGENT_VERSION = "1.0.0"
 AGENT_ID = "speaker_attrib"
@@ -44,6 +57,8 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="SpeakerAttributionAgent – smart talare-attribution.")
     p.add_argument("--payload", type=str, default=None)
     p.add_argument("--explain-verbose", action="store_true")
+    p.add_argument("--input", type=str, default=None, help="Chattexport att strömma (sökväg, eller - för stdin)")
+    p.add_argument("--lang", type=str, default=None, choices=["sv", "en"])
     return p.parse_args(argv)
 
 def nb_stdin(default: Dict[str, Any]) -> Dict[str, Any]:
@@ -84,6 +99,15 @@ THIRD_PERSON = {
     "en": ["he", "she", "they", "him", "her", "them", "his", "hers", "their"]
 }
 
+# Kompilerade en gång per språk: (talare, \bpronomen\b)
+PRONOUN_RES = {
+    lang: [(speaker, re.compile(r"\b" + re.escape(pronoun) + r"\b"))
+           for speaker, pronoun_list in pronouns.items() for pronoun in pronoun_list]
+    for lang, pronouns in (("sv", SV_PRONOUNS), ("en", EN_PRONOUNS))
+}
+
+LANG_PEEK_LINES = 50  # språkdetektering i strömmande läge
+
 # -------------------- Mönster för dialogstruktur -------------------- #
 # Identifierar dialog-separatorer
 DIALOG_MARKERS = [
@@ -111,16 +135,12 @@ def detect_language(text: str) -> str:
 
 def extract_pronouns(text: str, language: str) -> Dict[str, int]:
     """Extraherar pronomen och räknar förekomster."""
-    pronouns = SV_PRONOUNS if language == "sv" else EN_PRONOUNS
     counts = {"P1": 0, "P2": 0, "BOTH": 0}
     
     text_lower = text.lower()
-    for speaker, pronoun_list in pronouns.items():
-        for pronoun in pronoun_list:
-            # Använd word boundary för exakt matchning
-            pattern = r"\b" + re.escape(pronoun) + r"\b"
-            matches = len(re.findall(pattern, text_lower))
-            counts[speaker] += matches
+    for speaker, rx in PRONOUN_RES["sv" if language == "sv" else "en"]:
+        # Word boundary för exakt matchning
+        counts[speaker] += len(rx.findall(text_lower))
     
     return counts
 
@@ -158,20 +178,21 @@ def attribute_speaker_from_text(text: str, language: str, default_speaker: str =
         # Oavgjort - använd default
         return default_speaker, 0.4
 
-def split_into_turns(text: str) -> List[str]:
-    """Delar text i turer baserat på radbrytningar och dialogmarkörer."""
-    # Först, kolla om det redan är strukturerat
-    lines = text.split("\n")
-    turns = []
-    current_turn = []
+def iter_split_turns(lines: Iterable[str]) -> Iterator[str]:
+    """Delar rader i turer baserat på tomrader och dialogmarkörer, en tur i taget."""
+    current_turn: List[str] = []
+    blank: Optional[List[str]] = []  # råraderna så länge ingen text setts
     
-    for line in lines:
-        line = line.strip()
+    for raw in lines:
+        line = raw.strip()
         if not line:
             if current_turn:
-                turns.append(" ".join(current_turn))
+                yield " ".join(current_turn)
                 current_turn = []
+            elif blank is not None:
+                blank.append(raw)
             continue
+        blank = None
         
         # Kolla om det är en ny tur (dialogmarkör)
         is_new_turn = False
@@ -182,19 +203,127 @@ def split_into_turns(text: str) -> List[str]:
         
         if is_new_turn:
             if current_turn:
-                turns.append(" ".join(current_turn))
+                yield " ".join(current_turn)
             current_turn = [line]
         else:
             current_turn.append(line)
     
     if current_turn:
-        turns.append(" ".join(current_turn))
+        yield " ".join(current_turn)
+    elif blank is not None:
+        # Om inga turer hittades, behandla hela texten som en tur
+        yield "\n".join(blank)
+
+def split_into_turns(text: str) -> List[str]:
+    """Delar text i turer baserat på radbrytningar och dialogmarkörer."""
+    return list(iter_split_turns(text.split("\n")))
+
+def iter_labeled(dialog: Iterable[Any], language: str, default_speaker: str = "P1") -> Iterator[Dict[str, Any]]:
+    """Strukturerad dialog: behåll givna talare, attribuera okända ("UNKNOWN"/"?")."""
+    for i, turn in enumerate(dialog):
+        if isinstance(turn, dict):
+            speaker = turn.get("speaker", "UNKNOWN")
+            text = turn.get("text", "")
+            ts = turn.get("ts", i)
+            
+            # Om speaker är okänd, försök attribuera
+            if speaker == "UNKNOWN" or speaker == "?":
+                speaker, confidence = attribute_speaker_from_text(text, language, default_speaker)
+            else:
+                confidence = 0.9  # Hög confidence om speaker redan är given
+            
+            yield {
+                "speaker": speaker,
+                "text": text,
+                "ts": ts,
+                "confidence": round(confidence, 2)
+            }
+
+def iter_attributed(turns: Iterable[str], language: str, default_speaker: str = "P1",
+                    expected_speakers: Sequence[str] = ("P1", "P2")) -> Iterator[Dict[str, Any]]:
+    """
+    Attribuerar råa turer en i taget.
     
-    # Om inga turer hittades, behandla hela texten som en tur
-    if not turns:
-        turns = [text]
+    Vid låg confidence alterneras förväntade talare om det finns mer än en
+    tur - det avgörs med en turs framförhållning i stället för len(turns).
+    """
+    head, turns = peek(turns, 2)
+    several = len(head) > 1
+    current_speaker_idx = 0
     
-    return turns
+    for i, turn_text in enumerate(turns):
+        speaker, confidence = attribute_speaker_from_text(turn_text, language, default_speaker)
+        
+        # Om confidence är låg och vi har flera turer, alternera
+        if confidence < 0.5 and several:
+            speaker = expected_speakers[current_speaker_idx % len(expected_speakers)]
+            confidence = 0.4
+            current_speaker_idx += 1
+        
+        yield {
+            "speaker": speaker,
+            "text": turn_text,
+            "ts": i,
+            "confidence": round(confidence, 2)
+        }
+
+class SpeakerTally:
+    """Löpande speaker_distribution och genomsnittlig confidence över en ström av turer."""
+    
+    def __init__(self, expected_speakers: Sequence[str] = ("P1", "P2")):
+        self.expected_speakers = list(expected_speakers)
+        self.counts: Dict[str, int] = {}
+        self.confidence_sum = 0.0
+        self.total = 0
+    
+    def add(self, turn: Dict[str, Any]) -> None:
+        self.counts[turn["speaker"]] = self.counts.get(turn["speaker"], 0) + 1
+        self.confidence_sum += turn.get("confidence", 0.0)
+        self.total += 1
+    
+    def feed(self, turns: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Släpper igenom turerna och räknar dem på vägen."""
+        for turn in turns:
+            self.add(turn)
+            yield turn
+    
+    def distribution(self) -> Dict[str, float]:
+        if not self.total:
+            return {}
+        return {speaker: round(self.counts.get(speaker, 0) / self.total, 2) for speaker in self.expected_speakers}
+    
+    def confidence(self) -> float:
+        return round(self.confidence_sum / max(1, self.total), 2)
+
+def _json_rows(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(row, dict):
+            yield row
+
+def iter_stream(source: Source, language: Optional[str] = None, default_speaker: str = "P1",
+                expected_speakers: Sequence[str] = ("P1", "P2")) -> Iterator[Dict[str, Any]]:
+    """
+    Strömmande attribution av en chattexport (sökväg, textström eller rader).
+    
+    JSON-rader med "speaker" går via iter_labeled, rå text via
+    iter_split_turns + iter_attributed.
+    """
+    head, lines = peek(iter_lines(source), LANG_PEEK_LINES)
+    first = next((line for line in head if line.strip()), "")
+    rows = list(_json_rows([first])) if first.lstrip().startswith("{") else []
+    jsonl = bool(rows) and "speaker" in rows[0]
+    if language is None:
+        sample = [str(t.get("text", "")) for t in _json_rows(head)] if jsonl else head
+        language = detect_language("\n".join(sample))
+    if jsonl:
+        return iter_labeled(_json_rows(lines), language, default_speaker)
+    return iter_attributed(iter_split_turns(lines), language, default_speaker, expected_speakers)
 
 # -------------------- Core -------------------- #
 def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
@@ -211,66 +340,20 @@ def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
     # Detektera språk
     language = detect_language(description)
     
-    labeled_thread = []
+    tally = SpeakerTally(expected_speakers)
     
     # Om dialog redan är strukturerad
     if dialog and isinstance(dialog, list):
-        for i, turn in enumerate(dialog):
-            if isinstance(turn, dict):
-                speaker = turn.get("speaker", "UNKNOWN")
-                text = turn.get("text", "")
-                ts = turn.get("ts", i)
-                
-                # Om speaker är okänd, försök attribuera
-                if speaker == "UNKNOWN" or speaker == "?":
-                    speaker, confidence = attribute_speaker_from_text(text, language, default_speaker)
-                else:
-                    confidence = 0.9  # Hög confidence om speaker redan är given
-                
-                labeled_thread.append({
-                    "speaker": speaker,
-                    "text": text,
-                    "ts": ts,
-                    "confidence": round(confidence, 2)
-                })
+        labeled_thread = list(tally.feed(iter_labeled(dialog, language, default_speaker)))
     else:
-        # Parsa från description
-        turns = split_into_turns(description)
-        
-        # Alternera mellan P1 och P2 om inga pronomen hittas
-        current_speaker_idx = 0
-        
-        for i, turn_text in enumerate(turns):
-            speaker, confidence = attribute_speaker_from_text(turn_text, language, default_speaker)
-            
-            # Om confidence är låg och vi har flera turer, alternera
-            if confidence < 0.5 and len(turns) > 1:
-                speaker = expected_speakers[current_speaker_idx % len(expected_speakers)]
-                confidence = 0.4
-                current_speaker_idx += 1
-            
-            labeled_thread.append({
-                "speaker": speaker,
-                "text": turn_text,
-                "ts": i,
-                "confidence": round(confidence, 2)
-            })
-    
-    # Beräkna speaker-distribution
-    speaker_distribution = {}
-    total = len(labeled_thread)
-    if total > 0:
-        for speaker in expected_speakers:
-            count = sum(1 for t in labeled_thread if t["speaker"] == speaker)
-            speaker_distribution[speaker] = round(count / total, 2)
-    
-    # Genomsnittlig confidence
-    avg_confidence = sum(t.get("confidence", 0.0) for t in labeled_thread) / max(1, len(labeled_thread))
+        # Parsa från description; alternera mellan P1 och P2 om inga pronomen hittas
+        turns = iter_split_turns(description.split("\n"))
+        labeled_thread = list(tally.feed(iter_attributed(turns, language, default_speaker, expected_speakers)))
     
     emits = {
         "labeled_thread": labeled_thread,
-        "speaker_confidence": round(avg_confidence, 2),
-        "speaker_distribution": speaker_distribution
+        "speaker_confidence": tally.confidence(),
+        "speaker_distribution": tally.distribution()
     }
     
     checks = {
@@ -287,6 +370,14 @@ def main() -> None:
     t0 = time.time()
     try:
         args = parse_args(sys.argv[1:])
+        if args.input:
+            # Strömmande läge: en JSON-rad per tur, sammanfattning till stderr
+            source = sys.stdin if args.input == "-" else args.input
+            tally = SpeakerTally()
+            write_jsonl(tally.feed(iter_stream(source, args.lang)), sys.stdout)
+            sys.stderr.write(json.dumps({"turns": tally.total, "speaker_confidence": tally.confidence(),
+                                         "speaker_distribution": tally.distribution()}) + "\n")
+            return
         payload = load_payload(args)
         meta = payload.get("meta", {}) or {}
         
@@ -8,7 +8,7 @@ Input (stdin eller --payload):
 {
   "meta": {
     "explain_verbose": false,
-    "format": "auto|structured|plain",  # auto-detekterar format
+    "format": "auto|structured|plain|jsonl",  # auto-detekterar format
     "timezone": "UTC"
   },
   "data": {
@@ -26,14 +26,26 @@ Output:
       {"speaker": "P1|P2|UNKNOWN", "text": "…", "ts": 0, "turn": 1}
     ],
     "thread_ok": true,
-    "format_detected": "structured|plain|mixed",
+    "format_detected": "structured|plain|jsonl",
     "turn_count": 2
   }
 }
+
+Strömmande läge (stora chattexporter):
+  python main.py --input export.txt [--format auto|structured|plain|jsonl]
+  cat export.txt | python main.py --input -
+Exporten läses radvis (lib.text.chat_stream) och varje tur skrivs direkt som en
+JSON-rad {"speaker", "text", "ts", "turn"} - minnet är konstant oavsett
+exportens storlek. Formatet detekteras på de första FORMAT_PEEK_LINES raderna.
 """
 import sys, json, time, argparse, re
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.chat_stream import iter_lines, peek, write_jsonl, Source
 
 AGENT_VERSION = "1.0.0"
 AGENT_ID = "thread_parser"
@@ -42,7 +54,8 @@ AGENT_ID = "thread_parser"
 def parse_args(argv: List[str]) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="ThreadParserAgent – robust dialog-parsing.")
     p.add_argument("--payload", type=str, default=None)
-    p.add_argument("--format", type=str, default=None, choices=["auto","structured","plain"])
+    p.add_argument("--format", type=str, default=None, choices=["auto","structured","plain","jsonl"])
+    p.add_argument("--input", type=str, default=None, help="Chattexport att strömma (sökväg, eller - för stdin)")
     p.add_argument("--explain-verbose", action="store_true")
     return p.parse_args(argv)
 
@@ -63,7 +76,46 @@ def load_payload(args: argparse.Namespace) -> Dict[str, Any]:
             return json.load(f)
     return nb_stdin(default_payload)
 
+# -------------------- Mönster -------------------- #
+FORMAT_PEEK_LINES = 10  # formatdetektering tittar på de första raderna
+
+FORMAT_MARKERS = [
+    re.compile(r"^(P1|P2|Person\s+1|Person\s+2|Jag|Du):\s*", re.I),
+    re.compile(r"^\[(P1|P2|Person\s+1|Person\s+2)\]:\s*", re.I),
+    re.compile(r"^<(P1|P2|Person\s+1|Person\s+2)>\s*", re.I),
+]
+
+# Format: "P1: text" / "Person 1: text" / "[P1]: text" / "<P1> text"
+SPEAKER_MARKERS = [
+    re.compile(r"^(P1|P2|Person\s+1|Person\s+2|Jag|Du):\s*(.*)$", re.I),
+    re.compile(r"^\[(P1|P2|Person\s+1|Person\s+2)\]:\s*(.*)$", re.I),
+    re.compile(r"^<(P1|P2|Person\s+1|Person\s+2)>\s*(.*)$", re.I),
+]
+
+SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+PLAIN_TURN_SIZE = 2
+
 # -------------------- Format-detektering -------------------- #
+def detect_format_lines(head: List[str]) -> str:
+    """Detekterar format från de första raderna (strömmande läge)."""
+    # JSON-rader: en tur per rad
+    first = next((line.strip() for line in head if line.strip()), "")
+    if first.startswith("{"):
+        try:
+            obj = json.loads(first)
+        except ValueError:
+            obj = None
+        if isinstance(obj, dict) and "speaker" in obj:
+            return "jsonl"
+    
+    # Kolla efter dialogmarkörer
+    marker_count = sum(1 for line in head[:FORMAT_PEEK_LINES]
+                       if any(rx.match(line) for rx in FORMAT_MARKERS))
+    if marker_count >= 2:
+        return "structured"
+    
+    return "plain"
+
 def detect_format(text: str) -> str:
     """Detekterar dialogformat."""
     
@@ -76,91 +128,56 @@ def detect_format(text: str) -> str:
     except:
         pass
     
-    # Kolla efter dialogmarkörer
-    lines = text.split("\n")
-    marker_count = 0
-    
-    for line in lines[:10]:  # Kolla första 10 raderna
-        if re.match(r"^(P1|P2|Person\s+1|Person\s+2|Jag|Du):\s*", line, re.I):
-            marker_count += 1
-        elif re.match(r"^\[(P1|P2|Person\s+1|Person\s+2)\]:\s*", line, re.I):
-            marker_count += 1
-        elif re.match(r"^<(P1|P2|Person\s+1|Person\s+2)>\s*", line, re.I):
-            marker_count += 1
-    
-    if marker_count >= 2:
-        return "structured"
-    
-    return "plain"
+    return detect_format_lines(text.split("\n", FORMAT_PEEK_LINES)[:FORMAT_PEEK_LINES])
 
 # -------------------- Parsing-funktioner -------------------- #
-def parse_structured(text: str) -> List[Dict[str, Any]]:
-    """Parsar strukturerad dialog med markörer."""
-    thread = []
-    lines = text.split("\n")
+def _speaker_of(tag: str) -> Optional[str]:
+    tag = tag.upper()
+    if "P1" in tag or "PERSON 1" in tag or "JAG" in tag:
+        return "P1"
+    if "P2" in tag or "PERSON 2" in tag or "DU" in tag:
+        return "P2"
+    return None
+
+def iter_structured(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parsar strukturerad dialog med markörer, en tur i taget."""
     current_speaker = "UNKNOWN"
-    current_text = []
+    current_text: List[str] = []
     turn = 1
     
     for line in lines:
         line = line.strip()
         if not line:
             if current_text:
-                thread.append({
+                yield {
                     "speaker": current_speaker,
                     "text": " ".join(current_text),
                     "ts": turn - 1,
                     "turn": turn
-                })
+                }
                 current_text = []
                 turn += 1
             continue
         
         # Kolla efter speaker-markör
         speaker_match = None
-        
-        # Format: "P1: text" eller "Person 1: text"
-        m = re.match(r"^(P1|P2|Person\s+1|Person\s+2|Jag|Du):\s*(.*)$", line, re.I)
-        if m:
-            speaker_tag = m.group(1).upper()
-            text_part = m.group(2)
-            
-            if "P1" in speaker_tag or "PERSON 1" in speaker_tag or "JAG" in speaker_tag:
-                speaker_match = ("P1", text_part)
-            elif "P2" in speaker_tag or "PERSON 2" in speaker_tag or "DU" in speaker_tag:
-                speaker_match = ("P2", text_part)
-        
-        # Format: "[P1] text"
-        if not speaker_match:
-            m = re.match(r"^\[(P1|P2|Person\s+1|Person\s+2)\]:\s*(.*)$", line, re.I)
-            if m:
-                speaker_tag = m.group(1).upper()
-                text_part = m.group(2)
-                if "P1" in speaker_tag or "PERSON 1" in speaker_tag:
-                    speaker_match = ("P1", text_part)
-                elif "P2" in speaker_tag or "PERSON 2" in speaker_tag:
-                    speaker_match = ("P2", text_part)
-        
-        # Format: "<P1> text"
-        if not speaker_match:
-            m = re.match(r"^<(P1|P2|Person\s+1|Person\s+2)>\s*(.*)$", line, re.I)
+        for rx in SPEAKER_MARKERS:
+            m = rx.match(line)
             if m:
-                speaker_tag = m.group(1).upper()
-                text_part = m.group(2)
-                if "P1" in speaker_tag or "PERSON 1" in speaker_tag:
-                    speaker_match = ("P1", text_part)
-                elif "P2" in speaker_tag or "PERSON 2" in speaker_tag:
-                    speaker_match = ("P2", text_part)
+                speaker = _speaker_of(m.group(1))
+                if speaker:
+                    speaker_match = (speaker, m.group(2))
+                    break
         
         if speaker_match:
             # Spara föregående tur om den finns
             if current_text:
-                thread.append({
+                yield {
                     "speaker": current_speaker,
                     "text": " ".join(current_text),
                     "ts": turn - 1,
                     "turn": turn
-                })
+                }
                 turn += 1
             
             # Starta ny tur
@@ -172,52 +189,71 @@ def parse_structured(text: str) -> List[Dict[str, Any]]:
     
     # Spara sista turen
     if current_text:
-        thread.append({
+        yield {
             "speaker": current_speaker,
             "text": " ".join(current_text),
             "ts": turn - 1,
             "turn": turn
-        })
-    
-    return thread
+        }
 
-def parse_plain(text: str) -> List[Dict[str, Any]]:
-    """Parsar plain text genom att dela på meningar och alternera talare."""
-    thread = []
-    
-    # Dela på meningar (punkt, utropstecken, frågetecken)
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    if not sentences:
-        # Om inga meningar hittades, behandla hela texten som en tur
-        return [{
-            "speaker": "UNKNOWN",
-            "text": text,
-            "ts": 0,
-            "turn": 1
-        }]
+def parse_structured(text: str) -> List[Dict[str, Any]]:
+    """Parsar strukturerad dialog med markörer."""
+    return list(iter_structured(text.split("\n")))
+
+def iter_plain(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Parsar plain text radvis: delar på meningar och alternerar talare.
     
-    # Alternera mellan P1 och P2
+    Raderna skannas en i taget. En meningsgräns över en radbrytning syns genom
+    att föregående rads sista tecken läggs framför raden, så bara den
+    påbörjade meningen hålls i minnet.
+    """
     speakers = ["P1", "P2"]
-    current_speaker_idx = 0
+    pending: List[str] = []   # påbörjad mening
+    group: List[str] = []     # meningar i aktuell tur
+    last = ""
+    idx = 0
     
-    # Gruppera meningar i turer (2-3 meningar per tur)
-    turn_size = 2
-    for i in range(0, len(sentences), turn_size):
-        turn_sentences = sentences[i:i+turn_size]
-        speaker = speakers[current_speaker_idx % len(speakers)]
-        
-        thread.append({
-            "speaker": speaker,
-            "text": " ".join(turn_sentences),
-            "ts": i // turn_size,
-            "turn": (i // turn_size) + 1
-        })
-        
-        current_speaker_idx += 1
+    for k, line in enumerate(lines):
+        piece = "\n" + line if k else line
+        parts = SENT_SPLIT_RE.split(last + piece)
+        parts[0] = parts[0][len(last):]
+        if piece:
+            last = piece[-1]
+        for part in parts[:-1]:
+            pending.append(part)
+            sentence = "".join(pending).strip()
+            pending = []
+            if sentence:
+                group.append(sentence)
+                if len(group) == PLAIN_TURN_SIZE:
+                    yield {"speaker": speakers[idx % len(speakers)], "text": " ".join(group),
+                           "ts": idx, "turn": idx + 1}
+                    idx += 1
+                    group = []
+        pending.append(parts[-1])
     
-    return thread
+    sentence = "".join(pending).strip()
+    if sentence:
+        group.append(sentence)
+    if group:
+        yield {"speaker": speakers[idx % len(speakers)], "text": " ".join(group),
+               "ts": idx, "turn": idx + 1}
+    elif idx == 0:
+        # Om inga meningar hittades, behandla hela texten som en tur
+        yield {"speaker": "UNKNOWN", "text": "".join(pending), "ts": 0, "turn": 1}
+
+def parse_plain(text: str) -> List[Dict[str, Any]]:
+    """Parsar plain text genom att dela på meningar och alternera talare."""
+    return list(iter_plain(text.split("\n")))
+
+def _json_turn(item: Dict[str, Any], i: int) -> Dict[str, Any]:
+    return {
+        "speaker": item.get("speaker", "UNKNOWN"),
+        "text": item.get("text", ""),
+        "ts": item.get("ts", i),
+        "turn": item.get("turn", i + 1)
+    }
 
 def parse_json_structure(data: Any) -> List[Dict[str, Any]]:
     """Parsar JSON-strukturerad dialog."""
@@ -226,15 +262,41 @@ def parse_json_structure(data: Any) -> List[Dict[str, Any]]:
     if isinstance(data, list):
         for i, item in enumerate(data):
             if isinstance(item, dict):
-                thread.append({
-                    "speaker": item.get("speaker", "UNKNOWN"),
-                    "text": item.get("text", ""),
-                    "ts": item.get("ts", i),
-                    "turn": item.get("turn", i + 1)
-                })
+                thread.append(_json_turn(item, i))
     
     return thread
 
+def iter_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parsar JSON-rader (en tur per rad); tomma och trasiga rader hoppas över."""
+    i = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(item, dict):
+            yield _json_turn(item, i)
+        i += 1
+
+def iter_turns(source: Source, fmt: str = "auto") -> Iterator[Dict[str, Any]]:
+    """
+    Strömmande parsning av en chattexport (sökväg, textström eller rader).
+    
+    Ger samma turer som run() för samma text, men en i taget och utan att
+    läsa in hela exporten.
+    """
+    lines: Iterable[str] = iter_lines(source)
+    if not fmt or fmt == "auto":
+        head, lines = peek(lines, FORMAT_PEEK_LINES)
+        fmt = detect_format_lines(head)
+    if fmt == "jsonl":
+        return iter_jsonl(lines)
+    if fmt == "structured":
+        return iter_structured(lines)
+    return iter_plain(lines)
+
 # -------------------- Core -------------------- #
 def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
     data = payload.get("data", {}) or {}
@@ -257,6 +319,8 @@ def run(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
         format_detected = "structured"
     elif format_type == "structured":
         thread = parse_structured(description)
+    elif format_type == "jsonl":
+        thread = list(iter_jsonl(description.split("\n")))
     else:
         thread = parse_plain(description)
     
@@ -284,6 +348,11 @@ def main() -> None:
     t0 = time.time()
     try:
         args = parse_args(sys.argv[1:])
+        if args.input:
+            # Strömmande läge: en JSON-rad per tur, ingen payload
+            source = sys.stdin if args.input == "-" else args.input
+            write_jsonl(iter_turns(source, args.format or "auto"), sys.stdout)
+            return
         payload = load_payload(args)
         meta = payload.get("meta", {}) or {}
         
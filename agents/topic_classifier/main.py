@@ -50,9 +50,24 @@ Output:
   },
   "checks": {"CHK-TOPIC-F1": {"pass": true, "score": 0.83}}
 }
+
+Batch: data.texts = ["…", "…"] ger emits.results (en post per text med tags,
+topic_scores, spans och ev. metrics mot data.labels_true[i]).
+
+Topics-konfigurationen kompileras till en TopicModel: unika nålar
+(keywords/phrases efter normalize) som features, en gles topics × features-
+viktmatris och förkompilerade regex. Poängen är en gles matris × vektor-
+produkt över nålarnas träffantal. Modeller för meta.topics cachas per hash av
+konfigurationen (TOPIC_MODEL_CACHE).
 """
-import sys, json, time, argparse, re, unicodedata
-from typing import Any, Dict, List, Tuple
+import sys, os, json, time, argparse, re, unicodedata, hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.6.0"
 AGENT_ID = "topic_classifier"
@@ -101,51 +116,121 @@ def find_all_spans(text: str, needle: str) -> List[Tuple[int,int]]:
         start = i + len(needle)
     return res
 
+# ---------------- Topic model ---------------- #
+DEFAULT_TOPICS = {
+    "kommunikation": {"keywords": ["prata","samtal","dialog","kommunikation","lyssna","säga",
+                                   "talk","conversation","dialogue","communication","listen","speak"]},
+    "konflikt": {"keywords": ["konflikt","bråk","argument","dispute","fight","disagreement"]},
+    "känslor": {"keywords": ["känslor","ledsen","arg","glad","emotional","sad","angry","happy"]}
+}
+
+TOPIC_MODEL_CACHE = int(os.getenv("TOPIC_MODEL_CACHE", "64"))
+
+class TopicModel:
+    """
+    Kompilerad topics-konfiguration.
+
+    features   unika normaliserade keywords/phrases; träffantalet per feature
+               är antalet icke-överlappande förekomster (str.count, samma som
+               find_all_spans)
+    rows       gles viktmatris, en rad per ämne: (feature, vikt, regel) i
+               konfigurationens ordning - dubbletter ger egna poster, precis
+               som i den gamla loopen
+    regex      förkompilerade (mönster, vikt) per ämne; ogiltiga hoppas över
+    bias       prior per ämne
+    """
+
+    def __init__(self, topics_cfg: Dict[str, Any]):
+        self.topics: List[str] = list(topics_cfg.keys())
+        self.features: List[str] = []
+        self.rows: List[List[Tuple[int, float, str]]] = []
+        self.regex: List[List[Tuple[Pattern, float]]] = []
+        self.bias: List[float] = []
+        index: Dict[str, int] = {}
+        for topic in self.topics:
+            topic_cfg = topics_cfg.get(topic, {}) or {}
+            row: List[Tuple[int, float, str]] = []
+            for key, weight_key, default_w, rule in (("keywords", "kw_weight", 1.0, "kw"),
+                                                     ("phrases", "ph_weight", 1.5, "ph")):
+                needles = [n for n in (normalize(x) for x in topic_cfg.get(key, []) or []) if n]
+                if not needles:
+                    continue
+                w = float(topic_cfg.get(weight_key, default_w))
+                for needle in needles:
+                    j = index.get(needle)
+                    if j is None:
+                        j = index[needle] = len(self.features)
+                        self.features.append(needle)
+                    row.append((j, w, rule))
+            rxs: List[Tuple[Pattern, float]] = []
+            for rx_pat in topic_cfg.get("regex", []) or []:
+                try:
+                    rxs.append((re.compile(rx_pat, re.I), float(topic_cfg.get("rx_weight", 2.0))))
+                except Exception:
+                    continue
+            self.rows.append(row)
+            self.regex.append(rxs)
+            self.bias.append(float(topic_cfg.get("bias", 0.0)))
+
+    def counts(self, text_norm: str) -> List[int]:
+        """Träffvektorn: antal förekomster per feature."""
+        return [text_norm.count(f) for f in self.features]
+
+    def score(self, text_norm: str, spans_out: Optional[List[Dict[str, Any]]] = None) -> Dict[str, float]:
+        """Råpoäng per ämne (viktmatris × träffvektor + regex + bias); spans om spans_out ges."""
+        counts = self.counts(text_norm)
+        hits: Dict[int, List[Tuple[int, int]]] = {}
+        scores: Dict[str, float] = {}
+        for t, topic in enumerate(self.topics):
+            total = 0.0
+            for j, w, rule in self.rows[t]:
+                c = counts[j]
+                if not c:
+                    continue
+                total += w * c
+                if spans_out is not None:
+                    if j not in hits:
+                        hits[j] = find_all_spans(text_norm, self.features[j])
+                    for s, e in hits[j]:
+                        spans_out.append({"topic": topic, "span":[s,e], "text": text_norm[s:e], "weight": w, "rule": rule})
+            for rx, w in self.regex[t]:
+                for m in rx.finditer(text_norm):
+                    total += w
+                    if spans_out is not None:
+                        spans_out.append({"topic": topic, "span":[m.start(), m.end()], "text": text_norm[m.start():m.end()], "weight": w, "rule":"rx"})
+            scores[topic] = total + self.bias[t]
+        return scores
+
+_models: "OrderedDict[str, TopicModel]" = OrderedDict()
+
+def topics_key(topics_cfg: Dict[str, Any]) -> str:
+    # Ordningen på ämnen och nyckelord påverkar ranking/spans - ingen sort_keys
+    raw = json.dumps(topics_cfg, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def get_model(topics_cfg: Optional[Dict[str, Any]]) -> TopicModel:
+    """Kompilerad modell för konfigurationen (default-ämnen om tom), cachad per hash."""
+    topics_cfg = topics_cfg or DEFAULT_TOPICS
+    key = topics_key(topics_cfg)
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = TopicModel(topics_cfg)
+        while len(_models) > max(1, TOPIC_MODEL_CACHE):
+            _models.popitem(last=False)
+    else:
+        _models.move_to_end(key)
+    return model
+
 # ---------------- Scoring ---------------- #
 def score_topic(text_norm: str, topic: str, cfg: Dict[str, Any], spans_out: List[Dict[str, Any]], explain: bool) -> float:
-    topic_cfg = cfg.get(topic, {}) or {}
-    total = 0.0
-
-    # Keywords (delsträngsträff, vikt 1.0 default)
-    for kw in topic_cfg.get("keywords", []) or []:
-        k = normalize(kw)
-        if not k: continue
-        hits = find_all_spans(text_norm, k)
-        if hits:
-            w = float(topic_cfg.get("kw_weight", 1.0))
-            total += w * len(hits)
-            if explain:
-                for s, e in hits:
-                    spans_out.append({"topic": topic, "span":[s,e], "text": text_norm[s:e], "weight": w, "rule":"kw"})
-
-    # Phrases (exakt multiword, vikt 1.5 default)
-    for ph in topic_cfg.get("phrases", []) or []:
-        p = normalize(ph)
-        if not p: continue
-        hits = find_all_spans(text_norm, p)
-        if hits:
-            w = float(topic_cfg.get("ph_weight", 1.5))
-            total += w * len(hits)
-            if explain:
-                for s, e in hits:
-                    spans_out.append({"topic": topic, "span":[s,e], "text": text_norm[s:e], "weight": w, "rule":"ph"})
-
-    # Regex (vikt 2.0 default)
-    for rx_pat in topic_cfg.get("regex", []) or []:
-        try:
-            rx = re.compile(rx_pat, re.I)
-            for m in rx.finditer(text_norm):
-                w = float(topic_cfg.get("rx_weight", 2.0))
-                total += w
-                if explain:
-                    spans_out.append({"topic": topic, "span":[m.start(), m.end()], "text": text_norm[m.start():m.end()], "weight": w, "rule":"rx"})
-        except Exception:
-            continue
-
-    # Optional bias (t.ex. prior)
-    total += float(topic_cfg.get("bias", 0.0))
-
-    return total
+    """Ett ämnes poäng ur hela konfigurationens (cachade) modell."""
+    if topic not in (cfg or {}):
+        return 0.0
+    spans: Optional[List[Dict[str, Any]]] = [] if explain else None
+    score = get_model(cfg).score(text_norm, spans)[topic]
+    if spans:
+        spans_out.extend(s for s in spans if s["topic"] == topic)
+    return score
 
 def normalize_scores_linear(d: Dict[str, float]) -> Dict[str, float]:
     if not d: return {}
@@ -166,37 +251,15 @@ def f1_metrics(pred: List[str], gold: List[str]) -> Dict[str, float]:
     return {"precision": round(prec,3), "recall": round(rec,3), "f1": round(f1,3)}
 
 # ---------------- Core ---------------- #
-def run(payload: Dict[str, Any]) -> Dict[str, Any]:
-    meta = payload.get("meta", {}) or {}
-    data = payload.get("data", {}) or {}
-
-    text = data.get("text", "") or ""
-    text_norm = normalize(text)
-
-    topics_cfg = meta.get("topics") or {}  # kan ersättas från utsidan
-    if not topics_cfg:
-        # fail-safe: liten baseline
-        topics_cfg = {
-            "kommunikation": {"keywords": ["prata","samtal","dialog","kommunikation","lyssna","säga",
-                                           "talk","conversation","dialogue","communication","listen","speak"]},
-            "konflikt": {"keywords": ["konflikt","bråk","argument","dispute","fight","disagreement"]},
-            "känslor": {"keywords": ["känslor","ledsen","arg","glad","emotional","sad","angry","happy"]}
-        }
-
-    explain = bool(meta.get("explain_verbose", False))
-    top_n = int(meta.get("top_n", 3))
-    if isinstance(payload.get("cli_top_n_override"), int):  # intern – ej använd
-        top_n = payload["cli_top_n_override"]
-
+def classify(text_norm: str, model: TopicModel, top_n: int = 3, min_score: float = 0.15,
+             explain: bool = False) -> Dict[str, Any]:
+    """tags/topic_scores/spans för en normaliserad text."""
     spans: List[Dict[str, Any]] = []
-    raw_scores: Dict[str, float] = {}
-    for topic in topics_cfg.keys():
-        raw_scores[topic] = score_topic(text_norm, topic, topics_cfg, spans, explain)
+    raw_scores = model.score(text_norm, spans if explain else None)
 
     # Normalisera 0–1 och välj top-N
     norm_scores = normalize_scores_linear(raw_scores)
     ranked = sorted(norm_scores.items(), key=lambda kv: kv[1], reverse=True)
-    min_score = float(meta.get("min_score", 0.15))
     tags = [k for k, v in ranked[:top_n] if v >= min_score]
 
     # Fallback om inget över tröskel
@@ -204,16 +267,54 @@ def run(payload: Dict[str, Any]) -> Dict[str, Any]:
         # välj bästa 1–3 ändå (om nåt finns), annars några allmänna
         tags = [k for k, _ in ranked[:max(1, top_n)]] or ["kommunikation","relationer","känslor"]
 
-    emits = {
+    return {
         "tags": tags,
         "topic_scores": {k: round(float(norm_scores.get(k, 0.0)), 3) for k in tags},
         "spans": spans if explain else []
     }
 
+def classify_batch(texts: List[str], meta: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Klassa många texter med en och samma kompilerade modell."""
+    meta = meta or {}
+    model = get_model(meta.get("topics"))
+    top_n = int(meta.get("top_n", 3))
+    min_score = float(meta.get("min_score", 0.15))
+    explain = bool(meta.get("explain_verbose", False))
+    return [classify(normalize(t or ""), model, top_n, min_score, explain) for t in texts]
+
+def run_batch(data: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
+    labels = data.get("labels_true")
+    results = classify_batch(data["texts"], meta)
+    for i, emits in enumerate(results):
+        if isinstance(labels, list) and i < len(labels) and isinstance(labels[i], list):
+            emits["metrics"] = f1_metrics(emits["tags"], labels[i])
+    f1s = [r["metrics"]["f1"] for r in results if r.get("metrics")]
+    f1 = round(sum(f1s) / len(f1s), 3) if f1s else 0.85  # placeholder när gold saknas
+    return {"ok": True, "emits": {"results": results},
+            "checks": {"CHK-TOPIC-F1": {"pass": f1 >= 0.80, "score": f1}}}
+
+def run(payload: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
+    meta = payload.get("meta", {}) or {}
+    data = payload.get("data", {}) or {}
+
+    if isinstance(data.get("texts"), list):
+        return run_batch(data, meta)
+
+    model = get_model(meta.get("topics"))  # kan ersättas från utsidan; fail-safe: DEFAULT_TOPICS
+    explain = bool(meta.get("explain_verbose", False))
+    top_n = int(meta.get("top_n", 3))
+    if isinstance(payload.get("cli_top_n_override"), int):  # intern – ej använd
+        top_n = payload["cli_top_n_override"]
+    min_score = float(meta.get("min_score", 0.15))
+
+    text = data.get("text", "") or ""
+    text_norm = ensure_view(text, view).folded
+    emits = classify(text_norm, model, top_n, min_score, explain)
+
     # Metrics (om gold finns)
     metrics = {}
     if isinstance(data.get("labels_true"), list):
-        metrics = f1_metrics(tags, data["labels_true"])
+        metrics = f1_metrics(emits["tags"], data["labels_true"])
         emits["metrics"] = metrics
 
     # Checks
@@ -57,7 +57,12 @@ Output (exempel):
 }
 """
 import sys, json, time, argparse, re, unicodedata
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from lib.text.text_view import TextView, ensure_view
 
 AGENT_VERSION = "1.7.0"
 AGENT_ID = "tox_nuance"
@@ -247,7 +252,7 @@ def metrics_from_labels(pred: Dict[str, Any], gold: Dict[str, Any]) -> Dict[str,
     return {"precision": round(prec,3), "recall": round(rec,3), "f1": round(f1,3)}
 
 # ---------------- Core ---------------- #
-def analyze(text: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+def analyze(text: str, meta: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
     thr = meta.get("tox_thresholds") or {"warn": 0.4, "red": 0.75}
     W = meta.get("weights") or {"sarcasm":0.35,"irony":0.20,"aggression":0.35,"style":0.10}
     profanity_boost = float(meta.get("profanity_boost", 0.25))
@@ -256,7 +261,7 @@ def analyze(text: str, meta: Dict[str, Any]) -> Dict[str, Any]:
     emoji_boost = float(meta.get("emoji_boost", 0.08))
 
     raw = text or ""
-    norm = normalize(raw)
+    norm = ensure_view(raw, view).folded
     spans: List[Dict[str, Any]] = []
 
     sarc_score = score_sarcasm(raw, norm, meta.get("lang","auto"), spans)
@@ -293,12 +298,12 @@ def analyze(text: str, meta: Dict[str, Any]) -> Dict[str, Any]:
     }
     return result
 
-def run(payload: Dict[str, Any]) -> Dict[str, Any]:
+def run(payload: Dict[str, Any], view: Optional[TextView] = None) -> Dict[str, Any]:
     meta = payload.get("meta", {}) or {}
     data = payload.get("data", {}) or {}
 
     text = data.get("text", "") or ""
-    nuance = analyze(text, meta)
+    nuance = analyze(text, meta, view=view)
 
     emits = {"nuance": nuance}
 
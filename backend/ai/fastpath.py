@@ -10,17 +10,12 @@ from __future__ import annotations
 import re
 from typing import Dict, Any, Optional, Literal
 
+from lib.text.prescan import NEGATIVE_PATTERN, prescan
+
 
 # Negativa nyckelord som spärrar FastPath
 # Inkluderar konflikt/kris-ord OCH jailbreak-termer (för Shield-compliance)
-NEGATIVE_KEYWORDS = re.compile(
-    r"(misshandel|våld|självmord|kris|panik|hot|polis|barn|droger|sjukhus|konflikt|"
-    r"ignore\s+(all|previous|prior)\s+(rules|instructions)|"
-    r"reveal\s+(your\s+)?(password|api\s+key|token|system\s+prompt|instructions)|"
-    r"system\s+prompt|override\s+(safety|rules)|"
-    r"what\s+is\s+(your\s+)?(password|api|token))",
-    re.IGNORECASE
-)
+NEGATIVE_KEYWORDS = re.compile(NEGATIVE_PATTERN, re.IGNORECASE)
 
 # Hälsningslexikon (expanderat)
 GREETING_PATTERN = re.compile(
@@ -65,6 +60,7 @@ def check_fastpath(
     text: str,
     lang: str = "sv",
     min_confidence: float = 0.90,
+    scan: Optional[Dict[str, Any]] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Check if case qualifies for fastpath.
@@ -75,6 +71,7 @@ def check_fastpath(
         text: Input text
         lang: Language code
         min_confidence: Minimum confidence required for fastpath
+        scan: Optional prescan result for the same text (NEGATIVE_KEYWORDS-träffar)
         
     Returns:
         {
@@ -89,10 +86,12 @@ def check_fastpath(
         return None
     
     text_clean = text.strip()
-    text_lower = text_clean.lower()
     
     # Spärr: Negativa nyckelord → INGEN FastPath
-    if NEGATIVE_KEYWORDS.search(text_lower):
+    # (NEGATIVE_KEYWORDS ingår i den gemensamma prescan-skanningen)
+    if scan is None:
+        scan = prescan(text)
+    if scan["negative"]:
         return None
     
     # Kort text-check: chars ≤ 55 eller tokens ≤ 10 (generösare för 20-30% coverage)
@@ -150,6 +149,7 @@ def should_use_fastpath(
     lang: str = "sv",
     complexity_hints: Optional[Dict[str, Any]] = None,
     safety_flags: Optional[Dict[str, Any]] = None,
+    scan: Optional[Dict[str, Any]] = None,
 ) -> bool:
     """
     Determine if fastpath should be used.
@@ -165,6 +165,7 @@ def should_use_fastpath(
         lang: Language code
         complexity_hints: Complexity hints from other agents
         safety_flags: Safety flags
+        scan: Optional prescan result for the same text
         
     Returns:
         bool: True if fastpath should be used
@@ -187,7 +188,7 @@ def should_use_fastpath(
         return False
     
     # Check if pattern matches
-    result = check_fastpath(text, lang)
+    result = check_fastpath(text, lang, scan=scan)
     return result is not None
 
 
@@ -17,6 +17,8 @@ import re
 import hashlib
 from typing import Dict, Any, Literal, Optional
 
+from lib.text.prescan import prescan
+
 # Load routing configuration
 ROOT = pathlib.Path(__file__).resolve().parents[3]
 CONFIG_PATH = ROOT / "config" / "model_routing.json"
@@ -81,14 +83,8 @@ def estimate_confidence(
     if text.count('?') >= 1:
         confidence -= 0.02
     
-    # Keyword-based complexity detection
-    text_lower = text.lower()
-    complex_keywords = [
-        "överväger", "lämna", "konflikter", "reparera", "djupa problem",
-        "förtroende", "kommunikation", "tvingad", "kontrollerande", "missförstådd",
-        "ignorerar", "ekonomi", "framtiden"
-    ]
-    complex_count = sum(1 for kw in complex_keywords if kw in text_lower)
+    # Keyword-based complexity detection (delad prescan-skanning)
+    complex_count = len(prescan(text)["router_complex"])
     if complex_count >= 3:
         confidence -= 0.27  # Very complex keywords (mild sänkt)
     elif complex_count >= 2:
@@ -132,10 +128,7 @@ def complexity_flags(text: str, lang: str = "sv") -> Dict[str, Any]:
     ents = len(set(capitalized))  # Unique capitalized words
     
     # Conflict/stark affekt keywords
-    has_conflict = bool(re.search(
-        r"(gräl|bråk|hot|svek|otrohet|abuse|threat|gaslight|manipulera|kontrollerande)",
-        text, re.IGNORECASE
-    ))
+    has_conflict = bool(prescan(text)["router_conflict"])
     
     # Mixed language (Swedish + English)
     mixed_lang = bool(re.search(
@@ -8,6 +8,8 @@
  * - Per-call timeout (750ms)
  * - Schema-validering (Zod)
  * - Auto-respawn vid crash
+ * - Pipelining: flera requests i flykten per worker, svar matchas på trace_id
+ * - Batch: {"batch": [...]} → en rad per worker istället för en per text
  * 
  * Protokoll: JSONL över stdin/stdout (line-framed)
  */
@@ -38,18 +40,37 @@ const MicroMoodResponseSchema = z.object({
   red_hint: z.string().nullable().optional(),
   latency_ms: z.number().optional(),
   error: z.string().optional(),
+  trace_id: z.string().optional(),
+});
+
+const MicroMoodBatchItemSchema = z.object({
+  text: z.string(),
+  lang: z.enum(["sv", "en", "auto"]).optional(),
+  trace_id: z.string().optional(),
 });
 
 type MicroMoodRequest = z.infer<typeof MicroMoodRequestSchema>;
 type MicroMoodResponse = z.infer<typeof MicroMoodResponseSchema>;
+export type MicroMoodBatchItem = z.infer<typeof MicroMoodBatchItemSchema>;
+
+interface MicroMoodBatchResponse {
+  ok: boolean;
+  agent: "micro_mood";
+  batch?: MicroMoodResponse[];
+  count?: number;
+  latency_ms?: number;
+  error?: string;
+  trace_id?: string;
+}
 
 // -------------------- Bridge Configuration -------------------- //
 
-interface BridgeConfig {
+export interface BridgeConfig {
   agentName: string;
   pythonScript: string;
   poolSize: number;
   callTimeoutMs: number;
+  batchItemTimeoutMs: number;
   circuitBreakerThreshold: number;
   circuitBreakerResetMs: number;
 }
@@ -87,6 +108,7 @@ function getDefaultConfig(): BridgeConfig {
     pythonScript: resolveAgent(path.join("emotion", "micro_mood.py")),
     poolSize: 2, // 2-4 workers enligt spec
     callTimeoutMs: 750, // Per-call timeout
+    batchItemTimeoutMs: 20, // Extra timeout per batch-item
     circuitBreakerThreshold: 5, // 5 fel → circuit open
     circuitBreakerResetMs: 30000, // 30s innan reset
   };
@@ -141,24 +163,26 @@ class CircuitBreaker {
 
 // -------------------- Worker Pool -------------------- //
 
+interface PendingCall {
+  resolve: (response: any) => void;
+  reject: (error: Error) => void;
+  timeout: NodeJS.Timeout;
+}
+
 interface Worker {
   process: ChildProcess;
-  busy: boolean;
-  pending: Array<{
-    request: string;
-    requestData: MicroMoodRequest; // Store for logging
-    resolve: (response: MicroMoodResponse) => void;
-    reject: (error: Error) => void;
-    timeout: NodeJS.Timeout;
-  }>;
+  // Pipelining: flera requests i flykten per worker, matchas på trace_id
+  pending: Map<string, PendingCall>;
   stderrBuffer: string;
   crashCount: number;
 }
 
-class PyBridgePool {
+export class PyBridgePool {
   private workers: Worker[] = [];
   private circuitBreaker: CircuitBreaker;
   private config: BridgeConfig;
+  private seq = 0;
+  private closed = false;
 
   constructor(config: BridgeConfig = DEFAULT_CONFIG) {
     this.config = config;
@@ -175,13 +199,15 @@ class PyBridgePool {
 
   private spawnWorker(): Worker {
     const pythonBin = process.env.PYTHON_BIN || "python";
-    // Re-resolve path at runtime in case cwd changed
+    // Re-resolve path at runtime if the configured script is gone (cwd/deploy changed)
     let scriptPath = this.config.pythonScript;
-    try {
-      scriptPath = resolveAgent(path.join("emotion", "micro_mood.py"));
-    } catch (e) {
-      // Fallback to config path if resolve fails
-      console.warn(`[PyBridge] Failed to re-resolve agent path, using config: ${scriptPath}`);
+    if (!fs.existsSync(scriptPath)) {
+      try {
+        scriptPath = resolveAgent(path.join("emotion", "micro_mood.py"));
+      } catch (e) {
+        // Fallback to config path if resolve fails
+        console.warn(`[PyBridge] Failed to re-resolve agent path, using config: ${scriptPath}`);
+      }
     }
     
     const worker: Worker = {
@@ -193,15 +219,14 @@ class PyBridgePool {
           PYTHONUNBUFFERED: "1",
         },
       }),
-      busy: false,
-      pending: [],
+      pending: new Map(),
       stderrBuffer: "",
       crashCount: 0,
     };
 
     let lineBuffer = "";
 
-    // stdout: JSONL responses
+    // stdout: JSONL responses (kan komma i annan ordning än requests)
     worker.process.stdout?.on("data", (chunk: Buffer) => {
       lineBuffer += chunk.toString("utf-8");
       const lines = lineBuffer.split("\n");
@@ -211,8 +236,8 @@ class PyBridgePool {
         if (!line.trim()) continue;
         
         try {
-          const response: MicroMoodResponse = JSON.parse(line);
-          const pending = worker.pending.shift();
+          const response = JSON.parse(line);
+          const pending = this.takePending(worker, response.trace_id);
           
           if (pending) {
             clearTimeout(pending.timeout);
@@ -234,21 +259,22 @@ class PyBridgePool {
     worker.process.on("exit", (code) => {
       worker.crashCount++;
       
-      if (code !== 0 && code !== null) {
+      if (code !== 0 && code !== null && !this.closed) {
         console.warn(`[PyBridge] Worker crashed (exit ${code}), respawning...`);
         
         // Reject all pending requests
-        for (const pending of worker.pending) {
+        for (const pending of worker.pending.values()) {
           clearTimeout(pending.timeout);
           pending.reject(new Error(`Worker crashed (exit ${code})`));
         }
-        worker.pending = [];
+        worker.pending.clear();
         
         // Respawn after short delay
         setTimeout(() => {
           const idx = this.workers.indexOf(worker);
-          if (idx >= 0) {
-            this.workers[idx] = this.spawnWorker();
+          if (idx >= 0 && !this.closed) {
+            this.workers.splice(idx, 1);
+            this.spawnWorker();
           }
         }, 1000);
       }
@@ -258,6 +284,99 @@ class PyBridgePool {
     return worker;
   }
 
+  // Svar matchas på trace_id. Bara svar helt utan id (t.ex. parse-fel i workern) tar
+  // äldsta väntande; ett okänt id är ett sent svar på en request som redan timeat ut
+  // (send() tar bort sin post) och får aldrig lösa ett annat anrop.
+  private takePending(worker: Worker, traceId?: string): PendingCall | undefined {
+    let key: string | undefined;
+    if (traceId === undefined || traceId === null || traceId === "") {
+      key = worker.pending.keys().next().value;
+    } else if (worker.pending.has(traceId)) {
+      key = traceId;
+    } else {
+      console.warn(`[PyBridge] Dropping reply with unknown trace_id ${traceId} (late reply after timeout?)`);
+      return undefined;
+    }
+    if (key === undefined) return undefined;
+    const pending = worker.pending.get(key);
+    worker.pending.delete(key);
+    return pending;
+  }
+
+  // Worker med minst antal requests i flykten
+  private pickWorker(): Worker | undefined {
+    let best: Worker | undefined;
+    for (const w of this.workers) {
+      if (!w.process.pid || !w.process.stdin?.writable) continue;
+      if (!best || w.pending.size < best.pending.size) best = w;
+    }
+    return best;
+  }
+
+  private timeoutResponse(timeoutMs: number): MicroMoodResponse {
+    return {
+      ok: false,
+      agent: "micro_mood",
+      error: `Timeout (>${timeoutMs}ms)`,
+      score: 0.0,
+      level: "neutral",
+    };
+  }
+
+  // Skicka en rad utan att vänta på tidigare svar; wire-id är unikt per pool
+  private send(worker: Worker, payload: Record<string, unknown>, timeoutMs: number): Promise<any> {
+    const wireId = `mm${++this.seq}`;
+    return new Promise((resolve, reject) => {
+      const timeout = setTimeout(() => {
+        worker.pending.delete(wireId);
+        resolve(this.timeoutResponse(timeoutMs));
+      }, timeoutMs);
+
+      worker.pending.set(wireId, { resolve, reject, timeout });
+
+      if (worker.process.stdin?.writable) {
+        worker.process.stdin.write(JSON.stringify({ ...payload, trace_id: wireId }) + "\n");
+      } else {
+        clearTimeout(timeout);
+        worker.pending.delete(wireId);
+        reject(new Error("Worker stdin not writable"));
+      }
+    });
+  }
+
+  private logEvent(request: { text: string; lang?: string; trace_id?: string }, response: MicroMoodResponse) {
+    // Log emotion event
+    if (response.ok && response.score !== undefined && response.level) {
+      try {
+        const event = {
+          ts: new Date().toISOString(),
+          trace_id: request.trace_id,
+          agent: "micro_mood" as const,
+          level: ((response.level === "red" ? "red" : response.level) || "neutral") as "neutral" | "light" | "plus" | "red",
+          score: response.score || 0.0,
+          lang: ((request.lang === "auto" ? "sv" : request.lang) || "sv") as "sv" | "en",
+          len_chars: request.text.length,
+          latency_ms: response.latency_ms || 0,
+        };
+        
+        emotionLogger.log(event);
+      } catch (err: unknown) {
+        // emotionLogger.log() is fail-safe, but catch any type errors
+        console.error("[PyBridge] Failed to log emotion event", err);
+      }
+    }
+  }
+
+  private failureResponse(error: string): MicroMoodResponse {
+    return {
+      ok: false,
+      agent: "micro_mood",
+      error,
+      score: 0.0,
+      level: "neutral",
+    };
+  }
+
   async call(request: MicroMoodRequest): Promise<MicroMoodResponse> {
     // Validate request
     const validated = MicroMoodRequestSchema.parse(request);
@@ -266,139 +385,90 @@ class PyBridgePool {
     if (!this.circuitBreaker.canAttempt()) {
       const state = this.circuitBreaker.getState();
       console.warn(`[PyBridge] Circuit breaker ${state}, returning neutral fallback`);
-      return {
-        ok: false,
-        agent: "micro_mood",
-        error: "Circuit breaker open",
-        score: 0.0,
-        level: "neutral",
-      };
+      return this.failureResponse("Circuit breaker open");
     }
 
-    // Find available worker
-    const worker = this.workers.find(w => !w.busy && w.process.pid);
-    
+    const worker = this.pickWorker();
     if (!worker) {
-      // All workers busy, use first available
-      const available = this.workers[0];
-      if (available && available.process.pid) {
-        return new Promise((resolve, reject) => {
-          const timeout = setTimeout(() => {
-            const idx = available.pending.findIndex(p => p.request === JSON.stringify(validated));
-            if (idx >= 0) {
-              available.pending.splice(idx, 1);
-            }
-            this.circuitBreaker.recordFailure();
-            resolve({
-              ok: false,
-              agent: "micro_mood",
-              error: `Timeout (>${this.config.callTimeoutMs}ms)`,
-              score: 0.0,
-              level: "neutral",
-            });
-          }, this.config.callTimeoutMs);
-
-          available.pending.push({
-            request: JSON.stringify(validated),
-            requestData: validated,
-            resolve,
-            reject,
-            timeout,
-          });
-
-          if (available.process.stdin?.writable) {
-            available.process.stdin.write(JSON.stringify(validated) + "\n");
-          }
-        });
-      }
-      
       // Fallback if no workers
-      return {
-        ok: false,
-        agent: "micro_mood",
-        error: "No available workers",
-        score: 0.0,
-        level: "neutral",
-      };
+      return this.failureResponse("No available workers");
     }
 
-    // Send request
-    return new Promise((resolve, reject) => {
-      const timeout = setTimeout(() => {
-        const idx = worker.pending.findIndex(p => p.request === JSON.stringify(validated));
-        if (idx >= 0) {
-          worker.pending.splice(idx, 1);
-        }
+    try {
+      const response: MicroMoodResponse = await this.send(worker, validated, this.config.callTimeoutMs);
+      if (!response.ok) {
         this.circuitBreaker.recordFailure();
-        resolve({
-          ok: false,
-          agent: "micro_mood",
-          error: `Timeout (>${this.config.callTimeoutMs}ms)`,
-          score: 0.0,
-          level: "neutral",
-        });
-      }, this.config.callTimeoutMs);
-
-      worker.pending.push({
-        request: JSON.stringify(validated),
-        requestData: validated,
-        resolve: (response: MicroMoodResponse) => {
-          clearTimeout(timeout);
-          
-          if (!response.ok) {
-            this.circuitBreaker.recordFailure();
-          }
-          
-          // Log emotion event
-          if (response.ok && response.score !== undefined && response.level) {
-            try {
-              const event = {
-                ts: new Date().toISOString(),
-                trace_id: validated.trace_id,
-                agent: "micro_mood" as const,
-                level: ((response.level === "red" ? "red" : response.level) || "neutral") as "neutral" | "light" | "plus" | "red",
-                score: response.score || 0.0,
-                lang: ((validated.lang === "auto" ? "sv" : validated.lang) || "sv") as "sv" | "en",
-                len_chars: validated.text.length,
-                latency_ms: response.latency_ms || 0,
-              };
-              
-              emotionLogger.log(event);
-            } catch (err: unknown) {
-              // emotionLogger.log() is fail-safe, but catch any type errors
-              console.error("[PyBridge] Failed to log emotion event", err);
+      }
+      this.logEvent(validated, response);
+      return { ...response, trace_id: validated.trace_id };
+    } catch (error: any) {
+      this.circuitBreaker.recordFailure();
+      // Return fallback neutral response
+      return this.failureResponse(error?.message || "Unknown error");
+    }
+  }
+
+  /**
+   * Batch: en IPC-rad per worker istället för en per text. Batchen delas över
+   * poolens workers och körs parallellt; svaren returneras i input-ordning.
+   */
+  async callBatch(items: MicroMoodBatchItem[], lang: "sv" | "en" | "auto" = "auto"): Promise<MicroMoodResponse[]> {
+    const validated = items.map(it => MicroMoodBatchItemSchema.parse(it));
+    if (validated.length === 0) return [];
+
+    if (!this.circuitBreaker.canAttempt()) {
+      const state = this.circuitBreaker.getState();
+      console.warn(`[PyBridge] Circuit breaker ${state}, returning neutral fallback`);
+      return validated.map(() => this.failureResponse("Circuit breaker open"));
+    }
+
+    const workers = this.workers.filter(w => w.process.pid && w.process.stdin?.writable);
+    if (workers.length === 0) {
+      return validated.map(() => this.failureResponse("No available workers"));
+    }
+
+    const size = Math.ceil(validated.length / workers.length);
+    const parts: Promise<MicroMoodResponse[]>[] = [];
+    for (let i = 0, w = 0; i < validated.length; i += size, w++) {
+      const chunk = validated.slice(i, i + size);
+      const timeoutMs = this.config.callTimeoutMs + this.config.batchItemTimeoutMs * chunk.length;
+      parts.push(
+        this.send(workers[w], { agent: "micro_mood", batch: chunk, lang }, timeoutMs)
+          .then((response: MicroMoodBatchResponse) => {
+            if (!response.ok || !Array.isArray(response.batch) || response.batch.length !== chunk.length) {
+              this.circuitBreaker.recordFailure();
+              return chunk.map(() => this.failureResponse(response.error || "Batch failed"));
             }
-          }
-          
-          resolve(response);
-        },
-        reject: (error: Error) => {
-          clearTimeout(timeout);
-          this.circuitBreaker.recordFailure();
-          
-          // Return fallback neutral response
-          resolve({
-            ok: false,
-            agent: "micro_mood",
-            error: error.message || "Unknown error",
-            score: 0.0,
-            level: "neutral",
-          });
-        },
-        timeout,
-      });
+            return response.batch.map((r, j) => {
+              this.logEvent({ ...chunk[j], lang: chunk[j].lang ?? lang }, r);
+              return r;
+            });
+          })
+          .catch((error: any) => {
+            this.circuitBreaker.recordFailure();
+            return chunk.map(() => this.failureResponse(error?.message || "Unknown error"));
+          })
+      );
+    }
+    return (await Promise.all(parts)).flat();
+  }
 
-      if (worker.process.stdin?.writable) {
-        worker.process.stdin.write(JSON.stringify(validated) + "\n");
-      } else {
-        clearTimeout(timeout);
-        const idx = worker.pending.findIndex(p => p.request === JSON.stringify(validated));
-        if (idx >= 0) {
-          worker.pending.splice(idx, 1);
-        }
-        reject(new Error("Worker stdin not writable"));
+  async shutdown(): Promise<void> {
+    this.closed = true;
+    await Promise.all(this.workers.map(w => new Promise<void>(resolve => {
+      for (const pending of w.pending.values()) {
+        clearTimeout(pending.timeout);
+        pending.reject(new Error("Pool shut down"));
       }
-    });
+      w.pending.clear();
+      if (w.process.exitCode !== null || !w.process.stdin?.writable) {
+        resolve();
+        return;
+      }
+      w.process.once("exit", () => resolve());
+      w.process.stdin.end();
+    })));
+    this.workers = [];
   }
 }
 
@@ -433,3 +503,25 @@ export async function callMicroMood(
     trace_id: traceId,
   });
 }
+
+/**
+ * Score many texts with one JSONL round-trip per worker (golden runs, sweeps).
+ * Responses are returned in input order; item trace_ids are echoed back.
+ */
+export async function callMicroMoodBatch(
+  items: MicroMoodBatchItem[],
+  lang: "sv" | "en" | "auto" = "auto"
+): Promise<MicroMoodResponse[]> {
+  return getPyBridgePool().callBatch(items, lang);
+}
+
+/**
+ * Stop all workers (tests/scripts); next call spawns a new pool.
+ */
+export async function shutdownPyBridgePool(): Promise<void> {
+  const pool = poolInstance;
+  poolInstance = null;
+  if (pool) {
+    await pool.shutdown();
+  }
+}
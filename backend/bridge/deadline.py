@@ -0,0 +1,178 @@
+"""
+Deadline - per-request latensbudget för relation-pipelinen.
+
+Varje steg deklarerar en kostnadsklass och om det är required/optional.
+Schemaläggaren kör required-steg alltid; optional-steg körs fullt om
+budgeten räcker, trunkeras om bara en del av kostnaden ryms, annars hoppas
+de över. Vilka steg som degraderats rapporteras i svaret så att tail latency
+hålls inom budget vid lasttoppar.
+
+Kostnadsskattning: klassens grundvärde tills steget har körts, därefter en
+EWMA av uppmätta körtider (per process).
+
+En deadline kan också avbrytas (`cancel()`), t.ex. när safety-lanen svarar
+RED medan pipelinen körs spekulativt; nästa steg kastar då StageCancelled.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Grundskattning per kostnadsklass (ms)
+COST_CLASS_MS = {
+    "cheap": float(os.getenv("REL_COST_CHEAP_MS", "2")),
+    "medium": float(os.getenv("REL_COST_MEDIUM_MS", "10")),
+    "heavy": float(os.getenv("REL_COST_HEAVY_MS", "40")),
+}
+
+# Andel av full kostnad som måste rymmas för en trunkerad körning
+TRUNCATE_FRACTION = 0.25
+
+EWMA_ALPHA = 0.2
+
+
+class StageCancelled(BaseException):
+    """
+    Requesten avbröts mellan två steg. BaseException (som asyncio.CancelledError)
+    så att stegens egna `except Exception`-fallbacks inte sväljer avbrottet.
+    """
+
+
+class StageSpec:
+    """Deklaration av ett pipeline-steg: kostnadsklass + required/optional."""
+
+    __slots__ = ("name", "cost_class", "required", "truncatable")
+
+    def __init__(self, name: str, cost_class: str = "cheap", required: bool = True, truncatable: bool = False):
+        if cost_class not in COST_CLASS_MS:
+            raise ValueError(f"Unknown cost class: {cost_class}")
+        self.name = name
+        self.cost_class = cost_class
+        self.required = required
+        self.truncatable = truncatable
+
+
+class _CostModel:
+    """EWMA av uppmätta stegtider (trådsäker)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ewma: Dict[str, float] = {}
+
+    def estimate_ms(self, spec: StageSpec) -> float:
+        with self._lock:
+            return self._ewma.get(spec.name, COST_CLASS_MS[spec.cost_class])
+
+    def observe(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            prev = self._ewma.get(name)
+            self._ewma[name] = elapsed_ms if prev is None else (1 - EWMA_ALPHA) * prev + EWMA_ALPHA * elapsed_ms
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ewma.clear()
+
+
+COST_MODEL = _CostModel()
+
+
+class Deadline:
+    """
+    Absolut deadline för en request. `budget_ms=None` betyder ingen deadline
+    (alla steg körs fullt, inget rapporteras).
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None, start: Optional[float] = None):
+        self.budget_ms = None if budget_ms is None else max(0.0, float(budget_ms))
+        self.start = time.monotonic() if start is None else start
+        self.degraded: List[Dict[str, Any]] = []
+        self._cancelled = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.budget_ms is not None
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.start) * 1000.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Avbryt requesten; pågående steg körs klart, nästa steg körs inte."""
+        self._cancelled.set()
+
+    def remaining_ms(self) -> float:
+        if self.budget_ms is None:
+            return math.inf
+        return self.budget_ms - self.elapsed_ms()
+
+    def plan(self, spec: StageSpec) -> str:
+        """"full", "truncated" eller "skipped" för steget givet kvarvarande budget."""
+        if spec.required or not self.active:
+            return "full"
+        remaining = self.remaining_ms()
+        estimate = COST_MODEL.estimate_ms(spec)
+        if remaining >= estimate:
+            return "full"
+        if spec.truncatable and remaining >= estimate * TRUNCATE_FRACTION:
+            return "truncated"
+        return "skipped"
+
+    def run(
+        self,
+        spec: StageSpec,
+        fn: Callable[[], Any],
+        default: Any,
+        truncated_fn: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """Kör steget enligt plan, mät tiden och registrera degraderingar."""
+        if self._cancelled.is_set():
+            raise StageCancelled(spec.name)
+        mode = self.plan(spec)
+        if mode == "truncated" and truncated_fn is None:
+            mode = "skipped"
+        if mode != "full":
+            self.degraded.append({
+                "stage": spec.name,
+                "action": mode,
+                "remaining_ms": round(max(0.0, self.remaining_ms()), 1),
+            })
+        if mode == "skipped":
+            return default
+        t0 = time.perf_counter()
+        try:
+            return fn() if mode == "full" else truncated_fn()  # type: ignore[misc]
+        finally:
+            if mode == "full":
+                COST_MODEL.observe(spec.name, (time.perf_counter() - t0) * 1000.0)
+
+    def report(self) -> Dict[str, Any]:
+        """Fält för svaret (tomt om ingen deadline är aktiv)."""
+        if not self.active:
+            return {}
+        return {
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": round(self.elapsed_ms(), 1),
+            "degraded": list(self.degraded),
+        }
+
+
+def budget_from(value: Any = None) -> Optional[float]:
+    """Budget (ms) från request-fält eller REL_BUDGET_MS; None = ingen deadline."""
+    raw = value if value not in (None, "") else os.getenv("REL_BUDGET_MS")
+    if raw in (None, ""):
+        return None
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+__all__ = ["Deadline", "StageSpec", "StageCancelled", "COST_CLASS_MS", "COST_MODEL", "budget_from"]
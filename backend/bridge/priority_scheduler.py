@@ -0,0 +1,214 @@
+"""
+Priority Scheduler - safety-first lane + spekulativ körning med preemption.
+
+Tidigare körde orchestrator_runner consent och safety_gate sekventiellt före
+allt annat, och RED-fall väntade i samma kö som rutintrafik. Här får
+krisrelevanta agenter (SAFETY_AGENTS) en egen pool ("safety"-lanen) som aldrig
+delas med vanliga steg, så att de inte köar bakom normal last.
+
+`run_request()` startar safety-stegen först och övriga steg spekulativt
+parallellt. Så fort ett safety-resultat blockerar (t.ex. RED) avbryts den
+spekulativa delen via en CancelToken:
+- köade steg startas aldrig
+- subprocesser som registrerats på token:en dödas
+- in-process-steg avbryts vid nästa stegsgräns (Deadline.cancel)
+Normalvägen blir inte långsammare: utan block väntar vi bara på det som
+ändå hade körts, nu parallellt.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.bridge.deadline import StageCancelled
+
+
+SAFETY_AGENTS = frozenset({"safety_gate", "safety_scan", "risk_selfharm", "risk_abuse", "risk_coercion", "crisis_router"})
+
+LANE_SAFETY = "safety"
+LANE_NORMAL = "normal"
+
+SAFETY_WORKERS = int(os.getenv("REL_SAFETY_WORKERS", "2"))
+NORMAL_WORKERS = int(os.getenv("REL_NORMAL_WORKERS", "4"))
+
+# Steg: fn(token) -> resultat
+StageFn = Callable[["CancelToken"], Any]
+
+
+def lane_for(agent_id: str) -> str:
+    """Krisrelevanta agenter går i safety-lanen, allt annat i normal."""
+    return LANE_SAFETY if agent_id in SAFETY_AGENTS else LANE_NORMAL
+
+
+class CancelToken:
+    """Delad avbrytssignal för en requests spekulativa steg."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._procs: List[Any] = []
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise StageCancelled("cancelled")
+
+    def attach(self, proc: Any) -> None:
+        """Registrera en subprocess (Popen) som ska dödas vid cancel."""
+        with self._lock:
+            if not self._event.is_set():
+                self._procs.append(proc)
+                return
+        _kill(proc)
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            procs, self._procs = self._procs, []
+            callbacks, self._callbacks = self._callbacks, []
+        for proc in procs:
+            _kill(proc)
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception:
+                pass
+
+
+def _kill(proc: Any) -> None:
+    try:
+        if proc.poll() is None:
+            proc.kill()
+    except Exception:
+        pass
+
+
+class RequestOutcome:
+    """Resultat av en schemalagd request."""
+
+    __slots__ = ("blocked_by", "safety", "results", "errors", "cancelled")
+
+    def __init__(self):
+        self.blocked_by: Optional[str] = None
+        self.safety: Dict[str, Any] = {}
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.cancelled: List[str] = []
+
+    @property
+    def blocked(self) -> bool:
+        return self.blocked_by is not None
+
+
+class PriorityScheduler:
+    """
+    Två separata pooler: safety-lanen har egna workers och konkurrerar aldrig
+    med normal trafik om trådar.
+    """
+
+    def __init__(self, safety_workers: int = SAFETY_WORKERS, normal_workers: int = NORMAL_WORKERS):
+        self._pools = {
+            LANE_SAFETY: ThreadPoolExecutor(max_workers=max(1, safety_workers), thread_name_prefix="rel-safety"),
+            LANE_NORMAL: ThreadPoolExecutor(max_workers=max(1, normal_workers), thread_name_prefix="rel-normal"),
+        }
+
+    def submit(self, lane: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self._pools[lane].submit(fn, *args, **kwargs)
+
+    def run_request(
+        self,
+        safety: Dict[str, StageFn],
+        speculative: Dict[str, StageFn],
+        is_block: Callable[[str, Any], bool],
+        token: Optional[CancelToken] = None,
+    ) -> RequestOutcome:
+        """
+        Kör safety-steg i prioritetslanen och övriga steg spekulativt.
+
+        Ett safety-steg som kastar räknas som "inget block" (best-effort, som
+        tidigare). Spekulativa fel samlas i `errors` så att anroparen kan
+        välja fallback.
+        """
+        token = token or CancelToken()
+        outcome = RequestOutcome()
+
+        safety_futs = {self.submit(LANE_SAFETY, fn, token): name for name, fn in safety.items()}
+        spec_futs = {self.submit(LANE_NORMAL, _guarded, fn, token): name for name, fn in speculative.items()}
+
+        pending = set(safety_futs)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = safety_futs[fut]
+                try:
+                    res = fut.result()
+                except Exception:
+                    res = None
+                outcome.safety[name] = res
+                if outcome.blocked_by is None and is_block(name, res):
+                    outcome.blocked_by = name
+            if outcome.blocked_by is not None:
+                token.cancel()
+                for fut, name in spec_futs.items():
+                    fut.cancel()
+                    outcome.cancelled.append(name)
+                return outcome
+
+        for fut, name in spec_futs.items():
+            try:
+                outcome.results[name] = fut.result()
+            except StageCancelled:
+                outcome.cancelled.append(name)
+            except Exception as e:
+                outcome.errors[name] = e
+        return outcome
+
+    def shutdown(self, wait: bool = True) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+
+
+def _guarded(fn: StageFn, token: CancelToken) -> Any:
+    token.check()
+    return fn(token)
+
+
+_scheduler: Optional[PriorityScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> PriorityScheduler:
+    """Processens delade scheduler (skapas vid första anrop)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PriorityScheduler()
+        return _scheduler
+
+
+__all__ = [
+    "PriorityScheduler",
+    "CancelToken",
+    "RequestOutcome",
+    "SAFETY_AGENTS",
+    "LANE_SAFETY",
+    "LANE_NORMAL",
+    "lane_for",
+    "get_scheduler",
+]
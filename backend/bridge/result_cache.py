@@ -0,0 +1,364 @@
+"""
+Result Cache - content-addressed cache + in-flight coalescing för relation-pipelinen.
+
+Identiska payloads (retries från Node, golden replays, dubbla submits) ska inte
+räkna om alla agenter. Nyckeln byggs av:
+- text (exakt - svaren innehåller teckenoffsets, t.ex. explain_spans, så texten
+  får inte normaliseras om bortom typ/None-hantering)
+- lang (trim + lowercase), persona, context, dialog-hash, conversation_id
+- agent-fingerprint: AGENT_VERSION per agent (eller källkods-hash om agenten
+  saknar AGENT_VERSION) + CACHE_VERSION
+
+Invalidering: bump av AGENT_VERSION/källkod eller CACHE_VERSION ger nya nycklar;
+gamla poster nås aldrig igen och faller ut via LRU/TTL. `invalidate()` tömmer.
+
+Två nivåer:
+- ResultCache: in-process LRU + TTL, samtidiga identiska anrop (trådar) väntar
+  på EN beräkning.
+- DiskResultCache: för processer som spawnas per request (orchestrator_runner).
+  Lock-fil (O_EXCL) koalescerar samtidiga processer; TTL via mtime, maxantal filer.
+  Svaren innehåller textspans i klartext, så diskcachen är opt-in
+  (REL_DISK_CACHE=on) och ska bara slås på där runtime/ får hålla användartext.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Bumpa för att invalidera alla cachade resultat (t.ex. vid ändrad output-shape)
+CACHE_VERSION = "1"
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("REL_CACHE_MAX", "512"))
+DEFAULT_TTL_S = float(os.getenv("REL_CACHE_TTL_S", "300"))
+DISK_CACHE_DIR = ROOT / "runtime" / "result_cache"
+
+_VERSION_RE = re.compile(r"""^AGENT_VERSION\s*=\s*["']([^"']+)["']""", re.M)
+_fingerprint_memo: Dict[str, Tuple[int, int, str]] = {}
+
+
+def cache_enabled() -> bool:
+    """REL_RESULT_CACHE=off stänger av cachen (default: on)."""
+    return os.getenv("REL_RESULT_CACHE", "on").lower() not in ("off", "0", "false")
+
+
+def disk_cache_enabled() -> bool:
+    """REL_DISK_CACHE=on slår på diskcachen (default: off - den sparar svar med text)."""
+    return cache_enabled() and os.getenv("REL_DISK_CACHE", "off").lower() in ("on", "1", "true")
+
+
+def _canonical(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def agent_version(path: Path) -> str:
+    """AGENT_VERSION från källfilen, annars kort hash av källan (memo per mtime)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return "missing"
+    key = str(path)
+    memo = _fingerprint_memo.get(key)
+    if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+        return memo[2]
+    src = path.read_text(encoding="utf-8", errors="ignore")
+    m = _VERSION_RE.search(src)
+    ver = m.group(1) if m else "src:" + hashlib.sha1(src.encode("utf-8")).hexdigest()[:12]
+    _fingerprint_memo[key] = (st.st_mtime_ns, st.st_size, ver)
+    return ver
+
+
+def agent_fingerprint(paths: Iterable[Path]) -> str:
+    """Stabil hash över versionerna för en mängd agentfiler."""
+    versions = {}
+    for p in paths:
+        p = Path(p)
+        try:
+            name = p.resolve().relative_to(ROOT).as_posix()
+        except ValueError:
+            name = p.as_posix()
+        versions[name] = agent_version(p)
+    return hashlib.sha256((CACHE_VERSION + _canonical(versions)).encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(
+    *,
+    text: str,
+    lang: str = "sv",
+    dialog: Any = None,
+    persona: Any = None,
+    context: Any = None,
+    conversation_id: Any = None,
+    fingerprint: str = "",
+) -> str:
+    """Content-addressed nyckel för en relation-request."""
+    dialog_hash = hashlib.sha256(_canonical(dialog).encode("utf-8")).hexdigest()[:16] if dialog else ""
+    blob = _canonical({
+        "t": text or "",
+        "l": (lang or "sv").strip().lower(),
+        "d": dialog_hash,
+        "p": persona,
+        "c": context,
+        "cid": conversation_id,
+        "v": fingerprint,
+    })
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _Inflight:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """
+    In-process LRU + TTL med koalescering av samtidiga identiska anrop.
+
+    `get_or_compute(key, fn)` returnerar (värde, status) där status är
+    "hit", "miss" eller "coalesced". Värden returneras som djupa kopior så att
+    anropare kan mutera sina svar utan att förstöra cachen. `cacheable` kan
+    utesluta värden (t.ex. degraderade svar) från att sparas. `wait_s` begränsar
+    hur länge en koalescerad anropare väntar (t.ex. requestens kvarvarande
+    budget); går tiden ut räknar den själv istället.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, _Inflight] = {}
+        self.stats = {"hit": 0, "miss": 0, "coalesced": 0, "evicted": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_locked(self, key: str, now: float) -> Tuple[bool, Any]:
+        item = self._entries.get(key)
+        if item is None:
+            return False, None
+        stored_at, value = item
+        if now - stored_at > self.ttl_s:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            found, value = self._get_locked(key, time.monotonic())
+        return found, copy.deepcopy(value) if found else None
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+        wait_s: Optional[float] = None,
+    ) -> Tuple[Any, str]:
+        with self._lock:
+            found, value = self._get_locked(key, time.monotonic())
+            if found:
+                self.stats["hit"] += 1
+                return copy.deepcopy(value), "hit"
+            waiter = self._inflight.get(key)
+            owner = waiter is None
+            if owner:
+                waiter = self._inflight[key] = _Inflight()
+
+        if not owner:
+            if not waiter.event.wait(None if wait_s is None else max(0.0, wait_s)):
+                # Ägaren hann inte klart inom vår budget - räkna själv (utan att
+                # cacha; ägaren skriver sitt resultat när det blir klart)
+                value = compute()
+                with self._lock:
+                    self.stats["miss"] += 1
+                return value, "miss"
+            with self._lock:
+                self.stats["coalesced"] += 1
+            if waiter.error is not None:
+                raise waiter.error
+            return copy.deepcopy(waiter.value), "coalesced"
+
+        try:
+            value = compute()
+        except BaseException as e:
+            waiter.error = e
+            raise
+        else:
+            waiter.value = value
+            if cacheable is None or cacheable(value):
+                self.put(key, value)
+            with self._lock:
+                self.stats["miss"] += 1
+            return copy.deepcopy(value), "miss"
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.event.set()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Töm en nyckel eller hela cachen."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class DiskResultCache:
+    """
+    Filbaserad cache för processer som spawnas per request.
+
+    En JSON-fil per nyckel; mtime styr TTL. Första processen tar en lock-fil
+    (O_EXCL) och räknar; samtidiga processer med samma nyckel väntar på
+    resultatfilen (max `wait_s`) istället för att räkna om. Låsfiler äldre än
+    `lock_ttl_s` räknas som döda (kraschad process) och bryts.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DISK_CACHE_DIR,
+        max_entries: int = DEFAULT_MAX_ENTRIES * 4,
+        ttl_s: float = DEFAULT_TTL_S,
+        wait_s: float = 5.0,
+        lock_ttl_s: float = 30.0,
+        poll_s: float = 0.02,
+    ):
+        self.directory = Path(directory)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.wait_s = float(wait_s)
+        self.lock_ttl_s = float(lock_ttl_s)
+        self.poll_s = float(poll_s)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        p = self._path(key)
+        try:
+            if time.time() - p.stat().st_mtime > self.ttl_s:
+                return False, None
+            return True, json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False, None
+
+    def put(self, key: str, value: Any) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        p = self._path(key)
+        # Atomic write: write to temp file, then replace
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(value, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, p)
+        self._prune()
+
+    def _prune(self) -> None:
+        files = list(self.directory.glob("*.json"))
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime if f.exists() else 0.0)
+        for f in files[: len(files) - self.max_entries]:
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+    def _try_lock(self, key: str) -> bool:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = self.directory / f"{key}.lock"
+        try:
+            fd = os.open(str(lock), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > self.lock_ttl_s:
+                    lock.unlink()
+                    return self._try_lock(key)
+            except OSError:
+                pass
+            return False
+
+    def _unlock(self, key: str) -> None:
+        try:
+            (self.directory / f"{key}.lock").unlink()
+        except OSError:
+            pass
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+        wait_s: Optional[float] = None,
+    ) -> Tuple[Any, str]:
+        found, value = self.get(key)
+        if found:
+            return value, "hit"
+        if not self._try_lock(key):
+            limit = self.wait_s if wait_s is None else min(self.wait_s, max(0.0, wait_s))
+            deadline = time.monotonic() + limit
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_s)
+                found, value = self.get(key)
+                if found:
+                    return value, "coalesced"
+                if not (self.directory / f"{key}.lock").exists():
+                    break
+            # Ägaren misslyckades eller tog för lång tid - räkna själv
+            return compute(), "miss"
+        try:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                try:
+                    self.put(key, value)
+                except (OSError, TypeError, ValueError):
+                    pass
+            return value, "miss"
+        finally:
+            self._unlock(key)
+
+    def invalidate(self) -> None:
+        """Ta bort alla cachade resultat."""
+        for f in self.directory.glob("*.json"):
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+
+__all__ = [
+    "ResultCache",
+    "DiskResultCache",
+    "make_key",
+    "agent_fingerprint",
+    "agent_version",
+    "cache_enabled",
+    "disk_cache_enabled",
+    "CACHE_VERSION",
+]
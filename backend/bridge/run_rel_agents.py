@@ -3,12 +3,16 @@ from __future__ import annotations
 import json
 import sys
 import pathlib
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, Optional
 
 # Add repo root to PYTHONPATH so we can import agents
 ROOT = pathlib.Path(__file__).resolve().parents[3]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+# ...och sintari-relations-roten för backend.* när filen körs som skript
+PKG_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(PKG_ROOT) not in sys.path:
+    sys.path.insert(0, str(PKG_ROOT))
 
 def _safe_import(path: str, attr: str):
     try:
@@ -27,8 +31,64 @@ _reco = _safe_import("agents.rel.reco_agent", "recommend")
 _dialog_mem = _safe_import("agents.rel.dialog_memory_agent", "analyze")
 _speaker_label = _safe_import("agents.rel.speaker_attrib_agent", "label")
 _context_graph = _safe_import("agents.context_graph.main", "analyze")
+_context_graph_inc = _safe_import("agents.context_graph.main", "analyze_incremental")
+# Strömmande pipeline (run_stream)
+_iter_turns = _safe_import("agents.thread_parser.main", "iter_turns")
+_iter_labeled = _safe_import("agents.speaker_attrib.main", "iter_labeled")
+_label_turn = _safe_import("agents.rel.speaker_attrib_agent", "label_turn")
+_DialogMemoryFold = _safe_import("agents.rel.dialog_memory_agent", "DialogMemoryFold")
 
-def run_once_text(*, text: str, lang: str = "sv", persona: Any = None, context: Any = None) -> Dict[str, Any]:
+try:
+    from backend.bridge.result_cache import ResultCache, agent_fingerprint, cache_enabled, make_key
+    RESULT_CACHE_AVAILABLE = True
+except ImportError:
+    RESULT_CACHE_AVAILABLE = False
+
+from backend.bridge.deadline import Deadline, StageSpec, budget_from
+
+# Stegdeklarationer: kostnadsklass + required/optional. Optional-steg
+# hoppas över/trunkeras när en request-deadline inte räcker till.
+STAGES = {
+    "speaker_attrib": StageSpec("speaker_attrib", "cheap"),
+    "dialog_memory": StageSpec("dialog_memory", "medium"),
+    "attachment": StageSpec("attachment", "cheap"),
+    "tone": StageSpec("tone", "cheap"),
+    "conflict": StageSpec("conflict", "cheap"),
+    "boundary": StageSpec("boundary", "cheap"),
+    "reco": StageSpec("reco", "cheap"),
+    "explain": StageSpec("explain", "medium", required=False, truncatable=True),
+    "context_graph": StageSpec("context_graph", "heavy", required=False, truncatable=True),
+}
+
+# Trunkerade körningar ser bara början av texten/dialogen (offsets förblir giltiga)
+EXPLAIN_TRUNC_CHARS = 2000
+CONTEXT_GRAPH_TRUNC_TURNS = 8
+# run_stream behåller bara de senaste talarna i dialogminnets state
+STREAM_SPEAKER_TAIL = 64
+
+# In-process resultatcache (LRU + TTL) med koalescering av identiska anrop
+_RESULT_CACHE = ResultCache() if RESULT_CACHE_AVAILABLE else None
+
+
+def agent_paths() -> list:
+    """Källfilerna för agenterna som run_once använder (för cache-fingerprint)."""
+    fns = (_diag_attach, _conflict_an, _expl, _boundary_an, _tone_an, _reco,
+           _dialog_mem, _speaker_label, _context_graph)
+    paths = [pathlib.Path(__file__).resolve()]
+    for fn in fns:
+        mod = sys.modules.get(getattr(fn, "__module__", "") or "")
+        if mod is not None and getattr(mod, "__file__", None):
+            paths.append(pathlib.Path(mod.__file__))
+    return paths
+
+def _not_degraded(out: Any) -> bool:
+    """Degraderade (ofullständiga) svar ska inte cachas."""
+    return not (isinstance(out, dict) and (out.get("latency_budget") or {}).get("degraded"))
+
+
+def run_once_text(*, text: str, lang: str = "sv", persona: Any = None, context: Any = None,
+                  deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    dl = deadline or Deadline()
     # Use module-level imports
     diag_attach = _diag_attach
     conflict_an = _conflict_an
@@ -44,42 +104,48 @@ def run_once_text(*, text: str, lang: str = "sv", persona: Any = None, context:
     att = {"label": "trygg", "conf": 0.9}
     if callable(diag_attach):
         try:
-            att = diag_attach(text=text, lang=lang, persona=persona, context=context) or att
+            att = dl.run(STAGES["attachment"], lambda: diag_attach(text=text, lang=lang, persona=persona, context=context), None) or att
         except Exception:
             pass
 
     tn = {"tone_text": "empatisk lugn", "labels": []}
     if callable(tone_an):
         try:
-            tn = tone_an(text=text, lang=lang, persona=persona, context=context) or tn
+            tn = dl.run(STAGES["tone"], lambda: tone_an(text=text, lang=lang, persona=persona, context=context), None) or tn
         except Exception:
             pass
 
     cf = {"triggers": [], "repair_cues": [], "summary": ""}
     if callable(conflict_an):
         try:
-            cf = conflict_an(text=text, lang=lang, persona=persona, context=context) or cf
+            cf = dl.run(STAGES["conflict"], lambda: conflict_an(text=text, lang=lang, persona=persona, context=context), None) or cf
         except Exception:
             pass
 
     bd = {"has_boundary": False, "suggestions": []}
     if callable(boundary_an):
         try:
-            bd = boundary_an(text=text, lang=lang, persona=persona, context=context) or bd
+            bd = dl.run(STAGES["boundary"], lambda: boundary_an(text=text, lang=lang, persona=persona, context=context), None) or bd
         except Exception:
             pass
 
     rc = {"steps": []}
     if callable(reco):
         try:
-            rc = reco(text=text, lang=lang, persona=persona, context=context, insights={"conflict": cf, "boundary": bd}) or rc
+            rc = dl.run(STAGES["reco"], lambda: reco(text=text, lang=lang, persona=persona, context=context, insights={"conflict": cf, "boundary": bd}), None) or rc
         except Exception:
             pass
 
     ex = {"spans": [], "coverage": 0.0}
     if callable(expl):
         try:
-            ex = expl(text=text, lang=lang, persona=persona, context=context, insights={"attachment": att, "conflict": cf, "boundary": bd}) or ex
+            insights = {"attachment": att, "conflict": cf, "boundary": bd}
+            ex = dl.run(
+                STAGES["explain"],
+                lambda: expl(text=text, lang=lang, persona=persona, context=context, insights=insights),
+                None,
+                truncated_fn=lambda: expl(text=text[:EXPLAIN_TRUNC_CHARS], lang=lang, persona=persona, context=context, insights=insights),
+            ) or ex
         except Exception:
             pass
 
@@ -104,23 +170,66 @@ def run_once_text(*, text: str, lang: str = "sv", persona: Any = None, context:
     if isinstance(out.get("top_reco"), list):
         out["top_reco"] = (out["top_reco"][0] if out["top_reco"] else "")
     out["top_reco"] = str(out.get("top_reco") or rc.get("top_reco") or "")
+    if dl.active:
+        out["latency_budget"] = dl.report()
+    return out
+
+
+def run_once(*, text: str = "", lang: str = "sv", persona=None, context=None, dialog=None, conversation_id=None,
+             budget_ms: Optional[float] = None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """
+    Kör relation-agenterna, cachat per innehåll.
+
+    Identiska textanrop (samma text/lang/persona/context och samma
+    agentversioner) återanvänder resultatet; samtidiga identiska anrop väntar
+    på en och samma beräkning, högst requestens kvarvarande budget.
+    REL_RESULT_CACHE=off stänger av. Dialoganrop
+    (dialog/conversation_id) cachas aldrig: dialogminnet läser och skriver
+    sessionsminnet och kontextgrafen uppdaterar sitt state vid varje anrop.
+
+    Med `budget_ms` (eller en `deadline` som startat tidigare i requesten)
+    hoppas optional-steg över eller trunkeras när budgeten inte räcker;
+    svaret får då `latency_budget` med vilka steg som degraderats.
+    """
+    dl = deadline or Deadline(budget_ms)
+    if _RESULT_CACHE is None or not cache_enabled() or dialog or conversation_id:
+        return _run_once_uncached(text=text, lang=lang, persona=persona, context=context,
+                                  dialog=dialog, conversation_id=conversation_id, deadline=dl)
+    key = make_key(text=text, lang=lang, dialog=dialog, persona=persona, context=context,
+                   conversation_id=conversation_id, fingerprint=agent_fingerprint(agent_paths()))
+    out, _status = _RESULT_CACHE.get_or_compute(
+        key,
+        lambda: _run_once_uncached(text=text, lang=lang, persona=persona, context=context,
+                                   dialog=dialog, conversation_id=conversation_id, deadline=dl),
+        cacheable=_not_degraded,
+        wait_s=dl.remaining_ms() / 1000.0 if dl.active else None,
+    )
     return out
 
 
-def run_once(*, text: str = "", lang: str = "sv", persona=None, context=None, dialog=None, conversation_id=None) -> Dict[str, Any]:
+def _run_once_uncached(*, text: str = "", lang: str = "sv", persona=None, context=None, dialog=None, conversation_id=None,
+                       deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    dl = deadline or Deadline()
     # Dialog path for diamond
     if dialog and callable(_speaker_label) and callable(_dialog_mem):
         try:
-            sp = _speaker_label(dialog)
-            dm = _dialog_mem(sp["labeled_dialog"], lang=lang, persona=persona, context=context, conversation_id=conversation_id)
+            sp = dl.run(STAGES["speaker_attrib"], lambda: _speaker_label(dialog), None)
+            dm = dl.run(STAGES["dialog_memory"], lambda: _dialog_mem(sp["labeled_dialog"], lang=lang, persona=persona, context=context, conversation_id=conversation_id), None)
             text_join = " ".join(m.get("text", "") for m in sp["labeled_dialog"]) if sp else (text or "")
 
-            att = _diag_attach(text=text_join, lang=lang) if callable(_diag_attach) else {"label": "trygg", "conf": 0.9}
-            tn = _tone_an(text=text_join, lang=lang) if callable(_tone_an) else {"tone_text": "lugn fokuserad"}
-            cf = _conflict_an(text=text_join, lang=lang) if callable(_conflict_an) else {"triggers": []}
-            bd = _boundary_an(text=text_join, lang=lang) if callable(_boundary_an) else {"has_boundary": False}
-            rc = _reco(text=text_join, lang=lang, insights={"conflict": cf, "boundary": bd}) if callable(_reco) else {"steps": []}
-            ex = _expl(text=text_join, lang=lang, insights={"attachment": att, "conflict": cf, "boundary": bd}) if callable(_expl) else {"spans": [], "coverage": 0.0, "labels": []}
+            att = dl.run(STAGES["attachment"], lambda: _diag_attach(text=text_join, lang=lang), None) if callable(_diag_attach) else {"label": "trygg", "conf": 0.9}
+            tn = dl.run(STAGES["tone"], lambda: _tone_an(text=text_join, lang=lang), None) if callable(_tone_an) else {"tone_text": "lugn fokuserad"}
+            cf = dl.run(STAGES["conflict"], lambda: _conflict_an(text=text_join, lang=lang), None) if callable(_conflict_an) else {"triggers": []}
+            bd = dl.run(STAGES["boundary"], lambda: _boundary_an(text=text_join, lang=lang), None) if callable(_boundary_an) else {"has_boundary": False}
+            rc = dl.run(STAGES["reco"], lambda: _reco(text=text_join, lang=lang, insights={"conflict": cf, "boundary": bd}), None) if callable(_reco) else {"steps": []}
+            ex_default = {"spans": [], "coverage": 0.0, "labels": []}
+            insights = {"attachment": att, "conflict": cf, "boundary": bd}
+            ex = dl.run(
+                STAGES["explain"],
+                lambda: _expl(text=text_join, lang=lang, insights=insights),
+                ex_default,
+                truncated_fn=lambda: _expl(text=text_join[:EXPLAIN_TRUNC_CHARS], lang=lang, insights=insights),
+            ) if callable(_expl) else ex_default
 
             # Clamp memory_score to [0,1] with type safety
             mem = dm.get("memory_score") if isinstance(dm, dict) else None
@@ -130,11 +239,24 @@ def run_once(*, text: str = "", lang: str = "sv", persona=None, context=None, di
                 mem = 0.0
             mem = max(0.0, min(1.0, mem))
             
-            # Context graph
+            # Context graph: inkrementellt per konversation (bara nya turer), annars
+            # heavy/optional och trunkerad till de första turerna
             cg = {}
-            if callable(_context_graph):
+            if conversation_id and callable(_context_graph_inc):
                 try:
-                    cg = _context_graph(text_join, dialog=sp["labeled_dialog"]) or {}
+                    cg = dl.run(STAGES["context_graph"],
+                                lambda: _context_graph_inc(conversation_id, sp["labeled_dialog"]), None) or {}
+                except Exception:
+                    pass
+            elif callable(_context_graph):
+                head = sp["labeled_dialog"][:CONTEXT_GRAPH_TRUNC_TURNS]
+                try:
+                    cg = dl.run(
+                        STAGES["context_graph"],
+                        lambda: _context_graph(text_join, dialog=sp["labeled_dialog"]),
+                        None,
+                        truncated_fn=lambda: _context_graph(" ".join(m.get("text", "") for m in head), dialog=head),
+                    ) or {}
                 except Exception:
                     pass
             
@@ -177,22 +299,79 @@ def run_once(*, text: str = "", lang: str = "sv", persona=None, context=None, di
                     out["session_id"] = dm["session_id"]
                 if "session_history" in dm:
                     out["session_history"] = dm["session_history"]
+
+            if dl.active:
+                out["latency_budget"] = dl.report()
             
             return out
         except Exception:
             pass
     # Fallback to text path
-    return run_once_text(text=text or "", lang=lang, persona=persona, context=context)
+    return run_once_text(text=text or "", lang=lang, persona=persona, context=context, deadline=dl)
+
+
+def iter_dialog(source: Any, *, lang: str = "sv", fmt: str = "auto") -> Iterator[Dict[str, Any]]:
+    """
+    Chattexport (sökväg, textström eller rader) -> normaliserade turer {speaker, ts, text}.
+
+    thread_parser parsar exporten radvis, speaker_attrib attribuerar turer
+    utan talare och talaretiketterna normaliseras till P1/P2 - allt som
+    generatorer, så bara aktuell tur finns i minnet.
+    """
+    language = "sv" if lang == "sv" else "en"
+    for turn in _iter_labeled(_iter_turns(source, fmt), language):
+        m = _label_turn(turn)
+        yield {"speaker": m["speaker"], "ts": turn["ts"], "text": m["text"]}
+
+
+def run_stream(source: Any, *, lang: str = "sv", conversation_id=None, fmt: str = "auto",
+               sink: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Strömmande dialogväg för stora exporter: iter_dialog -> dialogminne, tur för tur.
+
+    Dialogminnet byggs med DialogMemoryFold i stället för över en lista, och
+    texten fogas aldrig ihop, så minnet är konstant oavsett antal turer.
+    `sink` får varje normaliserad tur (t.ex. för att skriva JSONL eller
+    mata ett minneslager). Textanalysen (attachment/tone/explain/...) behöver
+    hela texten och körs inte här - använd run_once för det.
+    """
+    fold = _DialogMemoryFold(max_speakers=STREAM_SPEAKER_TAIL)
+    speakers = set()
+    for m in iter_dialog(source, lang=lang, fmt=fmt):
+        fold.add(m)
+        speakers.add(m["speaker"])
+        if sink is not None:
+            sink(m)
+    dm = fold.result(conversation_id)
+    out = {
+        "turn_count": fold.turns,
+        "two_speakers": speakers == {"P1", "P2"},
+        "memory_score": max(0.0, min(1.0, float(dm.get("memory_score", 0.0)))),
+        "signals": dm.get("signals", {}),
+        "memory_state": dm.get("state", {}),
+    }
+    if "session_id" in dm:
+        out["session_id"] = dm["session_id"]
+    if "session_history" in dm:
+        out["session_history"] = dm["session_history"]
+    return out
 
 
 def main() -> None:
+    if len(sys.argv) > 2 and sys.argv[1] == "--input":
+        # Strömmande läge: run_rel_agents.py --input export.txt|- [lang]
+        source = sys.stdin if sys.argv[2] == "-" else sys.argv[2]
+        lang = sys.argv[3] if len(sys.argv) > 3 else "sv"
+        print(json.dumps(run_stream(source, lang=lang), ensure_ascii=False))
+        return
     req = json.loads(sys.stdin.read() or "{}")
     text = req.get("text") or ""
     lang = req.get("lang") or "sv"
     persona = req.get("persona")
     context = req.get("context")
     dialog = req.get("dialog")
-    out = run_once(text=text, lang=lang, persona=persona, context=context, dialog=dialog)
+    out = run_once(text=text, lang=lang, persona=persona, context=context, dialog=dialog,
+                   budget_ms=budget_from(req.get("budget_ms")))
     print(json.dumps(out, ensure_ascii=False))
 
 
@@ -1,48 +1,24 @@
 from __future__ import annotations
 
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
+from lib.text.prescan import prescan
 
-JAILBREAK_PATTERNS = [
-    r"(?i)ignore\s+(all\s+)?(previous|prior|all\s+previous)\s+instructions",
-    r"(?i)you\s+are\s+now\s+(free|not bound|unrestricted)",
-    r"(?i)act\s+as\s+(dan|developer\s+mode)",
-    r"(?i)system\s+prompt",
-    r"(?i)override\s+(safety|rules|restrictions)",
-    r"(?i)reveal\s+(your\s+)?(system\s+prompt|instructions|api\s+key|password|token|all\s+instructions)",
-    r"(?i)reveal\s+all\s+instructions",
-    r"(?i)what\s+is\s+(your\s+)?(password|api\s+key|token)",
-    r"(?i)tell\s+me\s+how\s+you\s+work",
-    r"(?i)do\s+anything\s+now",
-    r"(?i)harm\s+(yourself|myself|others)",
-    r"(?i)harm.*self",
-    r"(?i)violence",
-    r"(?i)violently",
-    r"(?i)manipulate",
-]
 
-
-def shield(text: str) -> Dict[str, Any]:
+def shield(text: str, scan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Shield check - returns action: block, sanitize, or allow.
+
+    Args:
+        text: Input text
+        scan: Optional prescan result for the same text (återanvänds istället
+              för att skanna texten igen)
     """
-    hits = []
-    for pat in JAILBREAK_PATTERNS:
-        if re.search(pat, text or ""):
-            hits.append(pat)
+    if scan is None:
+        scan = prescan(text or "")
 
-    # Additional patterns for PII detection
-    pii_patterns = [
-        r'\b\d{8}-\d{4}\b',  # Swedish personal number
-        r'\b\d{10,11}\b',     # Phone numbers
-        r'\b[\w\.-]+@[\w\.-]+\.\w+\b',  # Email
-    ]
-    
-    pii_hits = []
-    for pii_pat in pii_patterns:
-        if re.search(pii_pat, text or "", re.IGNORECASE):
-            pii_hits.append('pii_detected')
+    hits = [pat for _, pat, _, _ in scan["jailbreak"]]
+    pii_hits = ['pii_detected' for _ in scan["pii"]]
     
     if hits:
         action = "block"
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import json
 import os
-import re
 import subprocess
 import sys
 from pathlib import Path
@@ -10,59 +9,27 @@ from pathlib import Path
 
 HERE = Path(__file__).resolve().parent
 ROOT = HERE.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
+from backend.bridge.deadline import Deadline, budget_from
+from backend.bridge.priority_scheduler import CancelToken, get_scheduler, lane_for, LANE_SAFETY
+from backend.bridge.result_cache import DiskResultCache, agent_fingerprint, disk_cache_enabled, make_key
+from lib.text.prescan import prescan
+from lib.text.rule_scan import last_label
 
-def _heuristic_map(text: str) -> dict:
-    t = (text or "").lower()
-    attachment = "trygg"
-    if re.search(r"orolig|oro", t):
-        attachment = "orolig"
-    if re.search(r"egen tid|behöver egentid|behöver lite egen tid", t):
-        attachment = "undvikande"
-    if re.search(r"frustrerad|förlåt|sa saker jag inte menade", t):
-        attachment = "ambivalent"
-
-    tone = "empatisk lugn"
-    if re.search(r"icke-anklagande|kan vi prata", t):
-        tone = "icke-anklagande"
-    if re.search(r"saklig|rutin|bestämma en tid", t):
-        tone = "saklig varm"
-    if re.search(r"egen tid|respekt|gräns|grans", t):
-        tone = "respektfull gräns"
-    if re.search(r"tack|uppskattar", t):
-        tone = "tacksam"
-    if re.search(r"förlåt|ta ansvar|göra om", t):
-        tone = "ansvarsfull"
-    if re.search(r"sårbar|vill förstå|hur du upplevde", t):
-        tone = "sårbar varm"
-    if re.search(r"nyfiken|förstå din bild", t):
-        tone = "nyfiket lyssnande"
-    if re.search(r"samarbet|planera ekonomin", t):
-        tone = "samarbete"
-    if re.search(r"stressad|tålamodet", t):
-        tone = "ödmjuk"
-
-    reco = ["Öppen fråga", "Reflektiv lyssning", "Sammanfatta"]
-    if re.search(r"uppskattar", t):
-        reco = ["Bekräfta uppskattning", "Öppen fråga", "Delat beslut"]
-    if re.search(r"inte hörde av dig|nästa gång", t):
-        reco = ["Jag-budskap", "Konkret önskemål", "Plan framåt"]
-    if re.search(r"planer ändras|uppdatera", t):
-        reco = ["Normalisera känsla", "Tydlig rutin", "Gemensam check-in"]
-    if re.search(r"egen tid", t):
-        reco = ["Sätt gräns mjukt", "Erbjud alternativ", "Boka ny tid"]
-    if re.search(r"lugn(t)? igår|hjälpte mig att förstå", t):
-        reco = ["Ge beröm", "Spegel/validering", "Upprepa beteende"]
-    if re.search(r"frustrerad|förlåt", t):
-        reco = ["Ta ansvar", "Kort ursäkt", "Föreslå reparationssteg"]
-    if re.search(r"ekonomin tillsammans|utgifterna", t):
-        reco = ["Gemensam plan", "Transparens", "Tidsbokning"]
-    if re.search(r"stressad|tålamod", t):
-        reco = ["Självinsikt", "Tacka för tålamod", "Be om feedback"]
-    if re.search(r"fysisk närhet|mysig kväll", t):
-        reco = ["Uttryck behov", "Specifikt förslag", "Bekräfta frivillighet"]
-    if re.search(r"förstå din syn|hur du upplevde", t):
-        reco = ["Öppen fråga", "Reflektiv lyssning", "Sammanfatta"]
+
+# Heuristiska regler (HEURISTIC_RULES) ligger i lib.text.prescan och skannas
+# tillsammans med shield/fastpath-reglerna. Senare matchande regel vinner.
+DEFAULT_RECO = ("Öppen fråga", "Reflektiv lyssning", "Sammanfatta")
+
+
+def _heuristic_map(text: str, scan: dict | None = None) -> dict:
+    if scan is None:
+        scan = prescan(text or "")
+    attachment = last_label(scan["attachment"], "trygg")
+    tone = last_label(scan["tone"], "empatisk lugn")
+    reco = list(last_label(scan["reco"], DEFAULT_RECO))
 
     return {
         "attachment_style": attachment,
@@ -74,28 +41,52 @@ def _heuristic_map(text: str) -> dict:
     }
 
 
-def _run_agent(agent_id: str, payload: dict) -> dict | None:
-    agent_path = ROOT.parent / "agents" / agent_id / "main.py"
+def _run_agent(agent_id: str, payload: dict, token: CancelToken | None = None) -> dict | None:
+    agent_path = ROOT / "agents" / agent_id / "main.py"
     if not agent_path.exists():
         return None
     env = os.environ.copy()
-    proc = subprocess.run(
+    proc = subprocess.Popen(
         [sys.executable, str(agent_path)],
-        input=json.dumps(payload).encode("utf-8"),
+        stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
     )
+    # Spekulativa agenter dödas om safety-lanen hinner blockera först
+    if token is not None:
+        token.attach(proc)
+    stdout, _stderr = proc.communicate(input=json.dumps(payload).encode("utf-8"))
     if proc.returncode != 0:
         return None
     try:
-        return json.loads(proc.stdout.decode("utf-8"))
+        return json.loads(stdout.decode("utf-8"))
     except Exception:
         return None
 
 
-def main() -> None:
-    raw = sys.stdin.read()
-    req = json.loads(raw or "{}")
+def _is_red(agent_id: str, res) -> bool:
+    if not isinstance(res, dict):
+        return False
+    emits = res.get("emits") or {}
+    if not isinstance(emits, dict):
+        return False
+    scan = emits.get("safety_scan") or {}
+    return emits.get("safety") == "RED" or scan.get("level") == "RED"
+
+
+def _agent_paths() -> list:
+    """Filer vars versioner ingår i resultatcachens nyckel."""
+    paths = [Path(__file__).resolve()]
+    paths += [ROOT / "agents" / agent_id / "main.py" for agent_id in ("consent", "safety_scan", "safety_gate")]
+    try:
+        from backend.bridge.run_rel_agents import agent_paths  # type: ignore
+        paths += agent_paths()
+    except Exception:
+        pass
+    return paths
+
+
+def _analyze(req: dict, scan: dict, deadline: Deadline | None = None) -> dict:
     text = req.get("text") or ""
     lang = req.get("lang") or "sv"
     persona = req.get("persona")
@@ -107,6 +98,7 @@ def main() -> None:
         "data": {
             "person1": req.get("person1") or "P1",
             "person2": req.get("person2") or "P2",
+            "text": text,
             "description": text,
             "shared_text": text,
             "consent_given": True,
@@ -117,40 +109,92 @@ def main() -> None:
         "meta": {"run_id": "py_runner", "timestamp": "", "agent_version": "0.1.0"},
     }
 
-    # Optional: run a subset of agents (best-effort, ignore failures)
-    _ = _run_agent("consent", payload)
-    safety = _run_agent("safety_gate", payload)
+    deadline = deadline or Deadline()
 
-    # If safety indicates RED (best-effort), return safe block
-    if safety and isinstance(safety, dict):
-        emits = safety.get("emits") or {}
-        if isinstance(emits, dict) and emits.get("safety") == "RED":
-            out = {
-                "attachment_style": "trygg",
-                "ethics_check": "block",
-                "risk_flags": ["RED"],
-                "tone_target": "säkerhet först",
-                "top_reco": ["Avsluta", "Route to human", "Resurser"],
-                "confidence": 1.0,
-            }
-            print(json.dumps(out, ensure_ascii=False))
-            return
-
-    # Try bridge with richer agents mapping
-    try:
-        sys.path.insert(0, str((HERE.parent).resolve()))
+    def _bridge(token: CancelToken):
+        # Try bridge with richer agents mapping
         from backend.bridge.run_rel_agents import run_once  # type: ignore
-        bridged = run_once(text=text, lang=lang, persona=persona, context=context, dialog=dialog)
-        if isinstance(bridged, dict) and bridged.get("attachment_style"):
-            out = bridged
-        else:
-            out = _heuristic_map(text)
-    except Exception as e:
+        token.on_cancel(deadline.cancel)
+        return run_once(text=text, lang=lang, persona=persona, context=context, dialog=dialog, deadline=deadline)
+
+    # Safety-agenter i prioritetslanen; consent och relationsanalysen körs
+    # spekulativt parallellt och avbryts om safety svarar RED. Spekulativt körs
+    # bara read-only steg: dialogvägen skriver sessionsminne (dialog_memory) och
+    # kontextgrafens state, så den startas först när safety släppt igenom.
+    # safety_gate körs via safety_scan (early exit vid första RED-regeln);
+    # blockeringen gäller som förut bara safety_gates RED.
+    payloads = {
+        "consent": payload,
+        "safety_scan": {**payload, "meta": {**payload["meta"], "agents": ["safety_gate"]}},
+    }
+    safety = {a: (lambda tok, a=a, p=p: _run_agent(a, p, tok)) for a, p in payloads.items() if lane_for(a) == LANE_SAFETY}
+    speculative = {a: (lambda tok, a=a, p=p: _run_agent(a, p, tok)) for a, p in payloads.items() if lane_for(a) != LANE_SAFETY}
+    if not dialog:
+        speculative["relations"] = _bridge
+    outcome = get_scheduler().run_request(safety, speculative, _is_red)
+
+    # If safety indicates RED (best-effort), return safe block
+    if outcome.blocked:
+        return {
+            "attachment_style": "trygg",
+            "ethics_check": "block",
+            "risk_flags": ["RED"],
+            "tone_target": "säkerhet först",
+            "top_reco": ["Avsluta", "Route to human", "Resurser"],
+            "confidence": 1.0,
+        }
+
+    if dialog:
+        try:
+            outcome.results["relations"] = _bridge(CancelToken())
+        except Exception as e:
+            outcome.errors["relations"] = e
+
+    bridged = outcome.results.get("relations")
+    err = outcome.errors.get("relations")
+    if err is not None:
         # Fallback to heuristics (current MVP)
         import traceback
-        print(f"[DEBUG bridge fail: {e}]", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
-        out = _heuristic_map(text)
+        print(f"[DEBUG bridge fail: {err}]", file=sys.stderr)
+        traceback.print_exception(type(err), err, err.__traceback__, file=sys.stderr)
+        out = _heuristic_map(text, scan=scan)
+    elif isinstance(bridged, dict) and bridged.get("attachment_style"):
+        out = bridged
+    else:
+        out = _heuristic_map(text, scan=scan)
+    return out
+
+
+def main() -> None:
+    raw = sys.stdin.read()
+    req = json.loads(raw or "{}")
+    text = req.get("text") or ""
+    # Latensbudget räknas från requestens start (consent/safety ingår)
+    deadline = Deadline(budget_from(req.get("budget_ms")))
+
+    # En skanning av texten (shield/fastpath/heuristik-regler) återanvänds nedan
+    scan = prescan(text)
+
+    # Identiska payloads (retries, replays) delar resultat via diskcachen
+    # (opt-in, REL_DISK_CACHE=on); samtidiga processer med samma nyckel väntar
+    # på den första beräkningen. Dialoger skriver sessionsminne och cachas inte.
+    if disk_cache_enabled() and not req.get("dialog"):
+        key = make_key(
+            text=text,
+            lang=req.get("lang") or "sv",
+            dialog=req.get("dialog"),
+            persona=req.get("persona"),
+            context=req.get("context"),
+            fingerprint=agent_fingerprint(_agent_paths()),
+        )
+        out, _status = DiskResultCache().get_or_compute(
+            key,
+            lambda: _analyze(req, scan, deadline),
+            cacheable=lambda o: not (o.get("latency_budget") or {}).get("degraded"),
+            wait_s=deadline.remaining_ms() / 1000.0 if deadline.active else None,
+        )
+    else:
+        out = _analyze(req, scan, deadline)
     print(json.dumps(out, ensure_ascii=False))
 
 
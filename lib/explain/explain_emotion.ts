@@ -82,7 +82,7 @@ function buildPatterns(tone: ToneVector, riskFlags: Record<string, any>, facets:
   if (c < 0.35 && (lowerFacets.has("boundary") || riskFlags?.coercion)) {
     patterns.push("gräns-oskärpa i känsligt samtal");
   }
-  if (riskFlags?.selfharm) patterns.push("akut risksignal – observerad, ej tolkning");
+  if (riskFlags?.selfharm || riskFlags?.red) patterns.push("akut risksignal – observerad, ej tolkning");
   if (!patterns.length) patterns.push("tolkningsmönster: värde/tempo‑missmatch");
   return patterns;
 }
@@ -3,6 +3,7 @@ Language utilities for SV/EN parity and translation.
 """
 from .language_bridge import (
     detect_language,
+    detect_languages,
     translate,
     to_canonical_en,
     from_canonical,
@@ -10,6 +11,7 @@ from .language_bridge import (
 
 __all__ = [
     "detect_language",
+    "detect_languages",
     "translate",
     "to_canonical_en",
     "from_canonical",
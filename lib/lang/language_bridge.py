@@ -3,49 +3,67 @@ Language bridge for SV/EN parity via canonical English representation.
 Ensures consistent emotion detection across languages.
 """
 import sys
-import json
-import subprocess
 from pathlib import Path
-from typing import Tuple
+from typing import Iterable, List, Tuple
 
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    # In-process lang_detect (cached per text hash) instead of one subprocess per call
+    from agents.lang_detect.main import detect_language_cached, detect_languages as _detect_many
+except Exception:  # pragma: no cover - lang_detect agent not shipped
+    detect_language_cached = None
+    _detect_many = None
 
 
 def detect_language(text: str) -> str:
     """
     Detect language of text.
-    Returns: "sv", "en", or "und" (undetermined)
+    Returns: "sv" or "en" (undetermined text falls back to the heuristic)
     """
     if not text or not text.strip():
         return "en"  # Default to English
     
-    # Try to use lang_detect agent if available
+    if detect_language_cached is not None:
+        try:
+            detected = detect_language_cached(text)["lang"]
+            if detected in ("sv", "en"):
+                return detected
+        except Exception:
+            # Fallback to simple heuristic
+            pass
+    
+    return _heuristic_language(text)
+
+
+def detect_languages(texts: Iterable[str]) -> List[str]:
+    """
+    Batch variant of detect_language - one result per text, same order.
+    Duplicates within the batch are detected once.
+    """
+    texts = list(texts)
+    if _detect_many is None:
+        return [detect_language(t) for t in texts]
+    todo = [t for t in texts if t and t.strip()]
     try:
-        lang_agent_path = ROOT / "agents" / "lang_detect" / "main.py"
-        if lang_agent_path.exists():
-            request = json.dumps({
-                "data": {"text": text}
-            }, ensure_ascii=False)
-            
-            result = subprocess.run(
-                [sys.executable, str(lang_agent_path)],
-                input=request.encode('utf-8'),
-                capture_output=True,
-                timeout=5,
-                cwd=str(ROOT)
-            )
-            
-            if result.returncode == 0:
-                response = json.loads(result.stdout.decode('utf-8'))
-                if response.get("ok") and response.get("emits"):
-                    detected = response["emits"].get("lang", "en")
-                    if detected in ("sv", "en"):
-                        return detected
+        found = dict(zip(todo, (r["lang"] for r in _detect_many(todo))))
     except Exception:
-        # Fallback to simple heuristic
-        pass
-    
-    # Simple heuristic fallback
+        found = {}
+    out = []
+    for t in texts:
+        if not t or not t.strip():
+            out.append("en")
+        elif found.get(t) in ("sv", "en"):
+            out.append(found[t])
+        else:
+            out.append(_heuristic_language(t))
+    return out
+
+
+def _heuristic_language(text: str) -> str:
+    """Simple indicator-word fallback when lang_detect is unavailable or undecided."""
     text_lower = text.lower()
     sv_indicators = ["och", "är", "har", "jag", "du", "vi", "de", "det", "som", "för"]
     en_indicators = ["and", "is", "are", "have", "i", "you", "we", "they", "that", "for"]
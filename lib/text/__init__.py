@@ -0,0 +1,37 @@
+"""
+Shared text preprocessing (TextView) for agents.
+"""
+from .phrase_index import PhraseIndex, LexiconHits, lexicon_hits
+from .text_view import TextView, text_view, ensure_view, adopt, clear_views
+from .long_doc import Matcher, ChunkedMatcher, matcher_for, split_chunks, sentence_bounds, is_long
+from .spans import merge_same_label, nms
+from .chat_stream import iter_lines, write_jsonl
+from .dedup_index import NearDupIndex, SpanCover
+from .rule_scan import Rule, RuleScanner
+from .prescan import prescan
+
+__all__ = [
+    "TextView",
+    "text_view",
+    "ensure_view",
+    "adopt",
+    "clear_views",
+    "PhraseIndex",
+    "LexiconHits",
+    "lexicon_hits",
+    "Matcher",
+    "ChunkedMatcher",
+    "matcher_for",
+    "split_chunks",
+    "sentence_bounds",
+    "is_long",
+    "merge_same_label",
+    "nms",
+    "iter_lines",
+    "write_jsonl",
+    "NearDupIndex",
+    "SpanCover",
+    "Rule",
+    "RuleScanner",
+    "prescan",
+]
@@ -0,0 +1,81 @@
+"""
+ChatStream - radvis inläsning av chattexporter.
+
+thread_parser och speaker_attrib läste hela exporten med `sys.stdin.read()`,
+delade den med `split("\\n")` och byggde turlistor i minnet. `iter_lines` läser
+i stället källan (filsökväg, öppen textström eller en iterabel av rader) i
+block om READ_CHARS tecken och ger samma rader som `text.split("\\n")`, så
+parsningen kan köras som generatorer med konstant minne även för exporter med
+miljontals rader. Bara den rad som läses för tillfället hålls i minnet.
+
+    head, lines = peek(iter_lines("export.txt"), 10)   # formatdetektering
+    for turn in iter_structured(lines): ...
+
+`write_jsonl` skriver en ström av turer som JSON-rader (en tur per rad), det
+format agenterna läser och skriver i strömmande läge.
+"""
+from __future__ import annotations
+
+import json
+import os
+from itertools import chain, islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+READ_CHARS = int(os.getenv("CHAT_STREAM_READ_CHARS", "65536"))
+
+Source = Union[str, "os.PathLike[str]", IO[str], Iterable[str]]
+
+
+def _split_reader(f: IO[str]) -> Iterator[str]:
+    buf: List[str] = []
+    while True:
+        chunk = f.read(READ_CHARS)
+        if not chunk:
+            break
+        *lines, tail = chunk.split("\n")
+        if lines:
+            buf.append(lines[0])
+            yield "".join(buf)
+            buf = []
+            yield from lines[1:]
+        buf.append(tail)
+    yield "".join(buf)
+
+
+def iter_lines(source: Source) -> Iterator[str]:
+    """
+    Rader ur en källa, utan radslut - samma rader som `text.split("\\n")`.
+
+    Sökvägar öppnas som utf-8 och stängs när generatorn tar slut. Objekt med
+    `read` läses blockvis; andra iterabler räknas som färdiga rader (ett
+    avslutande "\\n" tas bort).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8", newline="") as f:
+            yield from _split_reader(f)
+    elif hasattr(source, "read"):
+        yield from _split_reader(source)  # type: ignore[arg-type]
+    else:
+        for line in source:
+            yield line[:-1] if line.endswith("\n") else line
+
+
+def peek(items: Iterable[Any], n: int) -> Tuple[List[Any], Iterator[Any]]:
+    """De första n elementen, plus en iterator som fortfarande ger alla element."""
+    it = iter(items)
+    head = list(islice(it, n))
+    return head, chain(head, it)
+
+
+def write_jsonl(items: Iterable[Dict[str, Any]], out: IO[str]) -> int:
+    """Skriv varje element som en JSON-rad; returnerar antalet rader."""
+    n = 0
+    for item in items:
+        out.write(json.dumps(item, ensure_ascii=False))
+        out.write("\n")
+        n += 1
+    out.flush()
+    return n
+
+
+__all__ = ["iter_lines", "peek", "write_jsonl", "READ_CHARS"]
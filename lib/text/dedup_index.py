@@ -0,0 +1,194 @@
+"""
+DedupIndex - kandidatindex för dubblettkontroll av evidens och citat.
+
+report_evidence jämförde varje ny text mot varje behållen (sha-fingeravtryck
+plus token-Jaccard), och tokeniserade om båda texterna i varje par. Här hålls
+de behållna tokenmängderna i ett index som bara ger de nycklar som KAN nå
+tröskeln; anroparen verifierar kandidaterna med samma Jaccard som förut.
+
+    NearDupIndex(t, order)            exakt prefixfilter: J(x, y) >= t kräver att
+                                      prefixen (de |x| - ceil(t*|x|) + 1 ovanligaste
+                                      tokens) delar en token - inga missade par
+    NearDupIndex(t, mode="minhash")   MinHash-signaturer i LSH-band; ungefärligt
+                                      (kan missa par nära tröskeln) men oberoende
+                                      av tokenfördelningen
+    SpanCover                         behållna (start, end)-intervall per dokument
+                                      som sorterad lista av maximala intervall;
+                                      `covers` = ligger spanen helt inuti ett av dem,
+                                      `remove` tar bort ett tillagt intervall igen
+
+Med prefixfiltret blir utfallet identiskt med den parvisa jämförelsen, och
+kostnaden nästan linjär i antalet texter.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import re
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+MINHASH_PERM = 64
+MINHASH_BANDS = 16          # 16 band x 4 rader: S-kurvan går upp kring J ~ 0.5
+_PRIME = (1 << 61) - 1
+
+
+def token_set(text: str) -> FrozenSet[str]:
+    """Ordtokens i gemener, som mängd (samma tokenisering som report_evidence.jaccard)."""
+    return frozenset(TOKEN_RE.findall((text or "").lower()))
+
+
+def jaccard_sets(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return len(a & b) / max(1, len(a | b))
+
+
+def token_order(sets: Iterable[Iterable[str]]) -> Dict[str, int]:
+    """Global tokenordning för prefixfiltret: ovanligast först (dokumentfrekvens, sedan token)."""
+    df = Counter(tok for s in sets for tok in s)
+    return {tok: rank for rank, tok in enumerate(sorted(df, key=lambda t: (df[t], t)))}
+
+
+def _perms(n: int, seed: int = 1) -> List[Tuple[int, int]]:
+    rnd = random.Random(seed)
+    return [(rnd.randrange(1, _PRIME), rnd.randrange(0, _PRIME)) for _ in range(n)]
+
+
+def minhash(tokens: Iterable[str], perms: List[Tuple[int, int]]) -> Tuple[int, ...]:
+    hs = [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little") for t in tokens]
+    if not hs:
+        return ()
+    return tuple(min((a * h + b) % _PRIME for h in hs) for a, b in perms)
+
+
+class NearDupIndex:
+    """Tokenmängder under nycklar; `candidates(tokens)` ⊇ nycklar med Jaccard >= threshold (exakt läge)."""
+
+    def __init__(self, threshold: float, order: Optional[Dict[str, int]] = None, mode: str = "exact",
+                 num_perm: int = MINHASH_PERM, bands: int = MINHASH_BANDS):
+        if mode not in ("exact", "minhash"):
+            raise ValueError(f"okänt dedupe-läge: {mode}")
+        self.threshold = float(threshold)
+        self.order = order or {}
+        self.mode = mode
+        self.keys: Set[Hashable] = set()
+        self.empty: Set[Hashable] = set()        # J(tom, tom) = 1
+        self.postings: Dict[Any, Set[Hashable]] = {}
+        self._entries: Dict[Hashable, List[Any]] = {}
+        if mode == "minhash":
+            self.rows = max(1, num_perm // max(1, bands))
+            self.perms = _perms(self.rows * max(1, bands))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _prefix(self, tokens: FrozenSet[str]) -> List[str]:
+        n = len(tokens)
+        size = n - math.ceil(self.threshold * n - 1e-9) + 1   # avrundat nedåt blir prefixet bara längre
+        if size <= 0:
+            return []
+        order = self.order
+        return sorted(tokens, key=lambda t: (order.get(t, -1), t))[:size]
+
+    def _keys_for(self, tokens: FrozenSet[str]) -> List[Any]:
+        if self.mode == "exact":
+            return self._prefix(tokens)
+        sig = minhash(tokens, self.perms)
+        r = self.rows
+        return [(b, sig[b * r:(b + 1) * r]) for b in range(len(sig) // r)]
+
+    def add(self, key: Hashable, tokens: FrozenSet[str]) -> None:
+        self.keys.add(key)
+        if not tokens:
+            self.empty.add(key)
+            self._entries[key] = []
+            return
+        entries = self._keys_for(tokens)
+        self._entries[key] = entries
+        for e in entries:
+            self.postings.setdefault(e, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        self.keys.discard(key)
+        self.empty.discard(key)
+        for e in self._entries.pop(key, []):
+            bucket = self.postings.get(e)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.postings[e]
+
+    def candidates(self, tokens: FrozenSet[str]) -> Set[Hashable]:
+        if self.threshold <= 0:
+            return set(self.keys)                # J >= 0 för alla par
+        if not tokens:
+            return set(self.empty) if self.threshold <= 1 else set()
+        out: Set[Hashable] = set()
+        for e in self._keys_for(tokens):
+            bucket = self.postings.get(e)
+            if bucket:
+                out |= bucket
+        return out
+
+
+class SpanCover:
+    """
+    Täckta intervall per dokument. Bara maximala intervall sparas, sorterade på
+    start med strikt växande slut, så `covers` är en bisect plus en jämförelse.
+    Alla tillagda intervall räknas också, så att `remove` kan bygga om de
+    maximala intervallen för dokumentet.
+    """
+
+    def __init__(self):
+        self._docs: Dict[Hashable, Tuple[List[int], List[int]]] = {}
+        self._added: Dict[Hashable, Counter] = {}
+
+    def covers(self, doc: Hashable, start: int, end: int) -> bool:
+        starts, ends = self._docs.get(doc, ((), ()))
+        i = bisect_right(starts, start) - 1
+        return i >= 0 and ends[i] >= end
+
+    def add(self, doc: Hashable, start: int, end: int) -> None:
+        self._added.setdefault(doc, Counter())[(start, end)] += 1
+        self._insert(doc, start, end)
+
+    def remove(self, doc: Hashable, start: int, end: int) -> None:
+        added = self._added.get(doc)
+        if not added or not added[(start, end)]:
+            return
+        added[(start, end)] -= 1
+        if not added[(start, end)]:
+            del added[(start, end)]
+        self._docs.pop(doc, None)
+        for s, e in sorted(added):
+            self._insert(doc, s, e)
+
+    def _insert(self, doc: Hashable, start: int, end: int) -> None:
+        if self.covers(doc, start, end):
+            return
+        starts, ends = self._docs.setdefault(doc, ([], []))
+        i = bisect_right(starts, start)
+        if i > 0 and starts[i - 1] == start:
+            i -= 1                               # samma start, kortare slut: ersätts nedan
+        j = i
+        while j < len(starts) and ends[j] <= end:
+            j += 1                               # intervall som det nya täcker
+        starts[i:j] = [start]
+        ends[i:j] = [end]
+
+
+__all__ = [
+    "NearDupIndex",
+    "SpanCover",
+    "token_set",
+    "token_order",
+    "jaccard_sets",
+    "minhash",
+]
@@ -0,0 +1,295 @@
+"""
+LongDoc - chunkat läge för mycket långa texter (chattexporter, transkript).
+
+Agenter som features_conversation och meta_patterns kör varje mönster över hela
+texten, och en fler-sidig chattexport ger då långa regexpass plus
+teckenvisa meningsgränser. Långt läge är opt-in (meta.long_doc), eftersom
+mönster med `.*`/`.{0,N}` kan ge andra träffar än över hela texten (se nedan),
+och meta_patterns arketyppoäng ändras då märkbart på långa transkript.
+I långt läge delas texten i meningsalignade chunkar
+(`split_chunks`). Varje chunk äger ett intervall `[own_start, own_end)` och läser
+CHUNK_OVERLAP tecken förbi det på båda sidor, så en träff som börjar nära en söm
+fortfarande ryms i sin chunk. Chunkarna skannas i en processpool (LONG_DOC_WORKERS),
+en per process som återanvänds mellan anrop.
+Träffar flyttas tillbaka till originaltextens offsets, och en träff räknas bara
+i den chunk som äger dess start, så sömmarna ger inga dubbletter.
+
+Agenterna frågar en Matcher i stället för att anropa `re` direkt:
+
+    search(pattern, flags, lower)    (start, end) för första träffen, eller None
+    finditer(pattern, flags, lower)  [(start, end)] för alla träffar (icke-överlappande)
+    find(sub, lower)                 str.find
+
+`Matcher(text)` går direkt mot hela texten. `ChunkedMatcher(text, probes)`
+räknar ut de uppräknade proberna (op, pattern, flags, lower) chunkvis i förväg.
+För `search` matchas den globalt första starten om mot hela texten, så slutet
+blir exakt även för mönster som slutar på `.*`. Prober som inte räknats upp
+körs direkt mot hela texten. Utfallet är detsamma som för Matcher, utom för
+träffar längre än överlappet (t.ex. `.{0,120}?` över en söm med liten
+CHUNK_OVERLAP).
+"""
+from __future__ import annotations
+
+import os
+import re
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+CHUNK_CHARS = int(os.getenv("LONG_DOC_CHUNK_CHARS", "16000"))
+CHUNK_OVERLAP = int(os.getenv("LONG_DOC_OVERLAP", "512"))
+LONG_DOC_WORKERS = int(os.getenv("LONG_DOC_WORKERS", "0"))  # 0 = en per kärna, 1 = ingen processpool
+
+SENT_SEP_CHARS = ".!?‽⁇⁈⁉"
+QUOTE_CHARS = "“”«»\"'’‚„"
+
+# Samma gränser som agenternas SENT_SPLIT_RE: whitespace efter meningsslut, eller radbrytningar
+_BOUNDARY_RE = re.compile(rf"(?<=[{re.escape(SENT_SEP_CHARS)}])\s+|\n+")
+_SENT_END_RE = re.compile(rf"[{re.escape(SENT_SEP_CHARS)}\n]")
+
+Probe = Tuple[str, str, int, bool]  # (op, pattern, flags, lower)
+
+
+class Chunk(NamedTuple):
+    start: int       # chunkens text = text[start:end]
+    end: int
+    own_start: int   # träffar som börjar i [own_start, own_end) hör till chunken
+    own_end: int
+
+    def owns(self, pos: int) -> bool:
+        return self.own_start <= pos < self.own_end
+
+
+def is_long(text: str, meta: Optional[Dict[str, Any]] = None) -> bool:
+    """Långt läge bara med meta.long_doc; textens längd slår inte på det."""
+    return bool((meta or {}).get("long_doc"))
+
+
+def split_chunks(text: str, chunk_chars: Optional[int] = None, overlap: Optional[int] = None) -> List[Chunk]:
+    """
+    Dela text i chunkar som äger högst `chunk_chars` (CHUNK_CHARS) tecken var.
+
+    Ägargränserna läggs vid meningsgränser. Finns ingen i chunkens andra halva
+    läggs de vid blanksteg, och annars klipps chunken hårt. Varje chunk läser
+    `overlap` (CHUNK_OVERLAP) tecken utanför sitt ägda intervall.
+    """
+    n = len(text)
+    chunk_chars = max(1, int(CHUNK_CHARS if chunk_chars is None else chunk_chars))
+    overlap = max(0, int(CHUNK_OVERLAP if overlap is None else overlap))
+    if n <= chunk_chars:
+        return [Chunk(0, n, 0, n)]
+    cuts = [m.end() for m in _BOUNDARY_RE.finditer(text)]
+    bounds = [0]
+    pos = 0
+    while n - pos > chunk_chars:
+        target = pos + chunk_chars
+        i = bisect_right(cuts, target) - 1
+        cut = cuts[i] if i >= 0 else -1
+        if cut <= pos + chunk_chars // 2:
+            ws = text.rfind(" ", pos + chunk_chars // 2, target)
+            cut = ws + 1 if ws >= 0 else target
+        bounds.append(cut)
+        pos = cut
+    bounds.append(n)
+    return [Chunk(max(0, a - overlap), min(n, b + overlap), a, b) for a, b in zip(bounds, bounds[1:])]
+
+
+def _sentence_start(text: str, start: int) -> int:
+    # Sista skiljetecknet före start: sök bakåt i växande fönster (ingen regex baklänges)
+    width = 256
+    while True:
+        lo = max(0, start - width)
+        last = -1
+        for m in _SENT_END_RE.finditer(text, lo, start):
+            last = m.start()
+        if last >= 0:
+            return last + 1
+        if lo == 0:
+            return 0
+        start, width = lo, width * 4
+
+
+def sentence_bounds(text: str, start: int, end: int) -> Tuple[int, int]:
+    """
+    Meningen runt [start, end) inklusive avslutande skiljetecken och omgivande citattecken.
+
+    Samma resultat som agenternas teckenvisa find_sentence_bounds, men med
+    rfind/regex i stället för en Python-loop per tecken.
+    """
+    n = len(text)
+    start = max(0, min(start, n))
+    end = max(0, min(end, n))
+    l = _sentence_start(text, start)
+    m = _SENT_END_RE.search(text, end)
+    r = m.start() + 1 if m else n
+    while l > 0 and text[l-1] in QUOTE_CHARS:
+        l -= 1
+    while r < n and text[r:r+1] in QUOTE_CHARS:
+        r += 1
+    return l, r
+
+
+# ----------------------------- Matchers -----------------------------
+class Matcher:
+    """Mönsteruppslag direkt mot hela texten (eller dess gemena form)."""
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        self._lower: Optional[str] = None
+
+    def target(self, lower: bool = False) -> str:
+        if not lower:
+            return self.text
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    def search(self, pattern: str, flags: int = 0, lower: bool = False) -> Optional[Tuple[int, int]]:
+        m = re.search(pattern, self.target(lower), flags)
+        return m.span() if m else None
+
+    def finditer(self, pattern: str, flags: int = 0, lower: bool = False) -> List[Tuple[int, int]]:
+        return [m.span() for m in re.finditer(pattern, self.target(lower), flags)]
+
+    def find(self, sub: str, lower: bool = False) -> int:
+        return self.target(lower).find(sub)
+
+
+def scan_chunk(text: str, lo: int, hi: int, probes: Sequence[Probe]) -> List[Any]:
+    """Processpool-enhet: proberna över en chunk, bara träffar som börjar i [lo, hi)."""
+    lowered = text.lower()
+    out: List[Any] = []
+    for op, pattern, flags, lower in probes:
+        t = lowered if lower else text
+        if op == "find":
+            i = t.find(pattern, lo, hi + len(pattern))
+            out.append(i if 0 <= i < hi else -1)
+        elif op == "search":
+            m = re.compile(pattern, flags).search(t, lo)
+            out.append(m.start() if m and m.start() < hi else None)
+        else:
+            out.append([m.span() for m in re.compile(pattern, flags).finditer(t, lo) if m.start() < hi])
+    return out
+
+
+def _scan_job(job: Tuple[str, int, int, Sequence[Probe]]) -> List[Any]:
+    return scan_chunk(*job)
+
+
+_POOL: Any = None
+_POOL_KEY: Tuple[int, int] = (0, 0)  # (pid, workers)
+
+
+def _pool(workers: int) -> Any:
+    # En pool per process; byggs om bara om fler workers behövs (eller efter fork)
+    global _POOL, _POOL_KEY
+    pid = os.getpid()
+    if _POOL is None or _POOL_KEY[0] != pid or _POOL_KEY[1] < workers:
+        import atexit
+        import multiprocessing
+        if _POOL is not None and _POOL_KEY[0] == pid:
+            _POOL.terminate()
+        else:
+            atexit.register(_close_pool)
+        _POOL = multiprocessing.Pool(workers)
+        _POOL_KEY = (pid, workers)
+    return _POOL
+
+
+def _close_pool() -> None:
+    global _POOL
+    if _POOL is not None and _POOL_KEY[0] == os.getpid():
+        _POOL.terminate()
+    _POOL = None
+
+
+def map_chunks(fn: Callable[[Any], Any], jobs: List[Any], workers: Optional[int] = None) -> List[Any]:
+    """fn över jobben i ordning; med flera jobb och workers != 1 i processens delade pool."""
+    workers = LONG_DOC_WORKERS if workers is None else int(workers)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        return _pool(workers).map(fn, jobs)
+    return [fn(job) for job in jobs]
+
+
+class ChunkedMatcher(Matcher):
+    """
+    Matcher för långa texter: proberna räknas ut chunkvis (parallellt) i förväg.
+
+    Träffoffsets är i originaltexten. finditer-träffar som börjar inuti
+    föregående chunks sista träff stryks, på samma sätt som den icke-överlappande
+    skanningen över hela texten skulle hoppa över dem.
+    """
+
+    def __init__(self, text: str, probes: Sequence[Probe], chunks: Optional[List[Chunk]] = None,
+                 workers: Optional[int] = None):
+        super().__init__(text)
+        self.chunks = chunks if chunks is not None else split_chunks(self.text)
+        self.probes = list(dict.fromkeys(probes))
+        jobs = [(self.text[c.start:c.end], c.own_start - c.start, c.own_end - c.start, self.probes)
+                for c in self.chunks]
+        results = map_chunks(_scan_job, jobs, workers)
+        self._found: Dict[Probe, Any] = {}
+        for k, probe in enumerate(self.probes):
+            parts = [(c.start, res[k]) for c, res in zip(self.chunks, results)]
+            op = probe[0]
+            if op == "find":
+                self._found[probe] = next((off + i for off, i in parts if i >= 0), -1)
+            elif op == "search":
+                self._found[probe] = next((off + i for off, i in parts if i is not None), None)
+            else:
+                spans: List[Tuple[int, int]] = []
+                for off, part in parts:
+                    for s, e in part:
+                        if not spans or off + s >= spans[-1][1]:
+                            spans.append((off + s, off + e))
+                self._found[probe] = spans
+
+    def search(self, pattern: str, flags: int = 0, lower: bool = False) -> Optional[Tuple[int, int]]:
+        key = ("search", pattern, flags, lower)
+        if key not in self._found:
+            return super().search(pattern, flags, lower)
+        start = self._found[key]
+        if start is None:
+            return None
+        # Exakt slut: matcha om vid den globalt första starten (\b ser tecknet före start)
+        m = re.compile(pattern, flags).match(self.target(lower), start)
+        return m.span() if m else super().search(pattern, flags, lower)
+
+    def finditer(self, pattern: str, flags: int = 0, lower: bool = False) -> List[Tuple[int, int]]:
+        key = ("finditer", pattern, flags, lower)
+        if key not in self._found:
+            return super().finditer(pattern, flags, lower)
+        return list(self._found[key])
+
+    def find(self, sub: str, lower: bool = False) -> int:
+        key = ("find", sub, 0, lower)
+        if key not in self._found:
+            return super().find(sub, lower)
+        return self._found[key]
+
+
+def matcher_for(text: str, meta: Optional[Dict[str, Any]], probes: Callable[[], Sequence[Probe]]) -> Matcher:
+    """ChunkedMatcher i långt läge (meta.long_doc), annars Matcher; `probes` anropas bara i långt läge."""
+    meta = meta or {}
+    if not is_long(text, meta):
+        return Matcher(text)
+    workers = meta.get("long_doc_workers")
+    return ChunkedMatcher(text, probes(), workers=None if workers is None else int(workers))
+
+
+__all__ = [
+    "Chunk",
+    "Probe",
+    "Matcher",
+    "ChunkedMatcher",
+    "is_long",
+    "split_chunks",
+    "sentence_bounds",
+    "scan_chunk",
+    "map_chunks",
+    "matcher_for",
+    "CHUNK_CHARS",
+    "CHUNK_OVERLAP",
+]
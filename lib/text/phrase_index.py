@@ -0,0 +1,225 @@
+"""
+PhraseIndex - en skanning per mening för många `\\bfras\\b`-uppslag.
+
+diag_*-agenterna frågade varje fras för sig med
+`re.search(r'\\b' + re.escape(p) + r'\\b', s.lower())`, och kontrollerade om
+intensifierare/negationer för varje kategori. Med ~1200 fraser över nio
+agenter blev det O(text × lexikon × agenter).
+
+PhraseIndex nycklar varje fras på sitt första ord (första `\\w+`-sekvensen).
+En fras som börjar med ett ordtecken kan bara matcha `\\b...\\b` där ett ord i
+texten börjar, och då måste textens ord vara exakt frasens första ord. En
+skanning över textens ord ger därför alla träffar: ett dict-uppslag per ord,
+sedan `startswith` och slutgräns för de (få) kandidaterna. Fraser som börjar
+med annat än ett ordtecken ("!!!") körs som vanlig regex. Utfallet är exakt
+samma mängd som regex-varianten gav.
+
+LexiconHits är en delad, taggad registry ovanpå indexet: varje agent
+registrerar sina lexikon (`register(tag, LEX)`), indexet byggs om lazy över
+ALLA registrerade lexikon, och träffmängden per mening memoreras. Kör flera
+agenter i samma process (diag_engine) skannas varje mening alltså en gång.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+_WORD_RUN_RE = re.compile(r"\w+")
+_WORD_CHAR_RE = re.compile(r"\w")
+
+HITS_CACHE_SIZE = 2048
+
+
+def _is_word(ch: str) -> bool:
+    return _WORD_CHAR_RE.match(ch) is not None
+
+
+def iter_phrases(lex: Any) -> Iterable[str]:
+    """Alla strängar i ett (nästlat) lexikon: dict-värden, listor, tupler."""
+    if isinstance(lex, str):
+        yield lex
+    elif isinstance(lex, dict):
+        for v in lex.values():
+            yield from iter_phrases(v)
+    elif isinstance(lex, (list, tuple, set, frozenset)):
+        for v in lex:
+            yield from iter_phrases(v)
+
+
+class PhraseIndex:
+    """Kompilerat fras-index; `scan(text)` ger mängden fraser som matchar `\\bfras\\b`."""
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: Tuple[str, ...] = tuple(dict.fromkeys(p for p in phrases if p))
+        self.known: FrozenSet[str] = frozenset(self.phrases)
+        self._by_head: Dict[str, List[Tuple[str, bool]]] = {}
+        self._regex: List[Tuple[str, re.Pattern]] = []
+        for p in self.phrases:
+            head = _WORD_RUN_RE.match(p)
+            if head:
+                self._by_head.setdefault(head.group(0), []).append((p, _is_word(p[-1])))
+            else:
+                self._regex.append((p, re.compile(r"\b" + re.escape(p) + r"\b")))
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def __contains__(self, phrase: str) -> bool:
+        return phrase in self.known
+
+    def scan(self, text: str) -> Set[str]:
+        """Fraser (som de registrerades) med minst en `\\b`-avgränsad förekomst i text."""
+        found: Set[str] = set()
+        by_head = self._by_head
+        n = len(text)
+        for m in _WORD_RUN_RE.finditer(text):
+            cands = by_head.get(m.group(0))
+            if not cands:
+                continue
+            i = m.start()
+            for p, ends_word in cands:
+                if p in found or not text.startswith(p, i):
+                    continue
+                e = i + len(p)
+                # \b efter frasen: ordtecken på exakt en sida
+                if ends_word != (e < n and _is_word(text[e])):
+                    found.add(p)
+        for p, rx in self._regex:
+            if rx.search(text):
+                found.add(p)
+        return found
+
+
+class LexiconHits:
+    """
+    Taggad registry av lexikon över ett gemensamt PhraseIndex.
+
+    Fraser matchas gemena mot gemen text (som agenternas `p.lower()` på
+    `s.lower()`). `hits(text)` memoreras per text; `any`/`count` svarar för
+    en fraslista och faller tillbaka på regex för fraser som inte registrerats.
+    """
+
+    def __init__(self, cache_size: int = HITS_CACHE_SIZE):
+        self.cache_size = max(1, int(cache_size))
+        self._lock = threading.Lock()
+        self._lexicons: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._index: Optional[PhraseIndex] = None
+        self._hits: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        self._lists: Dict[int, Tuple[Sequence[str], Tuple[str, ...], bool]] = {}
+        self.stats = {"scans": 0, "hit": 0}
+
+    def register(self, tag: str, lex: Any) -> None:
+        """Registrera (eller ersätt) ett lexikon; indexet byggs om vid nästa skanning."""
+        phrases = tuple(dict.fromkeys(p.lower() for p in iter_phrases(lex) if p))
+        with self._lock:
+            if self._lexicons.get(tag) == phrases:
+                return
+            self._lexicons[tag] = phrases
+            self._index = None
+            self._hits.clear()
+            self._lists.clear()
+
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        return tuple(self._lexicons)
+
+    def tags_for(self, phrase: str) -> Tuple[str, ...]:
+        """Vilka registrerade lexikon som innehåller frasen."""
+        p = phrase.lower()
+        return tuple(tag for tag, phrases in self._lexicons.items() if p in phrases)
+
+    @property
+    def index(self) -> PhraseIndex:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = PhraseIndex(p for phrases in self._lexicons.values() for p in phrases)
+                index = self._index
+        return index
+
+    def hits(self, text: str) -> FrozenSet[str]:
+        """Registrerade fraser som matchar `\\bfras\\b` i text.lower()."""
+        key = (text or "").lower()
+        with self._lock:
+            found = self._hits.get(key)
+            if found is not None:
+                self._hits.move_to_end(key)
+                self.stats["hit"] += 1
+                return found
+        index = self.index
+        found = frozenset(index.scan(key))
+        with self._lock:
+            self.stats["scans"] += 1
+            if self._index is index:
+                self._hits[key] = found
+                if len(self._hits) > self.cache_size:
+                    self._hits.popitem(last=False)
+        return found
+
+    def _prepared(self, phrases: Sequence[str]) -> Tuple[Tuple[str, ...], bool]:
+        # Fraslistorna är agenternas modulkonstanter - gemena + "alla kända" en gång per lista
+        entry = self._lists.get(id(phrases))
+        if entry is None or entry[0] is not phrases:
+            lowered = tuple(p.lower() for p in phrases)
+            known = self.index.known
+            entry = (phrases, lowered, all(p in known for p in lowered))
+            if len(self._lists) >= self.cache_size:
+                self._lists.clear()  # tillfälliga listor ska inte ackumuleras
+            self._lists[id(phrases)] = entry
+        return entry[1], entry[2]
+
+    def _fallback(self, phrase: str, text_lower: str) -> bool:
+        return re.search(r"\b" + re.escape(phrase) + r"\b", text_lower) is not None
+
+    def any(self, phrases: Sequence[str], text: str, found: Optional[FrozenSet[str]] = None) -> bool:
+        """Som `any(re.search(r'\\b'+p+r'\\b', text.lower()) for p in phrases)`."""
+        if found is None:
+            found = self.hits(text)
+        lowered, all_known = self._prepared(phrases)
+        if all_known:
+            return not found.isdisjoint(lowered)
+        known = self.index.known
+        text_lower = (text or "").lower()
+        return any(p in found if p in known else self._fallback(p, text_lower) for p in lowered)
+
+    def count(self, phrases: Sequence[str], text: str, found: Optional[FrozenSet[str]] = None) -> int:
+        """Antal fraser i listan (dubbletter räknas) som matchar i text."""
+        if found is None:
+            found = self.hits(text)
+        lowered, all_known = self._prepared(phrases)
+        if all_known:
+            return sum(1 for p in lowered if p in found)
+        known = self.index.known
+        text_lower = (text or "").lower()
+        return sum(1 for p in lowered if (p in found if p in known else self._fallback(p, text_lower)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hits.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {"lexicons": len(self._lexicons), "phrases": len(self.index),
+                "cached": len(self._hits), **self.stats}
+
+
+_registries: Dict[str, LexiconHits] = {}
+_registries_lock = threading.Lock()
+
+
+def lexicon_hits(name: str) -> LexiconHits:
+    """
+    Processens delade LexiconHits för `name`. Alla diag_*-agenter registrerar
+    sina lexikon under "diag", så en skanning per mening ger träffarna för
+    alla kategorier och agenter.
+    """
+    with _registries_lock:
+        reg = _registries.get(name)
+        if reg is None:
+            reg = _registries[name] = LexiconHits()
+        return reg
+
+
+__all__ = ["PhraseIndex", "LexiconHits", "lexicon_hits", "iter_phrases"]
@@ -0,0 +1,255 @@
+"""
+Prescan - en gemensam skanning av inkommande text före routing.
+
+Samlar regelseten från prompt_shield (jailbreak + PII), fastpath
+(NEGATIVE_KEYWORDS), orchestrator_runner (tone/reco/attachment-heuristiker),
+diag_attachment (KEYS), explain_linker (CUES) och model_router (nyckelord)
+i EN RuleScanner. Ett pass över texten ger alla träffar; resultatet cachas per
+text så att alla konsumenter delar samma skanning. Nya regler lägger alltså
+inte till fler skanningar per request.
+
+Regeltabellerna ligger här och ägarmodulerna importerar dem, så att agenter
+(diag_attachment, explain_linker) och backend delar skanningen utan att
+agents/ behöver importera backend/.
+
+Regelset kan byggas och mätas isolerat: `bench(texts, rulesets=("explain_cues",))`.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lib.text.rule_scan import Hit, Rule, RuleScanner, RuleSpec
+
+
+# ----------------------------- Regeltabeller -----------------------------
+# prompt_shield
+JAILBREAK_PATTERNS = [
+    r"(?i)ignore\s+(all\s+)?(previous|prior|all\s+previous)\s+instructions",
+    r"(?i)you\s+are\s+now\s+(free|not bound|unrestricted)",
+    r"(?i)act\s+as\s+(dan|developer\s+mode)",
+    r"(?i)system\s+prompt",
+    r"(?i)override\s+(safety|rules|restrictions)",
+    r"(?i)reveal\s+(your\s+)?(system\s+prompt|instructions|api\s+key|password|token|all\s+instructions)",
+    r"(?i)reveal\s+all\s+instructions",
+    r"(?i)what\s+is\s+(your\s+)?(password|api\s+key|token)",
+    r"(?i)tell\s+me\s+how\s+you\s+work",
+    r"(?i)do\s+anything\s+now",
+    r"(?i)harm\s+(yourself|myself|others)",
+    r"(?i)harm.*self",
+    r"(?i)violence",
+    r"(?i)violently",
+    r"(?i)manipulate",
+]
+
+# Additional patterns for PII detection (matchas case-insensitive)
+PII_PATTERNS = [
+    ("personnummer", r'\b\d{8}-\d{4}\b'),  # Swedish personal number
+    ("phone", r'\b\d{10,11}\b'),     # Phone numbers
+    ("email", r'\b[\w\.-]+@[\w\.-]+\.\w+\b'),  # Email
+]
+
+# fastpath: negativa nyckelord som spärrar FastPath (case-insensitive)
+# Inkluderar konflikt/kris-ord OCH jailbreak-termer (för Shield-compliance)
+NEGATIVE_PATTERN = (
+    r"(misshandel|våld|självmord|kris|panik|hot|polis|barn|droger|sjukhus|konflikt|"
+    r"ignore\s+(all|previous|prior)\s+(rules|instructions)|"
+    r"reveal\s+(your\s+)?(password|api\s+key|token|system\s+prompt|instructions)|"
+    r"system\s+prompt|override\s+(safety|rules)|"
+    r"what\s+is\s+(your\s+)?(password|api|token))"
+)
+
+# orchestrator_runner: heuristiska regler (mönster, label). Senare matchande regel vinner.
+HEURISTIC_RULES = {
+    "attachment": [
+        (r"orolig|oro", "orolig"),
+        (r"egen tid|behöver egentid|behöver lite egen tid", "undvikande"),
+        (r"frustrerad|förlåt|sa saker jag inte menade", "ambivalent"),
+    ],
+    "tone": [
+        (r"icke-anklagande|kan vi prata", "icke-anklagande"),
+        (r"saklig|rutin|bestämma en tid", "saklig varm"),
+        (r"egen tid|respekt|gräns|grans", "respektfull gräns"),
+        (r"tack|uppskattar", "tacksam"),
+        (r"förlåt|ta ansvar|göra om", "ansvarsfull"),
+        (r"sårbar|vill förstå|hur du upplevde", "sårbar varm"),
+        (r"nyfiken|förstå din bild", "nyfiket lyssnande"),
+        (r"samarbet|planera ekonomin", "samarbete"),
+        (r"stressad|tålamodet", "ödmjuk"),
+    ],
+    "reco": [
+        (r"uppskattar", ("Bekräfta uppskattning", "Öppen fråga", "Delat beslut")),
+        (r"inte hörde av dig|nästa gång", ("Jag-budskap", "Konkret önskemål", "Plan framåt")),
+        (r"planer ändras|uppdatera", ("Normalisera känsla", "Tydlig rutin", "Gemensam check-in")),
+        (r"egen tid", ("Sätt gräns mjukt", "Erbjud alternativ", "Boka ny tid")),
+        (r"lugn(t)? igår|hjälpte mig att förstå", ("Ge beröm", "Spegel/validering", "Upprepa beteende")),
+        (r"frustrerad|förlåt", ("Ta ansvar", "Kort ursäkt", "Föreslå reparationssteg")),
+        (r"ekonomin tillsammans|utgifterna", ("Gemensam plan", "Transparens", "Tidsbokning")),
+        (r"stressad|tålamod", ("Självinsikt", "Tacka för tålamod", "Be om feedback")),
+        (r"fysisk närhet|mysig kväll", ("Uttryck behov", "Specifikt förslag", "Bekräfta frivillighet")),
+        (r"förstå din syn|hur du upplevde", ("Öppen fråga", "Reflektiv lyssning", "Sammanfatta")),
+    ],
+}
+
+# diag_attachment: poängen är antalet matchande mönster per label
+ATTACH_KEYS = {
+    "trygg": [
+        r"\buppskattar\b", r"\bteam\b", r"\bvi\b", r"\bplanera\b", r"\bnyfiken\b",
+        r"\bcheck[- ]?in\b", r"\btack\b", r"\bvalfrihet\b", r"\bfråga\b"
+    ],
+    "orolig": [
+        r"\borolig\b", r"\bjag[aer] dig\b", r"\bghost\b", r"\bosedd\b",
+        r"\bjag blir defensiv\b", r"\btryggt\b"
+    ],
+    "undvikande": [
+        r"\bspace\b", r"\begen tid\b", r"\båterhämtn?ing\b", r"\bkort i tonen\b",
+        r"\bbyte av kanal\b", r"\bIRL\b", r"\bta paus\b"
+    ],
+    "ambivalent": [
+        r"\bpassivt aggressiv\b", r"\bspårade ur\b", r"\bsa saker jag inte menade\b"
+    ],
+}
+
+# explain_linker: alla spans per cue
+EXPLAIN_CUES = [
+    (r"\bjag uppskattar\b", "beröm"),
+    (r"\bjag blev ledsen\b|\bjag kände\b", "känsla"),
+    (r"\bkan vi\b|\bskulle vi\b|\bvill du\b", "öppen_fråga"),
+    (r"\bförlåt\b|\bjag tar ansvar\b", "reparation"),
+    (r"\bska vi ta paus\b|\btime[- ]?out\b", "regler"),
+    (r"\begen tid\b|\bspace\b", "gräns"),
+]
+
+# model_router: nyckelord för komplexitet (substring, case-insensitive).
+COMPLEX_KEYWORDS = [
+    "överväger", "lämna", "konflikter", "reparera", "djupa problem",
+    "förtroende", "kommunikation", "tvingad", "kontrollerande", "missförstådd",
+    "ignorerar", "ekonomi", "framtiden"
+]
+
+# Conflict/stark affekt keywords
+CONFLICT_PATTERN = r"(gräl|bråk|hot|svek|otrohet|abuse|threat|gaslight|manipulera|kontrollerande)"
+
+PRESCAN_RULESETS = (
+    "jailbreak", "pii", "negative", "attachment", "tone", "reco",
+    "attach_keys", "explain_cues", "router_complex", "router_conflict",
+)
+
+PRESCAN_CACHE_SIZE = 256
+
+
+def build_rules(rulesets: Optional[Iterable[str]] = None) -> List[RuleSpec]:
+    """
+    Regelseten som en lista i skanningsordning.
+    `rulesets` begränsar till en delmängd (t.ex. för benchmark).
+    """
+    rules: List[RuleSpec] = []
+    for pat in JAILBREAK_PATTERNS:
+        rules.append(("jailbreak", pat, pat, 0))
+    for label, pat in PII_PATTERNS:
+        rules.append(("pii", label, pat, re.IGNORECASE))
+    rules.append(("negative", "negative", NEGATIVE_PATTERN, re.IGNORECASE))
+    # Heuristikerna körde tidigare på text.lower() - IGNORECASE ger samma träffar
+    for ruleset in ("attachment", "tone", "reco"):
+        for pat, label in HEURISTIC_RULES[ruleset]:
+            rules.append((ruleset, label, pat, re.IGNORECASE))
+    # diag_attachment räknar matchande mönster per label
+    for label, pats in ATTACH_KEYS.items():
+        for pat in pats:
+            rules.append(Rule("attach_keys", label, pat, re.IGNORECASE))
+    # explain_linker behöver alla spans (finditer)
+    for pat, label in EXPLAIN_CUES:
+        rules.append(Rule("explain_cues", label, pat, re.IGNORECASE, capture="all"))
+    # model_router: substring-nyckelord (text.lower()) + konfliktregex
+    for kw in COMPLEX_KEYWORDS:
+        rules.append(Rule("router_complex", kw, re.escape(kw), re.IGNORECASE))
+    rules.append(Rule("router_conflict", "conflict", CONFLICT_PATTERN, re.IGNORECASE))
+    if rulesets is not None:
+        wanted = set(rulesets)
+        rules = [r for r in rules if r[0] in wanted]
+    return rules
+
+
+@functools.lru_cache(maxsize=1)
+def get_scanner() -> RuleScanner:
+    """Kompilerad prescan-scanner (byggs en gång per process)."""
+    return RuleScanner(build_rules())
+
+
+@functools.lru_cache(maxsize=PRESCAN_CACHE_SIZE)
+def _prescan_cached(text: str) -> Tuple[Tuple[str, Tuple[Hit, ...]], ...]:
+    hits = get_scanner().scan(text)
+    return tuple((rs, tuple(hits.get(rs, ()))) for rs in PRESCAN_RULESETS)
+
+
+def prescan(text: str) -> Dict[str, Tuple[Hit, ...]]:
+    """
+    Skanna texten en gång mot alla pre-routing-regler.
+
+    Returns:
+        {
+            "jailbreak": ((pattern, pattern, start, end), ...),
+            "pii": ((label, pattern, start, end), ...),
+            "negative": (...),
+            "attachment": (...),
+            "tone": (...),
+            "reco": (...),
+            "attach_keys": (...),
+            "explain_cues": (...),      # alla spans per cue
+            "router_complex": (...),
+            "router_conflict": (...),
+        }
+        Träffar ligger i regelordning (första träffen per regel om inte
+        regeln har capture="all").
+    """
+    return dict(_prescan_cached(text or ""))
+
+
+def clear_cache() -> None:
+    """Töm text-cachen och bygg om scannern vid nästa anrop."""
+    _prescan_cached.cache_clear()
+    get_scanner.cache_clear()
+
+
+def bench(texts: Sequence[str], rulesets: Optional[Iterable[str]] = None, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Mät regelutvärdering isolerat (utan text-cache): bästa av `repeat` pass.
+
+    Returns:
+        {"rules": int, "texts": int, "best_ms": float, "per_text_us": float}
+    """
+    scanner = RuleScanner(build_rules(rulesets))
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        for text in texts:
+            scanner.scan(text)
+        best = min(best, time.perf_counter() - t0)
+    n = max(1, len(texts))
+    return {
+        "rules": len(scanner),
+        "texts": len(texts),
+        "best_ms": round(best * 1000.0, 3),
+        "per_text_us": round(best * 1e6 / n, 2),
+    }
+
+
+__all__ = [
+    "prescan",
+    "get_scanner",
+    "build_rules",
+    "bench",
+    "clear_cache",
+    "PRESCAN_RULESETS",
+    "JAILBREAK_PATTERNS",
+    "PII_PATTERNS",
+    "NEGATIVE_PATTERN",
+    "HEURISTIC_RULES",
+    "ATTACH_KEYS",
+    "EXPLAIN_CUES",
+    "COMPLEX_KEYWORDS",
+    "CONFLICT_PATTERN",
+]
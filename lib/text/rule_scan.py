@@ -0,0 +1,182 @@
+"""
+Rule Scan - shared rule compiler for single-pass text scanning.
+
+Flera moduler körde sina egna listor av `re.search` över samma text
+(prompt_shield, fastpath, orchestrator-heuristiker), var och en med egen
+lower()/IGNORECASE. Här kompileras alla regelset EN gång till en RuleScanner:
+
+- Texten casefoldas en gång; case-insensitive regler kompileras då utan
+  IGNORECASE så att `re` kan använda sin snabba literal-prefix-skanning.
+  (En kombinerad alternation med namngivna grupper mättes - den blir
+  långsammare i CPython:s `re` eftersom alternationer och IGNORECASE inte
+  prefix-optimeras.)
+- Identiska mönster delas mellan regelset och körs bara en gång.
+- `scan(text)` ger träffar för ALLA regelset i regelordning, så att
+  anropare som tidigare lät "senare regel vinna" beter sig likadant.
+
+Regler deklareras som `Rule(ruleset, label, pattern, flags, priority, capture)`
+(eller som kortare tuple). `priority` sorterar träffarna inom ett regelset
+(stigande, vid lika: deklarationsordning) så att vinnaren alltid ligger sist;
+`capture="all"` ger alla spans för regeln (finditer) istället för den första.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Rule(NamedTuple):
+    """Deklarativ regel: mönster -> label, med prioritet och span-capture."""
+
+    ruleset: Any
+    label: Hashable
+    pattern: str
+    flags: Optional[int] = None  # None = scannerns default-flaggor
+    priority: int = 0
+    capture: str = "first"  # "first" | "all"
+
+
+# Rule, eller (ruleset, label, pattern[, flags[, priority[, capture]]])
+RuleSpec = Tuple[Any, ...]
+
+CAPTURE_MODES = ("first", "all")
+
+# (label, pattern, start, end) - första (vänstraste) träffen per regel
+Hit = Tuple[Hashable, str, int, int]
+
+_LEADING_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+_FLAG_BITS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+
+def split_inline_flags(pattern: str, flags: int = 0) -> Tuple[str, int]:
+    """Flytta ledande globala inline-flaggor, t.ex. `(?i)`, till flaggor."""
+    m = _LEADING_FLAGS.match(pattern)
+    if not m:
+        return pattern, flags
+    for ch in m.group(1):
+        flags |= _FLAG_BITS.get(ch, 0)
+    return pattern[m.end():], flags
+
+
+def _folds_cleanly(body: str) -> bool:
+    """Mönstret matchar casefoldad text utan IGNORECASE (inga versaler/\\S/\\W...)."""
+    return body == body.casefold()
+
+
+class RuleScanner:
+    """
+    Kompilerade regler över flera regelset, skannade i ett pass.
+
+    `scan(text)` returnerar `{ruleset: [hit, ...]}` där träffarna ligger i
+    (prioritet, deklarationsordning) - med lika prioritet alltså i samma
+    ordning som reglerna deklarerades.
+    """
+
+    def __init__(self, rules: Iterable[RuleSpec], flags: int = 0):
+        self.rules: List[Tuple[Any, Hashable, str]] = []
+        self.priorities: List[int] = []
+        self._capture_all: List[bool] = []
+        # Unika (mönster, flaggor) -> index i self._programs
+        self._programs: List[Tuple[re.Pattern, re.Pattern, bool]] = []
+        self._program_all: List[bool] = []
+        self._program_of: List[int] = []
+        seen: Dict[Tuple[str, int], int] = {}
+        for spec in rules:
+            rule = spec if isinstance(spec, Rule) else Rule(*spec)
+            if rule.capture not in CAPTURE_MODES:
+                raise ValueError(f"Unknown capture mode: {rule.capture}")
+            rule_flags = flags if rule.flags is None else rule.flags
+            body, rule_flags = split_inline_flags(rule.pattern, rule_flags)
+            self.rules.append((rule.ruleset, rule.label, rule.pattern))
+            self.priorities.append(rule.priority)
+            self._capture_all.append(rule.capture == "all")
+            key = (body, rule_flags)
+            if key not in seen:
+                seen[key] = len(self._programs)
+                exact = re.compile(body, rule_flags)
+                folded = rule_flags & re.IGNORECASE and _folds_cleanly(body)
+                fast = re.compile(body, rule_flags & ~re.IGNORECASE) if folded else exact
+                self._programs.append((exact, fast, bool(folded)))
+                self._program_all.append(False)
+            self._program_of.append(seen[key])
+            if rule.capture == "all":
+                self._program_all[seen[key]] = True
+        self.rulesets: Tuple[Any, ...] = tuple(dict.fromkeys(r[0] for r in self.rules))
+        # Utvärderingsordning per regelset: (prioritet, deklarationsindex)
+        self._order: Dict[Any, List[int]] = {rs: [] for rs in self.rulesets}
+        for idx in sorted(range(len(self.rules)), key=lambda i: (self.priorities[i], i)):
+            self._order[self.rules[idx][0]].append(idx)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _program_spans(self, text: str) -> List[List[Tuple[int, int]]]:
+        """Spans per unikt program: första träffen, eller alla för capture="all"."""
+        if not text:
+            return [[] for _ in self._programs]
+        folded = text.casefold()
+        # Casefold kan ändra längden (ß -> ss); då stämmer inte offsets längre
+        use_folded = len(folded) == len(text)
+        spans: List[List[Tuple[int, int]]] = []
+        for (exact, fast, is_folded), want_all in zip(self._programs, self._program_all):
+            prog, hay = (fast, folded) if is_folded and use_folded else (exact, text)
+            if want_all:
+                spans.append([m.span() for m in prog.finditer(hay)])
+            else:
+                m = prog.search(hay)
+                spans.append([m.span()] if m else [])
+        return spans
+
+    def first_hits(self, text: str) -> Dict[int, Tuple[int, int]]:
+        """Regelindex -> span för första träffen."""
+        spans = self._program_spans(text)
+        return {idx: spans[prog][0] for idx, prog in enumerate(self._program_of) if spans[prog]}
+
+    def scan(self, text: str) -> Dict[Any, List[Hit]]:
+        """Skanna texten en gång och gruppera träffarna per regelset."""
+        spans = self._program_spans(text)
+        out: Dict[Any, List[Hit]] = {}
+        for ruleset, order in self._order.items():
+            hits = out[ruleset] = []
+            for idx in order:
+                found = spans[self._program_of[idx]]
+                if not found:
+                    continue
+                _, label, pattern = self.rules[idx]
+                for start, end in (found if self._capture_all[idx] else found[:1]):
+                    hits.append((label, pattern, start, end))
+        return out
+
+
+def compile_rules(rules: Sequence[RuleSpec], flags: int = 0) -> RuleScanner:
+    """Kompilera en regellista till en RuleScanner."""
+    return RuleScanner(rules, flags=flags)
+
+
+def last_label(hits: Sequence[Hit], default: Any = None) -> Any:
+    """
+    Vinnande label: högst prioritet, vid lika senast deklarerade regel
+    ("senare regel vinner").
+    """
+    return hits[-1][0] if hits else default
+
+
+def label_counts(hits: Sequence[Hit], labels: Iterable[Hashable] = ()) -> Dict[Hashable, int]:
+    """Antal träffar per label (labels ger nollor för omatchade)."""
+    counts: Dict[Hashable, int] = {lbl: 0 for lbl in labels}
+    for hit in hits:
+        counts[hit[0]] = counts.get(hit[0], 0) + 1
+    return counts
+
+
+__all__ = [
+    "Rule",
+    "RuleScanner",
+    "compile_rules",
+    "last_label",
+    "label_counts",
+    "split_inline_flags",
+    "Hit",
+    "RuleSpec",
+]
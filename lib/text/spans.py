@@ -0,0 +1,108 @@
+"""
+Spans - delad merge/NMS för agenternas (start, end)-spans.
+
+features_conversation, meta_patterns och explain_linker hade var sin kopia av
+samma två steg:
+
+    merge_same_label  sortera på (label, start, end) och slå ihop en span med
+                      föregående av samma label om gapet <= gap_join (och IoU >=
+                      iou_merge); end och confidence tar max
+    nms               greedy: fallande score (stabil ordning vid lika), behåll en
+                      span om ingen redan behållen har IoU >= iou_thr, sluta vid limit
+
+NMS jämförde varje kandidat mot varje behållen span. Här ligger behållna
+spans sorterade på start (KeptIndex): IoU >= t kräver
+|start_a - start_b| <= (1 - t) / t * len(a), så bara behållna spans i det
+fönstret jämförs (med samma iou()). Resultatet är exakt detsamma som den
+kvadratiska varianten.
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+Span = Dict[str, Any]
+
+
+def iou(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+    a1, a2 = a
+    b1, b2 = b
+    inter = max(0, min(a2, b2) - max(a1, b1))
+    union = (a2 - a1) + (b2 - b1) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def merge_same_label(spans: Sequence[Span], label: str = "flag", gap_join: int = 2,
+                     iou_merge: Optional[float] = 0.5, conf: str = "confidence", default_conf: float = 0.9,
+                     on_merge: Optional[Callable[[Span, Span], None]] = None) -> List[Span]:
+    """
+    Slå ihop spans med samma `label` som ligger inom `gap_join` från föregående.
+
+    `iou_merge=None` slår ihop på gap-villkoret ensamt. Den sammanslagna spanen
+    (första i sorteringsordning) muteras; `on_merge(kept, merged)` kan justera
+    fler fält.
+    """
+    out: List[Span] = []
+    for s in sorted(spans, key=lambda x: (x[label], x["start"], x["end"])):
+        if out:
+            last = out[-1]
+            if s[label] == last[label] and s["start"] <= last["end"] + gap_join and (
+                    iou_merge is None or iou((s["start"], s["end"]), (last["start"], last["end"])) >= iou_merge):
+                last["end"] = max(last["end"], s["end"])
+                last[conf] = max(last.get(conf, default_conf), s.get(conf, default_conf))
+                if on_merge is not None:
+                    on_merge(last, s)
+                continue
+        out.append(s)
+    return out
+
+
+class KeptIndex:
+    """Behållna spans sorterade på start; `suppresses(s, e)` om någon har IoU >= iou_thr."""
+
+    def __init__(self, iou_thr: float):
+        self.iou_thr = float(iou_thr)
+        self.reach = (1.0 - self.iou_thr) / self.iou_thr if self.iou_thr > 0 else math.inf
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def suppresses(self, s: int, e: int) -> bool:
+        if self.reach == math.inf:
+            lo, hi = 0, len(self.starts)
+        else:
+            w = self.reach * max(0, e - s) + 1  # +1: marginal för flyttalsavrundning
+            lo, hi = bisect_left(self.starts, s - w), bisect_right(self.starts, s + w)
+        thr = self.iou_thr
+        starts, ends = self.starts, self.ends
+        return any(iou((s, e), (starts[j], ends[j])) >= thr for j in range(lo, hi))
+
+    def add(self, s: int, e: int) -> None:
+        i = bisect_right(self.starts, s)
+        self.starts.insert(i, s)
+        self.ends.insert(i, e)
+
+
+def nms(spans: Sequence[Span], score: Callable[[Span], float], iou_thr: float, limit: int) -> List[Span]:
+    """
+    Greedy NMS i fallande `score` (lika score: inputordning).
+
+    Samma utfall som att sortera alla spans (reverse=True) och jämföra varje
+    kandidat mot varje behållen span. Precis som tidigare kontrolleras limit
+    efter varje kandidat, så minst en span behålls.
+    """
+    index = KeptIndex(iou_thr)
+    kept: List[Span] = []
+    for s in sorted(spans, key=score, reverse=True):  # stabil: lika score i inputordning
+        if not index.suppresses(s["start"], s["end"]):
+            kept.append(s)
+            index.add(s["start"], s["end"])
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+__all__ = ["iou", "merge_same_label", "nms", "KeptIndex"]
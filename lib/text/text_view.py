@@ -0,0 +1,190 @@
+"""
+TextView - delad, lazy förbehandling av en text för alla agenter.
+
+Nästan varje agent hade sin egen normalize() och meningsdelare och räknade
+fram gemener/NFC/NFKD/meningar ur råtexten på nytt. En TextView byggs en gång
+per text och varje form räknas ut först när någon agent ber om den:
+
+    nfc, nfkc, lower, casefold
+    folded       lower → NFKD → utan diakritik (tox_nuance, topic_classifier)
+    folded_ws    folded + kollapsad whitespace (safety_gate, risk_selfharm)
+    clean        utan kodblock/URL/e-post/siffror, trimmad (lang_detect)
+    clean_ws     clean + kollapsad whitespace (meta_patterns)
+    tokens       [(token, start, end)] med offsets i råtexten
+    sentences    meningar via SENT_SPLIT; sentence_bounds ger (start, end)
+    split(rx)    meningar för en agents egen delare (memo per mönster)
+    emoji        emoji i textordning
+    lang         språkgissning från lang_detect ({"lang", "confidence", ...})
+
+Varje form är exakt det värde agentens gamla normalize() gav, så utfallen
+ändras inte. `text_view(text)` delar vyn per text inom processen (liten LRU,
+samma idé som lib.text.prescan); anropare som redan har en vy kan ge den
+till agentens run(..., view=view).
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import cached_property
+from typing import Dict, List, Optional, Pattern, Tuple
+
+SENT_SPLIT = re.compile(r'(?<=[\.\!\?\n])\s+')
+
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+_WS_RE = re.compile(r"\s+")
+_URL_RE = re.compile(r"https?://\S+|www\.\S+", re.I)
+_EMAIL_RE = re.compile(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", re.I)
+_CODE_FENCE_RE = re.compile(r"```.*?```", re.S)
+_NUM_RE = re.compile(r"\d+")
+_TOKEN_RE = re.compile(r"\w+(?:['’]\w+)*", re.U)
+_EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\u2190-\u21FF\u3030\u303D\u3297\u3299]"
+    "[\uFE0F\U0001F3FB-\U0001F3FF]*"
+)
+
+VIEW_CACHE_SIZE = 64
+
+
+class TextView:
+    """Lazy-beräknade former av en text (se modul-docstring)."""
+
+    def __init__(self, text: str):
+        self.raw = text if isinstance(text, str) else str(text or "")
+        self._splits: Dict[Pattern, List[str]] = {}
+
+    def __repr__(self) -> str:
+        return f"TextView({self.raw[:40]!r}{'...' if len(self.raw) > 40 else ''})"
+
+    @cached_property
+    def nfc(self) -> str:
+        return unicodedata.normalize("NFC", self.raw)
+
+    @cached_property
+    def nfkc(self) -> str:
+        return unicodedata.normalize("NFKC", self.raw)
+
+    @cached_property
+    def lower(self) -> str:
+        return self.raw.lower()
+
+    @cached_property
+    def casefold(self) -> str:
+        return self.raw.casefold()
+
+    @cached_property
+    def folded(self) -> str:
+        """lower → NFKD → utan diakritik; == tox_nuance/topic_classifier normalize()."""
+        return _COMBINING_RE.sub("", unicodedata.normalize("NFKD", self.lower))
+
+    @cached_property
+    def folded_ws(self) -> str:
+        """
+        folded + kollapsad whitespace. Exakt vad safety_gate, risk_selfharm,
+        risk_abuse och risk_coercion normaliserade med (safety_scan delar den
+        mellan dem), så agenterna läser den i stället för en egen normalize().
+        """
+        return _WS_RE.sub(" ", self.folded)
+
+    @cached_property
+    def _cleaned(self) -> str:
+        t = _CODE_FENCE_RE.sub(" ", self.raw)
+        t = _URL_RE.sub(" ", t)
+        t = _EMAIL_RE.sub(" ", t)
+        return _NUM_RE.sub(" ", t)
+
+    @cached_property
+    def clean(self) -> str:
+        """== lang_detect.normalize()."""
+        return self._cleaned.strip()
+
+    @cached_property
+    def clean_ws(self) -> str:
+        """clean + kollapsad whitespace (meta_patterns)."""
+        return _WS_RE.sub(" ", self._cleaned).strip()
+
+    @cached_property
+    def tokens(self) -> List[Tuple[str, int, int]]:
+        return [(m.group(0), m.start(), m.end()) for m in _TOKEN_RE.finditer(self.raw)]
+
+    @cached_property
+    def sentence_bounds(self) -> List[Tuple[int, int]]:
+        """(start, end) i råtexten för varje icke-tom mening (SENT_SPLIT)."""
+        bounds, pos = [], 0
+        for m in SENT_SPLIT.finditer(self.raw):
+            bounds.append((pos, m.start()))
+            pos = m.end()
+        bounds.append((pos, len(self.raw)))
+        out = []
+        for s, e in bounds:
+            seg = self.raw[s:e]
+            if seg.strip():
+                lead = len(seg) - len(seg.lstrip())
+                out.append((s + lead, s + len(seg.rstrip())))
+        return out
+
+    @property
+    def sentences(self) -> List[str]:
+        return self.split(SENT_SPLIT)
+
+    def split(self, pattern: Pattern) -> List[str]:
+        """[x.strip() for x in pattern.split(raw) if x.strip()] - memo per mönster."""
+        parts = self._splits.get(pattern)
+        if parts is None:
+            parts = self._splits[pattern] = [x.strip() for x in pattern.split(self.raw) if x.strip()]
+        return list(parts)
+
+    @cached_property
+    def emoji(self) -> List[str]:
+        return _EMOJI_RE.findall(self.raw)
+
+    @cached_property
+    def lang(self) -> Dict:
+        from agents.lang_detect.main import detect_language_cached
+        return detect_language_cached(self.raw, view=self)
+
+
+_views: "OrderedDict[str, TextView]" = OrderedDict()
+_views_lock = threading.Lock()
+
+
+def text_view(text: Optional[str]) -> TextView:
+    """Delad TextView för texten (skapas vid första anropet, LRU per process)."""
+    text = text if isinstance(text, str) else str(text or "")
+    with _views_lock:
+        view = _views.get(text)
+        if view is not None:
+            _views.move_to_end(text)
+            return view
+        view = _views[text] = TextView(text)
+        if len(_views) > VIEW_CACHE_SIZE:
+            _views.popitem(last=False)
+        return view
+
+
+def adopt(view: Optional[TextView]) -> Optional[TextView]:
+    """Registrera en redan byggd vy så att text_view() för samma text återanvänder den."""
+    if view is not None:
+        with _views_lock:
+            _views[view.raw] = view
+            _views.move_to_end(view.raw)
+            if len(_views) > VIEW_CACHE_SIZE:
+                _views.popitem(last=False)
+    return view
+
+
+def ensure_view(text: Optional[str], view: Optional[TextView] = None) -> TextView:
+    """`view` om den gäller exakt `text`, annars den delade vyn för texten."""
+    text = text if isinstance(text, str) else str(text or "")
+    if view is not None and view.raw == text:
+        return adopt(view)
+    return text_view(text)
+
+
+def clear_views() -> None:
+    with _views_lock:
+        _views.clear()
+
+
+__all__ = ["TextView", "text_view", "ensure_view", "adopt", "clear_views", "SENT_SPLIT"]
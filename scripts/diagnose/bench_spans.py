@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: lib.text.spans (merge_same_label + nms) vs the old per-agent loops.
+Run: python scripts/diagnose/bench_spans.py [--sizes 10,1000,100000] [--limit 16]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lib.text.spans import iou, merge_same_label, nms
+
+
+def quadratic_nms(spans, score, iou_thr, limit):
+    # The loop features_conversation / meta_patterns / explain_linker used to run
+    spans = sorted(spans, key=score, reverse=True)
+    kept = []
+    for s in spans:
+        if all(iou((s["start"], s["end"]), (t["start"], t["end"])) < iou_thr for t in kept):
+            kept.append(s)
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+def make_spans(n, seed=0):
+    rnd = random.Random(seed)
+    text_len = max(1000, n * 40)
+    spans = []
+    for _ in range(n):
+        a = rnd.randrange(text_len)
+        spans.append({"start": a, "end": a + rnd.choice([12, 20, 40, 80]), "flag": rnd.choice("abcdefgh"),
+                      "confidence": rnd.choice([0.85, 0.9, 0.92])})
+    return spans
+
+
+def timed(fn, reps):
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        out = fn()
+    return (time.perf_counter() - t0) / reps * 1000.0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10,1000,100000")
+    ap.add_argument("--limit", type=int, default=16, help="max_spans (16 = features_conversation)")
+    ap.add_argument("--iou", type=float, default=0.8)
+    args = ap.parse_args()
+
+    score = lambda s: (s["end"] - s["start"]) * s.get("confidence", 0.9)
+    print(f"{'spans':>8} {'merge ms':>10} {'nms old ms':>11} {'nms new ms':>11} {'uncapped old':>12} {'uncapped new':>12}  same")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        spans = make_spans(n)
+        reps = max(1, 20000 // max(1, n))
+        merge_ms, merged = timed(lambda: merge_same_label([dict(s) for s in spans], label="flag"), reps)
+        old_ms, old = timed(lambda: quadratic_nms(merged, score, args.iou, args.limit), reps)
+        new_ms, new = timed(lambda: nms(merged, score, args.iou, args.limit), reps)
+        # utan tak (limit = alla, högst 5000 vid 100k): värsta fallet för den kvadratiska loopen
+        cap = len(merged) if n <= 10000 else 5000
+        all_old_ms, all_old = timed(lambda: quadratic_nms(merged, score, args.iou, cap), 1)
+        all_new_ms, all_new = timed(lambda: nms(merged, score, args.iou, cap), 1)
+        same = [id(s) for s in old] == [id(s) for s in new] and [id(s) for s in all_old] == [id(s) for s in all_new]
+        print(f"{n:>8} {merge_ms:>10.3f} {old_ms:>11.3f} {new_ms:>11.3f} {all_old_ms:>12.1f} {all_new_ms:>12.1f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@
  */
 
 import fs from "fs";
+import os from "os";
 import path from "path";
 import { fileURLToPath } from "url";
 
@@ -91,6 +92,7 @@ const misses = [];
 async function run() {
   // Import py_bridge using same approach as test script
   let callMicroMood;
+  let callMicroMoodBatch;
   try {
     // Use spawn directly (like test script does)
     const { spawn } = await import("child_process");
@@ -106,8 +108,8 @@ async function run() {
       console.warn(`[Eval] Micro-Mood script not found at ${scriptPath}, using fallback`);
     }
     
-    // Simple wrapper that uses Python directly
-    callMicroMood = async (text, lang, traceId) => {
+    // Simple wrapper that uses Python directly (one process per request line)
+    const runMicroMood = async (payload) => {
       return new Promise((resolve) => {
         const proc = spawn(pythonBin, [scriptPath], {
           stdio: ["pipe", "pipe", "pipe"],
@@ -117,6 +119,8 @@ async function run() {
             PYTHONIOENCODING: "utf-8",
             LC_ALL: "C.UTF-8",
             LANG: "C.UTF-8",
+            // Stora batchar fördelas över en processpool i micro_mood
+            MICRO_MOOD_WORKERS: process.env.MICRO_MOOD_WORKERS || String(Math.min(4, os.cpus().length)),
           },
         });
 
@@ -151,16 +155,26 @@ async function run() {
         });
 
         // Send request
-        const request = JSON.stringify({
-          agent: "micro_mood",
-          text: text,
-          lang: lang === "auto" ? "sv" : lang,
-          trace_id: traceId || "eval",
-        });
-        proc.stdin.write(request + "\n");
+        proc.stdin.write(JSON.stringify(payload) + "\n");
         proc.stdin.end();
       });
     };
+
+    callMicroMood = async (text, lang, traceId) => runMicroMood({
+      agent: "micro_mood",
+      text: text,
+      lang: lang === "auto" ? "sv" : lang,
+      trace_id: traceId || "eval",
+    });
+
+    // Batch: hela golden-setet i en request istället för en process per fall
+    callMicroMoodBatch = async (items) => {
+      const resp = await runMicroMood({ agent: "micro_mood", batch: items, trace_id: "eval_batch" });
+      if (resp.ok && Array.isArray(resp.batch) && resp.batch.length === items.length) {
+        return resp.batch;
+      }
+      return items.map(() => ({ ok: false, error: resp.error || "Batch failed", level: "neutral", score: 0 }));
+    };
   } catch (e) {
     console.error("[Eval] Failed to setup callMicroMood:", e.message);
     console.error("[Eval] Will use fallback - script structure test only");
@@ -171,6 +185,7 @@ async function run() {
       score: 0.5,
       latency_ms: 10,
     });
+    callMicroMoodBatch = async (items) => Promise.all(items.map((it) => callMicroMood(it.text, it.lang, it.trace_id)));
   }
 
   // Load all golden files
@@ -305,10 +320,16 @@ async function run() {
   let redFP = 0;
   let redPred = 0;
 
-  for (const r of allCases) {
+  const responses = await callMicroMoodBatch(allCases.map((r) => ({
+    text: r.text,
+    lang: r.lang === "auto" ? "sv" : r.lang,
+    trace_id: `golden_${r.id}`,
+  })));
+
+  for (const [i, r] of allCases.entries()) {
     try {
       const lang = r.lang === "auto" ? "sv" : r.lang;
-      const resp = await callMicroMood(r.text, lang, `golden_${r.id}`);
+      const resp = responses[i];
 
       if (!resp.ok) {
         console.warn(`[Eval] ${r.id} failed: ${resp.error}`);
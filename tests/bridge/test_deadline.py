@@ -0,0 +1,49 @@
+"""
+Deadline Test
+Per-request latensbudget: optional-steg hoppas över/trunkeras, required körs alltid
+"""
+import sys
+from pathlib import Path
+
+# Add root to path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.bridge.deadline import COST_MODEL, Deadline, StageSpec, budget_from
+
+
+def test_no_budget_runs_everything_and_reports_nothing():
+    dl = Deadline()
+    spec = StageSpec("t_opt", "heavy", required=False)
+    assert dl.run(spec, lambda: "full", "default") == "full"
+    assert dl.report() == {}
+
+
+def test_exhausted_budget_skips_optional_but_runs_required():
+    COST_MODEL.reset()
+    dl = Deadline(budget_ms=0)
+    assert dl.run(StageSpec("t_req", "heavy"), lambda: "req", None) == "req"
+    assert dl.run(StageSpec("t_opt", "heavy", required=False), lambda: "full", "default") == "default"
+    report = dl.report()
+    assert [d["stage"] for d in report["degraded"]] == ["t_opt"]
+    assert report["degraded"][0]["action"] == "skipped"
+
+
+def test_partial_budget_truncates_truncatable_stage():
+    COST_MODEL.reset()
+    COST_MODEL.observe("t_trunc", 1000.0)
+    dl = Deadline(budget_ms=500)
+    spec = StageSpec("t_trunc", "heavy", required=False, truncatable=True)
+    out = dl.run(spec, lambda: "full", "default", truncated_fn=lambda: "truncated")
+    assert out == "truncated"
+    assert dl.degraded[0]["action"] == "truncated"
+
+
+def test_budget_from_request_or_env(monkeypatch):
+    monkeypatch.delenv("REL_BUDGET_MS", raising=False)
+    assert budget_from(None) is None
+    assert budget_from("150") == 150.0
+    monkeypatch.setenv("REL_BUDGET_MS", "80")
+    assert budget_from(None) == 80.0
+    assert budget_from("x") is None
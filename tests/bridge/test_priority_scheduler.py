@@ -0,0 +1,80 @@
+"""
+Priority Scheduler Test
+Safety-lane + spekulativa steg som avbryts när safety svarar RED
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.bridge.deadline import Deadline, StageCancelled, StageSpec
+from backend.bridge.priority_scheduler import LANE_NORMAL, LANE_SAFETY, PriorityScheduler, lane_for
+
+
+def _is_red(name, res):
+    return res == "RED"
+
+
+def test_red_cancels_speculative_stages():
+    sched = PriorityScheduler(safety_workers=1, normal_workers=1)
+    dl = Deadline()
+    ran_second_stage = []
+
+    def pipeline(token):
+        token.on_cancel(dl.cancel)
+        time.sleep(0.1)
+        dl.run(StageSpec("t_second"), lambda: ran_second_stage.append(1), None)
+        return "analysis"
+
+    t0 = time.monotonic()
+    outcome = sched.run_request({"safety_gate": lambda tok: "RED"}, {"relations": pipeline}, _is_red)
+    assert outcome.blocked and outcome.blocked_by == "safety_gate"
+    assert "relations" in outcome.cancelled
+    assert time.monotonic() - t0 < 0.1  # blockerar utan att vänta på pipelinen
+    sched.shutdown()
+    assert ran_second_stage == []
+
+
+def test_ok_safety_returns_speculative_results_and_errors():
+    sched = PriorityScheduler()
+
+    def boom(tok):
+        raise ValueError("bridge fail")
+
+    outcome = sched.run_request(
+        {"safety_gate": lambda tok: "OK"},
+        {"relations": lambda tok: {"attachment_style": "trygg"}, "consent": boom},
+        _is_red,
+    )
+    assert not outcome.blocked
+    assert outcome.results["relations"] == {"attachment_style": "trygg"}
+    assert isinstance(outcome.errors["consent"], ValueError)
+    sched.shutdown()
+
+
+def test_safety_lane_not_blocked_by_saturated_normal_lane():
+    sched = PriorityScheduler(safety_workers=1, normal_workers=1)
+    release = threading.Event()
+    sched.submit(LANE_NORMAL, release.wait, 5)
+    fut = sched.submit(LANE_SAFETY, lambda: "ran")
+    assert fut.result(timeout=1) == "ran"
+    release.set()
+    sched.shutdown()
+
+
+def test_cancelled_deadline_raises_at_next_stage():
+    dl = Deadline()
+    dl.cancel()
+    try:
+        dl.run(StageSpec("t_any"), lambda: 1, None)
+    except StageCancelled:
+        pass
+    else:
+        raise AssertionError("expected StageCancelled")
+    assert lane_for("risk_selfharm") == LANE_SAFETY
+    assert lane_for("consent") == LANE_NORMAL
@@ -0,0 +1,127 @@
+"""
+Result Cache Test
+Content-addressed cache + in-flight coalescing för run_once
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.bridge.result_cache import ResultCache, DiskResultCache, agent_fingerprint, make_key
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    """Samtidiga identiska anrop delar EN beräkning."""
+    cache = ResultCache(max_entries=8, ttl_s=60)
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(1.0)
+        return {"tone_target": "lugn", "spans": []}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["coalesced"] * 4 + ["miss"]
+    assert cache.get_or_compute("k", compute)[1] == "hit"
+
+
+def test_coalesced_wait_is_bounded_by_budget():
+    """En väntande anropare räknar själv när ägaren inte hinner inom wait_s."""
+    cache = ResultCache(max_entries=8, ttl_s=60)
+    gate = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        gate.wait(2.0)
+        return "owner"
+
+    owner = threading.Thread(target=lambda: cache.get_or_compute("k", slow))
+    owner.start()
+    started.wait(1.0)
+    t0 = time.monotonic()
+    out, status = cache.get_or_compute("k", lambda: "local", wait_s=0.05)
+    assert (out, status) == ("local", "miss")
+    assert time.monotonic() - t0 < 1.0
+    gate.set()
+    owner.join()
+    assert cache.get("k") == (True, "owner")
+
+
+def test_cached_values_are_isolated_copies():
+    """Anropare kan mutera sitt svar utan att förstöra cachen."""
+    cache = ResultCache()
+    out, _ = cache.get_or_compute("k", lambda: {"labels": ["a"]})
+    out["labels"].append("b")
+    assert cache.get_or_compute("k", lambda: None)[0] == {"labels": ["a"]}
+
+
+def test_ttl_and_lru_bounds():
+    """Poster faller ut via TTL och maxantal."""
+    cache = ResultCache(max_entries=2, ttl_s=0.05)
+    for k in ("a", "b", "c"):
+        cache.put(k, k)
+    assert len(cache) == 2 and cache.get("a") == (False, None)
+    time.sleep(0.06)
+    assert cache.get("c") == (False, None)
+
+
+def test_key_changes_with_agent_versions(tmp_path):
+    """Bump av AGENT_VERSION ger ny nyckel (versionsbaserad invalidering)."""
+    agent = tmp_path / "main.py"
+    agent.write_text('AGENT_VERSION = "1.0.0"\n', encoding="utf-8")
+    k1 = make_key(text="hej", lang="sv", fingerprint=agent_fingerprint([agent]))
+    assert k1 == make_key(text="hej", lang=" SV", fingerprint=agent_fingerprint([agent]))
+    agent.write_text('AGENT_VERSION = "1.0.1"\n', encoding="utf-8")
+    assert k1 != make_key(text="hej", lang="sv", fingerprint=agent_fingerprint([agent]))
+    assert k1 != make_key(text="hej", lang="sv", dialog=[{"text": "hej"}], fingerprint=agent_fingerprint([agent]))
+
+
+def test_disk_cache_roundtrip(tmp_path):
+    """Diskcachen delar resultat mellan processer (här: instanser)."""
+    calls = []
+    first = DiskResultCache(directory=tmp_path, ttl_s=60)
+    assert first.get_or_compute("k", lambda: calls.append(1) or {"ok": True}) == ({"ok": True}, "miss")
+    assert DiskResultCache(directory=tmp_path, ttl_s=60).get_or_compute("k", lambda: calls.append(1)) == ({"ok": True}, "hit")
+    assert len(calls) == 1
+    assert not list(tmp_path.glob("*.lock"))
+
+
+def test_dialog_requests_bypass_cache(monkeypatch):
+    """Dialoganrop skriver sessionsminne och ska räknas om varje gång."""
+    from backend.bridge import run_rel_agents
+
+    calls = []
+    monkeypatch.setattr(run_rel_agents, "_RESULT_CACHE", ResultCache())
+    monkeypatch.setattr(run_rel_agents, "_run_once_uncached", lambda **kw: calls.append(kw) or {"attachment_style": "trygg"})
+    dialog = [{"speaker": "P1", "text": "hej"}]
+    for _ in range(2):
+        run_rel_agents.run_once(dialog=dialog)
+        run_rel_agents.run_once(text="hej", conversation_id="c1")
+        run_rel_agents.run_once(text="hej")
+    assert len(calls) == 5
+
+
+def test_disk_cache_is_opt_in(monkeypatch):
+    """Diskcachen sparar svar med text i klartext och är av som default."""
+    from backend.bridge.result_cache import disk_cache_enabled
+
+    monkeypatch.delenv("REL_DISK_CACHE", raising=False)
+    assert not disk_cache_enabled()
+    monkeypatch.setenv("REL_DISK_CACHE", "on")
+    assert disk_cache_enabled()
@@ -0,0 +1,54 @@
+"""
+Safety lane Test
+orchestrator_runner: RED från safety_gate (via safety_scan) blockerar, och dialogvägen (som
+skriver sessionsminne) startas först när safety släppt igenom requesten
+"""
+import sys
+from pathlib import Path
+
+# Add root to path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend import orchestrator_runner
+from backend.bridge.deadline import Deadline
+from lib.text.prescan import prescan
+
+RED_TEXT = "Om du går nu, vet du vad som händer."
+
+
+def test_red_text_blocks():
+    res = orchestrator_runner._run_agent("safety_gate", {"data": {"text": RED_TEXT}})
+    assert res is not None and res["emits"]["safety"] == "RED"
+    scan = orchestrator_runner._run_agent("safety_scan", {"data": {"text": RED_TEXT}, "meta": {"agents": ["safety_gate"]}})
+    assert orchestrator_runner._is_red("safety_scan", scan)
+    assert not scan["emits"]["safety_scan"]["complete"]
+    out = orchestrator_runner._analyze({"text": RED_TEXT}, prescan(RED_TEXT), Deadline())
+    assert out["ethics_check"] == "block" and out["risk_flags"] == ["RED"]
+
+
+def test_blocked_dialog_never_runs_relations(monkeypatch):
+    from backend.bridge import run_rel_agents
+
+    calls = []
+    monkeypatch.setattr(run_rel_agents, "run_once", lambda **kw: calls.append(kw) or {"attachment_style": "trygg", "ethics_check": "safe"})
+    dialog = [{"speaker": "P1", "text": RED_TEXT}]
+    out = orchestrator_runner._analyze({"text": RED_TEXT, "dialog": dialog}, prescan(RED_TEXT), Deadline())
+    assert out["ethics_check"] == "block"
+    assert calls == []
+
+    calm = "Kan vi prata om helgen?"
+    out = orchestrator_runner._analyze({"text": calm, "dialog": [{"speaker": "P1", "text": calm}]}, prescan(calm), Deadline())
+    assert out["ethics_check"] == "safe" and len(calls) == 1
+
+
+def test_hot_path_runs_safety_scan(monkeypatch):
+    from backend.bridge import run_rel_agents
+
+    ran = []
+    real = orchestrator_runner._run_agent
+    monkeypatch.setattr(orchestrator_runner, "_run_agent", lambda a, p, tok=None: ran.append(a) or real(a, p, tok))
+    monkeypatch.setattr(run_rel_agents, "run_once", lambda **kw: {"attachment_style": "trygg", "ethics_check": "safe"})
+    orchestrator_runner._analyze({"text": "Kan vi prata om helgen?"}, prescan(""), Deadline())
+    assert "safety_scan" in ran and "safety_gate" not in ran
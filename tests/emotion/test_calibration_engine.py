@@ -0,0 +1,39 @@
+"""
+Calibration Engine
+
+Tröskelsvep över cachade signaler ska ge exakt samma level/score som
+detect_mood i CALIBRATION_MODE med motsvarande Z-trösklar.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import micro_mood as mm
+from agents.emotion.calibration_engine import FeatureCache, cfg_override, load_golden, sweep
+
+
+def test_feature_cache_matches_detect_mood(monkeypatch):
+    cases = load_golden()
+    assert cases
+    cache = FeatureCache(cases)
+
+    for z in [(1.05, 0.80, 0.45), (0.90, 0.60, 0.30), (1.20, 0.50, 0.20)]:
+        monkeypatch.setenv("Z_RED", str(z[0]))
+        monkeypatch.setenv("Z_PLUS", str(z[1]))
+        monkeypatch.setenv("Z_LIGHT", str(z[2]))
+        with cfg_override():
+            expected = [(r["level"], r["score"]) for r in (mm.detect_mood(c["text"], c["lang"]) for c in cases)]
+        assert cache.predict(*z) == expected
+
+
+def test_sweep_orders_by_macro_f1():
+    cases = load_golden()[:20]
+    before = dict(mm.CFG)
+    results = sweep(cases, [1.0, 1.1], [0.6, 0.8], [0.3, 0.5])
+    assert len(results) == 8
+    assert all(r["Z_RED"] > r["Z_PLUS"] > r["Z_LIGHT"] for r in results)
+    assert results[0]["macro_f1"] == max(r["macro_f1"] for r in results)
+    assert mm.CFG == before
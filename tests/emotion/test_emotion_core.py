@@ -0,0 +1,82 @@
+"""
+Emotion Core
+
+Den fusionerade kedjan ska ge samma resultat per steg som separata agentanrop
+(micro_mood, empathy_tone_v2, tone_regularizer, empathy_fusion) och bära
+tonfiltrets tillstånd mellan turer.
+"""
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import empathy_tone_v2 as tone
+from agents.emotion import micro_mood as mm
+from agents.emotion.emotion_core import handle_jsonl_request, run_emotion_core
+from agents.emotion.empathy_fusion import fuse
+from agents.emotion.tone_regularizer import regularize_tone
+from agents.emotion.tone_state_store import MemoryToneStateStore, set_store
+
+TURNS = ["Jag är orolig för imorgon 😞", "haha okej, det löser sig nog 🙂", "I feel so alone and I want to die"]
+
+
+def test_fused_chain_matches_separate_agents():
+    set_store(MemoryToneStateStore())
+    history, state, expected = [], None, []
+    for text in TURNS:
+        mood = mm.detect_mood(text, "auto")
+        lang = mood["lang"]
+        ctx = {"trace_id": "sep", "prev_state": state}
+        t = tone.analyze(text, lang, context=ctx)
+        state = ctx["_updated_state"]
+        reg = regularize_tone(t["tone_vector"], history)
+        history.append(reg["tone_vector"])
+        red = mood["level"] == "red"
+        fused = fuse({"block": red, "level": "red" if red else "safe"},
+                     {"affects": t["affects"], "tone_vector": reg["tone_vector"]}, text, lang)
+        expected.append((mood["level"], mood["score"], t, reg, fused))
+
+    set_store(MemoryToneStateStore())
+    for text, (level, score, t, reg, fused) in zip(TURNS, expected):
+        out = run_emotion_core(text, "auto", trace_id="core")
+        assert (out["mood"]["level"], out["mood"]["score"]) == (level, score)
+        assert (out["tone"], out["regularizer"], out["fusion"]) == (t, reg, fused)
+        assert {"analysis", "micro_mood", "empathy_tone", "total"} <= set(out["timings_ms"])
+    assert out["fusion"]["block"] and out["explain"]["patterns"][0].startswith("akut")
+    assert len(out["tone_history"]) == len(TURNS)
+
+
+def test_red_without_risk_flags_is_not_selfharm(monkeypatch):
+    # RED från ett övergreppshot får inte märkas som självskada
+    import agents.emotion.emotion_core as core
+    seen = []
+    real, detect = core.explain_emotion, mm.detect_mood
+    monkeypatch.setattr(core, "explain_emotion", lambda *a, **kw: seen.append(a[3]) or real(*a, **kw))
+    # micro_mood-nivån beror på kalibreringsläget; RED är förutsättningen här
+    monkeypatch.setattr(mm, "detect_mood", lambda *a, **kw: {**detect(*a, **kw), "level": "red"})
+    set_store(MemoryToneStateStore())
+    out = run_emotion_core("Han slår mig och hotar att döda mig", "sv", track=False)
+    assert seen == [{"red": True}]
+    assert out["explain"]["patterns"][0].startswith("akut")
+
+
+def test_jsonl_round_trip_state():
+    set_store(MemoryToneStateStore())
+    first = json.loads(handle_jsonl_request(json.dumps({"text": TURNS[0], "lang": "sv", "trace_id": "x"})))
+    assert first["ok"] and first["trace_id"] == "x" and "next_state" in first
+
+    # Ny process (tom store) med tillståndet från förra svaret ger samma tur två
+    req = {"text": TURNS[1], "lang": "sv", "trace_id": "x", "explain": False}
+    warm = json.loads(handle_jsonl_request(json.dumps(req)))
+    set_store(MemoryToneStateStore())
+    cold = json.loads(handle_jsonl_request(json.dumps(
+        {**req, "prev_state": first["next_state"], "tone_history": first["tone_history"]})))
+    assert warm["tone"] == cold["tone"] and warm["fusion"] == cold["fusion"]
+    assert cold["explain"] is None
+
+    bad = json.loads(handle_jsonl_request(json.dumps({"agent": "micro_mood", "text": "x"})))
+    assert not bad["ok"]
+    set_store(MemoryToneStateStore())
@@ -0,0 +1,52 @@
+"""
+Emotion Tracker
+
+Rullande aggregat per konversation ska motsvara en omräkning från grunden,
+och change-points (RED-streak, nivåskiften) ska skickas till prenumeranter.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion.emotion_tracker import EmotionTracker
+
+TURNS = [
+    ("neutral", 0.5, "sv"), ("light", 0.45, "sv"), ("red", 1.0, "en"),
+    ("red", 1.0, "en"), ("red", 0.95, "sv"), ("plus", 0.8, "en"),
+]
+
+
+def test_push_turn_aggregates_and_events():
+    tracker = EmotionTracker()
+    seen = []
+    tracker.subscribe(seen.append)
+    tracker.open_session("c1", channel="chat")
+
+    events = []
+    for i, (level, score, lang) in enumerate(TURNS):
+        out = tracker.push_turn("c1", mood={"level": level, "score": score, "lang": lang},
+                                tone_vector=[0.5, 0.5 + 0.1 * i, 0.5], ts=float(i))
+        events += out["events"]
+
+    snap = tracker.snapshot("c1")
+    assert snap["turns"] == len(TURNS) and snap["meta"] == {"channel": "chat"}
+    assert snap["counts_by_level"] == {"neutral": 1, "light": 1, "plus": 1, "red": 3}
+    assert snap["max_red_streak"] == 3 and snap["red_streak"] == 0
+    sv = [s for _, s, l in TURNS if l == "sv"]
+    en = [s for _, s, l in TURNS if l == "en"]
+    assert snap["sv_en_gap"] == round(abs(sum(sv) / len(sv) - sum(en) / len(en)), 3)
+
+    types = [e["type"] for e in events]
+    assert types.count("red_enter") == 1 and types.count("red_streak") == 1 and types.count("red_exit") == 1
+    assert seen == events and snap["change_points"] == len(events)
+
+
+def test_sessions_are_bounded():
+    tracker = EmotionTracker(max_sessions=2)
+    for cid in ("a", "b", "c"):
+        tracker.push_turn(cid, mood={"level": "neutral", "score": 0.5})
+    assert tracker.sessions() == ["b", "c"] and tracker.snapshot("a") is None
+    assert tracker.close_session("b")["turns"] == 1 and len(tracker) == 1
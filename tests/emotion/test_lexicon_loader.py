@@ -0,0 +1,44 @@
+"""
+Lexicon Loader
+
+Kompilerad artefakt ska matcha källan, och en ändrad källfil ska bytas in
+utan omstart (nytt objekt → micro_mood bygger om sin plan).
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import lexicon_loader, micro_mood as mm
+from agents.emotion.lexicon_loader import DEFAULT_PATH, build, compiled_path, load_compiled, load_lexicon
+
+
+def test_compiled_artifact_is_up_to_date():
+    assert lexicon_loader.main(["check"]) == 0, "run: python agents/emotion/lexicon_loader.py build"
+    art = json.loads(compiled_path(DEFAULT_PATH).read_text(encoding="utf-8"))
+    compiled = load_compiled(check_interval=0)
+    assert compiled["source_sha256"] == art["source_sha256"], "run: python agents/emotion/lexicon_loader.py build"
+    assert compiled["lexicon"] == json.loads(DEFAULT_PATH.read_text(encoding="utf-8"))
+
+
+def test_hot_reload_on_mtime_change(tmp_path):
+    src = tmp_path / "lex.json"
+    src.write_text(json.dumps({"RED": {"sv": ["Förtvivlad ", "förtvivlad"], "en": []}}), encoding="utf-8")
+    build(src)
+    first = load_lexicon(src, check_interval=0)
+    assert first["RED"]["sv"] == ["Förtvivlad"]
+    assert load_lexicon(src, check_interval=60) is first
+    assert load_compiled(src)["lexicon"] is first
+
+    src.write_text(json.dumps({"RED": {"sv": ["uppgiven"], "en": []}}), encoding="utf-8")
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_lexicon(src, check_interval=60) is first
+    second = load_lexicon(src, check_interval=0)
+    # Inaktuell artefakt ignoreras - källan kompileras i minnet
+    assert second is not first and second["RED"]["sv"] == ["uppgiven"]
+    assert "uppgiven" in mm.get_plan(second).sv.red_words
@@ -0,0 +1,68 @@
+"""
+Micro-Mood JSONL batch protocol
+
+Batch-svar ska vara identiska med enstaka anrop, och svar från processpoolen
+matchas på trace_id även när de kommer i annan ordning.
+"""
+import io
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import micro_mood as mm
+
+TEXTS = [
+    ("Jag känner mig trött idag", "sv"),
+    ("I want to die, no way out", "en"),
+    ("Vi skrattade mycket igår 🙂", "auto"),
+    ("", "auto"),
+]
+
+
+def _strip(resp: dict) -> dict:
+    return {k: v for k, v in resp.items() if k != "latency_ms"}
+
+
+def test_batch_matches_single_requests():
+    items = [{"text": t, "lang": lang, "trace_id": f"t{i}"} for i, (t, lang) in enumerate(TEXTS)]
+    single = [_strip(json.loads(mm.handle_jsonl_request(json.dumps(it)))) for it in items]
+
+    resp = json.loads(mm.handle_jsonl_request(json.dumps({"batch": items, "trace_id": "b1"})))
+    assert resp["ok"] and resp["trace_id"] == "b1" and resp["count"] == len(items)
+    assert [_strip(r) for r in resp["batch"]] == single
+
+    bad = json.loads(mm.handle_jsonl_request(json.dumps({"batch": "nope", "trace_id": "b2"})))
+    assert not bad["ok"] and bad["trace_id"] == "b2"
+
+
+def test_serve_jsonl_pool_batch_and_pipelined_singles():
+    items = [{"text": t, "lang": lang, "trace_id": f"t{i}"} for i, (t, lang) in enumerate(TEXTS * 3)]
+    lines = [
+        json.dumps({"batch": items, "trace_id": "big"}),
+        json.dumps({"text": "Jag är ledsen", "lang": "sv", "trace_id": "s1"}),
+        "not json",
+    ]
+    out = io.StringIO()
+    mm.serve_jsonl(io.StringIO("\n".join(lines) + "\n"), out, workers=2, mp_min=4)
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    by_id = {r.get("trace_id"): r for r in responses}
+    assert len(responses) == 3
+    assert by_id["s1"]["ok"] and by_id["s1"]["level"]
+    assert [r["trace_id"] for r in by_id["big"]["batch"]] == [it["trace_id"] for it in items]
+    assert [_strip(r) for r in by_id["big"]["batch"]] == [_strip(mm._mood_response(it)) for it in items]
+    assert not by_id[""]["ok"]
+
+
+def test_detect_mood_batch_matches_scalar():
+    texts = [t for t, _ in TEXTS] * 2 + ["Han kontrollerar min telefon", "self-care hjälper 🙂"]
+    expected = [_strip(mm.detect_mood(t, "sv")) for t in texts]
+
+    assert [_strip(r) for r in mm.detect_mood_batch(texts, "sv")] == expected
+    pooled = mm.detect_mood_batch(texts, ["sv"] * len(texts), workers=2, chunksize=2)
+    assert [_strip(r) for r in pooled] == expected
+    assert pooled[0] is not pooled[len(TEXTS)]
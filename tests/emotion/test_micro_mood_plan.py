@@ -0,0 +1,48 @@
+"""
+Micro mood detection plan
+
+Planen ska återanvändas för samma lexikon och CFG, och byggas om när
+CFG-listorna eller lexikonobjektet byts.
+"""
+import gc
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import micro_mood as mm
+
+
+def _lexicon(words):
+    return {"RED": {"sv": list(words), "en": []}}
+
+
+def test_plan_reused_for_same_lexicon_and_cfg():
+    lex = _lexicon(["uppgiven"])
+    assert mm.get_plan(lex) is mm.get_plan(lex)
+
+
+def test_plan_rebuilt_when_cfg_changes():
+    lex = _lexicon([])
+    first = mm.get_plan(lex)
+    old = mm.CFG["RESOLVE_MARKERS_SV"]
+    try:
+        mm.CFG["RESOLVE_MARKERS_SV"] = old + ",testmarkör"
+        second = mm.get_plan(lex)
+        assert second is not first and "testmarkör" in second.sv.resolve_markers
+    finally:
+        mm.CFG["RESOLVE_MARKERS_SV"] = old
+    assert "testmarkör" not in mm.get_plan(lex).sv.resolve_markers
+
+
+def test_plan_rebuilt_for_new_lexicon_object():
+    # Nya lexikonobjekt (även med återanvänt id) får aldrig en gammal plan
+    for i in range(20):
+        lex = _lexicon([f"ord{i}"])
+        plan = mm.get_plan(lex)
+        assert plan.lexicon is lex and f"ord{i}" in plan.sv.red_words
+        del lex, plan
+        gc.collect()
+    assert len(mm._PLANS) <= mm._PLAN_SLOTS
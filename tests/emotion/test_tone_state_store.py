@@ -0,0 +1,59 @@
+"""
+Tone State Store
+
+Filtertillståndet för empathy_tone_v2 ska vara begränsat (LRU/TTL/bytes) och
+ge samma tonvektor oavsett om nästa tur körs i samma process eller läser
+tillståndet från en delad SQLite-store.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.emotion import empathy_tone_v2 as tone
+from agents.emotion.tone_state_store import MemoryToneStateStore, SqliteToneStateStore, make_store, set_store
+
+STATE = {"prev_vector": [0.5, 0.5, 0.5], "history_vectors": [[0.5, 0.5, 0.5]], "prev_feats": {"worry": 0.1}}
+TURNS = ["Jag är orolig för imorgon", "haha okej, det löser sig nog", "Bra, precis vad jag behövde..."]
+
+
+def test_memory_store_bounds():
+    store = MemoryToneStateStore(max_entries=3, ttl_s=60)
+    for i in range(5):
+        store.put(f"t{i}", STATE)
+    assert len(store) == 3 and store.get("t0") is None and store.get("t4") == STATE
+    assert store.stats["evicted"] == 2
+
+    got = store.get("t4")
+    got["prev_vector"][0] = 9.0
+    assert store.get("t4") == STATE
+
+    small = MemoryToneStateStore(max_entries=100, max_bytes=store.nbytes // 3 + 1)
+    for i in range(10):
+        small.put(f"t{i}", STATE)
+    assert small.nbytes <= small.max_bytes and len(small) < 10
+
+    expired = MemoryToneStateStore(ttl_s=0)
+    expired.put("a", STATE)
+    assert expired.get("a") is None and len(expired) == 0
+
+
+def test_shared_sqlite_store_matches_in_process(tmp_path):
+    def run(stores):
+        out = []
+        for i, text in enumerate(TURNS * 2):
+            set_store(stores[i % len(stores)])
+            out.append(tone.analyze(text, "sv", context={"trace_id": "conv-1"})["tone_vector"])
+        return out
+
+    try:
+        expected = run([MemoryToneStateStore()])
+        # Två "workers" som växelvis tar turerna mot samma fil
+        db = tmp_path / "tone_state.sqlite"
+        workers = [SqliteToneStateStore(db), SqliteToneStateStore(db)]
+        assert run(workers) == expected
+        assert len(workers[0]) == 1
+    finally:
+        set_store(make_store("memory"))
@@ -0,0 +1,76 @@
+"""
+Safety Scan
+
+safety_scan kör de fyra säkerhetsagenternas regler i ett pass. I audit-läge
+ska emits vara identiska med agenterna körda var för sig; early exit ska
+stanna vid första hard stop med samma nivå som agenten själv hade gett, och
+ett hard stop som bara hard + soft tillsammans ger (lenient) ska inte missas.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.safety_scan import main as safety_scan
+
+TEXTS = [
+    "Hej, hur mår du?",
+    "Om du inte gör det, vet du vad som händer. Annars tar jag barnen.",
+    "Han sa \"jag vill dö\" men det var ett citat",
+    "He hits me and threatens me. He screams at me, idiot.",
+    "hopeless, no way out, orkar inte mer",
+    "I will kill myself tonight. I'm hopeless.",
+]
+METAS = [{}, {"mode": "strict"}, {"mode": "lenient"}, {"mode": "balanced", "enable_insults": False}]
+
+
+def _separate(text, meta):
+    out = {}
+    for agent_id, mod in safety_scan.load_agents().items():
+        cfg = mod.cfg_from(meta, mod.parse_args([]))
+        out[agent_id] = mod.run({"data": {"text": text}, "meta": meta}, cfg)["emits"]
+    return out
+
+
+def _is_hard(agent_id, emits):
+    return emits.get("safety") == "RED" or emits.get(agent_id.replace("risk_", "") + "_risk") == "HIGH"
+
+
+def test_audit_matches_separate_agents():
+    for text in TEXTS:
+        for meta in METAS:
+            ref = _separate(text, meta)
+            res = safety_scan.run({"data": {"text": text}, "meta": dict(meta, audit=True)})
+            assert res["emits"]["safety_scan"]["complete"]
+            for agent_id, emits in ref.items():
+                assert res["emits"][agent_id] == emits
+
+
+def test_early_exit_stops_at_first_hard_stop():
+    for text in TEXTS:
+        for meta in METAS:
+            hard = {a for a, emits in _separate(text, meta).items() if _is_hard(a, emits)}
+            scan = safety_scan.run({"data": {"text": text}, "meta": meta})["emits"]["safety_scan"]
+            assert scan["hard_stop"] == bool(hard)
+            if hard:
+                assert scan["agent"] in hard
+                assert scan["level"] in safety_scan.HARD_LEVELS
+            if scan["hard_stop"] and not scan["complete"]:
+                assert scan["rules_run"] < scan["rules_total"]
+
+
+def test_lenient_hard_plus_soft_is_hard_stop():
+    # En HIGH-fras ensam blir MEDIUM i lenient, tillsammans med en MEDIUM-träff HIGH
+    res = safety_scan.run({"data": {"text": TEXTS[-1]}, "meta": {"mode": "lenient"}})
+    scan = res["emits"]["safety_scan"]
+    assert scan["hard_stop"] and scan["level"] == "HIGH" and scan["agent"] == "risk_selfharm"
+    assert scan["complete"] and res["emits"]["risk_selfharm"]["selfharm_risk"] == "HIGH"
+    assert res["checks"]["CHK-SAFETY-SCAN-01"]["reason"].startswith("Hard stop HIGH")
+
+
+def test_agent_subset():
+    res = safety_scan.run({"data": {"text": TEXTS[1]}, "meta": {"agents": ["risk_abuse"]}})
+    assert set(res["emits"]) == {"safety_scan", "risk_abuse"}
+    assert not res["emits"]["safety_scan"]["hard_stop"]
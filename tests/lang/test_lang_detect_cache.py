@@ -0,0 +1,39 @@
+"""
+Lang Detect Cache
+
+language_bridge ska detektera språk in-process (ingen subprocess per anrop):
+cachen är begränsad, ger samma svar som agenten och batch-API:t följer
+inmatningsordningen.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.lang_detect import main as lang_detect
+from lib.lang import detect_language, detect_languages, to_canonical_en
+
+TEXTS = ["Jag vill att du lyssnar på mig", "I need you to listen to me", "", "ok", "Jag vill att du lyssnar på mig"]
+
+
+def test_cached_matches_agent_and_is_bounded(monkeypatch):
+    lang_detect.clear_cache()
+    monkeypatch.setattr(lang_detect, "CACHE_MAX", 2)
+    for t in TEXTS:
+        assert lang_detect.detect_language_cached(t) == lang_detect.detect_language(t)
+    lang_detect.detect_language_cached(TEXTS[-1])
+    info = lang_detect.cache_info()
+    assert info["entries"] == 2 and info["evicted"] == 3 and info["hit"] == 1
+    res = lang_detect.detect_language_cached(TEXTS[0])
+    res["details"]["sv"]["stop"] = -1
+    assert lang_detect.detect_language_cached(TEXTS[0])["details"]["sv"]["stop"] != -1
+
+
+def test_bridge_in_process_and_batch(monkeypatch):
+    import subprocess
+    monkeypatch.setattr(subprocess, "run", lambda *a, **k: (_ for _ in ()).throw(AssertionError("spawn")))
+    assert [detect_language(t) for t in TEXTS] == ["sv", "en", "en", "en", "sv"]
+    assert detect_languages(TEXTS) == [detect_language(t) for t in TEXTS]
+    assert to_canonical_en(TEXTS[0]) == (TEXTS[0], "sv")
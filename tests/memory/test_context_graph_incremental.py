@@ -0,0 +1,85 @@
+"""
+Context graph (inkrementell)
+
+analyze_incremental ska bara bearbeta nya turer och ge samma räknare, spans
+och noder som en full analyze() över hela dialogen. graph_spans är alltid hela
+grafens spans; de nya turernas ligger i graph_delta.
+"""
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.context_graph.main import analyze, analyze_incremental, graph_snapshot, make_store
+
+WORDS = ["jag", "du", "vi", "hon", "paus", "check-in", "gräns", "min partner", "vänner", "konflikt",
+         "stöd", "hej", "20 min", "IRL", "familj"]
+
+
+def _dialog(rnd, n):
+    return [{"speaker": rnd.choice(["P1", "P2"]),
+             "text": " ".join(rnd.choice(WORDS) for _ in range(rnd.randrange(0, 10)))} for _ in range(n)]
+
+
+def test_incremental_matches_full():
+    rnd = random.Random(4)
+    key = lambda s: (s["start"], s["label"])
+    for _ in range(40):
+        dialog = _dialog(rnd, rnd.randrange(1, 15))
+        store = make_store("memory", None)
+        spans = []
+        for k in range(1, len(dialog) + 1):
+            res = analyze_incremental("c1", dialog[:k], store=store)
+            spans += res["graph_delta"]["spans"]
+            assert sorted(res["graph_spans"], key=key) == sorted(spans, key=key)
+        full = analyze(" ".join(m["text"] for m in dialog), dialog=dialog)
+        assert res["event_counts"] == full["event_counts"]
+        assert res["relation_counts"] == full["relation_counts"]
+        assert res["graph_confidence"] == full["graph_confidence"]
+        assert sorted(spans, key=key) == sorted(full["graph_spans"], key=key)
+        snap = graph_snapshot(store.get("context_graph:c1"))
+        assert {n["id"]: n for n in snap["nodes"]} == {n["id"]: n for n in full["graph_delta"]["nodes"]}
+
+
+def test_delta_is_the_diff():
+    store = make_store("memory", None)
+    dialog = [{"speaker": "P1", "text": "jag vill ha en paus"}]
+    first = analyze_incremental("c2", dialog, store=store)
+    assert {n["id"] for n in first["graph_delta"]["nodes"]} == {"P1", "P2", "evt:paus"}
+    assert [e["type"] for e in first["graph_delta"]["edges"]] == ["mentions", "interacts_with"]
+
+    dialog.append({"speaker": "P2", "text": "paus låter bra"})
+    second = analyze_incremental("c2", dialog, store=store)
+    assert second["graph_delta"]["nodes"] == [{"id": "evt:paus", "type": "event", "count": 2, "mentions": 2}]
+    assert second["graph_delta"]["edges"] == [
+        {"from": "P2", "to": "evt:paus", "type": "mentions", "confidence": 0.8, "turn": 2}]
+    assert [t["t"] for t in second["graph_delta"]["timeline"]] == [2]
+
+    assert [sp["start"] for sp in second["graph_delta"]["spans"]] == [20]
+
+    # Retry/replay av samma dialog: ingen diff, men evidensen finns kvar
+    again = analyze_incremental("c2", dialog, store=store)
+    assert again["graph_delta"] == {"nodes": [], "edges": [], "timeline": [], "spans": []}
+    assert again["graph_spans"] == second["graph_spans"] and len(again["graph_spans"]) == 2
+
+
+def test_changed_dialog_rebuilds():
+    store = make_store("memory", None)
+    analyze_incremental("c3", [{"speaker": "P1", "text": "paus"}, {"speaker": "P2", "text": "ok"}], store=store)
+    res = analyze_incremental("c3", [{"speaker": "P1", "text": "gräns"}], store=store)
+    assert res["graph_rebuilt"] and res["graph_turns"] == 1 and res["graph_events"] == ["gräns"]
+
+
+def test_default_store_persists(tmp_path, monkeypatch):
+    from agents.context_graph import main as context_graph
+    monkeypatch.setenv("CONTEXT_GRAPH_STATE_PATH", str(tmp_path / "cg.sqlite"))
+    monkeypatch.delenv("CONTEXT_GRAPH_STATE_BACKEND", raising=False)
+    context_graph.set_graph_store(None)
+    try:
+        assert context_graph.get_graph_store().backend == "sqlite"
+    finally:
+        context_graph.get_graph_store().close()
+        context_graph.set_graph_store(None)
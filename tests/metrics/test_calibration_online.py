@@ -0,0 +1,80 @@
+"""
+Calibration (stateful)
+
+Online-statistiken ska ge samma medel/std som calculate_statistics, och
+drift mot lagrad historik ska bli densamma som när hela historiken skickas.
+Stateful läge är opt-in, och samtidiga processer får inte tappa uppdateringar.
+"""
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.calibration.main import calculate_statistics, run
+from agents.calibration.online_stats import OnlineStats
+from agents.emotion.tone_state_store import make_store
+from agents.calibration import online_stats
+
+
+def test_welford_matches_batch_stats():
+    rnd = random.Random(1)
+    values = [rnd.random() for _ in range(500)]
+    st = OnlineStats(window=20)
+    st.extend(values)
+    ref = calculate_statistics(values)
+    assert round(st.mean, 3) == ref["mean"]
+    assert round(st.std, 3) == ref["std"]
+    restored = OnlineStats.from_state(st.to_state(), window=20)
+    assert list(restored.window) == values[-20:]
+    assert restored.summary() == st.summary()
+
+
+def test_stateful_drift_matches_full_history():
+    online_stats.set_store(make_store("memory", None))
+    try:
+        rnd = random.Random(2)
+        history = []
+        for i in range(40):
+            cur = {"empathy": round(rnd.random() * (1 + i / 20), 3), "clarity": round(rnd.random(), 3)}
+            full = run({"data": {"current_scores": cur, "historical_scores": list(history)}}, {"window_size": 10})
+            online = run({"data": {"current_scores": cur}}, {"window_size": 10, "agent": "reply", "stateful": True})
+            assert online["emits"]["drift_detection"] == full["emits"]["drift_detection"]
+            assert online["emits"]["online"]["metrics"]["empathy"]["stats"]["n"] == i + 1
+            history.append({"scores": cur})
+    finally:
+        online_stats.set_store(None)
+
+
+def test_stateful_is_opt_in():
+    online_stats.set_store(make_store("memory", None))
+    try:
+        res = run({"data": {"current_scores": {"empathy": 0.4}}}, {"agent": "reply"})
+        assert "online" not in res["emits"]
+        assert len(online_stats.get_store()) == 0
+    finally:
+        online_stats.set_store(None)
+
+
+_WORKER = """
+from agents.calibration.main import calibrate_online
+for i in range({n}):
+    calibrate_online("reply", {{"empathy": 0.5, "clarity": 0.25}})
+"""
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    env = {**os.environ, "CALIBRATION_STATE_BACKEND": "sqlite",
+           "CALIBRATION_STATE_PATH": str(tmp_path / "cal.sqlite"), "PYTHONPATH": str(ROOT)}
+    procs = [subprocess.Popen([sys.executable, "-c", _WORKER.format(n=25)], cwd=ROOT, env=env) for _ in range(4)]
+    assert all(p.wait(timeout=60) == 0 for p in procs)
+    store = make_store("sqlite", str(tmp_path / "cal.sqlite"))
+    try:
+        assert online_stats.load("reply:empathy", store=store).n == 100
+        assert online_stats.load("reply:*", store=store).n == 200
+    finally:
+        store.close()
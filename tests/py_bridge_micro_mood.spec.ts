@@ -5,8 +5,10 @@
  * KPI: p95 <150ms, error rate <0.5%, 100% schema-validerade svar
  */
 import { describe, it, expect, beforeAll, afterAll } from "@jest/globals";
-import { callMicroMood, shutdownPyBridgePool } from "../backend/ai/py_bridge";
+import { callMicroMood, shutdownPyBridgePool, PyBridgePool } from "../backend/ai/py_bridge";
 import path from "path";
+import fs from "fs";
+import os from "os";
 
 // -------------------- Test Cases (20 fall) -------------------- //
 
@@ -48,6 +50,17 @@ const TEST_CASES = [
   { text: "I feel sad and hopeless", lang: "auto" as const, expected: { level: "plus", score: { min: 0.5, max: 0.9 } } },
 ];
 
+const SLOW_WORKER = [
+  "import json, sys, time",
+  "for line in iter(sys.stdin.readline, ''):",
+  "    req = json.loads(line)",
+  "    if req['text'] == 'slow':",
+  "        time.sleep(0.35)",
+  "    print(json.dumps({'ok': True, 'agent': 'micro_mood', 'score': 0.0, 'level': 'neutral',",
+  "                      'flags': [req['text']], 'trace_id': req['trace_id']}), flush=True)",
+  "",
+].join("\n");
+
 // -------------------- Test Suite -------------------- //
 
 describe("Py-Bridge Micro-Mood (steg 92)", () => {
@@ -172,6 +185,34 @@ describe("Py-Bridge Micro-Mood (steg 92)", () => {
     expect(true).toBe(true);
   });
 
+  it("should drop a late reply to a timed-out request", async () => {
+    // Fejkworker: "slow" svarar efter timeouten, med sitt eget trace_id
+    const script = path.join(os.tmpdir(), `mm_slow_worker_${process.pid}.py`);
+    fs.writeFileSync(script, SLOW_WORKER);
+    const pool = new PyBridgePool({
+      agentName: "micro_mood",
+      pythonScript: script,
+      poolSize: 1,
+      callTimeoutMs: 300,
+      batchItemTimeoutMs: 20,
+      circuitBreakerThreshold: 5,
+      circuitBreakerResetMs: 30000,
+    });
+    try {
+      const first = await pool.call({ agent: "micro_mood", text: "slow", lang: "sv" });
+      expect(first.ok).toBe(false);
+      expect(first.error).toMatch(/Timeout/);
+
+      // Det sena "slow"-svaret kommer medan "fast" väntar och ska ignoreras
+      const second = await pool.call({ agent: "micro_mood", text: "fast", lang: "sv" });
+      expect(second.ok).toBe(true);
+      expect(second.flags).toEqual(["fast"]);
+    } finally {
+      await pool.shutdown();
+      fs.rmSync(script, { force: true });
+    }
+  });
+
   it("should validate schema strictly", async () => {
     const response = await callMicroMood("Test", "sv");
     
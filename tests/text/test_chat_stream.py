@@ -0,0 +1,78 @@
+"""
+Chat stream
+
+Strömmande parsning av chattexporter (lib.text.chat_stream + thread_parser /
+speaker_attrib) ska ge samma turer som parsning av hela texten.
+"""
+import io
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lib.text import chat_stream
+from lib.text.chat_stream import iter_lines, peek
+from agents.thread_parser import main as thread_parser
+from agents.speaker_attrib import main as speaker_attrib
+from agents.rel.dialog_memory_agent import DialogMemoryFold
+from agents.rel.session_memory import key_of
+
+TOKENS = ["P1:", "P2:", "Person 1:", "[P1]:", "<P2>", "Jag:", "du", "jag", "you", "hej", "Hej.", "ok?", "ja!",
+          ".", " ", "  ", "\n", "\n", "\n\n", "\r\n", "\t"]
+
+
+def _texts(n, seed=3):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rnd.choice(TOKENS) + rnd.choice(["", " "]) for _ in range(rnd.randrange(0, 30)))
+
+
+def test_iter_lines_matches_split(monkeypatch):
+    for k, text in enumerate(_texts(300)):
+        monkeypatch.setattr(chat_stream, "READ_CHARS", 1 + k % 5)
+        assert list(iter_lines(io.StringIO(text))) == text.split("\n")
+
+
+def test_iter_lines_reads_path(tmp_path):
+    path = tmp_path / "export.txt"
+    path.write_text("P1: hej\r\nP2: hej då\n", encoding="utf-8", newline="")
+    assert list(iter_lines(path)) == ["P1: hej\r", "P2: hej då", ""]
+
+
+def test_peek_keeps_items():
+    head, it = peek(iter(range(5)), 2)
+    assert head == [0, 1] and list(it) == [0, 1, 2, 3, 4]
+
+
+def test_iter_turns_matches_run():
+    for text in _texts(500):
+        for fmt in ("structured", "plain"):
+            expected = thread_parser.run({"data": {"description": text}}, {"format": fmt})["emits"]["thread"]
+            assert list(thread_parser.iter_turns(io.StringIO(text), fmt)) == expected
+
+
+def test_iter_turns_jsonl():
+    src = ['{"speaker": "P1", "text": "hej"}', "", "inte json", '{"speaker": "P2", "text": "hallå", "ts": 9}']
+    assert list(thread_parser.iter_turns(src)) == [
+        {"speaker": "P1", "text": "hej", "ts": 0, "turn": 1},
+        {"speaker": "P2", "text": "hallå", "ts": 9, "turn": 2},
+    ]
+
+
+def test_speaker_attrib_stream_matches_run():
+    for text in _texts(300, seed=5):
+        expected = speaker_attrib.run({"data": {"description": text}}, {})["emits"]["labeled_thread"]
+        lang = speaker_attrib.detect_language(text)
+        assert list(speaker_attrib.iter_stream(io.StringIO(text), lang)) == expected
+
+
+def test_dialog_memory_fold_session_key():
+    dialog = [{"speaker": "P1", "text": "hej å"}, {"speaker": "P2", "text": ""}, {"speaker": "P1", "text": "IRL?"}]
+    fold = DialogMemoryFold(max_speakers=2)
+    for m in dialog:
+        fold.add(m)
+    assert fold._key.hexdigest()[:16] == key_of(" ".join(m["text"] for m in dialog))
+    assert list(fold.speakers) == ["P2", "P1"] and fold.proposal["switch_channel"]
@@ -0,0 +1,98 @@
+"""
+Evidence dedupe (index)
+
+dedupe() med prefixfilter-index ska ge samma utfall som den parvisa
+jämförelsen, och agent-spans inuti en behållen span räknas som dubbletter.
+"""
+import copy
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.report_evidence.main import cfg_from, content_fprint, dedupe, jaccard, parse_args, run
+from lib.text.dedup_index import SpanCover
+
+
+def pairwise_dedupe(items, max_duplicates):
+    # Den tidigare kvadratiska varianten
+    kept, dropped = [], 0
+    for it in items:
+        for jt in kept:
+            if it["content_fprint"] == jt["content_fprint"]:
+                break
+            if jaccard(it["snippet"], jt["snippet"]) >= max_duplicates:
+                if it["quality"] > jt["quality"]:
+                    jt.update(it)
+                break
+        else:
+            kept.append(it)
+            continue
+        dropped += 1
+    return kept, dropped
+
+
+def test_dedupe_matches_pairwise():
+    rnd = random.Random(3)
+    vocab = [f"w{i}" for i in range(30)] + ["Hej", "hej", "då"]
+    for _ in range(300):
+        base = [" ".join(rnd.choice(vocab) for _ in range(rnd.randrange(0, 10))) for _ in range(5)]
+        items = []
+        for i in range(rnd.randrange(1, 25)):
+            words = rnd.choice(base).split()
+            if words and rnd.random() < 0.5:
+                words[rnd.randrange(len(words))] = rnd.choice(vocab)
+            snippet = " ".join(words)
+            items.append({"id": i, "snippet": snippet, "content_fprint": content_fprint(snippet),
+                          "quality": rnd.random()})
+        t = rnd.choice([0.0, 0.5, 0.75, 0.85, 1.0])
+        assert dedupe(copy.deepcopy(items), t) == pairwise_dedupe(copy.deepcopy(items), t)
+
+
+def test_span_containment():
+    cover = SpanCover()
+    cover.add("d", 10, 20)
+    cover.add("d", 5, 12)
+    assert cover.covers("d", 12, 18)
+    assert not cover.covers("d", 8, 18)
+    assert not cover.covers("other", 12, 18)
+    cover.add("d", 5, 25)
+    assert cover.covers("d", 8, 18)
+    cover.remove("d", 5, 25)
+    assert cover.covers("d", 12, 18) and not cover.covers("d", 8, 18)
+    cover.remove("d", 10, 20)
+    assert cover.covers("d", 6, 12) and not cover.covers("d", 12, 18)
+
+    sources = [
+        {"id": "A", "doc": "case", "span": [100, 180], "snippet": "vi bråkar varje kväll om disken", "confidence": 0.9},
+        {"id": "B", "doc": "case", "span": [120, 150], "snippet": "varje kväll", "confidence": 0.9},
+        {"id": "C", "doc": "case", "span": [170, 220], "snippet": "han går ut utan att säga något", "confidence": 0.9},
+    ]
+    cfg = cfg_from({"min_quality": 0.0}, parse_args([]))
+    out = run({"data": {"sources": sources}}, cfg)["emits"]
+    assert [e["source_id"] for e in out["evidence"]] == ["A", "C"]
+    assert out["stats"]["dropped_dupes"] == 1
+
+
+def test_replaced_item_releases_its_span():
+    # B ersätter A (högre kvalitet, samma text utan span); A:s span ska inte
+    # längre täcka C
+    items = [
+        {"id": "A", "snippet": "vi bråkar om disken", "quality": 0.5, "doc": "case", "span": [0, 100]},
+        {"id": "B", "snippet": "vi bråkar om disken ikväll", "quality": 0.9},
+        {"id": "C", "snippet": "han går ut", "quality": 0.9, "doc": "case", "span": [10, 20]},
+    ]
+    for it in items:
+        it["content_fprint"] = content_fprint(it["snippet"])
+    kept, dropped = dedupe(items, 0.5)
+    assert [it["id"] for it in kept] == ["B", "C"] and dropped == 1
+
+
+def test_unknown_dedupe_mode_falls_back_to_exact():
+    cfg = cfg_from({"dedupe_mode": "fuzzy", "min_quality": 0.0}, parse_args([]))
+    assert cfg["dedupe_mode"] == "exact"
+    out = run({"data": {"sources": [{"id": "A", "snippet": "hej", "confidence": 0.9}]}}, cfg)
+    assert [e["source_id"] for e in out["emits"]["evidence"]] == ["A"]
@@ -0,0 +1,91 @@
+"""
+Long Doc
+
+Chunkat läge för långa texter: chunkarna ska täcka texten med ägda intervall
+utan luckor, ChunkedMatcher ska ge samma träffar som Matcher över hela texten,
+och features_conversation ska ge samma emits i långt läge som i vanligt.
+Långt läge är opt-in, och processpoolen återanvänds mellan anrop.
+"""
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import lib.text.long_doc as long_doc
+from lib.text.long_doc import ChunkedMatcher, Matcher, sentence_bounds, split_chunks
+from agents.features_conversation import main as features_conversation
+
+TEXT = ("Du är alltid sen. Jag förstår. \"Det har aldrig hänt!\" you always do this\n"
+        "kan vi pausa 10 minuter? Annars tar jag barnen. left me on read. ") * 40
+PROBES = [
+    ("search", r"\bannars\b", re.I, False),
+    ("search", r"\bdu är alltid\b.*", re.I, False),
+    ("finditer", r"\b(pausa|minuter)\b", 0, True),
+    ("finditer", r"aldrig hänt", 0, False),
+    ("find", "left me", 0, True),
+    ("find", "finns inte", 0, False),
+]
+
+
+def test_split_chunks_cover_text():
+    chunks = split_chunks(TEXT, chunk_chars=300, overlap=50)
+    assert len(chunks) > 1
+    assert chunks[0].own_start == 0 and chunks[-1].own_end == len(TEXT)
+    for a, b in zip(chunks, chunks[1:]):
+        assert a.own_end == b.own_start
+        assert TEXT[a.own_end - 1] == " "  # meningsgräns
+    for c in chunks:
+        assert c.start <= c.own_start < c.own_end <= c.end
+        assert c.own_end - c.own_start <= 300
+
+
+def test_sentence_bounds():
+    text = "Hej. Du är \"alltid sen!\" Va\nny rad"
+    i = text.index("alltid")
+    assert sentence_bounds(text, i, i + 6) == (4, 24)
+    assert sentence_bounds(text, 0, 2) == (0, 4)
+    assert sentence_bounds(text, len(text) - 2, len(text)) == (28, len(text))
+
+
+def test_chunked_matcher_matches_full_text():
+    full = Matcher(TEXT)
+    chunked = ChunkedMatcher(TEXT, PROBES, chunks=split_chunks(TEXT, chunk_chars=200, overlap=80), workers=1)
+    for op, pattern, flags, lower in PROBES:
+        if op == "find":
+            assert chunked.find(pattern, lower) == full.find(pattern, lower)
+        else:
+            assert getattr(chunked, op)(pattern, flags, lower) == getattr(full, op)(pattern, flags, lower)
+    # ej uppräknade prober går direkt mot hela texten
+    assert chunked.search(r"\bbarnen\b") == full.search(r"\bbarnen\b")
+
+
+def test_features_conversation_long_doc_same_emits(monkeypatch):
+    monkeypatch.setattr(long_doc, "CHUNK_CHARS", 500)
+    monkeypatch.setattr(long_doc, "CHUNK_OVERLAP", 120)
+    payload = {"data": {"text": TEXT}, "meta": {"explain_verbose": True, "long_doc_workers": 1}}
+    normal = features_conversation.run({**payload, "meta": {**payload["meta"], "long_doc": False}})
+    long = features_conversation.run({**payload, "meta": {**payload["meta"], "long_doc": True}})
+    assert long["emits"]["debug"].pop("long_doc_chunks") > 1
+    assert "long_doc_chunks" not in normal["emits"]["debug"]
+    assert long["emits"] == normal["emits"]
+
+
+def test_long_mode_is_opt_in():
+    assert not long_doc.is_long("x" * 1_000_000, {})
+    assert not long_doc.is_long("x" * 1_000_000, None)
+    assert long_doc.is_long("kort", {"long_doc": True})
+    res = features_conversation.run({"data": {"text": TEXT * 20}, "meta": {"explain_verbose": True}})
+    assert "long_doc_chunks" not in res["emits"]["debug"]
+
+
+def test_map_chunks_reuses_pool():
+    jobs = [(TEXT[:400], 0, 400, PROBES)] * 3
+    first = long_doc.map_chunks(long_doc._scan_job, jobs, workers=2)
+    pool = long_doc._POOL
+    assert pool is not None
+    assert long_doc.map_chunks(long_doc._scan_job, jobs, workers=2) == first
+    assert long_doc._POOL is pool
+    assert first == [long_doc.scan_chunk(*job) for job in jobs]
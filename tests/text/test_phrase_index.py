@@ -0,0 +1,55 @@
+"""
+Phrase Index / Diag Engine
+
+PhraseIndex ska ge exakt samma träffar som `re.search(r'\b'+p+r'\b')` per fras,
+och diag_engine ska ge samma emits som varje diag-agent körd för sig.
+"""
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lib.text.phrase_index import LexiconHits, PhraseIndex
+from agents.diag_engine import main as diag_engine
+
+PHRASES = ["jag", "jag är rädd", "i'm afraid", "!!!", "all caps", "right now", "aband", "pull away"]
+TEXTS = [
+    "Jag är rädd, jag!!! ALL CAPS right now.",
+    "i'm afraid... abandon? aband. pull  away / pull away",
+    "jagär rädd !!!x x!!!x",
+    "",
+]
+
+
+def test_scan_matches_regex_per_phrase():
+    idx = PhraseIndex(PHRASES)
+    for t in TEXTS:
+        s = t.lower()
+        expected = {p for p in PHRASES if re.search(r"\b" + re.escape(p) + r"\b", s)}
+        assert idx.scan(s) == expected
+
+
+def test_lexicon_hits_any_count_and_fallback():
+    reg = LexiconHits()
+    reg.register("a", {"x": PHRASES[:4]})
+    reg.register("b", [PHRASES[4:]])
+    assert reg.tags_for("jag") == ("a",)
+    text = TEXTS[0]
+    assert reg.count(["jag", "jag", "right now"], text) == 3
+    assert reg.any(["pull away"], text) is False
+    # oregistrerad fras faller tillbaka på regex
+    assert reg.any(["caps right"], text) is True
+    assert reg.hits(text) is reg.hits(text.upper())
+
+
+def test_engine_matches_individual_agents():
+    text = "Du ljuger alltid och byter ämne. Jag känner mig inte trygg!\nHan kontrollerar mina pengar."
+    payload = {"data": {"text": text}, "meta": {}}
+    res = diag_engine.run(payload)
+    assert set(res["emits"]["diag"]) == set(diag_engine.DIAG_AGENTS)
+    for agent_id, mod in diag_engine.load_agents().items():
+        assert res["emits"]["diag"][agent_id] == mod.run(payload).get("emits", {}), agent_id
+    assert res["engine"]["scans"] <= res["engine"]["sentences"] * 2
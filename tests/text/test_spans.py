@@ -0,0 +1,56 @@
+"""
+Spans
+
+lib.text.spans ska ge exakt samma merge/NMS som agenternas gamla loopar
+(sortering + jämförelse mot varje behållen span).
+"""
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lib.text.spans import iou, merge_same_label, nms
+
+
+def _quadratic_nms(spans, score, iou_thr, limit):
+    kept = []
+    for s in sorted(spans, key=score, reverse=True):
+        if all(iou((s["start"], s["end"]), (t["start"], t["end"])) < iou_thr for t in kept):
+            kept.append(s)
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+def test_nms_matches_quadratic():
+    rnd = random.Random(7)
+    score = lambda s: (s["end"] - s["start"]) * s["confidence"]
+    for _ in range(300):
+        spans = []
+        for i in range(rnd.randint(0, 40)):
+            a = rnd.randint(0, 300)
+            spans.append({"start": a, "end": a + rnd.choice([0, 3, 12, 40, rnd.randint(0, 300)]),
+                          "confidence": rnd.choice([0.7, 0.9]), "i": i})
+        iou_thr = rnd.choice([0.0, 0.3, 0.8, 1.0])
+        limit = rnd.choice([0, 2, 16])
+        assert [s["i"] for s in nms(spans, score, iou_thr, limit)] == \
+            [s["i"] for s in _quadratic_nms(spans, score, iou_thr, limit)]
+
+
+def test_merge_same_label():
+    spans = [
+        {"flag": "a", "start": 10, "end": 30, "confidence": 0.8},
+        {"flag": "a", "start": 0, "end": 20},
+        {"flag": "b", "start": 5, "end": 25, "confidence": 0.95},
+        {"flag": "a", "start": 60, "end": 70},
+    ]
+    out = merge_same_label(spans, label="flag", gap_join=2, iou_merge=0.3)
+    assert [(s["flag"], s["start"], s["end"], s.get("confidence")) for s in out] == [
+        ("a", 0, 30, 0.9), ("a", 60, 70, None), ("b", 5, 25, 0.95)]
+    # iou_merge=None: gap-villkoret ensamt
+    touching = [{"flag": "a", "start": 0, "end": 10}, {"flag": "a", "start": 11, "end": 50}]
+    assert len(merge_same_label([dict(s) for s in touching], iou_merge=None)) == 1
+    assert len(merge_same_label([dict(s) for s in touching], iou_merge=0.5)) == 2
@@ -0,0 +1,59 @@
+"""
+TextView
+
+Vyns former ska vara exakt det agenternas egna normalize()/split_sentences gav,
+och en vy som skickas in via run(..., view=) ska ge samma utfall som utan.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lib.text import TextView, clear_views, text_view
+from agents.diag_boundary import main as diag_boundary
+from agents.diag_trust import main as diag_trust
+from agents.lang_detect import main as lang_detect
+from agents.risk_selfharm import main as risk_selfharm
+from agents.safety_gate import main as safety_gate
+from agents.tox_nuance import main as tox_nuance
+
+TEXTS = [
+    "",
+    "Hej!  Jag är   trött.\nDu lyssnar aldrig... Varför? Déjà vu, naïve café.",
+    "I will KILL you. Pay 500 at https://x.y/z or mail a@b.se ```code 1```",
+]
+
+
+def test_forms_match_agent_normalizers():
+    for t in TEXTS:
+        v = TextView(t)
+        assert v.folded_ws == risk_selfharm.normalize(t)
+        assert v.folded == tox_nuance.normalize(t)
+        assert v.clean == lang_detect.normalize(t)
+        assert v.split(diag_boundary.SENT_SPLIT) == [x.strip() for x in diag_boundary.SENT_SPLIT.split(t) if x.strip()]
+        assert v.sentences == [x.strip() for x in diag_trust.SENT_SPLIT.split(t) if x.strip()]
+        for s, e in v.sentence_bounds:
+            assert t[s:e] == t[s:e].strip() and t[s:e]
+
+
+def test_shared_view_and_lazy_lang():
+    clear_views()
+    t = TEXTS[1]
+    v = text_view(t)
+    assert text_view(t) is v
+    assert "lang" not in v.__dict__
+    assert v.lang == lang_detect.detect_language(t)
+    assert [tok for tok, s, e in v.tokens][:2] == ["Hej", "Jag"]
+    assert all(t[s:e] == tok for tok, s, e in v.tokens)
+
+
+def test_run_with_view_is_identical():
+    cfg = safety_gate.cfg_from({}, safety_gate.parse_args([]))
+    for t in TEXTS:
+        payload = {"data": {"text": t}, "meta": {}}
+        v = TextView(t)
+        assert safety_gate.run(payload, cfg, view=v) == safety_gate.run(payload, cfg)
+        assert tox_nuance.run(payload, view=v) == tox_nuance.run(payload)
+        assert diag_trust.run(payload, view=v) == diag_trust.run(payload)
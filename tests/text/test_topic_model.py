@@ -0,0 +1,83 @@
+"""
+Topic classifier
+
+Den kompilerade TopicModel ska ge samma poäng och spans som den gamla
+loopen över ämnen/nyckelord, och batch-läget samma svar som en text i taget.
+"""
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.topic_classifier import main as topic_classifier
+from agents.topic_classifier.main import (TopicModel, classify_batch, find_all_spans, get_model,
+                                          normalize, run, score_topic)
+
+TOPICS = {
+    "kommunikation": {"keywords": ["prata", "samtal", "lyssna"], "phrases": ["prata med"], "kw_weight": 0.7},
+    "konflikt": {"keywords": ["bråk", "argument", "argument"], "regex": [r"gr[äa]l", "("], "rx_weight": 0.3, "bias": 0.1},
+    "känslor": {"keywords": ["ledsen", "arg"], "phrases": ["känner mig"], "ph_weight": 2.2},
+}
+
+
+def _loop_score(text_norm, topic_cfg):
+    # Den gamla score_topic, utan spans
+    total = 0.0
+    for kw in topic_cfg.get("keywords", []):
+        hits = find_all_spans(text_norm, normalize(kw))
+        if hits:
+            total += float(topic_cfg.get("kw_weight", 1.0)) * len(hits)
+    for ph in topic_cfg.get("phrases", []):
+        hits = find_all_spans(text_norm, normalize(ph))
+        if hits:
+            total += float(topic_cfg.get("ph_weight", 1.5)) * len(hits)
+    for rx_pat in topic_cfg.get("regex", []):
+        try:
+            for _ in re.compile(rx_pat, re.I).finditer(text_norm):
+                total += float(topic_cfg.get("rx_weight", 2.0))
+        except Exception:
+            continue
+    return total + float(topic_cfg.get("bias", 0.0))
+
+
+def test_model_matches_loop():
+    model = TopicModel(TOPICS)
+    for text in ["Jag vill prata med dig, prata!", "bråk och gräl, argument", "Jag känner mig ledsen och arg", ""]:
+        t = normalize(text)
+        assert model.score(t) == {k: _loop_score(t, cfg) for k, cfg in TOPICS.items()}
+
+
+def test_duplicate_keywords_share_a_feature():
+    model = TopicModel(TOPICS)
+    assert model.features.count("argument") == 1
+    assert model.score("argument")["konflikt"] == 2.0 + 0.1
+
+
+def test_model_cached_by_config():
+    assert get_model(TOPICS) is get_model(dict(TOPICS))
+    assert get_model(TOPICS) is not get_model({"känslor": TOPICS["känslor"]})
+
+
+def test_batch_matches_single():
+    texts = ["Vi måste prata med varandra", "Ännu ett bråk om pengar", "Jag känner mig ledsen"]
+    meta = {"topics": TOPICS, "explain_verbose": True}
+    batch = classify_batch(texts, meta)
+    assert batch == [run({"meta": meta, "data": {"text": t}})["emits"] for t in texts]
+    res = run({"meta": meta, "data": {"texts": texts, "labels_true": [["kommunikation"], None, ["känslor"]]}})
+    assert [r["tags"] for r in res["emits"]["results"]] == [b["tags"] for b in batch]
+    assert "metrics" in res["emits"]["results"][0] and "metrics" not in res["emits"]["results"][1]
+
+
+def test_score_topic_uses_full_model():
+    get_model(TOPICS)
+    cached = len(topic_classifier._models)
+    t = normalize("Jag vill prata med dig, bråk och gräl")
+    for topic, cfg in TOPICS.items():
+        spans = []
+        assert score_topic(t, topic, TOPICS, spans, True) == _loop_score(t, cfg)
+        assert all(s["topic"] == topic for s in spans)
+    assert score_topic(t, "okänt", TOPICS, [], False) == 0.0
+    assert len(topic_classifier._models) == cached